@@ -0,0 +1,102 @@
+"""Бенчмарк создания задач: N последовательных RPC против одного bulk RPC.
+
+Supabase не нужен: фейковый клиент отвечает на rpc() с задержкой --rtt-ms
+(сетевой round trip до PostgREST) плюс --row-us на строку внутри транзакции.
+Сравниваются:
+- per-row: цикл create_task_if_not_exists (как backfill/schedule_updates раньше);
+- bulk: backfill_scrape → create_tasks_if_not_exist (один RPC на пачку).
+
+Запуск:
+    uv run python -m scripts.bench_bulk_task_creation [--blogs N] [--rtt-ms MS] [--row-us US]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock, patch
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from src.database import create_task_if_not_exists
+from src.worker.scheduler import backfill_scrape
+
+
+class _FakeRpc:
+    """Ответ rpc(): задержка round trip + обработка строк."""
+
+    def __init__(self, client: "_FakeClient", name: str, params: dict[str, Any]) -> None:
+        self._client = client
+        self._name = name
+        self._params = params
+
+    async def execute(self) -> SimpleNamespace:
+        client = self._client
+        client.round_trips += 1
+        if self._name == "backfill_pending_blogs":
+            await asyncio.sleep(client.rtt)
+            return SimpleNamespace(data=[{"id": f"blog-{i}"} for i in range(client.blogs)])
+        if self._name == "create_task_if_not_exists":
+            await asyncio.sleep(client.rtt + client.row_cost)
+            return SimpleNamespace(data=f"task-{client.round_trips}")
+        if self._name == "create_tasks_if_not_exist":
+            rows = self._params["p_tasks"]
+            await asyncio.sleep(client.rtt + client.row_cost * len(rows))
+            return SimpleNamespace(data=[{"idx": i, "task_id": f"task-{i}"} for i in range(len(rows))])
+        raise ValueError(f"unexpected rpc {self._name}")
+
+
+class _FakeClient:
+    def __init__(self, blogs: int, rtt_ms: float, row_us: float) -> None:
+        self.blogs = blogs
+        self.rtt = rtt_ms / 1000
+        self.row_cost = row_us / 1_000_000
+        self.round_trips = 0
+
+    def rpc(self, name: str, params: dict[str, Any]) -> _FakeRpc:
+        return _FakeRpc(self, name, params)
+
+
+async def _per_row(blogs: int, rtt_ms: float, row_us: float) -> tuple[float, int]:
+    db: Any = _FakeClient(blogs, rtt_ms, row_us)
+    started = time.perf_counter()
+    for i in range(blogs):
+        await create_task_if_not_exists(db, f"blog-{i}", "full_scrape", priority=6)
+    return time.perf_counter() - started, db.round_trips
+
+
+async def _bulk(blogs: int, rtt_ms: float, row_us: float) -> tuple[float, int]:
+    db: Any = _FakeClient(blogs, rtt_ms, row_us)
+    settings: Any = SimpleNamespace(backfill_scrape_batch_size=blogs, ai_queue_pause_threshold=10**9)
+    with (
+        patch("src.worker.scheduler.count_running_ai_tasks", AsyncMock(return_value=0)),
+        patch("src.worker.scheduler.has_recent_balance_errors", AsyncMock(return_value=False)),
+    ):
+        started = time.perf_counter()
+        await backfill_scrape(db, settings)
+    # Вычитаем выборку блогов — сравниваем только создание задач
+    return time.perf_counter() - started - db.rtt, db.round_trips - 1
+
+
+async def main(blogs: int, rtt_ms: float, row_us: float) -> None:
+    """Вывести время создания задач для N блогов в обоих режимах."""
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+    logger.info(f"blogs={blogs}, rtt={rtt_ms}ms, row_cost={row_us}us")
+    for name, runner in (("per-row", _per_row), ("bulk", _bulk)):
+        elapsed, round_trips = await runner(blogs, rtt_ms, row_us)
+        logger.info(f"{name:<8} {elapsed * 1000:9.1f}ms  round_trips={round_trips}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-row vs bulk создание задач")
+    parser.add_argument("--blogs", type=int, default=1000, help="Количество блогов")
+    parser.add_argument("--rtt-ms", type=float, default=15.0, help="Round trip до PostgREST (мс)")
+    parser.add_argument("--row-us", type=float, default=50.0, help="Стоимость строки в транзакции (мкс)")
+    args = parser.parse_args()
+    asyncio.run(main(args.blogs, args.rtt_ms, args.row_us))
@@ -0,0 +1,185 @@
+"""Бенчмарк латентности enqueue → start задачи в run_worker.
+
+Сравнивает два режима на in-memory очереди (Supabase не нужен):
+- poll-only: воркер узнаёт о задаче только на следующем poll;
+- wakeup: создание задачи будит воркер через TaskWakeup.
+С --dsn дополнительно меряет путь через Postgres NOTIFY: задачи вставляются
+во временную таблицу с триггером pg_notify, воркер слушает LISTEN.
+
+Запуск:
+    uv run python -m scripts.bench_dispatch_latency [--tasks N] [--poll-interval S] [--dsn DSN]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from src.task_wakeup import TASK_CHANNEL, TaskWakeup, listen_for_new_tasks, notify_task_created
+from src.worker.loop import run_worker
+
+
+class _MemoryQueue:
+    """In-memory замена scrape_tasks: enqueue фиксирует время, start — латентность."""
+
+    def __init__(self) -> None:
+        self.pending: list[dict[str, Any]] = []
+        self.enqueued_at: dict[str, float] = {}
+        self.latencies: list[float] = []
+        self.started = asyncio.Event()
+
+    def enqueue(self) -> str:
+        task_id = str(uuid.uuid4())
+        self.enqueued_at[task_id] = time.perf_counter()
+        self.pending.append({"id": task_id, "task_type": "discover", "attempts": 0, "max_attempts": 3})
+        return task_id
+
+    async def claim(
+        self, _db: Any, _worker_id: str, limit: int = 10, task_types: list[str] | None = None,
+        lease_seconds: int = 60,
+    ) -> list[dict[str, Any]]:
+        if task_types is not None and "discover" not in task_types:
+            return []
+        batch, self.pending = self.pending[:limit], self.pending[limit:]
+        return batch
+
+    async def process(self, _db: Any, task: dict[str, Any], *_args: Any, **_kwargs: Any) -> None:
+        self.latencies.append(time.perf_counter() - self.enqueued_at[task["id"]])
+        self.started.set()
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+async def _run_scenario(
+    name: str,
+    n_tasks: int,
+    poll_interval: float,
+    enqueue: Any,
+    queue: _MemoryQueue,
+    wakeup: TaskWakeup,
+) -> list[float]:
+    """Запустить run_worker и создавать задачи со случайными паузами."""
+    settings = SimpleNamespace(
+        worker_poll_interval=poll_interval,
+        worker_max_concurrent=5,
+        upload_max_concurrent=5,
+        worker_id="bench",
+        worker_lanes="",
+        task_lease_seconds=60,
+        task_lease_renew_seconds=15,
+        status_flush_interval_ms=50,
+        status_flush_max_items=100,
+    )
+    shutdown = asyncio.Event()
+    with (
+        patch("src.worker.loop.claim_pending_tasks", queue.claim),
+        patch("src.worker.loop.process_task", queue.process),
+    ):
+        worker = asyncio.create_task(
+            run_worker(None, {}, settings, shutdown, openai_client=object(), wakeup=wakeup),  # type: ignore[arg-type]
+        )
+        await asyncio.sleep(0.1)
+        for _ in range(n_tasks):
+            # Случайная фаза относительно poll-цикла
+            await asyncio.sleep(random.uniform(0, poll_interval))
+            queue.started.clear()
+            await enqueue()
+            await queue.started.wait()
+        shutdown.set()
+        await worker
+
+    lat_ms = [v * 1000 for v in queue.latencies]
+    logger.info(
+        f"{name:<10} n={len(lat_ms):>3}  p50={_percentile(lat_ms, 50):8.1f}ms  "
+        f"p99={_percentile(lat_ms, 99):8.1f}ms  mean={statistics.fmean(lat_ms):8.1f}ms"
+    )
+    return lat_ms
+
+
+async def _bench_poll_only(n_tasks: int, poll_interval: float) -> None:
+    queue = _MemoryQueue()
+
+    async def enqueue() -> None:
+        queue.enqueue()
+
+    await _run_scenario("poll-only", n_tasks, poll_interval, enqueue, queue, TaskWakeup())
+
+
+async def _bench_local_wakeup(n_tasks: int, poll_interval: float) -> None:
+    queue = _MemoryQueue()
+
+    async def enqueue() -> None:
+        queue.enqueue()
+        notify_task_created("discover")
+
+    await _run_scenario("wakeup", n_tasks, poll_interval, enqueue, queue, TaskWakeup())
+
+
+async def _bench_pg_notify(n_tasks: int, poll_interval: float, dsn: str) -> None:
+    import asyncpg
+
+    queue = _MemoryQueue()
+    wakeup = TaskWakeup()
+    listener_shutdown = asyncio.Event()
+    listener = asyncio.create_task(listen_for_new_tasks(dsn, wakeup, listener_shutdown))
+
+    producer = await asyncpg.connect(dsn)
+    await producer.execute(f"""
+        CREATE TEMP TABLE bench_tasks (id uuid PRIMARY KEY, task_type text NOT NULL);
+        CREATE FUNCTION pg_temp.bench_notify() RETURNS trigger AS $$
+        BEGIN
+          PERFORM pg_notify('{TASK_CHANNEL}', NEW.task_type);
+          RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        CREATE TRIGGER bench_tasks_notify AFTER INSERT ON bench_tasks
+          FOR EACH ROW EXECUTE FUNCTION pg_temp.bench_notify();
+    """)
+    # Дать listener подключиться
+    await asyncio.sleep(0.5)
+
+    async def enqueue() -> None:
+        task_id = queue.enqueue()
+        await producer.execute("INSERT INTO bench_tasks VALUES ($1, 'discover')", uuid.UUID(task_id))
+
+    try:
+        await _run_scenario("pg-notify", n_tasks, poll_interval, enqueue, queue, wakeup)
+    finally:
+        listener_shutdown.set()
+        await listener
+        await producer.close()
+
+
+async def main(n_tasks: int, poll_interval: float, dsn: str | None) -> None:
+    """Прогнать сценарии и вывести p50/p99 латентности enqueue → start."""
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+    logger.info(f"tasks={n_tasks}, poll_interval={poll_interval}s")
+    await _bench_poll_only(n_tasks, poll_interval)
+    await _bench_local_wakeup(n_tasks, poll_interval)
+    if dsn:
+        await _bench_pg_notify(n_tasks, poll_interval, dsn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Латентность enqueue → start воркера")
+    parser.add_argument("--tasks", type=int, default=30, help="Количество задач на сценарий")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="worker_poll_interval (сек)")
+    parser.add_argument("--dsn", default=None, help="Postgres DSN для сценария с NOTIFY")
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.poll_interval, args.dsn))
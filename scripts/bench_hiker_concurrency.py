@@ -0,0 +1,109 @@
+"""Бенчмарк параллелизма HikerAPI: sync SDK через to_thread против async-клиента.
+
+Поднимает локальный fake HikerAPI (uvicorn, 127.0.0.1) с задержкой --latency-ms
+на каждый ответ и гоняет --requests вызовов user_by_username_v2 при разном
+числе одновременных задач:
+- to_thread: hikerapi.Client в default executor на 4 треда (как в main.py до перехода);
+- async: SafeHikerClient (общий httpx.AsyncClient).
+Пропускная способность to_thread упирается в 4 * 1000 / latency req/s,
+async растёт с concurrency.
+
+Запуск:
+    uv run python -m scripts.bench_hiker_concurrency [--requests N] [--latency-ms MS] [--concurrency 4,16,64]
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import socket
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import uvicorn
+from fastapi import FastAPI
+from hikerapi import Client
+from loguru import logger
+
+from src.platforms.instagram.hiker_scraper import SafeHikerClient
+
+
+def _fake_hikerapi(latency_ms: float) -> FastAPI:
+    """Минимальный fake HikerAPI: /v2/user/by/username с искусственной задержкой."""
+    app = FastAPI()
+
+    @app.get("/v2/user/by/username")
+    async def user_by_username(username: str) -> dict[str, Any]:
+        await asyncio.sleep(latency_ms / 1000)
+        return {"user": {"pk": "1", "username": username}, "status": "ok"}
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+async def _run(n_requests: int, concurrency: int, call: Callable[[str], Awaitable[Any]]) -> float:
+    """n_requests вызовов не более чем по concurrency одновременно; возвращает req/s."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(i: int) -> None:
+        async with semaphore:
+            await call(f"user{i}")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(n_requests)))
+    return n_requests / (time.perf_counter() - started)
+
+
+async def main(n_requests: int, latency_ms: float, levels: list[int]) -> None:
+    """Сравнить req/s sync SDK (to_thread, 4 треда) и async-клиента на каждом уровне concurrency."""
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        _fake_hikerapi(latency_ms), host="127.0.0.1", port=port, log_level="warning",
+    ))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:  # noqa: ASYNC110 — uvicorn выставляет только bool-флаг
+        await asyncio.sleep(0.01)
+
+    base_url = f"http://127.0.0.1:{port}"
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=4))
+
+    sync_client = Client(token="bench")
+    sync_client._url = base_url
+    sync_client._client.base_url = base_url
+    async_client = SafeHikerClient(token="bench", base_url=base_url, max_connections=max(levels))
+
+    logger.info(f"requests={n_requests}, latency={latency_ms}ms, executor=4 threads")
+    logger.info(f"{'concurrency':>11}  {'to_thread req/s':>15}  {'async req/s':>11}")
+    try:
+        for level in levels:
+            threaded = await _run(
+                n_requests, level, lambda u: asyncio.to_thread(sync_client.user_by_username_v2, u),
+            )
+            native = await _run(n_requests, level, async_client.user_by_username_v2)
+            logger.info(f"{level:>11}  {threaded:>15,.0f}  {native:>11,.0f}")
+    finally:
+        await async_client.aclose()
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HikerAPI: to_thread vs async-клиент на fake-сервере")
+    parser.add_argument("--requests", type=int, default=400, help="Вызовов на каждый уровень")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Задержка ответа fake-сервера (мс)")
+    parser.add_argument("--concurrency", default="4,16,64", help="Уровни параллелизма через запятую")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency_ms, [int(x) for x in args.concurrency.split(",")]))
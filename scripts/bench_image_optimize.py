@@ -0,0 +1,126 @@
+"""Бенчмарк подготовки изображений для LLM: четыре прохода JPEG против прогноза качества.
+
+Прогоняет корпус миниатюр (--corpus: каталог с .jpg/.jpeg/.png/.webp, например
+скачанные из Storage post_*.jpg и avatar.jpg) через два кодировщика:
+- legacy: thumbnail + JPEG с quality 82 → 72 → 62 → 52 до MAX_OPTIMIZED_IMAGE_SIZE
+  (PNG-проход для любого alpha), как optimize_image_for_llm раньше;
+- current: src.ai.images.optimize_image_for_llm.
+Для каждого — CPU мс на изображение и распределение размера результата.
+Без --corpus генерируется синтетический набор (шум + градиенты разных размеров).
+
+Запуск:
+    uv run python -m scripts.bench_image_optimize [--corpus DIR] [--limit-kb KB] [--repeat N]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+from PIL import Image, ImageFilter
+
+import src.ai.images as images
+
+_CORPUS_SUFFIXES = frozenset({".jpg", ".jpeg", ".png", ".webp"})
+
+
+def _legacy_optimize(raw_image: bytes, _source_url: str) -> tuple[bytes, str] | None:
+    """Прежний алгоритм: до четырёх полных JPEG-кодирований с optimize=True."""
+    image = Image.open(io.BytesIO(raw_image))
+    image.load()
+    image.thumbnail((images.MAX_IMAGE_DIMENSION, images.MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
+    if "A" in image.getbands():
+        png_buffer = io.BytesIO()
+        image.save(png_buffer, format="PNG", optimize=True)
+        if len(png_buffer.getvalue()) <= images.MAX_OPTIMIZED_IMAGE_SIZE:
+            return png_buffer.getvalue(), "image/png"
+        image = image.convert("RGB")
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    best_jpeg = raw_image
+    for quality in (82, 72, 62, 52):
+        jpeg_buffer = io.BytesIO()
+        image.save(jpeg_buffer, format="JPEG", quality=quality, optimize=True)
+        best_jpeg = jpeg_buffer.getvalue()
+        if len(best_jpeg) <= images.MAX_OPTIMIZED_IMAGE_SIZE:
+            break
+    return best_jpeg, "image/jpeg"
+
+
+def _load_corpus(corpus: Path) -> list[bytes]:
+    return [
+        path.read_bytes() for path in sorted(corpus.rglob("*"))
+        if path.suffix.lower() in _CORPUS_SUFFIXES
+    ]
+
+
+def _synthetic_corpus() -> list[bytes]:
+    """Миниатюры Instagram-подобных размеров: JPEG 1080px, небольшие JPEG и PNG с alpha."""
+    corpus: list[bytes] = []
+    for i, (size, fmt) in enumerate([
+        ((1080, 1350), "JPEG"), ((1080, 1080), "JPEG"), ((640, 800), "JPEG"),
+        ((320, 320), "JPEG"), ((150, 150), "JPEG"), ((1080, 1080), "PNG"),
+    ] * 5):
+        noise = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3))
+        image = noise.filter(ImageFilter.GaussianBlur(1 + i % 4))
+        if fmt == "PNG":
+            image.putalpha(255)
+        buffer = io.BytesIO()
+        image.save(buffer, format=fmt, quality=90)
+        corpus.append(buffer.getvalue())
+    return corpus
+
+
+def _measure(
+    optimize: Callable[[bytes, str], tuple[bytes, str] | None], corpus: list[bytes], repeat: int,
+) -> tuple[float, list[int]]:
+    """CPU мс на изображение (по лучшему из repeat прогонов) и размеры результата."""
+    best_cpu = float("inf")
+    sizes: list[int] = []
+    for _ in range(repeat):
+        sizes = []
+        started = time.process_time()
+        for raw in corpus:
+            result = optimize(raw, "bench")
+            if result is not None:
+                sizes.append(len(result[0]))
+        best_cpu = min(best_cpu, (time.process_time() - started) * 1000 / len(corpus))
+    return best_cpu, sizes
+
+
+def main(corpus_dir: Path | None, limit_kb: int, repeat: int) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+
+    images.MAX_OPTIMIZED_IMAGE_SIZE = limit_kb * 1024
+    corpus = _load_corpus(corpus_dir) if corpus_dir is not None else _synthetic_corpus()
+    if not corpus:
+        logger.info(f"В {corpus_dir} нет изображений")
+        return
+    source = str(corpus_dir) if corpus_dir is not None else "synthetic"
+    logger.info(f"corpus={source}, images={len(corpus)}, limit={limit_kb}KB, repeat={repeat}")
+    logger.info(f"{'encoder':>8}  {'cpu ms/img':>10}  {'p50 KB':>7}  {'p90 KB':>7}  {'max KB':>7}  {'over':>4}")
+    for name, optimize in (("legacy", _legacy_optimize), ("current", images.optimize_image_for_llm)):
+        cpu_ms, sizes = _measure(optimize, corpus, repeat)
+        deciles = statistics.quantiles(sizes, n=10) if len(sizes) > 1 else sizes * 9
+        over = sum(size > images.MAX_OPTIMIZED_IMAGE_SIZE for size in sizes)
+        logger.info(
+            f"{name:>8}  {cpu_ms:>10.1f}  {statistics.median(sizes) / 1024:>7.1f}  "
+            f"{deciles[8] / 1024:>7.1f}  {max(sizes) / 1024:>7.1f}  {over:>4}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU и размер подготовки изображений для LLM")
+    parser.add_argument("--corpus", type=Path, default=None, help="Каталог с миниатюрами")
+    parser.add_argument("--limit-kb", type=int, default=400, help="MAX_OPTIMIZED_IMAGE_SIZE (КБ)")
+    parser.add_argument("--repeat", type=int, default=3, help="Прогонов корпуса на кодировщик")
+    args = parser.parse_args()
+    main(args.corpus, args.limit_kb, args.repeat)
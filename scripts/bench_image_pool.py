@@ -0,0 +1,118 @@
+"""Бенчмарк лага event loop при оптимизации изображений для LLM.
+
+Прогоняет корпус (--corpus или синтетический из bench_image_optimize) через
+optimize_image_for_llm тремя способами при --concurrency одновременных задачах
+(как download_semaphore в submit_batch):
+- inline: синхронный вызов в event loop (download_image_as_base64 раньше);
+- thread: asyncio.to_thread (_upload_llm_variant раньше);
+- process: optimize_image_async с пулом create_image_pool(--workers).
+Параллельно зонд спит по --tick-ms и меряет опоздание пробуждений —
+лаг, который видят API и остальные задачи воркера. Для каждого способа:
+изображений/с и лаг p50/p99/max.
+
+Запуск:
+    uv run python -m scripts.bench_image_pool [--corpus DIR] [--workers N] [--concurrency N] [--repeat N]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+import src.ai.images as images
+from scripts.bench_image_optimize import _load_corpus, _synthetic_corpus
+
+type Optimize = Callable[[bytes, str], Awaitable[tuple[bytes, str] | None]]
+
+
+async def _inline(raw_image: bytes, source_url: str) -> tuple[bytes, str] | None:
+    return images.optimize_image_for_llm(raw_image, source_url)
+
+
+async def _thread(raw_image: bytes, source_url: str) -> tuple[bytes, str] | None:
+    return await asyncio.to_thread(images.optimize_image_for_llm, raw_image, source_url)
+
+
+async def _lag_probe(tick: float, lags: list[float], done: asyncio.Event) -> None:
+    """Спать по tick и записывать опоздание каждого пробуждения (мс)."""
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append((time.perf_counter() - started - tick) * 1000)
+
+
+async def _run(optimize: Optimize, corpus: list[bytes], concurrency: int, tick: float) -> tuple[float, list[float]]:
+    """Изображений/с и лаги зонда за один прогон корпуса."""
+    semaphore = asyncio.Semaphore(concurrency)
+    lags: list[float] = []
+    done = asyncio.Event()
+    probe = asyncio.create_task(_lag_probe(tick, lags, done))
+    await asyncio.sleep(tick)  # Зонд успевает начать до нагрузки
+
+    async def _one(raw: bytes) -> None:
+        async with semaphore:
+            await optimize(raw, "bench")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one(raw) for raw in corpus))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe
+    return len(corpus) / elapsed, lags
+
+
+async def main(corpus_dir: Path | None, workers: int, concurrency: int, repeat: int, tick_ms: float) -> None:
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+
+    corpus = _load_corpus(corpus_dir) if corpus_dir is not None else _synthetic_corpus()
+    if not corpus:
+        logger.info(f"В {corpus_dir} нет изображений")
+        return
+    corpus *= repeat
+    source = str(corpus_dir) if corpus_dir is not None else "synthetic"
+    logger.info(
+        f"corpus={source}, images={len(corpus)}, workers={workers}, "
+        f"concurrency={concurrency}, tick={tick_ms}ms"
+    )
+
+    pool = images.create_image_pool(workers)
+    # Прогрев: старт forkserver и рабочих процессов не входит в замер
+    await asyncio.gather(*(
+        asyncio.get_running_loop().run_in_executor(pool, images.optimize_image_for_llm, corpus[0], "warmup")
+        for _ in range(workers)
+    ))
+    images.set_image_pool(pool)
+    modes: list[tuple[str, Optimize]] = [
+        ("inline", _inline), ("thread", _thread), ("process", images.optimize_image_async),
+    ]
+    try:
+        logger.info(f"{'mode':>8}  {'img/s':>6}  {'lag p50':>8}  {'lag p99':>8}  {'lag max':>8}")
+        for name, optimize in modes:
+            rate, lags = await _run(optimize, corpus, concurrency, tick_ms / 1000)
+            p99 = statistics.quantiles(lags, n=100, method="inclusive")[98] if len(lags) > 1 else max(lags)
+            logger.info(
+                f"{name:>8}  {rate:>6.1f}  {statistics.median(lags):>6.1f}ms  "
+                f"{p99:>6.1f}ms  {max(lags):>6.1f}ms"
+            )
+    finally:
+        images.set_image_pool(None)
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Лаг event loop: optimize_image_for_llm inline / thread / process")
+    parser.add_argument("--corpus", type=Path, default=None, help="Каталог с миниатюрами")
+    parser.add_argument("--workers", type=int, default=2, help="Процессов в пуле")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных задач")
+    parser.add_argument("--repeat", type=int, default=2, help="Повторов корпуса")
+    parser.add_argument("--tick-ms", type=float, default=5.0, help="Период зонда лага (мс)")
+    args = parser.parse_args()
+    asyncio.run(main(args.corpus, args.workers, args.concurrency, args.repeat, args.tick_ms))
@@ -0,0 +1,95 @@
+"""Бенчмарк обработки упавшего AI-батча: N последовательных UPDATE против TaskStatusWriter.
+
+Фейковый клиент отвечает на update().execute() с задержкой --rtt-ms.
+Сравниваются:
+- serial: цикл mark_task_failed без writer (как _safe_fail_tasks раньше);
+- writer: _safe_fail_tasks с активным TaskStatusWriter (bulk UPDATE на группу).
+
+Запуск:
+    uv run python -m scripts.bench_status_writer [--tasks N] [--rtt-ms MS]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from src.database import TaskStatusWriter, mark_task_failed, set_active_status_writer
+from src.worker.handlers import _safe_fail_tasks
+
+
+class _FakeQuery:
+    def __init__(self, client: "_FakeClient") -> None:
+        self._client = client
+
+    def update(self, _data: dict[str, Any]) -> "_FakeQuery":
+        return self
+
+    def eq(self, *_args: Any) -> "_FakeQuery":
+        return self
+
+    def in_(self, *_args: Any) -> "_FakeQuery":
+        return self
+
+    async def execute(self) -> SimpleNamespace:
+        self._client.round_trips += 1
+        await asyncio.sleep(self._client.rtt)
+        return SimpleNamespace(data=[])
+
+
+class _FakeClient:
+    def __init__(self, rtt_ms: float) -> None:
+        self.rtt = rtt_ms / 1000
+        self.round_trips = 0
+
+    def table(self, _name: str) -> _FakeQuery:
+        return _FakeQuery(self)
+
+
+async def _serial(task_infos: list[tuple[str, int, int]], rtt_ms: float) -> tuple[float, int]:
+    db: Any = _FakeClient(rtt_ms)
+    started = time.perf_counter()
+    for task_id, attempts, max_attempts in task_infos:
+        await mark_task_failed(db, task_id, attempts, max_attempts, "Batch failed")
+    return time.perf_counter() - started, db.round_trips
+
+
+async def _with_writer(task_infos: list[tuple[str, int, int]], rtt_ms: float) -> tuple[float, int]:
+    db: Any = _FakeClient(rtt_ms)
+    writer = TaskStatusWriter(db)
+    set_active_status_writer(writer)
+    try:
+        started = time.perf_counter()
+        await _safe_fail_tasks(db, task_infos, "Batch failed")
+        elapsed = time.perf_counter() - started
+    finally:
+        set_active_status_writer(None)
+        await writer.close()
+    return elapsed, db.round_trips
+
+
+async def main(n_tasks: int, rtt_ms: float) -> None:
+    """Вывести время пометки N задач упавшего батча в обоих режимах."""
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+    # attempts 1 и 3 из 3 — две группы: retry и окончательный failed
+    task_infos = [(f"task-{i}", 1 if i % 2 else 3, 3) for i in range(n_tasks)]
+    logger.info(f"tasks={n_tasks}, rtt={rtt_ms}ms")
+    for name, runner in (("serial", _serial), ("writer", _with_writer)):
+        elapsed, round_trips = await runner(task_infos, rtt_ms)
+        logger.info(f"{name:<7} {elapsed * 1000:9.1f}ms  round_trips={round_trips}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial vs write-behind пометка задач упавшего батча")
+    parser.add_argument("--tasks", type=int, default=100, help="Задач в упавшем батче")
+    parser.add_argument("--rtt-ms", type=float, default=15.0, help="Round trip до PostgREST (мс)")
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.rtt_ms))
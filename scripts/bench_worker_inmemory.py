@@ -0,0 +1,109 @@
+"""Нагрузочный бенчмарк run_worker на InMemoryTaskRepository — без Supabase.
+
+В очередь кладутся N синтетических задач, handlers подменяются заглушкой,
+которая ждёт --work-ms и помечает задачу done через переданные ей repos. Измеряется
+пропускная способность цикла воркера (claim → lane → process_task → wakeup)
+и его накладные расходы относительно идеального времени N * work / concurrency.
+
+По умолчанию задачи pre_filter и discover: после full_scrape/ai_analysis
+process_task вызывает gc.collect(), что на 100k задач измеряет GC, а не цикл.
+
+Запуск:
+    uv run python -m scripts.bench_worker_inmemory [--tasks N] [--concurrency C] [--work-ms MS]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+# Добавляем корень проекта в sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from loguru import logger
+
+from src.repositories.memory import InMemoryBlogRepository, InMemoryTaskRepository
+from src.worker.handlers import HandlerRepos
+from src.worker.loop import run_worker
+
+
+def _settings(concurrency: int, task_types: list[str]) -> Any:
+    per_lane = max(1, concurrency // len(task_types))
+    return SimpleNamespace(
+        worker_poll_interval=1,
+        worker_max_concurrent=concurrency,
+        upload_max_concurrent=concurrency,
+        worker_id="bench",
+        worker_lanes=",".join(f"{t}:{per_lane}:1" for t in task_types),
+        task_lease_seconds=60,
+        task_lease_renew_seconds=15,
+        status_flush_interval_ms=50,
+        status_flush_max_items=100,
+    )
+
+
+async def main(n_tasks: int, concurrency: int, work_ms: float, task_types: list[str]) -> None:
+    """Прогнать n_tasks через run_worker и вывести tasks/sec и накладные расходы."""
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", format="{message}", filter=lambda r: r["name"] == __name__)
+
+    repo = InMemoryTaskRepository()
+    for i in range(n_tasks):
+        await repo.create_if_not_exists(f"blog-{i}", task_types[i % len(task_types)], priority=i % 10)
+
+    shutdown = asyncio.Event()
+    done = 0
+
+    async def _handler(_db: Any, task: Any, *_args: Any, repos: HandlerRepos) -> None:
+        nonlocal done
+        if work_ms:
+            await asyncio.sleep(work_ms / 1000)
+        await repos.tasks.mark_done(task["id"])
+        done += 1
+        if done == n_tasks:
+            shutdown.set()
+
+    settings = _settings(concurrency, task_types)
+    logger.info(
+        f"tasks={n_tasks}, concurrency={concurrency}, work={work_ms}ms, types={','.join(task_types)}"
+    )
+    with (
+        patch("src.worker.loop.handle_pre_filter", _handler),
+        patch("src.worker.loop.handle_discover", _handler),
+        patch("src.worker.loop.handle_full_scrape", _handler),
+        patch("src.worker.loop.handle_ai_analysis", _handler),
+    ):
+        started = time.perf_counter()
+        await run_worker(
+            db=None,  # type: ignore[arg-type]
+            scrapers={"instagram": object()},  # type: ignore[dict-item]
+            settings=settings,
+            shutdown_event=shutdown,
+            openai_client=object(),  # type: ignore[arg-type]
+            task_repo=repo,
+            repos=HandlerRepos(tasks=repo, blogs=InMemoryBlogRepository()),
+        )
+        elapsed = time.perf_counter() - started
+
+    ideal = n_tasks * work_ms / 1000 / concurrency
+    logger.info(f"elapsed   {elapsed:8.2f}s  ({n_tasks / elapsed:,.0f} tasks/s)")
+    logger.info(f"ideal     {ideal:8.2f}s  overhead {(elapsed - ideal) / n_tasks * 1e6:,.1f}µs/task")
+    logger.info(f"claims    {repo.claim_calls}  statuses={dict(repo.status_counts())}")
+    for priority, waits in sorted(repo.wait_seconds.items()):
+        waits.sort()
+        p50 = waits[len(waits) // 2]
+        p99 = waits[min(len(waits) - 1, int(len(waits) * 0.99))]
+        logger.info(f"wait p{priority:<2}   n={len(waits):>6}  p50={p50:.3f}s  p99={p99:.3f}s  max={waits[-1]:.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пропускная способность run_worker на in-memory очереди")
+    parser.add_argument("--tasks", type=int, default=100_000, help="Синтетических задач")
+    parser.add_argument("--concurrency", type=int, default=64, help="worker_max_concurrent")
+    parser.add_argument("--work-ms", type=float, default=0.0, help="Время «работы» handler'а (мс)")
+    parser.add_argument("--types", default="pre_filter,discover", help="task_type задач через запятую")
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.concurrency, args.work_ms, args.types.split(",")))
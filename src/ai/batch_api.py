@@ -2,9 +2,9 @@
 import asyncio
 import io
 import json
+from collections.abc import Mapping
 from typing import Any, cast
 
-import httpx
 from loguru import logger
 from openai import AsyncOpenAI
 from pydantic import ValidationError
@@ -13,6 +13,7 @@ from src.ai.images import resolve_profile_images
 from src.ai.prompt import build_analysis_prompt
 from src.ai.schemas import AIInsights
 from src.config import Settings
+from src.http_clients import cdn_client
 from src.models.blog import ScrapedProfile
 
 __all__ = [
@@ -234,11 +235,14 @@ async def submit_batch(
     profiles: list[tuple[str, ScrapedProfile]],
     settings: Settings,
     text_only_ids: set[str] | None = None,
+    llm_variants: Mapping[str, str] | None = None,
 ) -> str:
     """
     Отправить батч профилей на анализ.
     profiles — список (blog_id, ScrapedProfile).
     text_only_ids — blog_id для которых не скачивать изображения (retry после refusal).
+    llm_variants — {URL изображения: URL его LLM-варианта в Storage}; такие
+    изображения идут в запрос ссылкой, без скачивания.
     Возвращает batch_id.
 
     Использует chunked pipeline: профили обрабатываются чанками по _IMAGE_CHUNK_SIZE,
@@ -263,7 +267,7 @@ async def submit_batch(
     )
 
     try:
-        async with httpx.AsyncClient() as http_client:
+        async with cdn_client() as http_client:
             for chunk_start in range(0, len(profiles), _IMAGE_CHUNK_SIZE):
                 chunk = profiles[chunk_start:chunk_start + _IMAGE_CHUNK_SIZE]
 
@@ -277,6 +281,7 @@ async def submit_batch(
                     image_tasks = [
                         resolve_profile_images(
                             profile, client=http_client, semaphore=download_semaphore,
+                            llm_variants=llm_variants,
                         )
                         for _, profile in chunk_for_images
                     ]
@@ -310,7 +315,7 @@ async def submit_batch(
                 del chunk_image_maps
 
         logger.info(
-            f"[batch] Скачано {total_images} изображений для "
+            f"[batch] Подготовлено {total_images} изображений (скачаны или LLM-варианты по URL) для "
             f"{total_profiles_with_images} профилей"
         )
         logger.debug(f"[batch] JSONL size: {buffer.tell()} bytes, model={settings.batch_model}")
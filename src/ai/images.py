@@ -1,12 +1,19 @@
 """Скачивание изображений и конвертация в base64 data URI для Batch API."""
 import asyncio
 import base64
+import concurrent.futures
+import contextlib
 import io
+import math
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures.process import BrokenProcessPool
 
 import httpx
 from loguru import logger
 from PIL import Image
 
+from src.http_clients import cdn_client
 from src.models.blog import ScrapedProfile
 from src.utils import is_safe_url
 
@@ -41,14 +48,106 @@ _ALLOWED_IMAGE_MIMES = frozenset({
 })
 
 
+# JPEG: качество первого прохода и нижняя граница подбора
+JPEG_QUALITY = 82
+MIN_JPEG_QUALITY = 40
+
+# Перекодирований после первого прохода, если JPEG не уложился в лимит
+MAX_QUALITY_SEARCH_STEPS = 2
+
+# Прогноз качества целится чуть ниже лимита, чтобы чаще попадать с первого раза
+_QUALITY_TARGET_MARGIN = 0.9
+
+# Размер JPEG ∝ scale ** -e. Показатель e зависит от плотности первого прохода
+# (байт на пиксель): гладкие изображения при снижении качества сжимаются
+# сильнее, шумные — слабее. Эмпирически e ≈ 0.55 при 0.3 байт/пиксель
+# (фото), ≈ 0.75 при 0.03 (гладкие градиенты), ≈ 0.5 у шума.
+_JPEG_SIZE_EXPONENT = 0.55
+_JPEG_EXPONENT_REF_BPP = 0.3
+_JPEG_EXPONENT_BPP_SLOPE = 0.08
+_JPEG_EXPONENT_MIN = 0.45
+_JPEG_EXPONENT_MAX = 0.8
+
+# LLM-вариант (результат optimize_image_for_llm) лежит в Storage рядом с
+# оригиналом: blog/post_X.jpg → blog/post_X_llm.jpg. Создаётся при full_scrape
+# и отмечается в blogs.image_index; в батч попадает ссылкой, без скачивания.
+LLM_VARIANT_SUFFIX = "_llm"
+
+
+# Пул процессов для optimize_image_for_llm (регистрирует main.py); без него — поток
+_image_pool: concurrent.futures.ProcessPoolExecutor | None = None
+
+
 class _ImageTooLargeError(Exception):
     """Raised when downloaded image exceeds hard byte limit."""
 
 
-def _optimize_image_for_llm(raw_image: bytes, source_url: str) -> tuple[bytes, str] | None:
-    """Сжать/уменьшить изображение для более компактного base64 payload."""
+def llm_variant_path(path: str) -> str:
+    """Путь LLM-варианта для пути (или URL) оригинала: post_X.jpg → post_X_llm.jpg."""
+    stem, dot, ext = path.rpartition(".")
+    if not dot or "/" in ext:
+        return f"{path}{LLM_VARIANT_SUFFIX}"
+    return f"{stem}{LLM_VARIANT_SUFFIX}.{ext}"
+
+
+def _jpeg_scale(quality: int) -> float:
+    """Множитель таблиц квантования libjpeg (в %) для заданного quality."""
+    return 5000 / quality if quality < 50 else 200 - 2 * quality
+
+
+def _jpeg_size_exponent(bytes_per_pixel: float) -> float:
+    """Показатель e в размер ∝ scale ** -e для плотности bytes_per_pixel."""
+    exponent = _JPEG_SIZE_EXPONENT - _JPEG_EXPONENT_BPP_SLOPE * math.log(
+        max(bytes_per_pixel, 1e-3) / _JPEG_EXPONENT_REF_BPP
+    )
+    return max(_JPEG_EXPONENT_MIN, min(_JPEG_EXPONENT_MAX, exponent))
+
+
+def _predict_jpeg_quality(quality: int, size: int, pixels: int) -> int:
+    """Качество, при котором JPEG размера size (при quality, pixels пикселей) уложится в лимит.
+
+    Шаг квантования пропорционален _jpeg_scale(quality), а размер JPEG
+    падает примерно как его степень: нужный scale выводится из отношения
+    размера прохода к цели, показатель — из байт на пиксель.
+    """
+    ratio = size / (MAX_OPTIMIZED_IMAGE_SIZE * _QUALITY_TARGET_MARGIN)
+    exponent = _jpeg_size_exponent(size / max(pixels, 1))
+    scale = _jpeg_scale(quality) * ratio ** (1 / exponent)
+    predicted = 5000 / scale if scale > 100 else (200 - scale) / 2
+    return max(MIN_JPEG_QUALITY, min(quality - 1, int(predicted)))
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _is_llm_ready_jpeg(image: Image.Image, size: int) -> bool:
+    """Исходник уже подходит для LLM как есть: небольшой JPEG в пределах 512px."""
+    return (
+        image.format == "JPEG"
+        and image.mode in ("RGB", "L")
+        and max(image.size) <= MAX_IMAGE_DIMENSION
+        and size <= MAX_OPTIMIZED_IMAGE_SIZE
+    )
+
+
+def optimize_image_for_llm(raw_image: bytes, source_url: str) -> tuple[bytes, str] | None:
+    """Сжать/уменьшить изображение для более компактного base64 payload.
+
+    Небольшой JPEG в пределах MAX_IMAGE_DIMENSION отдаётся без перекодирования.
+    Остальное кодируется в JPEG с JPEG_QUALITY; если результат больше
+    MAX_OPTIMIZED_IMAGE_SIZE — качество прогнозируется по размеру первого
+    прохода, не больше MAX_QUALITY_SEARCH_STEPS перекодирований.
+    """
     try:
         image = Image.open(io.BytesIO(raw_image))
+        if _is_llm_ready_jpeg(image, len(raw_image)):
+            image.load()  # Проверить, что файл декодируется целиком
+            return raw_image, "image/jpeg"
+        # Большой JPEG декодируется сразу в уменьшенном масштабе (DCT scaling)
+        image.draft(None, (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
         image.load()
     except Exception as e:
         logger.warning(f"[images] Не удалось декодировать изображение, пропускаем: {source_url} ({e})")
@@ -56,31 +155,65 @@ def _optimize_image_for_llm(raw_image: bytes, source_url: str) -> tuple[bytes, s
 
     image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.Resampling.LANCZOS)
 
-    has_alpha = "A" in image.getbands()
-
-    # Для изображений с прозрачностью сохраняем PNG.
-    if has_alpha:
-        png_buffer = io.BytesIO()
-        image.save(png_buffer, format="PNG", optimize=True)
-        png_bytes = png_buffer.getvalue()
-        if len(png_bytes) <= MAX_OPTIMIZED_IMAGE_SIZE:
-            return png_bytes, "image/png"
+    # Для изображений с реальной прозрачностью сохраняем PNG;
+    # полностью непрозрачный alpha-канал просто отбрасываем.
+    if "A" in image.getbands():
+        if image.getchannel("A").getextrema() != (255, 255):
+            png_buffer = io.BytesIO()
+            image.save(png_buffer, format="PNG", optimize=True)
+            png_bytes = png_buffer.getvalue()
+            if len(png_bytes) <= MAX_OPTIMIZED_IMAGE_SIZE:
+                return png_bytes, "image/png"
         # Если PNG слишком большой, fallback на JPEG без alpha.
         image = image.convert("RGB")
 
     if image.mode not in ("RGB", "L"):
         image = image.convert("RGB")
 
-    best_jpeg = raw_image
-    for quality in (82, 72, 62, 52):
-        jpeg_buffer = io.BytesIO()
-        image.save(jpeg_buffer, format="JPEG", quality=quality, optimize=True)
-        jpeg_bytes = jpeg_buffer.getvalue()
-        best_jpeg = jpeg_bytes
-        if len(jpeg_bytes) <= MAX_OPTIMIZED_IMAGE_SIZE:
+    quality = JPEG_QUALITY
+    jpeg_bytes = _encode_jpeg(image, quality)
+    for _ in range(MAX_QUALITY_SEARCH_STEPS):
+        if len(jpeg_bytes) <= MAX_OPTIMIZED_IMAGE_SIZE or quality <= MIN_JPEG_QUALITY:
             break
+        quality = _predict_jpeg_quality(quality, len(jpeg_bytes), image.width * image.height)
+        jpeg_bytes = _encode_jpeg(image, quality)
+
+    return jpeg_bytes, "image/jpeg"
+
+
+def create_image_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Пул процессов для optimize_image_for_llm.
+
+    forkserver: рабочие процессы стартуют из чистого интерпретатора, а не
+    форком процесса с event loop, тредами и открытыми соединениями.
+    """
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("forkserver"),
+    )
+
+
+def set_image_pool(pool: concurrent.futures.ProcessPoolExecutor | None) -> None:
+    """Зарегистрировать пул процессов для optimize_image_async или снять регистрацию (None)."""
+    global _image_pool
+    _image_pool = pool
 
-    return best_jpeg, "image/jpeg"
+
+async def optimize_image_async(raw_image: bytes, source_url: str) -> tuple[bytes, str] | None:
+    """optimize_image_for_llm вне event loop: в пуле процессов, без него — в потоке.
+
+    Decode, resize и JPEG-кодирование держат GIL частями (преобразования
+    режимов, квантование) — в потоке они всё равно дают лаг event loop.
+    Сломанный пул (рабочий процесс упал) снимается с регистрации, дальше — поток.
+    """
+    pool = _image_pool
+    if pool is not None:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, optimize_image_for_llm, raw_image, source_url)
+        except BrokenProcessPool:
+            logger.error("[images] Пул процессов оптимизации сломан, дальше — в потоке")
+            set_image_pool(None)
+    return await asyncio.to_thread(optimize_image_for_llm, raw_image, source_url)
 
 
 async def _do_download(
@@ -175,7 +308,7 @@ async def download_image_as_base64(
         logger.warning(f"[images] Небезопасный redirect URL, пропускаем: {final_url}")
         return None
 
-    optimized = _optimize_image_for_llm(downloaded_bytes, url)
+    optimized = await optimize_image_async(downloaded_bytes, url)
     if optimized is None:
         return None
     optimized_bytes, optimized_mime = optimized
@@ -207,27 +340,32 @@ async def resolve_profile_images(
     profile: ScrapedProfile,
     client: httpx.AsyncClient | None = None,
     semaphore: asyncio.Semaphore | None = None,
+    llm_variants: Mapping[str, str] | None = None,
 ) -> dict[str, str]:
     """
     Скачать все изображения профиля параллельно.
-    Возвращает {original_url: data_uri} для успешных скачиваний.
+    Возвращает {original_url: data_uri или URL LLM-варианта} для успешных.
     semaphore — ограничивает общее число конкурентных загрузок (при батче).
+    llm_variants — {original_url: URL LLM-варианта в Storage}: такие
+    изображения не скачиваются, в ответ идёт URL варианта (его читает OpenAI).
     """
-    urls = _collect_image_urls(profile)
+    variants = llm_variants or {}
+    image_map: dict[str, str] = {}
+    urls: list[str] = []
+    for url in _collect_image_urls(profile):
+        if variant_url := variants.get(url):
+            image_map[url] = variant_url
+        else:
+            urls.append(url)
     if not urls:
-        return {}
-
-    # Если клиент не передан — создаём временный
-    own_client = client is None
-    if client is None:
-        client = httpx.AsyncClient()
+        return image_map
 
-    try:
+    # Если клиент не передан — общий клиент процесса (или временный)
+    async with contextlib.AsyncExitStack() as stack:
+        if client is None:
+            client = await stack.enter_async_context(cdn_client())
         tasks = [download_image_as_base64(url, client, semaphore=semaphore) for url in urls]
         results = await asyncio.gather(*tasks, return_exceptions=True)
-    finally:
-        if own_client:
-            await client.aclose()
 
     # Заменяем exceptions на None
     processed: list[str | None] = []
@@ -239,7 +377,6 @@ async def resolve_profile_images(
             processed.append(r)
 
     # Собираем только успешные
-    image_map: dict[str, str] = {}
     for url, data_uri in zip(urls, processed, strict=True):
         if data_uri is not None:
             image_map[url] = data_uri
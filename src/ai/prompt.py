@@ -273,7 +273,7 @@ def build_analysis_prompt(
     Собрать multimodal-запрос для OpenAI.
     Возвращает list[message] для chat completions.
 
-    image_map — словарь {url: data_uri} для замены remote URL на base64.
+    image_map — словарь {url: data_uri или URL LLM-варианта} для замены remote URL.
     Если None — используются оригинальные remote URL (обратная совместимость).
     Если передан, но url нет в словаре — изображение пропускается.
     """
@@ -298,7 +298,7 @@ def build_analysis_prompt(
         if image_count >= max_images:
             return False
         if image_map is not None:
-            # Режим base64: используем data URI из словаря
+            # Режим image_map: data URI или URL LLM-варианта из словаря
             resolved = image_map.get(url)
             if resolved is None:
                 return False  # скачивание не удалось — пропускаем
@@ -17,6 +17,7 @@ from src.api.schemas import (
     HealthResponse,
     PreFilterRequest,
     PreFilterResponse,
+    QueueWaitStatsResponse,
     RetryResponse,
     SchedulerStatusResponse,
     ScrapeRequest,
@@ -25,6 +26,7 @@ from src.api.schemas import (
     TaskResponse,
 )
 from src.api.services import (
+    fetch_queue_wait_stats,
     fetch_tasks_list,
     find_blog_by_username,
     find_or_create_blog,
@@ -102,11 +104,27 @@ def create_app(db: AsyncClient, pool: AccountPool | None, settings: Settings) ->
         dependencies=[Depends(check_rate_limit), Depends(verify_api_key)],
     )
     async def scheduler_status() -> dict[str, Any]:
-        """Статус планировщика — список cron/interval-задач."""
+        """Статус планировщика — cron/interval-задачи и lanes воркера."""
         scheduler = getattr(app.state, "scheduler", None)
-        if scheduler is None:
-            return {"jobs": []}
-        return {"jobs": get_scheduler_status(scheduler)}
+        worker_lanes = getattr(app.state, "worker_lanes", None)
+        return {
+            "jobs": get_scheduler_status(scheduler) if scheduler is not None else [],
+            "lanes": worker_lanes.snapshot() if worker_lanes is not None else [],
+        }
+
+    @app.get(
+        "/api/queue/wait-stats",
+        response_model=QueueWaitStatsResponse,
+        dependencies=[Depends(check_rate_limit), Depends(verify_api_key)],
+    )
+    async def queue_wait_stats(
+        window_minutes: int = Query(default=60, ge=1, le=7 * 24 * 60),
+    ) -> dict[str, Any]:
+        """Ожидание задач в очереди по priority: p50/p95/p99 и возраст старейшей pending."""
+        return {
+            "window_minutes": window_minutes,
+            "priorities": await fetch_queue_wait_stats(db, window_minutes),
+        }
 
     @app.get(
         "/api/tasks", response_model=TaskListResponse,
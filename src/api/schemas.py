@@ -168,7 +168,43 @@ class SchedulerJobStatus(BaseModel):
     status: Literal["ok", "unknown"] = "unknown"
 
 
+class WorkerLaneStatus(BaseModel):
+    """Занятость и ожидание одной lane воркера (task_type)."""
+
+    task_type: str
+    max_concurrent: int
+    weight: int
+    in_flight: int
+    active: int
+    started: int
+    completed: int
+    wait_avg_seconds: float
+    wait_p95_seconds: float
+    wait_max_seconds: float
+
+
+class PriorityWaitStats(BaseModel):
+    """Ожидание в очереди для одного уровня priority."""
+
+    priority: int
+    started: int
+    wait_p50_seconds: float | None = None
+    wait_p95_seconds: float | None = None
+    wait_p99_seconds: float | None = None
+    wait_max_seconds: float | None = None
+    pending: int
+    oldest_pending_seconds: float | None = None
+
+
+class QueueWaitStatsResponse(BaseModel):
+    """Ответ GET /api/queue/wait-stats."""
+
+    window_minutes: int
+    priorities: list[PriorityWaitStats]
+
+
 class SchedulerStatusResponse(BaseModel):
     """Ответ GET /api/scheduler/status."""
 
     jobs: list[SchedulerJobStatus]
+    lanes: list[WorkerLaneStatus] = []
@@ -118,8 +118,7 @@ async def get_health_status(
         accounts_total = len(pool.accounts)
         accounts_available = sum(
             1 for acc in pool.accounts
-            if acc.cooldown_until <= now
-            and acc.requests_this_hour < pool.requests_per_hour
+            if acc.cooldown_until <= now and acc.tokens >= 1
         )
     else:
         accounts_total = 0
@@ -183,6 +182,7 @@ JOB_NAMES: dict[str, tuple[str, str]] = {
     "retry_taxonomy_mappings": ("Retry Taxonomy Mappings", "every 2 hours"),
     "audit_taxonomy_drift": ("Audit Taxonomy Drift", "daily at 05:00"),
     "recover_tasks": ("Recover Stuck Tasks", "every 10 min"),
+    "recover_leases": ("Recover Expired Leases", "every 1 min"),
 }
 
 
@@ -276,6 +276,22 @@ async def _get_queue_depth(db: AsyncClient) -> dict[str, QueueDepthItem] | None:
         return None
 
 
+async def fetch_queue_wait_stats(db: AsyncClient, window_minutes: int) -> list[dict[str, Any]]:
+    """Перцентили ожидания до первого claim по priority за окно + текущий хвост pending.
+
+    Считается в БД (RPC task_wait_stats) — видны все реплики и процессы воркера.
+    """
+    result = await db.rpc("task_wait_stats", {"p_window_minutes": window_minutes}).execute()
+    raw_data: Any = result.data or []
+    if isinstance(raw_data, dict):
+        raw_data = [raw_data]
+    rows: list[dict[str, Any]] = []
+    for raw in cast(list[Any], raw_data):
+        if isinstance(raw, dict):
+            rows.append(cast(dict[str, Any], raw))
+    return rows
+
+
 async def fetch_tasks_list(
     db: AsyncClient,
     status: str | None = None,
@@ -84,6 +84,10 @@ class Settings(BaseSettings):
     scrape_delay_min: float = 1.5
     scrape_delay_max: float = 4.0
     requests_per_hour: int = 30
+    # Сколько запрос ждёт свободный аккаунт, прежде чем задача уйдёт в retry
+    account_wait_max_seconds: int = 120
+    # Сколько аккаунтов логинится одновременно при старте
+    account_init_concurrency: int = 4
     cooldown_minutes: int = 45
 
     # Параметры сбора контента
@@ -92,6 +96,9 @@ class Settings(BaseSettings):
     highlights_to_fetch: int = 3
     comments_to_fetch: int = 10       # Комментариев на пост
     posts_with_comments: int = 3      # Постов с комментариями
+    # Параллельных под-запросов (детали хайлайтов, комментарии) на один профиль;
+    # для instagrapi — не больше числа доступных аккаунтов
+    profile_subrequest_concurrency: int = 6
 
     # Pre-filter параметры
     pre_filter_min_likes: int = 30
@@ -110,6 +117,32 @@ class Settings(BaseSettings):
     worker_poll_interval: int = 30
     worker_max_concurrent: int = 5
     upload_max_concurrent: int = 5  # глобальный лимит параллельных загрузок в Storage
+    # Общие HTTP-клиенты процесса (скачивание изображений, Supabase Storage)
+    http_max_connections: int = 50
+    http_max_keepalive_connections: int = 20
+    http_keepalive_expiry: float = 30.0  # секунды простоя до закрытия соединения
+    http2_enabled: bool = False
+    # Процессов для оптимизации изображений (LLM-варианты, батч); 0 — в потоке
+    image_process_workers: int = 2
+    # Прямой Postgres DSN (session mode) для LISTEN scrape_tasks_new.
+    # Пусто — воркер просыпается только по in-process notify и poll_interval.
+    postgres_dsn: SecretStr = SecretStr("")
+    # Идентификатор реплики в scrape_tasks.worker_id (пусто — hostname:pid)
+    worker_id: str = ""
+    # Lanes по task_type: "task_type:max_concurrent:weight,...".
+    # Не указанные типы — лимит worker_max_concurrent, вес 1.
+    # Сумма лимитов по умолчанию = worker_max_concurrent (5): у каждого типа свой слот.
+    worker_lanes: str = "full_scrape:2:3,pre_filter:1:3,ai_analysis:1:1,discover:1:1"
+    # Lease захваченной задачи и период heartbeat-продления (секунды)
+    task_lease_seconds: int = 60
+    task_lease_renew_seconds: int = 15
+    # Write-behind статусов задач: flush раз в N мс или по набору M переходов
+    status_flush_interval_ms: int = 50
+    status_flush_max_items: int = 100
+    # Шард процесса в режиме --workers N (выставляет супервизор).
+    # Instagram-аккаунты делятся между процессами по индексу.
+    worker_shard_index: int = 0
+    worker_shard_count: int = 1
     log_level: str = "INFO"
 
     # API
@@ -126,6 +159,7 @@ class Settings(BaseSettings):
 
     # Фильтрация свежести
     rescrape_days: int = 60  # Минимальный интервал между скрапами (дни)
+    incremental_rescrape: bool = True  # Re-scrape догружает только новые посты
 
     # Backfill: автоскрап pending блогов
     backfill_scrape_enabled: bool = True
@@ -142,8 +176,29 @@ class Settings(BaseSettings):
 
     # HikerAPI (альтернативный бэкенд)
     hikerapi_token: SecretStr = SecretStr("")
+    # Размер общего пула HTTP-соединений к HikerAPI (потолок параллельных запросов)
+    hikerapi_max_connections: int = 100
+    # TTL ответов pre_filter для последующего full_scrape (0 — не передавать)
+    hikerapi_prefetch_ttl_seconds: int = 7200
+    # Rate governor (на весь деплой, делится на worker_shard_count): запросов/сек и burst,
+    # 0 — без ограничения
+    hikerapi_rate_per_second: float = 10.0
+    hikerapi_burst: int = 20
+    # Дневной бюджет по path endpoint'а и суммарно ("*"), в единицах стоимости
+    # (сбрасывается в полночь UTC и при рестарте процесса):
+    # {"*": 50000, "/v1/media/comments/chunk": 10000}
+    hikerapi_daily_budget: dict[str, float] = {}
+    # Стоимость вызова по path (по умолчанию 1 — бюджет в вызовах)
+    hikerapi_call_costs: dict[str, float] = {}
     scraper_backend: Literal["instagrapi", "hikerapi"] = "instagrapi"
 
+    # TTL-кэш ответов Instagram API (HikerAPI и instagrapi), 0 — выключен
+    response_cache_max_mb: int = 64
+    # Каталог дискового уровня (пусто — только память); общий для --workers N
+    response_cache_dir: str = ""
+    # Переопределение TTL по endpoint'у, JSON: {"/v2/user/by/username": 600}
+    response_cache_ttls: dict[str, float] = {}
+
     @field_validator("scraper_api_key")
     @classmethod
     def _check_api_key_not_default(cls, v: SecretStr) -> SecretStr:
@@ -151,11 +206,30 @@ class Settings(BaseSettings):
             raise ValueError("SCRAPER_API_KEY must be changed from default value")
         return v
 
+    @field_validator("worker_lanes")
+    @classmethod
+    def _check_worker_lanes(cls, v: str) -> str:
+        from src.worker.lanes import parse_lane_spec
+
+        parse_lane_spec(v)
+        return v
+
     @cached_property
-    def account_credentials(self) -> list[AccountCredentials]:
-        """Креды всех Instagram-аккаунтов из .env файла."""
+    def all_account_credentials(self) -> list[AccountCredentials]:
+        """Креды всех Instagram-аккаунтов из .env файла (до шардирования)."""
         return _parse_account_credentials()
 
+    @cached_property
+    def account_credentials(self) -> list[AccountCredentials]:
+        """Креды Instagram-аккаунтов из .env файла — только шард этого процесса."""
+        credentials = self.all_account_credentials
+        if self.worker_shard_count <= 1:
+            return credentials
+        return [
+            cred for i, cred in enumerate(credentials)
+            if i % self.worker_shard_count == self.worker_shard_index
+        ]
+
     @cached_property
     def trusted_proxy_ip_list(self) -> list[str]:
         """Список доверенных proxy IP из trusted_proxy_ips."""
@@ -1,6 +1,8 @@
 """CRUD-операции с Supabase для скрапера."""
 import asyncio
+import contextlib
 import re
+from dataclasses import dataclass
 from datetime import UTC, datetime, timedelta
 from typing import Any, cast
 
@@ -8,7 +10,8 @@ from loguru import logger
 from postgrest.types import CountMethod
 from supabase import AsyncClient
 
-from src.models.db_types import TaskRecord
+from src.models.db_types import NewTaskRow, TaskRecord
+from src.task_wakeup import notify_task_created
 
 
 def sanitize_error(error: str) -> str:
@@ -35,6 +38,27 @@ def get_backoff_seconds(attempts: int) -> int:
     return 300 * (3 ** max(0, attempts - 1))
 
 
+# Aging приоритета: каждые N секунд ожидания задача поднимается на один уровень
+# priority. Источник истины — таблица scrape_task_aging (claim_rank считает
+# триггер в БД); здесь зеркало её seed'а для in-memory очереди.
+DEFAULT_PRIORITY_AGING_SECONDS = 600
+PRIORITY_AGING_SECONDS: dict[str, int] = {"discover": 900}
+
+
+def priority_aging_seconds(task_type: str) -> int:
+    """Шаг aging для task_type: секунд ожидания на один уровень priority."""
+    return PRIORITY_AGING_SECONDS.get(task_type, DEFAULT_PRIORITY_AGING_SECONDS)
+
+
+def _claim_order_key(task: TaskRecord) -> tuple[str, int, str]:
+    """Порядок выдачи claim: claim_rank (priority с aging), затем priority, created_at."""
+    return (
+        str(task.get("claim_rank") or ""),
+        task.get("priority", 0),
+        str(task.get("created_at", "")),
+    )
+
+
 def _extract_rpc_scalar(data: Any) -> Any:
     """Extract scalar value from Supabase RPC response."""
     if isinstance(data, list):
@@ -96,7 +120,11 @@ async def mark_task_running(db: AsyncClient, task_id: str) -> bool:
 
 
 async def mark_task_done(db: AsyncClient, task_id: str) -> None:
-    """Пометить задачу как done."""
+    """Пометить задачу как done (через активный TaskStatusWriter, если он есть)."""
+    writer = _active_status_writer
+    if writer is not None and writer.db is db:
+        await writer.mark_done(task_id)
+        return
     await (
         db.table("scrape_tasks").update({
             "status": "done",
@@ -116,7 +144,13 @@ async def mark_task_failed(
     """
     Пометить задачу как failed или pending (retry).
     При retry=True и attempts < max_attempts → status='pending' с backoff.
+    При активном TaskStatusWriter запись уходит в общий bulk UPDATE.
     """
+    writer = _active_status_writer
+    if writer is not None and writer.db is db:
+        await writer.mark_failed(task_id, attempts, max_attempts, error, retry=retry)
+        return
+
     safe_error = sanitize_error(error)
 
     if retry and attempts < max_attempts:
@@ -140,6 +174,230 @@ async def mark_task_failed(
         logger.error(f"Task {task_id} permanently failed: {safe_error}")
 
 
+async def requeue_task(
+    db: AsyncClient,
+    task_id: str,
+    attempts: int,
+    error: str,
+    delay_seconds: float,
+) -> None:
+    """Вернуть задачу в pending без сжигания попытки (транзиентная ошибка)."""
+    await (
+        db.table("scrape_tasks").update({
+            "status": "pending",
+            "error_message": error,
+            "next_retry_at": (datetime.now(UTC) + timedelta(seconds=delay_seconds)).isoformat(),
+            "attempts": max(0, attempts),
+        }).eq("id", task_id).execute()
+    )
+
+
+@dataclass
+class _StatusTransition:
+    """Отложенный переход статуса одной задачи."""
+
+    task_id: str
+    status: str
+    error_message: str | None
+    backoff_seconds: int | None
+    future: asyncio.Future[None]
+
+    @property
+    def group_key(self) -> tuple[str, str | None, int | None]:
+        return (self.status, self.error_message, self.backoff_seconds)
+
+
+class TaskStatusWriter:
+    """
+    Write-behind запись переходов статуса задач (done / pending-retry / failed).
+
+    Переходы копятся в очереди и раз в flush_interval секунд (или по набору
+    max_batch) сбрасываются bulk UPDATE'ами — по одному на группу с одинаковым
+    целевым состоянием (status, error_message, backoff). Вызывающий ждёт свой
+    future: при ошибке bulk UPDATE группа повторяется построчно, и исключение
+    получает только задача, чья строка не записалась.
+    close() гарантированно сбрасывает очередь.
+    """
+
+    def __init__(self, db: AsyncClient, flush_interval: float = 0.05, max_batch: int = 100) -> None:
+        self.db = db
+        self.flush_interval = flush_interval
+        self.max_batch = max(1, max_batch)
+        self._items: list[_StatusTransition] = []
+        self._has_items = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._runner: asyncio.Task[None] | None = None
+        self._closed = False
+        self.flushes = 0
+        self.updates = 0
+
+    async def mark_done(self, task_id: str) -> None:
+        """Поставить задачу в done; возвращается после записи в БД."""
+        await self._submit(task_id, "done", None, None)
+
+    async def mark_failed(
+        self,
+        task_id: str,
+        attempts: int,
+        max_attempts: int,
+        error: str,
+        retry: bool = True,
+    ) -> None:
+        """Семантика mark_task_failed: pending с backoff или failed."""
+        safe_error = sanitize_error(error)
+        if retry and attempts < max_attempts:
+            await self._submit(task_id, "pending", safe_error, get_backoff_seconds(attempts))
+        else:
+            await self._submit(task_id, "failed", safe_error, None)
+
+    async def _submit(
+        self,
+        task_id: str,
+        status: str,
+        error_message: str | None,
+        backoff_seconds: int | None,
+    ) -> None:
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._items.append(_StatusTransition(task_id, status, error_message, backoff_seconds, future))
+        if self._closed:
+            # После close() фонового flush нет — пишем сразу
+            await self.flush()
+        else:
+            self._has_items.set()
+            if len(self._items) >= self.max_batch:
+                self._batch_full.set()
+            if self._runner is None:
+                self._runner = asyncio.create_task(self._run())
+        await future
+
+    async def _run(self) -> None:
+        while not self._closed:
+            await self._has_items.wait()
+            if not self._closed and len(self._items) < self.max_batch:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(self._batch_full.wait(), timeout=self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Записать все накопленные переходы."""
+        items, self._items = self._items, []
+        self._has_items.clear()
+        self._batch_full.clear()
+        if not items:
+            return
+
+        # Последний переход задачи в пачке побеждает — более ранние завершаем вместе с ним
+        latest: dict[str, _StatusTransition] = {}
+        superseded: list[tuple[_StatusTransition, _StatusTransition]] = []
+        for item in items:
+            previous = latest.get(item.task_id)
+            if previous is not None:
+                superseded.append((previous, item))
+            latest[item.task_id] = item
+
+        groups: dict[tuple[str, str | None, int | None], list[_StatusTransition]] = {}
+        for item in latest.values():
+            groups.setdefault(item.group_key, []).append(item)
+
+        self.flushes += 1
+        await asyncio.gather(*(self._write_group(key, group) for key, group in groups.items()))
+        for previous, item in superseded:
+            _chain_future(previous.future, item.future)
+
+    async def _write_group(
+        self,
+        key: tuple[str, str | None, int | None],
+        group: list[_StatusTransition],
+    ) -> None:
+        status, error_message, backoff_seconds = key
+        update = _transition_update(status, error_message, backoff_seconds)
+        ids = [item.task_id for item in group]
+        try:
+            await self.db.table("scrape_tasks").update(update).in_("id", ids).execute()
+            self.updates += 1
+        except Exception as bulk_err:
+            logger.warning(
+                f"[status_writer] Bulk update {status} for {len(ids)} tasks failed, "
+                f"retrying per task: {bulk_err}"
+            )
+            for item in group:
+                try:
+                    await self.db.table("scrape_tasks").update(update).eq("id", item.task_id).execute()
+                    self.updates += 1
+                except Exception as row_err:
+                    if not item.future.done():
+                        item.future.set_exception(row_err)
+                    continue
+                if not item.future.done():
+                    item.future.set_result(None)
+            return
+
+        for item in group:
+            if not item.future.done():
+                item.future.set_result(None)
+        _log_transition_group(status, error_message, backoff_seconds, ids)
+
+    async def close(self) -> None:
+        """Остановить фоновый flush и записать остаток очереди."""
+        self._closed = True
+        if self._runner is not None:
+            # Не отменяем: flush в процессе должен завершить futures ожидающих
+            self._has_items.set()
+            self._batch_full.set()
+            await self._runner
+            self._runner = None
+        await self.flush()
+
+
+def _transition_update(status: str, error_message: str | None, backoff_seconds: int | None) -> dict[str, Any]:
+    """Тело UPDATE для группы переходов; время считается в момент flush."""
+    now = datetime.now(UTC)
+    if status == "done":
+        return {"status": "done", "completed_at": now.isoformat()}
+    if status == "pending":
+        return {
+            "status": "pending",
+            "error_message": error_message,
+            "next_retry_at": (now + timedelta(seconds=backoff_seconds or 0)).isoformat(),
+        }
+    return {"status": status, "error_message": error_message}
+
+
+def _log_transition_group(
+    status: str,
+    error_message: str | None,
+    backoff_seconds: int | None,
+    ids: list[str],
+) -> None:
+    if status == "pending":
+        logger.info(f"Tasks {ids} retry in {backoff_seconds}s")
+    elif status == "failed":
+        logger.error(f"Tasks {ids} permanently failed: {error_message}")
+    else:
+        logger.debug(f"[status_writer] {len(ids)} tasks → {status}")
+
+
+def _chain_future(source: asyncio.Future[None], target: asyncio.Future[None]) -> None:
+    """Завершить source так же, как target (перезаписанный переход той же задачи)."""
+    if source.done():
+        return
+    exc = target.exception() if target.done() else None
+    if exc is not None:
+        source.set_exception(exc)
+    else:
+        source.set_result(None)
+
+
+# Writer текущего процесса — mark_task_done/mark_task_failed пишут через него
+_active_status_writer: TaskStatusWriter | None = None
+
+
+def set_active_status_writer(writer: TaskStatusWriter | None) -> None:
+    """Зарегистрировать writer (run_worker на старте) или снять регистрацию (None)."""
+    global _active_status_writer
+    _active_status_writer = writer
+
+
 async def create_task_if_not_exists(
     db: AsyncClient,
     blog_id: str | None,
@@ -164,21 +422,70 @@ async def create_task_if_not_exists(
     task_id = _extract_rpc_scalar(result.data)
     if isinstance(task_id, str) and task_id:
         logger.info(f"Created task {task_type} for blog {blog_id}: {task_id}")
+        notify_task_created(task_type)
         return task_id
 
     logger.debug(f"Task {task_type} for blog {blog_id} already exists, skipping")
     return None
 
 
+async def create_tasks_if_not_exist(
+    db: AsyncClient,
+    rows: list[NewTaskRow],
+) -> list[str | None]:
+    """
+    Создать пачку задач одним RPC — проверка дублей и вставка в одной транзакции.
+
+    Семантика дедупликации та же, что у create_task_if_not_exists (в том числе
+    для повторов внутри пачки). Возвращает список той же длины, что rows:
+    id созданной задачи или None, если такая задача уже была.
+    """
+    if not rows:
+        return []
+    result = await (
+        db.rpc("create_tasks_if_not_exist", {
+            "p_tasks": [
+                {
+                    "blog_id": row["blog_id"],
+                    "task_type": row["task_type"],
+                    "priority": row["priority"],
+                    "payload": row.get("payload") or {},
+                }
+                for row in rows
+            ],
+        }).execute()
+    )
+    raw_data = result.data or []
+    raw_rows: list[Any] = cast(list[Any], raw_data) if isinstance(raw_data, list) else [raw_data]
+
+    created: list[str | None] = [None] * len(rows)
+    for raw in raw_rows:
+        item = _as_dict_row(raw)
+        idx = item.get("idx")
+        task_id = item.get("task_id")
+        if isinstance(idx, int) and 0 <= idx < len(rows) and isinstance(task_id, str) and task_id:
+            created[idx] = task_id
+
+    created_types = {rows[i]["task_type"] for i, task_id in enumerate(created) if task_id}
+    n_created = sum(1 for task_id in created if task_id)
+    logger.info(f"Bulk created {n_created}/{len(rows)} tasks ({sorted(created_types)})")
+    for task_type in sorted(created_types):
+        notify_task_created(task_type)
+    return created
+
+
 async def fetch_pending_tasks(db: AsyncClient, limit: int = 10) -> list[TaskRecord]:
-    """Получить pending задачи, готовые к обработке (один запрос с or-фильтром)."""
+    """Получить pending задачи, готовые к обработке (один запрос с or-фильтром).
+
+    Порядок — claim_rank (priority с поправкой на время ожидания), как у claim.
+    """
     now = datetime.now(UTC).isoformat()
     result = await (
         db.table("scrape_tasks")
         .select("*")
         .eq("status", "pending")
         .or_(f"next_retry_at.is.null,next_retry_at.lte.{now}")
-        .order("priority", desc=False)
+        .order("claim_rank", desc=False)
         .order("created_at", desc=False)
         .limit(limit)
         .execute()
@@ -200,6 +507,140 @@ async def fetch_pending_tasks(db: AsyncClient, limit: int = 10) -> list[TaskReco
     return rows
 
 
+async def claim_pending_tasks(
+    db: AsyncClient,
+    worker_id: str,
+    limit: int = 10,
+    task_types: list[str] | None = None,
+    lease_seconds: int = 60,
+) -> list[TaskRecord]:
+    """
+    Атомарно захватить пачку pending задач одним RPC (FOR UPDATE SKIP LOCKED).
+
+    RPC переводит задачи в running, ставит started_at, worker_id и
+    lease_expires_at = now + lease_seconds, инкрементирует attempts.
+    Параллельные реплики не получают одни и те же строки.
+    task_types=None — любые типы.
+    """
+    if limit <= 0:
+        return []
+    result = await (
+        db.rpc("claim_pending_tasks", {
+            "p_worker_id": worker_id,
+            "p_limit": limit,
+            "p_task_types": task_types,
+            "p_lease_seconds": lease_seconds,
+        }).execute()
+    )
+    rows: list[TaskRecord] = []
+    raw_data: Any = result.data or []
+    if isinstance(raw_data, dict):
+        raw_data = [raw_data]
+    for raw in cast(list[Any], raw_data):
+        row = _as_dict_row(raw)
+        if row:
+            rows.append(cast(TaskRecord, row))
+
+    # RETURNING не гарантирует порядок — восстанавливаем claim_rank, created_at
+    rows.sort(key=_claim_order_key)
+
+    if rows:
+        types: dict[str, int] = {}
+        for t in rows:
+            tt: str = str(t.get("task_type", "?"))
+            types[tt] = types.get(tt, 0) + 1
+        logger.debug(f"claim_pending_tasks[{worker_id}]: {len(rows)} tasks ({types})")
+    return rows
+
+
+async def renew_task_leases(
+    db: AsyncClient,
+    worker_id: str,
+    task_ids: list[str],
+    lease_seconds: int,
+) -> int:
+    """
+    Продлить lease всех активных задач воркера одним UPDATE (heartbeat).
+
+    Продлеваются только задачи, которые всё ещё running у этого воркера
+    и имеют lease — снятый lease (ai_analysis после отправки батча)
+    heartbeat не восстанавливает.
+    """
+    if not task_ids:
+        return 0
+    lease_expires_at = (datetime.now(UTC) + timedelta(seconds=lease_seconds)).isoformat()
+    result = await (
+        db.table("scrape_tasks")
+        .update({"lease_expires_at": lease_expires_at})
+        .in_("id", task_ids)
+        .eq("status", "running")
+        .eq("worker_id", worker_id)
+        .not_.is_("lease_expires_at", "null")
+        .execute()
+    )
+    return len(result.data or [])
+
+
+async def recover_expired_leases(db: AsyncClient) -> int:
+    """
+    Вернуть в pending running задачи с истёкшим lease (воркер упал или завис).
+
+    Задачи с исчерпанными попытками помечаются failed. Условие на lease
+    повторяется в UPDATE — задача, чей lease успели продлить, не трогается.
+    """
+    now = datetime.now(UTC).isoformat()
+    result = await (
+        db.table("scrape_tasks")
+        .select("id, task_type, attempts, max_attempts, worker_id")
+        .eq("status", "running")
+        .lt("lease_expires_at", now)
+        .execute()
+    )
+    expired = [_as_dict_row(t) for t in (result.data or [])]
+    expired = [t for t in expired if t.get("id")]
+    if not expired:
+        return 0
+
+    retry_ids: list[str] = []
+    exhausted_ids: list[str] = []
+    for task in expired:
+        attempts = int(task.get("attempts", 0) or 0)
+        max_attempts = int(task.get("max_attempts", 0) or 0)
+        (exhausted_ids if attempts >= max_attempts else retry_ids).append(str(task["id"]))
+
+    if exhausted_ids:
+        await (
+            db.table("scrape_tasks").update({
+                "status": "failed",
+                "error_message": "Lease expired, max attempts exhausted",
+                "lease_expires_at": None,
+            })
+            .in_("id", exhausted_ids)
+            .eq("status", "running")
+            .lt("lease_expires_at", now)
+            .execute()
+        )
+    if retry_ids:
+        await (
+            db.table("scrape_tasks").update({
+                "status": "pending",
+                "error_message": "Recovered: lease expired",
+                "lease_expires_at": None,
+            })
+            .in_("id", retry_ids)
+            .eq("status", "running")
+            .lt("lease_expires_at", now)
+            .execute()
+        )
+
+    workers = sorted({str(t.get("worker_id") or "?") for t in expired})
+    logger.warning(
+        f"Recovered {len(retry_ids)} tasks with expired lease "
+        f"(failed={len(exhausted_ids)}, workers={workers})"
+    )
+    return len(retry_ids)
+
+
 async def recover_stuck_tasks(
     db: AsyncClient,
     max_running_minutes: int = 30,
@@ -208,7 +649,9 @@ async def recover_stuck_tasks(
     """
     Вернуть зависшие running задачи в pending.
 
-    full_scrape/discover — таймаут max_running_minutes (30 мин).
+    full_scrape/discover — таймаут max_running_minutes (30 мин), только задачи
+      без lease (захвачены через mark_task_running); задачи с lease
+      восстанавливает recover_expired_leases.
     ai_analysis — таймаут max_ai_running_minutes (по умолчанию 24ч).
       AI задачи зависают если handle_batch_results упал с исключением
       (например \u0000 в PostgreSQL). retry_stale_batches — последняя линия
@@ -228,6 +671,7 @@ async def recover_stuck_tasks(
         .eq("status", "running")
         .in_("task_type", ["full_scrape", "discover", "pre_filter"])
         .lt("started_at", threshold)
+        .is_("lease_expires_at", "null")
         .execute(),
         db.table("scrape_tasks")
         .select("id, task_type, attempts, max_attempts")
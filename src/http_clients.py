@@ -0,0 +1,113 @@
+"""Общие HTTP-клиенты процесса: скачивание изображений (CDN) и Supabase Storage.
+
+Один пул соединений на процесс вместо httpx.AsyncClient на каждый
+full_scrape/батч: TLS-соединения с CDN Instagram и Storage переиспользуются
+между задачами. Клиенты создаёт main.py на старте (set_shared_http_clients)
+и закрывает на shutdown; без них (скрипты, тесты) код берёт временный клиент.
+"""
+import contextlib
+from collections.abc import AsyncGenerator
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+from storage3 import AsyncStorageClient
+from storage3.constants import DEFAULT_TIMEOUT as STORAGE_TIMEOUT
+from supabase import AsyncClient
+
+from src.config import Settings
+
+
+@dataclass
+class HttpPoolStats:
+    """Запросы и новые соединения одного клиента."""
+
+    requests: int = 0
+    connections: int = 0  # Открытых TCP-соединений (остальные запросы — reuse)
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Доля запросов, ушедших по уже открытому соединению."""
+        if self.requests == 0:
+            return 0.0
+        return max(self.requests - self.connections, 0) / self.requests
+
+
+def _tracked_client(settings: Settings, stats: HttpPoolStats, **kwargs: Any) -> httpx.AsyncClient:
+    """httpx.AsyncClient с лимитами пула из настроек и подсчётом reuse соединений."""
+
+    async def _trace(event: str, _info: dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            stats.connections += 1
+
+    async def _on_request(request: httpx.Request) -> None:
+        stats.requests += 1
+        request.extensions["trace"] = _trace
+
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        ),
+        http2=settings.http2_enabled,
+        event_hooks={"request": [_on_request]},
+        **kwargs,
+    )
+
+
+class SharedHttpClients:
+    """CDN-клиент и Storage API на общем пуле соединений."""
+
+    def __init__(self, settings: Settings, db: AsyncClient) -> None:
+        self.cdn_stats = HttpPoolStats()
+        self.storage_stats = HttpPoolStats()
+        self.cdn = _tracked_client(settings, self.cdn_stats)
+        self.storage_http = _tracked_client(
+            settings, self.storage_stats, timeout=STORAGE_TIMEOUT, follow_redirects=True,
+        )
+        # Тот же URL и auth-заголовки, что у db.storage, но на общем пуле
+        self.storage = AsyncStorageClient(
+            str(db.storage_url), dict(db.options.headers), http_client=self.storage_http,
+        )
+
+    async def aclose(self) -> None:
+        await self.cdn.aclose()
+        await self.storage_http.aclose()
+
+
+# Клиенты текущего процесса (регистрирует main.py)
+_shared_clients: SharedHttpClients | None = None
+
+
+def set_shared_http_clients(clients: SharedHttpClients | None) -> None:
+    """Зарегистрировать общие клиенты процесса или снять регистрацию (None)."""
+    global _shared_clients
+    _shared_clients = clients
+
+
+@contextlib.asynccontextmanager
+async def cdn_client() -> AsyncGenerator[httpx.AsyncClient]:
+    """Общий клиент для скачивания изображений; без него — временный на блок."""
+    if _shared_clients is not None:
+        yield _shared_clients.cdn
+        return
+    async with httpx.AsyncClient() as client:
+        yield client
+
+
+@contextlib.asynccontextmanager
+async def storage_http_client() -> AsyncGenerator[httpx.AsyncClient]:
+    """Клиент для прямых запросов к Storage (потоковая загрузка); без общего — временный."""
+    if _shared_clients is not None:
+        yield _shared_clients.storage_http
+        return
+    async with httpx.AsyncClient(timeout=STORAGE_TIMEOUT) as client:
+        yield client
+
+
+def storage_api(db: AsyncClient) -> AsyncStorageClient:
+    """Storage API на общем пуле соединений; без него — db.storage."""
+    if _shared_clients is not None:
+        return _shared_clients.storage
+    return db.storage
@@ -1,17 +1,28 @@
 """Загрузка изображений Instagram в Supabase Storage для постоянного хранения."""
 import asyncio
+import contextlib
+import hashlib
+import tempfile
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Generator, Iterable
+from dataclasses import dataclass, field
 from typing import Any
 
 import httpx
 from loguru import logger
 from supabase import AsyncClient
 
+from src.ai.images import MAX_IMAGE_SIZE, llm_variant_path, optimize_image_async
+from src.http_clients import cdn_client, storage_api, storage_http_client
 from src.utils import is_safe_url, is_transient_network_error
 
 IMAGES_BUCKET = "blog-images"
 DOWNLOAD_TIMEOUT = 15.0
 MAX_DOWNLOAD_SIZE = 10 * 1024 * 1024  # 10 МБ
 MAX_CONCURRENT_UPLOADS = 5  # Fallback-лимит загрузок (используется если глобальный семафор не передан)
+STREAM_CHUNK_SIZE = 64 * 1024  # Чанк потоковой передачи CDN → Storage
+SPOOL_MAX_MEMORY = 256 * 1024  # Копия тела (LLM-вариант, условный refresh): сверх — во временный файл
+STORAGE_CACHE_CONTROL = "max-age=3600"  # Как cacheControl по умолчанию в storage3
 _ALLOWED_IMAGE_MIMES = frozenset({
     "image/jpeg",
     "image/png",
@@ -19,6 +30,31 @@ _ALLOWED_IMAGE_MIMES = frozenset({
     "image/gif",
 })
 
+# Индекс изображений блога (blogs.image_index): путь в Storage →
+# {"sha256": ..., "etag": ..., "last_modified": ..., "llm": ...} последней
+# загрузки; "llm" — MIME сохранённого LLM-варианта (нет ключа — варианта нет)
+type ImageIndex = dict[str, dict[str, str]]
+
+
+@dataclass
+class ImageTransfer:
+    """Одна передача CDN → Storage: объём и длительность."""
+
+    path: str
+    bytes: int
+    seconds: float
+
+
+@dataclass
+class UploadStats:
+    """Счётчики загрузок в Storage за один прогон persist_profile_images."""
+
+    files: int = 0
+    bytes: int = 0
+    skipped: int = 0  # Оригинал без изменений по индексу — не скачивался или не загружался
+    llm_variants: int = 0  # Сохранённых LLM-вариантов (для submit_batch)
+    transfers: list[ImageTransfer] = field(default_factory=list[ImageTransfer], compare=False)
+
 
 def _is_safe_storage_path(path: str) -> bool:
     """Validate relative storage path to prevent traversal."""
@@ -36,6 +72,23 @@ def _is_safe_storage_filename(name: str) -> bool:
     return not ("/" in name or "\\" in name or ".." in name)
 
 
+def parse_image_index(raw: object) -> ImageIndex:
+    """Индекс из значения blogs.image_index; некорректные записи отбрасываются."""
+    if not isinstance(raw, dict):
+        return {}
+    index: ImageIndex = {}
+    for path, entry in raw.items():  # pyright: ignore[reportUnknownVariableType]
+        if not isinstance(path, str) or not isinstance(entry, dict):
+            continue
+        values = {
+            key: value for key, value in entry.items()  # pyright: ignore[reportUnknownVariableType]
+            if isinstance(key, str) and isinstance(value, str)
+        }
+        if values.get("sha256"):
+            index[path] = values
+    return index
+
+
 def build_public_url(supabase_url: str, path: str) -> str:
     """Постоянный публичный URL для файла в Storage."""
     if not _is_safe_storage_path(path):
@@ -44,25 +97,23 @@ def build_public_url(supabase_url: str, path: str) -> str:
     return f"{base}/storage/v1/object/public/{IMAGES_BUCKET}/{path}"
 
 
-async def download_image(url: str, client: httpx.AsyncClient) -> tuple[bytes, str] | None:
-    """Скачать изображение по URL. Вернуть (bytes, content_type) или None при ошибке."""
-    if not is_safe_url(url):
-        logger.warning(f"[image_storage] Небезопасный URL, пропускаем: {url}")
-        return None
+def llm_variant_urls(urls: Iterable[str], index: ImageIndex) -> dict[str, str]:
+    """{public URL: URL LLM-варианта} для изображений, чей вариант отмечен в index."""
+    prefix = f"/storage/v1/object/public/{IMAGES_BUCKET}/"
+    variants: dict[str, str] = {}
+    for url in urls:
+        _, found, path = url.partition(prefix)
+        if found and "llm" in index.get(path, {}):
+            variants[url] = llm_variant_path(url)
+    return variants
 
-    try:
-        response = await client.get(url, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True)
-        response.raise_for_status()
-    except httpx.TimeoutException:
-        logger.warning(f"[image_storage] Таймаут при скачивании: {url}")
-        return None
-    except httpx.HTTPStatusError as e:
-        logger.warning(f"[image_storage] HTTP {e.response.status_code}: {url}")
-        return None
-    except httpx.HTTPError as e:
-        logger.warning(f"[image_storage] Ошибка скачивания {url}: {e}")
-        return None
 
+class _DownloadTooLargeError(Exception):
+    """Поток из CDN превысил MAX_DOWNLOAD_SIZE."""
+
+
+def _check_image_response(response: httpx.Response, url: str) -> str | None:
+    """Проверить ответ CDN до чтения тела (redirect, Content-Length, MIME). Вернуть MIME или None."""
     final_url = str(response.url)
     if not is_safe_url(final_url):
         logger.warning(f"[image_storage] Небезопасный redirect URL, пропускаем: {final_url}")
@@ -77,47 +128,214 @@ async def download_image(url: str, client: httpx.AsyncClient) -> tuple[bytes, st
         )
         return None
 
-    if len(response.content) > MAX_DOWNLOAD_SIZE:
-        logger.warning(
-            f"[image_storage] Слишком большое изображение "
-            f"({len(response.content)} байт): {url}"
-        )
-        return None
-
     content_type = response.headers.get("content-type", "image/jpeg")
     mime = content_type.split(";")[0].strip()
     if mime not in _ALLOWED_IMAGE_MIMES:
         logger.warning(f"[image_storage] Неподдерживаемый MIME-тип ({mime}): {url}")
         return None
+    return mime
+
+
+type _Spool = tempfile.SpooledTemporaryFile[bytes]
 
-    return response.content, mime
+
+@contextlib.contextmanager
+def _open_spool(enabled: bool) -> Generator[_Spool | None]:
+    """Копия тела передачи: в памяти до SPOOL_MAX_MEMORY, дальше — временный файл."""
+    if not enabled:
+        yield None
+        return
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        yield spool
+
+
+async def _iter_spool(spool: _Spool) -> AsyncIterator[bytes]:
+    """Содержимое spool чанками по STREAM_CHUNK_SIZE (тело для upload_stream)."""
+    spool.seek(0)
+    while chunk := spool.read(STREAM_CHUNK_SIZE):
+        yield chunk
+
+
+class _SizeLimitedBody:
+    """Тело ответа CDN чанками с проверкой MAX_DOWNLOAD_SIZE и sha256 по ходу потока.
+
+    spool (если передан) получает копию прочитанных чанков — память
+    ограничена SPOOL_MAX_MEMORY, остальное уходит во временный файл.
+    """
+
+    def __init__(self, response: httpx.Response, spool: _Spool | None = None) -> None:
+        self._response = response
+        self._digest = hashlib.sha256()
+        self._spool = spool
+        self.size = 0
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._response.aiter_bytes(STREAM_CHUNK_SIZE):
+            self.size += len(chunk)
+            if self.size > MAX_DOWNLOAD_SIZE:
+                raise _DownloadTooLargeError(f"больше {MAX_DOWNLOAD_SIZE} байт")
+            self._digest.update(chunk)
+            if self._spool is not None:
+                self._spool.write(chunk)
+            yield chunk
+
+    def index_entry(self) -> dict[str, str]:
+        """Запись ImageIndex для прочитанного тела: sha256 и валидаторы CDN."""
+        entry = {"sha256": self._digest.hexdigest()}
+        if etag := self._response.headers.get("etag"):
+            entry["etag"] = etag
+        if last_modified := self._response.headers.get("last-modified"):
+            entry["last_modified"] = last_modified
+        return entry
+
+
+@dataclass
+class _FetchedImage:
+    """Результат одной попытки CDN → Storage."""
+
+    size: int
+    entry: dict[str, str]  # Запись ImageIndex
+    uploaded: bool = True  # False — содержимое не изменилось, Storage не трогали
 
 
 UPLOAD_MAX_RETRIES = 3
 UPLOAD_RETRY_DELAY = 1.0  # секунды между попытками
 
 
-async def upload_image(db: AsyncClient, path: str, data: bytes, content_type: str) -> bool:
-    """Загрузить файл в Supabase Storage (upsert) с retry при транзиентных ошибках."""
+async def upload_stream(
+    db: AsyncClient, path: str, body: bytes | AsyncIterable[bytes], content_type: str,
+) -> None:
+    """Загрузить поток байт (или готовое тело) в Storage (upsert) одним POST."""
+    async with storage_http_client() as client:
+        response = await client.post(
+            f"{db.storage_url}object/{IMAGES_BUCKET}/{path}",
+            content=body,
+            headers={
+                **db.options.headers,
+                "content-type": content_type,
+                "cache-control": STORAGE_CACHE_CONTROL,
+                "x-upsert": "true",
+            },
+        )
+        response.raise_for_status()
+
+
+async def _stream_image(
+    db: AsyncClient,
+    http_client: httpx.AsyncClient,
+    cdn_url: str,
+    storage_path: str,
+    spool: _Spool | None = None,
+) -> _FetchedImage | None:
+    """Одна передача CDN → Storage (копия тела — в spool). None, если ответ CDN не подходит."""
+    async with http_client.stream(
+        "GET", cdn_url, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True,
+    ) as response:
+        response.raise_for_status()
+        mime = _check_image_response(response, cdn_url)
+        if mime is None:
+            return None
+        body = _SizeLimitedBody(response, spool)
+        await upload_stream(db, storage_path, body, mime)
+        return _FetchedImage(size=body.size, entry=body.index_entry())
+
+
+async def _refresh_image(
+    db: AsyncClient,
+    http_client: httpx.AsyncClient,
+    cdn_url: str,
+    storage_path: str,
+    previous: dict[str, str] | None,
+    spool: _Spool,
+) -> _FetchedImage | None:
+    """Условный GET по валидаторам previous; в Storage — только если изменился sha256.
+
+    Хэш нужен до решения о загрузке, поэтому тело сначала читается в
+    spool, а в Storage уходит уже из него.
+    """
+    headers: dict[str, str] = {}
+    if previous is not None:
+        if etag := previous.get("etag"):
+            headers["if-none-match"] = etag
+        if last_modified := previous.get("last_modified"):
+            headers["if-modified-since"] = last_modified
+    async with http_client.stream(
+        "GET", cdn_url, headers=headers, timeout=DOWNLOAD_TIMEOUT, follow_redirects=True,
+    ) as response:
+        if response.status_code == 304 and previous is not None:
+            return _FetchedImage(size=0, entry=previous, uploaded=False)
+        response.raise_for_status()
+        mime = _check_image_response(response, cdn_url)
+        if mime is None:
+            return None
+        body = _SizeLimitedBody(response, spool)
+        async for _chunk in body:
+            pass
+        entry = body.index_entry()
+
+    if previous is not None and previous.get("sha256") == entry["sha256"]:
+        if llm_mime := previous.get("llm"):
+            entry["llm"] = llm_mime  # Содержимое то же — вариант актуален
+        return _FetchedImage(size=body.size, entry=entry, uploaded=False)
+    await upload_stream(db, storage_path, _iter_spool(spool), mime)
+    return _FetchedImage(size=body.size, entry=entry)
+
+
+async def _upload_llm_variant(db: AsyncClient, storage_path: str, spool: _Spool) -> str | None:
+    """Сохранить рядом с оригиналом вариант для LLM (512px, сжатый). Вернуть его MIME или None."""
+    spool.seek(0)
+    optimized = await optimize_image_async(spool.read(), storage_path)
+    if optimized is None:
+        return None
+    data, mime = optimized
+    try:
+        await upload_stream(db, llm_variant_path(storage_path), data, mime)
+    except Exception as e:
+        logger.warning(f"[image_storage] Не удалось сохранить LLM-вариант ({storage_path}): {e}")
+        return None
+    return mime
+
+
+async def _fetch_image(
+    db: AsyncClient,
+    http_client: httpx.AsyncClient,
+    cdn_url: str,
+    storage_path: str,
+    spool: _Spool | None,
+    refresh: bool = False,
+    previous: dict[str, str] | None = None,
+) -> _FetchedImage | None:
+    """Передача CDN → Storage с повтором при транзиентных ошибках. None при неудаче.
+
+    spool перед каждой попыткой очищается: повтор передаёт изображение целиком.
+    """
     for attempt in range(1, UPLOAD_MAX_RETRIES + 1):
+        if spool is not None:
+            spool.seek(0)
+            spool.truncate()
         try:
-            await db.storage.from_(IMAGES_BUCKET).upload(
-                path,
-                data,
-                {"content-type": content_type, "upsert": "true"},
-            )
-            return True
+            if refresh and spool is not None:
+                return await _refresh_image(db, http_client, cdn_url, storage_path, previous, spool)
+            return await _stream_image(db, http_client, cdn_url, storage_path, spool)
+        except _DownloadTooLargeError as e:
+            logger.warning(f"[image_storage] Слишком большое изображение ({e}): {cdn_url}")
+            return None
         except Exception as e:
             if is_transient_network_error(e) and attempt < UPLOAD_MAX_RETRIES:
                 logger.warning(
-                    f"[image_storage] Транзиентная ошибка при загрузке ({path}), "
+                    f"[image_storage] Транзиентная ошибка при передаче ({storage_path}), "
                     f"попытка {attempt}/{UPLOAD_MAX_RETRIES}, жду {UPLOAD_RETRY_DELAY}с..."
                 )
                 await asyncio.sleep(UPLOAD_RETRY_DELAY * attempt)
                 continue
-            logger.error(f"[image_storage] Ошибка загрузки в Storage ({path}): {e}")
-            return False
-    return False
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.warning(f"[image_storage] HTTP {e.response.status_code}: {e.request.url}")
+            elif isinstance(e, httpx.TimeoutException):
+                logger.warning(f"[image_storage] Таймаут при передаче {cdn_url} → {storage_path}")
+            else:
+                logger.error(f"[image_storage] Ошибка передачи {cdn_url} → {storage_path}: {e}")
+            return None
+    return None
 
 
 async def download_and_upload_image(
@@ -126,16 +344,70 @@ async def download_and_upload_image(
     cdn_url: str,
     storage_path: str,
     supabase_url: str,
+    stats: UploadStats | None = None,
+    index: ImageIndex | None = None,
+    only_if_changed: bool = False,
+    llm_variant: bool = False,
 ) -> str | None:
-    """Скачать из CDN и загрузить в Storage. Вернуть постоянный URL или None."""
-    result = await download_image(cdn_url, http_client)
-    if result is None:
+    """Передать изображение из CDN в Storage потоком. Вернуть постоянный URL или None.
+
+    Тело ответа CDN уходит в upload чанками по STREAM_CHUNK_SIZE — в памяти
+    не больше чанка на изображение, MAX_DOWNLOAD_SIZE проверяется по ходу
+    потока. Поток нельзя перемотать, поэтому транзиентная ошибка повторяет
+    передачу целиком.
+
+    index (если передан) получает sha256/ETag загруженного файла. С
+    only_if_changed запрос к CDN условный по записи index, а загрузка
+    пропускается при совпадении sha256 — URL при этом тот же.
+
+    С llm_variant копия тела по ходу потока пишется в spool (в памяти не
+    больше SPOOL_MAX_MEMORY, остальное — временный файл), и из неё строится
+    LLM-вариант (llm_variant_path): submit_batch берёт его готовым, без
+    Pillow. Сохранённый вариант отмечается в записи index ключом "llm";
+    без него вариант строится заново, даже если оригинал не изменился.
+    """
+    if not is_safe_url(cdn_url):
+        logger.warning(f"[image_storage] Небезопасный URL, пропускаем: {cdn_url}")
         return None
 
-    data, content_type = result
-    ok = await upload_image(db, storage_path, data, content_type)
-    if not ok:
-        return None
+    started = time.monotonic()
+    refresh = only_if_changed and index is not None
+    previous = index.get(storage_path) if index is not None else None
+    if llm_variant and previous is not None and "llm" not in previous:
+        # Варианта нет — нужно тело: запрос без валидаторов, sha256 сравнивается как обычно
+        previous = {"sha256": previous["sha256"]}
+    with _open_spool(llm_variant or refresh) as spool:
+        fetched = await _fetch_image(
+            db, http_client, cdn_url, storage_path, spool, refresh=refresh, previous=previous,
+        )
+        if fetched is None:
+            return None
+        elapsed = time.monotonic() - started
+        entry = fetched.entry
+        variant_mime: str | None = None
+        if (
+            llm_variant and "llm" not in entry and spool is not None
+            and 0 < fetched.size <= MAX_IMAGE_SIZE
+        ):
+            variant_mime = await _upload_llm_variant(db, storage_path, spool)
+            if variant_mime is not None:
+                entry = {**entry, "llm": variant_mime}
+
+    if index is not None:
+        index[storage_path] = entry
+    if stats is not None and variant_mime is not None:
+        stats.llm_variants += 1
+    if not fetched.uploaded:
+        logger.debug(f"[image_storage] {storage_path}: без изменений, загрузка пропущена")
+        if stats is not None:
+            stats.skipped += 1
+        return build_public_url(supabase_url, storage_path)
+
+    logger.debug(f"[image_storage] {storage_path}: {fetched.size} байт за {elapsed * 1000:.0f}мс")
+    if stats is not None:
+        stats.files += 1
+        stats.bytes += fetched.size
+        stats.transfers.append(ImageTransfer(path=storage_path, bytes=fetched.size, seconds=elapsed))
 
     return build_public_url(supabase_url, storage_path)
 
@@ -147,32 +419,49 @@ async def persist_profile_images(
     avatar_cdn_url: str | None,
     posts: list[dict[str, Any]],
     upload_semaphore: asyncio.Semaphore | None = None,
+    stats: UploadStats | None = None,
+    image_index: ImageIndex | None = None,
 ) -> tuple[str | None, dict[str, str]]:
     """
     Скачать и загрузить изображения профиля параллельно (аватар + посты).
+    stats (если передан) накапливает число и объём загруженных файлов.
+
+    image_index (blogs.image_index, обновляется на месте): посты, уже
+    загруженные в Storage вместе с LLM-вариантом, не скачиваются — миниатюра
+    поста по platform_id практически не меняется. Пост без варианта в индексе
+    скачивается заново ради варианта; оригинал при том же sha256 не
+    перезагружается. Аватар запрашивается условно и загружается, только если
+    изменился sha256.
 
     Возвращает:
         (avatar_url, {post_platform_id: url})
     """
     # Если семафор не передан — создаём локальный с дефолтным лимитом
     semaphore = upload_semaphore or asyncio.Semaphore(MAX_CONCURRENT_UPLOADS)
+    stats = stats if stats is not None else UploadStats()
 
     # Метаинформация для сборки результата
     task_keys: list[tuple[str, str]] = []  # (type, platform_id)
 
     async def _throttled_upload(
-        client: httpx.AsyncClient, cdn_url: str, storage_path: str,
+        client: httpx.AsyncClient, cdn_url: str, storage_path: str, only_if_changed: bool = False,
     ) -> str | None:
         async with semaphore:
-            return await download_and_upload_image(db, client, cdn_url, storage_path, supabase_url)
+            return await download_and_upload_image(
+                db, client, cdn_url, storage_path, supabase_url, stats,
+                index=image_index, only_if_changed=only_if_changed, llm_variant=True,
+            )
 
     tasks: list[asyncio.Task[str | None]] = []
+    post_urls: dict[str, str] = {}
 
-    async with httpx.AsyncClient() as client:
+    async with cdn_client() as client:
         # Аватар
         if avatar_cdn_url:
             path = f"{blog_id}/avatar.jpg"
-            task = asyncio.create_task(_throttled_upload(client, avatar_cdn_url, path))
+            task = asyncio.create_task(
+                _throttled_upload(client, avatar_cdn_url, path, only_if_changed=image_index is not None),
+            )
             tasks.append(task)
             task_keys.append(("avatar", ""))
 
@@ -182,17 +471,28 @@ async def persist_profile_images(
             platform_id = post.get("platform_id", "")
             if cdn_url and platform_id:
                 path = f"{blog_id}/post_{platform_id}.jpg"
-                task = asyncio.create_task(_throttled_upload(client, cdn_url, path))
+                entry = image_index.get(path) if image_index is not None else None
+                if entry is not None and "llm" in entry:
+                    post_urls[platform_id] = build_public_url(supabase_url, path)
+                    stats.skipped += 1
+                    continue
+                task = asyncio.create_task(
+                    _throttled_upload(client, cdn_url, path, only_if_changed=entry is not None),
+                )
                 tasks.append(task)
                 task_keys.append(("post", platform_id))
 
         if not tasks:
-            return None, {}
+            if stats.skipped:
+                logger.info(
+                    f"[image_storage] blog={blog_id}: загружено 0 изображений, "
+                    f"без изменений {stats.skipped}"
+                )
+            return None, post_urls
 
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
     avatar_url: str | None = None
-    post_urls: dict[str, str] = {}
 
     for (kind, platform_id), result in zip(task_keys, results, strict=True):
         if isinstance(result, BaseException):
@@ -206,20 +506,30 @@ async def persist_profile_images(
         elif kind == "post":
             post_urls[platform_id] = result
 
-    total = (1 if avatar_url else 0) + len(post_urls)
-    logger.info(f"[image_storage] blog={blog_id}: загружено {total} изображений в Storage")
+    summary = f"[image_storage] blog={blog_id}: загружено {stats.files} изображений в Storage"
+    if stats.transfers:
+        slowest = max(t.seconds for t in stats.transfers)
+        summary += f" ({stats.bytes} байт, самое медленное {slowest * 1000:.0f}мс)"
+    if stats.skipped:
+        summary += f", без изменений {stats.skipped}"
+    if stats.llm_variants:
+        summary += f", LLM-вариантов {stats.llm_variants}"
+    logger.info(summary)
 
     return avatar_url, post_urls
 
 
 async def delete_blog_images(db: AsyncClient, blog_id: str) -> int:
-    """Удалить изображения постов блога из Storage (аватар сохраняется). Вернуть количество удалённых."""
+    """Удалить изображения постов блога из Storage (аватар и его LLM-вариант сохраняются).
+
+    Вернуть количество удалённых.
+    """
     if not _is_safe_storage_filename(blog_id):
         logger.warning(f"[image_storage] Пропускаем небезопасный blog_id: {blog_id}")
         return 0
 
     try:
-        files = await db.storage.from_(IMAGES_BUCKET).list(blog_id)
+        files = await storage_api(db).from_(IMAGES_BUCKET).list(blog_id)
     except Exception as e:
         logger.error(f"[image_storage] Ошибка листинга файлов для blog={blog_id}: {e}")
         return 0
@@ -227,13 +537,14 @@ async def delete_blog_images(db: AsyncClient, blog_id: str) -> int:
     if not files:
         return 0
 
-    # Аватар сохраняем — удаляем только посты
+    # Аватар сохраняем — удаляем только посты (и их LLM-варианты)
+    keep_names = {"avatar.jpg", llm_variant_path("avatar.jpg")}
     post_paths: list[str] = []
     for raw_file in files:
         if not isinstance(raw_file, dict):  # pyright: ignore[reportUnnecessaryIsInstance]
             continue
         name = raw_file.get("name")
-        if not isinstance(name, str) or name == "avatar.jpg":
+        if not isinstance(name, str) or name in keep_names:
             continue
         if not _is_safe_storage_filename(name):
             logger.warning(f"[image_storage] Пропускаем небезопасное имя файла: {name}")
@@ -243,14 +554,19 @@ async def delete_blog_images(db: AsyncClient, blog_id: str) -> int:
         return 0
 
     try:
-        await db.storage.from_(IMAGES_BUCKET).remove(post_paths)
+        await storage_api(db).from_(IMAGES_BUCKET).remove(post_paths)
     except Exception as e:
         logger.error(f"[image_storage] Ошибка удаления файлов из Storage для blog={blog_id}: {e}")
         return 0
 
-    # Обнуляем thumbnail_url у постов, чтобы при rescrape загрузились новые.
+    # Обнуляем thumbnail_url у постов и индекс изображений блога, чтобы при
+    # rescrape загрузились новые (индекс иначе считал бы посты загруженными).
     # Отдельный try — файлы уже удалены, БД должна быть синхронизирована.
     try:
+        await db.table("blogs") \
+            .update({"image_index": None}) \
+            .eq("id", blog_id) \
+            .execute()
         await db.table("blog_posts") \
             .update({"thumbnail_url": None}) \
             .eq("blog_id", blog_id) \
@@ -258,7 +574,7 @@ async def delete_blog_images(db: AsyncClient, blog_id: str) -> int:
     except Exception as e:
         logger.error(
             f"[image_storage] Файлы удалены ({len(post_paths)}), но не удалось "
-            f"обнулить thumbnail_url в БД для blog={blog_id}: {e}"
+            f"обнулить thumbnail_url/image_index в БД для blog={blog_id}: {e}"
         )
 
     logger.debug(f"[image_storage] Удалено {len(post_paths)} файлов постов для blog={blog_id}")
@@ -1,28 +1,42 @@
 """Точка входа скрапера — инициализация и запуск API + воркера."""
+import argparse
 import asyncio
 import concurrent.futures
 import signal
 import sys
-from typing import Any
+from typing import Any, Literal
 
 import uvicorn
 from loguru import logger
 from openai import AsyncOpenAI
 from supabase import create_async_client
 
+from src.ai.images import create_image_pool, set_image_pool
 from src.api.app import create_app
 from src.config import load_settings
+from src.http_clients import SharedHttpClients, set_shared_http_clients
 from src.log_sink import create_supabase_sink
 from src.platforms.base import BaseScraper
+from src.platforms.instagram.response_cache import create_response_cache
 from src.repositories.blog_repository import SupabaseBlogRepository
 from src.repositories.task_repository import SupabaseTaskRepository
+from src.task_wakeup import TaskWakeup, listen_for_new_tasks
+from src.worker.lanes import WorkerLanes
 from src.worker.loop import run_worker
 from src.worker.scheduler import create_scheduler
 
+type ProcessRole = Literal["all", "leader", "worker"]
 
-async def main() -> None:
-    """Инициализация и запуск API + воркера."""
+
+async def main(role: ProcessRole = "all") -> None:
+    """Инициализация и запуск API + воркера.
+
+    role: "all" — единственный процесс (API + scheduler + воркер);
+    "leader" — процесс 0 в режиме --workers N, то же самое;
+    "worker" — остальные процессы супервизора, только воркер.
+    """
     settings = load_settings()
+    serve_api = role != "worker"
 
     # Логирование
     logger.remove()
@@ -30,12 +44,17 @@ async def main() -> None:
     if settings.log_level == "DEBUG":
         logger.add("logs/scraper.log", rotation="100 MB", retention="7 days")
 
-    logger.info("Starting scraper worker")
+    logger.info(
+        f"Starting scraper {role} "
+        f"(shard {settings.worker_shard_index + 1}/{settings.worker_shard_count})"
+    )
 
-    # Thread pool для asyncio.to_thread (HikerAPI/instagrapi).
-    # Supabase теперь использует AsyncClient (не требует тредов).
-    # 4 треда: 3 HikerAPI + 1 запас
-    executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+    # Thread pool для asyncio.to_thread (instagrapi): по треду на аккаунт,
+    # чтобы параллельные запросы разных аккаунтов не ждали друг друга.
+    # Supabase и HikerAPI используют async-клиенты (не требуют тредов).
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max(4, len(settings.account_credentials)),
+    )
     asyncio.get_running_loop().set_default_executor(executor)
 
     # Supabase (async клиент — без тредов, без EAGAIN)
@@ -67,33 +86,47 @@ async def main() -> None:
     # OpenAI
     openai_client = AsyncOpenAI(api_key=settings.openai_api_key.get_secret_value())
 
+    # Общие HTTP-клиенты: скачивание изображений и Storage (пул соединений на процесс)
+    http_clients = SharedHttpClients(settings, db)
+    set_shared_http_clients(http_clients)
+
+    # Pillow (LLM-варианты, подготовка батча) — в отдельных процессах, вне event loop
+    image_pool = create_image_pool(settings.image_process_workers) if settings.image_process_workers > 0 else None
+    set_image_pool(image_pool)
+
+    # Кэш ответов Instagram API (общий для HikerAPI и instagrapi)
+    response_cache = create_response_cache(
+        settings.response_cache_max_mb, settings.response_cache_ttls, settings.response_cache_dir,
+    )
+
     # Выбор бэкенда скрапера
     pool = None
+    hiker_scraper = None
     if settings.scraper_backend == "hikerapi" and settings.hikerapi_token.get_secret_value():
         from src.platforms.instagram.hiker_scraper import HikerInstagramScraper
+        from src.platforms.instagram.rate_governor import create_rate_governor
 
-        scrapers: dict[str, BaseScraper] = {
-            "instagram": HikerInstagramScraper(settings.hikerapi_token.get_secret_value(), settings),
-        }
+        hiker_scraper = HikerInstagramScraper(
+            settings.hikerapi_token.get_secret_value(),
+            settings,
+            cache=response_cache,
+            governor=create_rate_governor(settings),
+        )
+        scrapers: dict[str, BaseScraper] = {"instagram": hiker_scraper}
         logger.info("Using HikerAPI backend")
     else:
         from src.platforms.instagram.client import AccountPool
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = await AccountPool.create(db, settings)
-        logger.info(f"Initialized {len(pool.accounts)} Instagram accounts")
+        pool = await AccountPool.create(db, settings, cache=response_cache)
+        logger.info(f"Instagram pool started: {len(pool.accounts)} accounts ready")
         scrapers = {"instagram": InstagramScraper(pool, settings)}
 
     # Репозитории
     task_repo = SupabaseTaskRepository(db)
     blog_repo = SupabaseBlogRepository(db)
 
-    # FastAPI
-    app = create_app(db, pool, settings)
-    app.state.task_repo = task_repo
-    app.state.blog_repo = blog_repo
-    config = uvicorn.Config(app, host="0.0.0.0", port=settings.scraper_port, log_level="warning")
-    server = uvicorn.Server(config)
+    worker_lanes = WorkerLanes.from_settings(settings)
 
     # Graceful shutdown
     shutdown_event = asyncio.Event()
@@ -101,13 +134,24 @@ async def main() -> None:
     for sig in (signal.SIGTERM, signal.SIGINT):
         loop.add_signal_handler(sig, shutdown_event.set)
 
-    # APScheduler — крон-задачи (re-scrape, poll_batches, recover)
-    scheduler = create_scheduler(db, settings, openai_client)
-    app.state.scheduler = scheduler
-    scheduler.start()
-    logger.info("Scheduler started")
-
-    logger.info(f"API server starting on port {settings.scraper_port}")
+    server: uvicorn.Server | None = None
+    scheduler = None
+    if serve_api:
+        # FastAPI
+        app = create_app(db, pool, settings)
+        app.state.task_repo = task_repo
+        app.state.blog_repo = blog_repo
+        app.state.worker_lanes = worker_lanes
+        config = uvicorn.Config(app, host="0.0.0.0", port=settings.scraper_port, log_level="warning")
+        server = uvicorn.Server(config)
+
+        # APScheduler — крон-задачи (re-scrape, poll_batches, recover) — только в лидере
+        scheduler = create_scheduler(db, settings, openai_client)
+        app.state.scheduler = scheduler
+        scheduler.start()
+        logger.info("Scheduler started")
+
+        logger.info(f"API server starting on port {settings.scraper_port}")
 
     async def _run_with_shutdown(coro: Any, shutdown_ev: asyncio.Event, name: str) -> None:
         """Запускает корутину, при ошибке сигнализирует shutdown."""
@@ -118,20 +162,86 @@ async def main() -> None:
             shutdown_ev.set()
             raise
 
+    # Пробуждение воркера по новым задачам (LISTEN — если задан прямой DSN)
+    wakeup = TaskWakeup()
+    listener_task: asyncio.Task[None] | None = None
+    postgres_dsn = settings.postgres_dsn.get_secret_value()
+    if postgres_dsn:
+        listener_task = asyncio.create_task(
+            listen_for_new_tasks(postgres_dsn, wakeup, shutdown_event),
+        )
+    else:
+        logger.info("[main] POSTGRES_DSN не задан — LISTEN отключён, только polling")
+
     try:
         worker_coro = run_worker(
             db, scrapers, settings, shutdown_event, openai_client,
+            wakeup=wakeup, lanes=worker_lanes,
         )
-        await asyncio.gather(
-            _run_with_shutdown(server.serve(), shutdown_event, "server"),
-            _run_with_shutdown(worker_coro, shutdown_event, "worker"),
-        )
+        runners = [_run_with_shutdown(worker_coro, shutdown_event, "worker")]
+        if server is not None:
+            runners.append(_run_with_shutdown(server.serve(), shutdown_event, "server"))
+        await asyncio.gather(*runners)
     finally:
-        scheduler.shutdown(wait=False)
+        if listener_task is not None:
+            listener_task.cancel()
+            await asyncio.gather(listener_task, return_exceptions=True)
+        if scheduler is not None:
+            scheduler.shutdown(wait=False)
         if pool is not None:
+            await pool.cancel_init()
+            for usage in pool.utilisation():
+                logger.info(
+                    f"[pool] {usage.name}: requests={usage.requests} "
+                    f"busy={usage.busy_seconds:.0f}s utilisation={usage.utilisation:.0%}"
+                )
+            logger.info(f"[pool] Ожидание аккаунтов суммарно: {pool.acquire_wait_seconds:.0f}s")
             await pool.save_all_sessions(db)
+        if hiker_scraper is not None:
+            governor = hiker_scraper.cl.governor
+            if governor is not None:
+                gstats = governor.stats
+                logger.info(
+                    f"[hiker_governor] calls_by_endpoint={dict(gstats.calls_by_endpoint)} "
+                    f"throttled={gstats.throttled} wait={gstats.wait_seconds:.1f}s "
+                    f"rate_limited={gstats.rate_limited} budget_rejected={gstats.budget_rejected}"
+                )
+            await hiker_scraper.close()
+        if response_cache is not None:
+            stats = response_cache.stats
+            logger.info(
+                f"[response_cache] hits={stats.hits} disk_hits={stats.disk_hits} "
+                f"misses={stats.misses} hit_rate={stats.hit_rate:.0%} "
+                f"bytes_served={stats.bytes_served} evictions={stats.evictions}"
+            )
+        set_shared_http_clients(None)
+        set_image_pool(None)
+        if image_pool is not None:
+            image_pool.shutdown(wait=False, cancel_futures=True)
+        for name, http_stats in (("cdn", http_clients.cdn_stats), ("storage", http_clients.storage_stats)):
+            logger.info(
+                f"[http] {name}: requests={http_stats.requests} "
+                f"connections={http_stats.connections} reuse={http_stats.reuse_ratio:.0%}"
+            )
+        await http_clients.aclose()
         logger.info("Scraper stopped gracefully")
 
 
+def _parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Scraper: API + воркер + scheduler")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Число процессов воркера; >1 — супервизор, API и scheduler только в процессе 0",
+    )
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
+    args = _parse_args()
+    if args.workers > 1:
+        from src.supervisor import run_supervisor
+
+        sys.exit(run_supervisor(args.workers))
     asyncio.run(main())
@@ -115,3 +115,6 @@ class ScrapedProfile(BaseModel):
     er_trend: Literal["growing", "stable", "declining"] | None = None
     posts_per_week: float | None = None
     likes_hidden: bool = False  # Лайки скрыты → ER недоступен
+
+    # Запросов к API не сделано: сохранённые посты (incremental), ответы pre_filter
+    saved_requests: int = 0
@@ -1,6 +1,6 @@
 """Типы для результатов БД — TypedDict вместо dict[str, Any]."""
 
-from typing import Any, Literal, TypedDict
+from typing import Any, Literal, NotRequired, TypedDict
 
 # Допустимые значения из DB CHECK constraints
 type TaskType = Literal["full_scrape", "ai_analysis", "discover", "pre_filter"]
@@ -29,6 +29,21 @@ class TaskRecord(TypedDict):
     started_at: str | None
     completed_at: str | None
     next_retry_at: str | None
+    # Заполняется claim_pending_tasks — какой воркер держит задачу
+    worker_id: NotRequired[str | None]
+    # Lease задачи: истёк — воркер считается упавшим, задачу забирает recover
+    lease_expires_at: NotRequired[str | None]
+    # created_at + priority * шаг aging task_type — ключ порядка claim
+    claim_rank: NotRequired[str | None]
+
+
+class NewTaskRow(TypedDict):
+    """Строка для bulk-создания задач (create_tasks_if_not_exist)."""
+
+    blog_id: str | None
+    task_type: TaskType
+    priority: int
+    payload: NotRequired[dict[str, Any]]
 
 
 class TaskListResult(TypedDict):
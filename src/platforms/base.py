@@ -1,8 +1,9 @@
 """Базовый интерфейс скрапера для любой платформы."""
+from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import Protocol
 
-from src.models.blog import ScrapedProfile
+from src.models.blog import ScrapedPost, ScrapedProfile
 
 
 @dataclass
@@ -22,8 +23,10 @@ class DiscoveredProfile:
 class BaseScraper(Protocol):
     """Общий интерфейс скрапера."""
 
-    async def scrape_profile(self, username: str) -> ScrapedProfile:
-        """Полный скрап профиля."""
+    async def scrape_profile(
+        self, username: str, known_posts: Sequence[ScrapedPost] | None = None,
+    ) -> ScrapedProfile:
+        """Скрап профиля; known_posts — сохранённые посты для инкрементального режима."""
         ...
 
     async def discover(
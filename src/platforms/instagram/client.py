@@ -1,6 +1,9 @@
 """Пул Instagram-аккаунтов с ротацией и cooldown."""
 import asyncio
+import contextlib
 import hashlib
+import heapq
+import itertools
 import random
 import time
 from collections.abc import Callable
@@ -23,12 +26,13 @@ from loguru import logger
 from pydantic import SecretStr
 from supabase import AsyncClient as SupabaseClient
 
-from src.config import Settings
+from src.config import AccountCredentials, Settings
 from src.database import sanitize_error
 from src.platforms.instagram.exceptions import (
     AllAccountsCooldownError,
     ScraperError,
 )
+from src.platforms.instagram.response_cache import MISS, ResponseCache
 from src.storage import load_session, save_session
 
 # Реалистичные устройства для уникальных fingerprints (популярные Android-модели)
@@ -156,21 +160,50 @@ class AccountState:
     totp_seed: SecretStr = field(default_factory=lambda: SecretStr(""))
     is_available: bool = True
     cooldown_until: float = 0
-    requests_this_hour: int = 0
-    hour_started_at: float = field(default_factory=time.time)
+    # Token bucket: ёмкость и скорость пополнения задаёт пул (requests_per_hour)
+    tokens: float = 0
+    tokens_updated_at: float = field(default_factory=time.time)
+    # Anti-detection пауза: следующий запрос аккаунта не раньше этого момента
+    next_request_at: float = 0
+    requests_total: int = 0
+    in_flight: bool = False  # Запрос через аккаунт выполняется прямо сейчас
+    busy_seconds: float = 0  # Суммарное время запросов к Instagram
 
     def __repr__(self) -> str:
         return (
             f"AccountState(name={self.name!r}, username={self.username!r}, "
             f"password='***', totp_seed='***', is_available={self.is_available}, "
-            f"requests_this_hour={self.requests_this_hour})"
+            f"tokens={self.tokens:.2f})"
         )
 
 
+# Допуск на погрешность float при проверке «есть целый токен»
+_TOKEN_EPSILON = 1e-9
+# Минимальный шаг ожидания в acquire() (защита от busy-loop на округлениях)
+_MIN_WAIT_SECONDS = 0.05
+# Случайная пауза между запросами одного аккаунта (anti-detection), секунды
+PACING_DELAY_RANGE = (2.0, 5.0)
+
+
+@dataclass
+class AccountUtilisation:
+    """Загрузка аккаунта с момента старта пула."""
+
+    name: str
+    requests: int
+    busy_seconds: float
+    utilisation: float  # Доля времени, занятая запросами
+
+
 class AccountPool:
     """
     Управляет пулом Instagram-аккаунтов.
     Один аккаунт = один sticky IP. Ротация round-robin.
+
+    Лимит запросов — token bucket на аккаунт: ёмкость requests_per_hour,
+    пополнение requests_per_hour токенов в час. Если свободных аккаунтов
+    нет, acquire() ставит вызывающего в очередь по приоритету и ждёт
+    до max_wait_seconds, пока какой-то аккаунт не станет доступен.
     """
 
     MAX_RETRIES = 3  # Максимум переключений аккаунтов на один запрос
@@ -181,13 +214,33 @@ class AccountPool:
         requests_per_hour: int = 30,
         cooldown_minutes: int = 45,
         db: SupabaseClient | None = None,
+        cache: ResponseCache | None = None,
+        max_wait_seconds: float = 120,
+        pacing_delay_range: tuple[float, float] = PACING_DELAY_RANGE,
     ) -> None:
         self.accounts = accounts
         self.current_index = 0
         self.requests_per_hour = requests_per_hour
         self.cooldown_minutes = cooldown_minutes
+        self.max_wait_seconds = max_wait_seconds
+        self.pacing_delay_range = pacing_delay_range
         self._db = db
+        self.cache = cache
         self._lock = asyncio.Lock()
+        self._ready = asyncio.Condition(self._lock)
+        # Очередь ждущих acquire(): (priority, seq)
+        self._waiters: list[tuple[int, int]] = []
+        self._waiter_seq = itertools.count()
+        # Время, проведённое запросами в ожидании аккаунта (acquire)
+        self.acquire_wait_seconds = 0.0
+        now = time.time()
+        self.started_at = now
+        # Фоновый логин аккаунтов из create(); пока он идёт, acquire() ждёт новых
+        self._initializing = False
+        self._init_task: asyncio.Task[None] | None = None
+        for acc in accounts:
+            acc.tokens = float(requests_per_hour)
+            acc.tokens_updated_at = now
 
     @staticmethod
     def _unwrap_secret(value: SecretStr | str) -> str:
@@ -210,93 +263,199 @@ class AccountPool:
             cl.login(username, password_value)
 
     @classmethod
-    async def create(cls, db: SupabaseClient, settings: Settings) -> "AccountPool":
-        """Инициализировать пул: загрузить сессии, залогиниться."""
-        accounts: list[AccountState] = []
-
+    async def create(
+        cls, db: SupabaseClient, settings: Settings, cache: ResponseCache | None = None,
+    ) -> "AccountPool":
+        """Инициализировать пул: загрузить сессии, залогиниться.
+
+        Аккаунты логинятся параллельно (не больше account_init_concurrency
+        одновременно). Пул возвращается, как только готов первый аккаунт,
+        остальные добавляются в фоне по мере готовности.
+        """
         credentials = settings.account_credentials
         logger.debug(f"Initializing account pool with {len(credentials)} accounts")
-        for cred in credentials:
-            logger.debug(f"Account {cred.name}: credentials loaded, "
-                         f"proxy={'set' if cred.proxy else 'MISSING'}, "
-                         f"totp={'set' if cred.has_totp_seed else 'no'}")
+        pool = cls(
+            accounts=[],
+            requests_per_hour=settings.requests_per_hour,
+            cooldown_minutes=settings.cooldown_minutes,
+            db=db,
+            cache=cache,
+            max_wait_seconds=settings.account_wait_max_seconds,
+        )
+        if credentials:
+            pool._initializing = True
+            pool._init_task = asyncio.create_task(pool._init_accounts(
+                db, settings, credentials, settings.account_init_concurrency,
+            ))
+            await pool.wait_first_account()
+        if not pool.accounts:
+            logger.warning("No Instagram accounts initialized")
+        return pool
+
+    async def _init_accounts(
+        self,
+        db: SupabaseClient,
+        settings: Settings,
+        credentials: list[AccountCredentials],
+        concurrency: int,
+    ) -> None:
+        """Залогинить аккаунты параллельно и добавлять их в пул по готовности."""
+        semaphore = asyncio.Semaphore(max(concurrency, 1))
+        started = time.monotonic()
+
+        async def _init_one(cred: AccountCredentials) -> None:
+            async with semaphore:
+                init_started = time.monotonic()
+                try:
+                    acc = await self._init_account(db, settings, cred)
+                except Exception as e:
+                    err = sanitize_error(str(e))
+                    logger.error(f"Account {cred.name}: login failed ({type(e).__name__}: {err}), skipping")
+                    return
+                await self.add_account(acc)
+                logger.info(f"Account {cred.name}: initialized in {time.monotonic() - init_started:.1f}s")
+
+        try:
+            await asyncio.gather(*(_init_one(cred) for cred in credentials))
+        finally:
+            async with self._ready:
+                self._initializing = False
+                self._ready.notify_all()
+        logger.info(
+            f"Account pool ready: {len(self.accounts)}/{len(credentials)} accounts "
+            f"in {time.monotonic() - started:.1f}s"
+        )
 
+    @classmethod
+    async def _init_account(
+        cls, db: SupabaseClient, settings: Settings, cred: AccountCredentials,
+    ) -> AccountState:
+        """Восстановить сессию аккаунта или залогиниться заново."""
+        logger.debug(f"Account {cred.name}: credentials loaded, "
+                     f"proxy={'set' if cred.proxy else 'MISSING'}, "
+                     f"totp={'set' if cred.has_totp_seed else 'no'}")
+
+        cl = Client()
+        if cred.proxy:
+            cl.set_proxy(cred.proxy)
+            logger.debug(f"Account {cred.name}: proxy configured")
+        else:
+            logger.warning(f"Account {cred.name}: no proxy configured, using direct IP")
+        cl.delay_range = [settings.scrape_delay_min, settings.scrape_delay_max]
+
+        # Загрузить или создать сессию
+        session = await load_session(db, cred.name)
+        logger.debug(f"Account {cred.name}: saved session {'found' if session else 'not found'}")
+        if session:
+            _cl_set_settings(cl, session)
             try:
+                # Валидация сессии через get_timeline_feed
+                logger.debug(f"Account {cred.name}: validating session via timeline feed...")
+                await asyncio.to_thread(_cl_get_timeline_feed, cl)
+                logger.info(f"Account {cred.name}: session restored via timeline check")
+            except Exception as e:
+                logger.warning(f"Account {cred.name}: session expired ({type(e).__name__}), fresh login")
+                # Сохраняем device settings и UUID для консистентности
+                old_settings: dict[str, Any] = _cl_get_settings(cl)
+                old_uuids: dict[str, Any] = cast(dict[str, Any], old_settings.get("uuids", {}))
+                old_device: dict[str, Any] = cast(dict[str, Any], old_settings.get("device_settings", {}))
                 cl = Client()
+                if old_device:
+                    _cl_set_device(cl, old_device)
+                if old_uuids:
+                    _cl_set_uuids(cl, old_uuids)
                 if cred.proxy:
                     cl.set_proxy(cred.proxy)
-                    logger.debug(f"Account {cred.name}: proxy configured")
-                else:
-                    logger.warning(f"Account {cred.name}: no proxy configured, using direct IP")
                 cl.delay_range = [settings.scrape_delay_min, settings.scrape_delay_max]
+                await asyncio.to_thread(
+                    cls._login_with_totp, cl,
+                    cred.username, cred.password, cred.totp_seed,
+                )
+        else:
+            # Первый логин — уникальный device fingerprint
+            device = _generate_device_for_account(cred.name)
+            _cl_set_device(cl, cast(dict[str, Any], device), reset=True)
+            logger.debug(f"Account {cred.name}: unique device set "
+                         f"({device['manufacturer']} {device['model']})")
+            await asyncio.to_thread(
+                cls._login_with_totp, cl,
+                cred.username, cred.password, cred.totp_seed,
+            )
+            logger.info(f"Account {cred.name}: fresh login")
 
-                # Загрузить или создать сессию
-                session = await load_session(db, cred.name)
-                logger.debug(f"Account {cred.name}: saved session {'found' if session else 'not found'}")
-                if session:
-                    _cl_set_settings(cl, session)
-                    try:
-                        # Валидация сессии через get_timeline_feed
-                        logger.debug(f"Account {cred.name}: validating session via timeline feed...")
-                        await asyncio.to_thread(_cl_get_timeline_feed, cl)
-                        logger.info(f"Account {cred.name}: session restored via timeline check")
-                    except Exception as e:
-                        logger.warning(f"Account {cred.name}: session expired ({type(e).__name__}), fresh login")
-                        # Сохраняем device settings и UUID для консистентности
-                        old_settings: dict[str, Any] = _cl_get_settings(cl)
-                        old_uuids: dict[str, Any] = cast(dict[str, Any], old_settings.get("uuids", {}))
-                        old_device: dict[str, Any] = cast(dict[str, Any], old_settings.get("device_settings", {}))
-                        cl = Client()
-                        if old_device:
-                            _cl_set_device(cl, old_device)
-                        if old_uuids:
-                            _cl_set_uuids(cl, old_uuids)
-                        if cred.proxy:
-                            cl.set_proxy(cred.proxy)
-                        cl.delay_range = [settings.scrape_delay_min, settings.scrape_delay_max]
-                        await asyncio.to_thread(
-                            cls._login_with_totp, cl,
-                            cred.username, cred.password, cred.totp_seed,
-                        )
-                else:
-                    # Первый логин — уникальный device fingerprint
-                    device = _generate_device_for_account(cred.name)
-                    _cl_set_device(cl, cast(dict[str, Any], device), reset=True)
-                    logger.debug(f"Account {cred.name}: unique device set "
-                                 f"({device['manufacturer']} {device['model']})")
-                    await asyncio.to_thread(
-                        cls._login_with_totp, cl,
-                        cred.username, cred.password, cred.totp_seed,
-                    )
-                    logger.info(f"Account {cred.name}: fresh login")
-
-                # Сохранить сессию
-                await save_session(db, cred.name, _cl_get_settings(cl))
-                logger.debug(f"Account {cred.name}: session saved to storage")
-
-                accounts.append(AccountState(
-                    name=cred.name, client=cl, proxy=cred.proxy,
-                    username=cred.username, password=cred.password,
-                    totp_seed=cred.totp_seed,
-                ))
-                logger.info(f"Account {cred.name}: initialized successfully")
-            except Exception as e:
-                err = sanitize_error(str(e))
-                logger.error(f"Account {cred.name}: login failed ({type(e).__name__}: {err}), skipping")
+        # Сохранить сессию
+        await save_session(db, cred.name, _cl_get_settings(cl))
+        logger.debug(f"Account {cred.name}: session saved to storage")
 
-        if not accounts:
-            logger.warning("No Instagram accounts initialized")
+        return AccountState(
+            name=cred.name, client=cl, proxy=cred.proxy,
+            username=cred.username, password=cred.password,
+            totp_seed=cred.totp_seed,
+        )
 
-        logger.debug(f"Account pool ready: {len(accounts)} accounts")
-        return cls(
-            accounts=accounts,
-            requests_per_hour=settings.requests_per_hour,
-            cooldown_minutes=settings.cooldown_minutes,
-            db=db,
+    async def add_account(self, acc: AccountState) -> None:
+        """Добавить готовый аккаунт в пул и разбудить ждущих acquire()."""
+        async with self._ready:
+            acc.tokens = float(self.requests_per_hour)
+            acc.tokens_updated_at = time.time()
+            self.accounts.append(acc)
+            self._ready.notify_all()
+
+    async def wait_first_account(self) -> None:
+        """Дождаться первого готового аккаунта (или конца инициализации без них)."""
+        async with self._ready:
+            await self._ready.wait_for(lambda: bool(self.accounts) or not self._initializing)
+
+    async def cancel_init(self) -> None:
+        """Прервать фоновый логин оставшихся аккаунтов (при shutdown)."""
+        if self._init_task is not None and not self._init_task.done():
+            self._init_task.cancel()
+            await asyncio.gather(self._init_task, return_exceptions=True)
+
+    def _refill(self, acc: AccountState, now: float) -> None:
+        """Пополнить token bucket аккаунта за прошедшее время."""
+        elapsed = max(0.0, now - acc.tokens_updated_at)
+        acc.tokens = min(float(self.requests_per_hour), acc.tokens + elapsed * self.requests_per_hour / 3600)
+        acc.tokens_updated_at = now
+
+    def account_ready_at(self, acc: AccountState, now: float) -> float:
+        """Момент, когда аккаунт сможет выполнить запрос (cooldown и token bucket)."""
+        self._refill(acc, now)
+        ready_at = max(now, acc.cooldown_until, acc.next_request_at)
+        missing = 1 - acc.tokens
+        if missing > _TOKEN_EPSILON:
+            if self.requests_per_hour <= 0:
+                return float("inf")
+            ready_at = max(ready_at, now + missing * 3600 / self.requests_per_hour)
+        return ready_at
+
+    def next_available_at(self, include_in_flight: bool = True) -> float | None:
+        """Ближайший момент, когда освободится хоть один аккаунт; None — пул пуст.
+
+        Для аккаунтов с запросом в процессе это нижняя граница: точное
+        время станет известно после release().
+        """
+        now = time.time()
+        return min(
+            (
+                self.account_ready_at(acc, now) for acc in self.accounts
+                if include_in_flight or not acc.in_flight
+            ),
+            default=None,
         )
 
+    def eligible_count(self) -> int:
+        """Сколько аккаунтов может принимать запросы: не в cooldown и с токеном."""
+        now = time.time()
+        count = 0
+        for acc in self.accounts:
+            self._refill(acc, now)
+            if acc.cooldown_until <= now and acc.tokens >= 1 - _TOKEN_EPSILON:
+                count += 1
+        return count
+
     def get_available_account(self) -> AccountState | None:
-        """Вернуть доступный аккаунт (round-robin) или None."""
+        """Вернуть доступный сейчас аккаунт (round-robin) или None."""
         now = time.time()
         checked = 0
 
@@ -311,26 +470,85 @@ class AccountPool:
                 logger.debug(f"Account {acc.name}: in cooldown ({remaining}s remaining)")
                 continue
 
-            # Проверить/сбросить часовой счётчик
-            if now - acc.hour_started_at >= 3600:
-                logger.debug(f"Account {acc.name}: hourly counter reset "
-                             f"(was {acc.requests_this_hour})")
-                acc.requests_this_hour = 0
-                acc.hour_started_at = now
-
-            # Проверить лимит запросов
-            if acc.requests_this_hour >= self.requests_per_hour:
-                logger.debug(f"Account {acc.name}: hourly limit reached "
-                             f"({acc.requests_this_hour}/{self.requests_per_hour})")
+            # Один запрос на аккаунт за раз, пауза после предыдущего и token bucket
+            if acc.in_flight or acc.next_request_at > now:
+                continue
+            if self.account_ready_at(acc, now) > now:
+                logger.debug(f"Account {acc.name}: rate limit reached "
+                             f"({acc.tokens:.2f} tokens)")
                 continue
 
-            logger.debug(f"Selected account {acc.name} "
-                         f"(requests: {acc.requests_this_hour}/{self.requests_per_hour})")
+            logger.debug(f"Selected account {acc.name} ({acc.tokens:.2f} tokens)")
             return acc
 
         logger.debug("No available accounts (all in cooldown or at limit)")
         return None
 
+    async def acquire(self, priority: int = 0, max_wait: float | None = None) -> AccountState:
+        """Дождаться свободного аккаунта и списать с него запрос.
+
+        Ждущие обслуживаются по priority (меньше — раньше), затем по порядку
+        прихода. Если ни один аккаунт не освободится за max_wait секунд
+        (по умолчанию max_wait_seconds) — AllAccountsCooldownError сразу,
+        без ожидания. Выданный аккаунт занят до release().
+        """
+        limit = self.max_wait_seconds if max_wait is None else max_wait
+        started = time.time()
+        deadline = started + limit
+        entry = (priority, next(self._waiter_seq))
+        async with self._ready:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    is_head = self._waiters[0] == entry
+                    if is_head:
+                        acc = self.get_available_account()
+                        if acc is not None:
+                            self.increment_requests(acc)
+                            acc.in_flight = True
+                            self.acquire_wait_seconds += time.time() - started
+                            return acc
+                    ready_at = self.next_available_at()
+                    now = time.time()
+                    unreachable = ready_at is None or ready_at > deadline
+                    # Пока остальные аккаунты логинятся, ждём add_account() до deadline
+                    if now >= deadline or (unreachable and not self._initializing):
+                        raise AllAccountsCooldownError("All accounts in cooldown")
+                    # Голова очереди ждёт освобождения аккаунта, остальные — своей очереди.
+                    # Занятые запросом аккаунты разбудят голову сами через release().
+                    if is_head:
+                        idle_at = self.next_available_at(include_in_flight=False)
+                        wake_at = deadline if idle_at is None else min(idle_at, deadline)
+                        timeout = max(wake_at - now, _MIN_WAIT_SECONDS)
+                    else:
+                        timeout = deadline - now
+                    logger.debug(f"acquire: waiting {timeout:.1f}s for account (priority={priority})")
+                    with contextlib.suppress(TimeoutError):
+                        await asyncio.wait_for(self._ready.wait(), timeout)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._ready.notify_all()
+
+    async def release(self, acc: AccountState) -> None:
+        """Вернуть аккаунт после запроса и разбудить ждущих acquire()."""
+        async with self._ready:
+            acc.in_flight = False
+            self._ready.notify_all()
+
+    def utilisation(self) -> list[AccountUtilisation]:
+        """Загрузка каждого аккаунта: число запросов и доля занятого времени."""
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        return [
+            AccountUtilisation(
+                name=acc.name,
+                requests=acc.requests_total,
+                busy_seconds=acc.busy_seconds,
+                utilisation=min(acc.busy_seconds / elapsed, 1.0),
+            )
+            for acc in self.accounts
+        ]
+
     def mark_rate_limited(self, account: AccountState) -> None:
         """Аккаунт получил rate limit → cooldown."""
         account.cooldown_until = time.time() + (self.cooldown_minutes * 60)
@@ -344,8 +562,26 @@ class AccountPool:
         )
 
     def increment_requests(self, account: AccountState) -> None:
-        """Инкрементировать счётчик запросов."""
-        account.requests_this_hour += 1
+        """Списать токен запроса с аккаунта."""
+        self._refill(account, time.time())
+        account.tokens -= 1
+        account.requests_total += 1
+
+    async def _call(
+        self, acc: AccountState, func: Callable[..., Any], *args: Any, **kwargs: Any,
+    ) -> Any:
+        """Запрос через аккаунт; следующий запрос аккаунта — после случайной паузы.
+
+        Пауза не держит вызывающего (и его слот воркера): acquire() просто
+        не выдаёт аккаунт до next_request_at, остальные задачи берут другие.
+        """
+        started = time.time()
+        try:
+            return await asyncio.to_thread(func, acc.client, *args, **kwargs)
+        finally:
+            finished = time.time()
+            acc.busy_seconds += finished - started
+            acc.next_request_at = finished + random.uniform(*self.pacing_delay_range)
 
     async def _try_relogin(self, account: AccountState) -> bool:
         """Попробовать re-login. Возвращает True при успехе."""
@@ -377,27 +613,34 @@ class AccountPool:
         - UserNotFound → raise (без retry)
         - ClientError → raise ScraperError
 
-        Лок удерживается только при выборе аккаунта и инкременте счётчика,
-        чтобы concurrent-корутины не получали один и тот же аккаунт.
+        Аккаунт выдаёт acquire(): при занятом пуле запрос ждёт до
+        max_wait_seconds, а не падает сразу с AllAccountsCooldownError.
+        Ответ из cache (ключ — имя func и аргументы) не расходует запрос аккаунта.
         """
         func_name = getattr(func, "__name__", str(func))
+        cache_args = [args, kwargs]
+        if self.cache is not None:
+            cached = await self.cache.get(func_name, cache_args)
+            if cached is not MISS:
+                return cached
+        result = await self._request_with_rotation(func, func_name, *args, **kwargs)
+        if self.cache is not None:
+            await self.cache.put(func_name, cache_args, result)
+        return result
+
+    async def _request_with_rotation(
+        self, func: Callable[..., Any], func_name: str, *args: Any, **kwargs: Any,
+    ) -> Any:
+        """Запрос с ротацией аккаунтов и обработкой ошибок (см. safe_request)."""
         for attempt in range(self.MAX_RETRIES):
-            async with self._lock:
-                acc = self.get_available_account()
-                if acc is None:
-                    raise AllAccountsCooldownError("All accounts in cooldown")
-                self.increment_requests(acc)
+            acc = await self.acquire()
 
             logger.debug(f"safe_request: {func_name} via {acc.name} "
                          f"(attempt {attempt + 1}/{self.MAX_RETRIES})")
 
             try:
-                result = await asyncio.to_thread(func, acc.client, *args, **kwargs)
-
-                # Случайная пауза между запросами (anti-detection)
-                delay = random.uniform(2, 5)
-                logger.debug(f"safe_request: {func_name} OK, sleeping {delay:.1f}s")
-                await asyncio.sleep(delay)
+                result = await self._call(acc, func, *args, **kwargs)
+                logger.debug(f"safe_request: {func_name} OK via {acc.name}")
                 return result
 
             except UserNotFound:
@@ -431,9 +674,7 @@ class AccountPool:
                 try:
                     async with self._lock:
                         self.increment_requests(acc)
-                    result = await asyncio.to_thread(func, acc.client, *args, **kwargs)
-                    await asyncio.sleep(random.uniform(2, 5))
-                    return result
+                    return await self._call(acc, func, *args, **kwargs)
                 except Exception as e:
                     logger.warning(f"[pool] Запрос после re-login на {acc.name} упал: {e}")
                     async with self._lock:
@@ -448,9 +689,7 @@ class AccountPool:
                     try:
                         async with self._lock:
                             self.increment_requests(acc)
-                        result = await asyncio.to_thread(func, acc.client, *args, **kwargs)
-                        await asyncio.sleep(random.uniform(2, 5))
-                        return result
+                        return await self._call(acc, func, *args, **kwargs)
                     except Exception as e2:
                         logger.warning(f"[pool] Запрос после re-login на {acc.name} упал: {e2}")
                         async with self._lock:
@@ -458,6 +697,9 @@ class AccountPool:
                         continue
                 raise ScraperError(f"Instagram client error: {e}") from e
 
+            finally:
+                await self.release(acc)
+
         raise AllAccountsCooldownError(
             f"Failed after {self.MAX_RETRIES} account retries"
         )
@@ -13,6 +13,14 @@ class AllAccountsCooldownError(ScraperError):
     """Все аккаунты в cooldown — задача откладывается."""
 
 
+class HikerBudgetExhaustedError(ScraperError):
+    """Дневной бюджет вызовов HikerAPI исчерпан — задача ждёт сброса бюджета без траты попытки."""
+
+    def __init__(self, message: str, reset_in_seconds: float) -> None:
+        self.reset_in_seconds = reset_in_seconds
+        super().__init__(message)
+
+
 class InsufficientBalanceError(ScraperError):
     """Недостаточно средств на HikerAPI — ретрай бесполезен."""
 
@@ -1,9 +1,11 @@
 """Скрапинг Instagram-профилей через HikerAPI (SaaS-бэкенд)."""
 import asyncio
+from collections.abc import Sequence
 from typing import Any, cast
 
 import httpx
-from hikerapi import Client
+from hikerapi import AsyncClient
+from hikerapi.base import BaseClient
 from loguru import logger
 
 from src.config import Settings
@@ -30,8 +32,13 @@ from src.platforms.instagram.metrics import (
     detect_likes_hidden,
     extract_hashtags,
     extract_mentions,
+    merge_known_posts,
     select_posts_for_comments,
 )
+from src.platforms.instagram.prefetch import PREFETCH_CALLS_PER_HIT, PrefetchCache
+from src.platforms.instagram.rate_governor import HikerRateGovernor
+from src.platforms.instagram.response_cache import MISS, ResponseCache
+from src.utils import run_limited
 
 
 def _pick_image_url(candidate: Any) -> str | None:
@@ -204,10 +211,78 @@ def _hiker_highlight_to_scraped(
     )
 
 
-class SafeHikerClient(Client):
-    """Client с проверкой HTTP-статусов (базовый Client их игнорирует)."""
+def _hiker_error_detail(resp: httpx.Response) -> str:
+    """detail из JSON-ответа HikerAPI с fallback на текст."""
+    try:
+        return str(resp.json().get("detail", resp.text))
+    except Exception:
+        return resp.text
 
-    def _request(
+
+# Повторов после 429, если вызовы идут через governor (он ставит паузу всем)
+RATE_LIMIT_RETRIES = 2
+
+
+def _retry_after_seconds(resp: httpx.Response) -> float | None:
+    """Retry-After в секундах (HTTP-date формат не поддерживаем)."""
+    try:
+        return float(resp.headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+def _raise_for_hiker_status(resp: httpx.Response) -> None:
+    """Маппинг HTTP-статусов HikerAPI в исключения (SDK их игнорирует)."""
+    if resp.status_code == 402:
+        raise InsufficientBalanceError(
+            f"HikerAPI: недостаточно средств (HTTP 402). {_hiker_error_detail(resp)}"
+        )
+    if resp.status_code == 429:
+        raise HikerAPIError(429, "rate limit exceeded")
+    if resp.status_code >= 400:
+        raise HikerAPIError(resp.status_code, _hiker_error_detail(resp))
+
+
+class SafeHikerClient(AsyncClient):
+    """Async-клиент HikerAPI с проверкой HTTP-статусов и общим пулом соединений.
+
+    Один httpx.AsyncClient (keep-alive, HTTP/2) на процесс — запросы не
+    занимают треды default executor и не ограничены его размером.
+    GET-ответы кэшируются в cache (если передан) по path и параметрам.
+    Вызовы API проходят через governor (rate limit, бюджет); на 429 он
+    ставит паузу всем корутинам, и запрос повторяется после неё.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        timeout: float = 10,
+        max_connections: int = 100,
+        transport: httpx.AsyncBaseTransport | None = None,
+        base_url: str | None = None,
+        cache: ResponseCache | None = None,
+        governor: HikerRateGovernor | None = None,
+    ) -> None:
+        # BaseAsyncClient.__init__ создаёт свой httpx.AsyncClient, который здесь
+        # сразу заменяется и не закрывался бы — инициализируем только BaseClient
+        BaseClient.__init__(self, token=token, timeout=timeout)
+        self.cache = cache
+        self.governor = governor
+        if base_url is not None:
+            self._url = base_url
+        self._client = httpx.AsyncClient(
+            base_url=self._url,
+            headers=self._headers,
+            timeout=self._timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            http2=True,
+            transport=transport,
+        )
+
+    async def _request(
         self,
         method: str,
         path: str,
@@ -218,84 +293,194 @@ class SafeHikerClient(Client):
     ) -> Any:
         if params:
             params = {k: v for k, v in params.items() if v is not None}
-        resp: httpx.Response = self._client.request(
-            method,
-            path,
-            headers=self._headers | (headers or {}),
-            params=params,
-            data=data,
-            json=json,
-            timeout=self._timeout,
-        )
-        # Проверяем HTTP-статус до парсинга JSON
-        if resp.status_code == 402:
-            detail = ""
-            try:
-                detail = resp.json().get("detail", resp.text)
-            except Exception:
-                detail = resp.text
-            raise InsufficientBalanceError(
-                f"HikerAPI: недостаточно средств (HTTP 402). {detail}"
+        # Кэшируем только чтения
+        cache = self.cache if method.lower() == "get" and data is None and json is None else None
+        if cache is not None:
+            cached = await cache.get(path, params or {})
+            if cached is not MISS:
+                return cached
+        governor = self.governor
+        attempt = 0
+        while True:
+            if governor is not None:
+                await governor.acquire(path)
+            resp: httpx.Response = await self._client.request(
+                method,
+                path,
+                headers=self._headers | (headers or {}),
+                params=params,
+                data=data,
+                json=json,
+                timeout=self._timeout,
             )
-        if resp.status_code == 429:
-            raise HikerAPIError(429, "rate limit exceeded")
-        if resp.status_code >= 400:
-            detail = ""
-            try:
-                detail = resp.json().get("detail", resp.text)
-            except Exception:
-                detail = resp.text
-            raise HikerAPIError(resp.status_code, detail)
+            if resp.status_code != 429 or governor is None:
+                break
+            governor.rate_limited(_retry_after_seconds(resp))
+            if attempt >= RATE_LIMIT_RETRIES:
+                break
+            attempt += 1
+        # Проверяем HTTP-статус до парсинга JSON
+        _raise_for_hiker_status(resp)
+
+        result: Any = resp.json() if "json" in resp.headers.get("content-type", "").lower() else resp.content
+        if cache is not None:
+            await cache.put(path, params or {}, result)
+        return result
 
-        if "json" in resp.headers.get("content-type", "").lower():
-            return resp.json()
-        return resp.content
+    async def aclose(self) -> None:
+        """Закрыть пул соединений."""
+        await self._client.aclose()
 
 
 class HikerInstagramScraper:
     """Скрапер Instagram через HikerAPI (SaaS от subzeroid)."""
 
-    def __init__(self, token: str, settings: Settings) -> None:
-        self.cl = SafeHikerClient(token=token)
+    def __init__(
+        self,
+        token: str,
+        settings: Settings,
+        cache: ResponseCache | None = None,
+        governor: HikerRateGovernor | None = None,
+    ) -> None:
+        self.cl = SafeHikerClient(
+            token=token,
+            max_connections=settings.hikerapi_max_connections,
+            cache=cache,
+            governor=governor,
+        )
         self.settings = settings
+        # Ответы pre_filter для прошедших фильтр блогеров — full_scrape не запрашивает их повторно
+        self.prefetch = PrefetchCache(ttl_seconds=settings.hikerapi_prefetch_ttl_seconds)
 
-    # --- Sync-обёртки для HikerAPI методов с явными типами ---
+    async def close(self) -> None:
+        """Закрыть HTTP-пул клиента HikerAPI."""
+        await self.cl.aclose()
+
+    # --- Обёртки для HikerAPI методов с явными типами ---
     # Необходимы, так как hikerapi не имеет полных type stubs.
     # cast(Any, self.cl) скрывает нетипизированные члены от pyright.
 
-    def _call_user_by_username_v2(self, username: str) -> dict[str, Any]:
-        """Sync-вызов HikerAPI: получить данные пользователя по username."""
+    async def _call_user_by_username_v2(self, username: str) -> dict[str, Any]:
+        """HikerAPI: получить данные пользователя по username."""
         cl: Any = self.cl
-        return cast(dict[str, Any], cl.user_by_username_v2(username))
+        return cast(dict[str, Any], await cl.user_by_username_v2(username))
 
-    def _call_user_medias_chunk_v1(self, user_id: str) -> list[Any]:
-        """Sync-вызов HikerAPI: получить chunk медиа пользователя."""
+    async def _call_user_medias_chunk_v1(self, user_id: str, end_cursor: str | None = None) -> list[Any]:
+        """HikerAPI: получить chunk медиа пользователя."""
         cl: Any = self.cl
-        return cast(list[Any], cl.user_medias_chunk_v1(user_id))
+        return cast(list[Any], await cl.user_medias_chunk_v1(user_id, end_cursor=end_cursor))
 
-    def _call_user_highlights(self, user_id: str, amount: int) -> list[dict[str, Any]]:
-        """Sync-вызов HikerAPI: получить хайлайты пользователя."""
+    async def _call_user_highlights(self, user_id: str, amount: int) -> list[dict[str, Any]]:
+        """HikerAPI: получить хайлайты пользователя."""
         cl: Any = self.cl
-        return cast(list[dict[str, Any]], cl.user_highlights(user_id, amount=amount))
+        return cast(list[dict[str, Any]], await cl.user_highlights(user_id, amount=amount))
 
-    def _call_highlight_by_id_v2(self, pk: str) -> dict[str, Any]:
-        """Sync-вызов HikerAPI: получить детали хайлайта по pk."""
+    async def _call_highlight_by_id_v2(self, pk: str) -> dict[str, Any]:
+        """HikerAPI: получить детали хайлайта по pk."""
         cl: Any = self.cl
-        return cast(dict[str, Any], cl.highlight_by_id_v2(pk))
+        return cast(dict[str, Any], await cl.highlight_by_id_v2(pk))
 
-    def _call_media_comments_chunk_v1(self, media_id: str) -> list[Any]:
-        """Sync-вызов HikerAPI: получить chunk комментариев к медиа."""
+    async def _call_media_comments_chunk_v1(self, media_id: str) -> list[Any]:
+        """HikerAPI: получить chunk комментариев к медиа."""
         cl: Any = self.cl
-        return cast(list[Any], cl.media_comments_chunk_v1(media_id))
-
-    async def scrape_profile(self, username: str) -> ScrapedProfile:
-        """Полный скрапинг Instagram-профиля через HikerAPI."""
+        return cast(list[Any], await cl.media_comments_chunk_v1(media_id))
+
+    async def _fetch_medias(
+        self, user_id: str, known_ids: set[str], first_chunk: list[Any] | None = None,
+    ) -> list[dict[str, Any]]:
+        """Медиа пользователя: один chunk или (инкрементально) chunk'и до первого известного поста.
+
+        first_chunk — уже полученный первый chunk (из pre_filter), вместо запроса.
+        """
+        raw_medias: list[dict[str, Any]] = []
+        end_cursor: str | None = None
+        while True:
+            # user_medias_chunk_v1 возвращает [medias_list, next_cursor]
+            if first_chunk is not None and end_cursor is None:
+                chunk = first_chunk
+            else:
+                chunk = await self._call_user_medias_chunk_v1(user_id, end_cursor)
+            page = cast(list[dict[str, Any]], chunk[0]) if chunk else []
+            raw_medias.extend(page)
+            if not known_ids or not page or len(raw_medias) >= self.settings.posts_to_fetch:
+                return raw_medias
+            if any(str(m.get("pk", "")) in known_ids for m in page):
+                return raw_medias
+            next_cursor: Any = chunk[1] if len(chunk) > 1 else None
+            if not next_cursor:
+                return raw_medias
+            end_cursor = str(next_cursor)
+
+    async def _fetch_highlight(self, hl: dict[str, Any]) -> ScrapedHighlight:
+        """Хайлайт с items из highlight_by_id_v2; при ошибке — без items."""
+        try:
+            hl_pk = str(hl.get("pk", ""))
+            # highlight_by_id_v2 принимает pk без prefix 'highlight:'
+            hl_pk_clean = hl_pk.replace("highlight:", "")
+            detail_raw: dict[str, Any] = await self._call_highlight_by_id_v2(hl_pk_clean)
+            # Структура: response.reels.{highlight:pk}.items
+            response_part = cast(dict[str, Any], detail_raw.get("response", {}))
+            reels_data = cast(dict[str, Any], response_part.get("reels", {}))
+            hl_items: list[dict[str, Any]] = []
+            for reel_data_raw in reels_data.values():
+                reel_data = cast(dict[str, Any], reel_data_raw)
+                hl_items = cast(list[dict[str, Any]], reel_data.get("items", []))
+                break  # берём первый (единственный) reel
+            return _hiker_highlight_to_scraped(hl, hl_items)
+        except Exception as e:
+            logger.warning(f"[HikerAPI] Failed to fetch highlight {hl.get('pk')}: {e}")
+            return _hiker_highlight_to_scraped(hl)
+
+    async def _fetch_comments(self, post: ScrapedPost) -> None:
+        """Заполнить post.top_comments; ошибка не влияет на остальные посты."""
+        try:
+            raw_comments_raw: list[Any] = await self._call_media_comments_chunk_v1(post.platform_id)
+            # media_comments_chunk_v1 возвращает [comments_list, max_id, can_support_threading]
+            comment_items: list[Any]
+            if raw_comments_raw and isinstance(raw_comments_raw[0], list):
+                comment_items = cast(list[Any], raw_comments_raw[0])
+            else:
+                comment_items = list(raw_comments_raw) if raw_comments_raw else []
+            comments: list[ScrapedComment] = []
+            for c in comment_items[:self.settings.comments_to_fetch]:
+                if not isinstance(c, dict):
+                    continue
+                c_dict = cast(dict[str, Any], c)
+                text: str = str(c_dict.get("text", "")).strip()
+                comment_user_raw: Any = c_dict.get("user") or {}
+                comment_user = cast(dict[str, Any], comment_user_raw)
+                uname: str = str(comment_user.get("username", ""))
+                if text and uname:
+                    comments.append(ScrapedComment(username=uname, text=text))
+            post.top_comments = comments
+        except Exception as e:
+            logger.warning(f"[HikerAPI] Failed to fetch comments for {post.platform_id}: {e}")
+
+    async def scrape_profile(
+        self, username: str, known_posts: Sequence[ScrapedPost] | None = None,
+    ) -> ScrapedProfile:
+        """Скрапинг Instagram-профиля через HikerAPI.
+
+        known_posts — сохранённые посты блога (инкрементальный re-scrape): медиа
+        догружаются до первого известного поста, комментарии запрашиваются только
+        для новых постов, остальное окно posts_to_fetch дополняется из БД.
+        """
         logger.info(f"[HikerAPI] Scraping profile @{username}")
 
-        # 1. Информация о пользователе (sync → thread)
-        response_raw: dict[str, Any] = await asyncio.to_thread(
-            self._call_user_by_username_v2, username
-        )
+        # 1. Информация о пользователе (свежий ответ pre_filter, если есть)
+        prefetched = self.prefetch.take(username)
+        first_chunk: list[Any] | None = None
+        response_raw: dict[str, Any]
+        if prefetched is not None:
+            response_raw = prefetched.user_response
+            first_chunk = prefetched.medias_chunk
+            stats = self.prefetch.stats
+            logger.info(
+                f"[HikerAPI] @{username}: данные pre_filter, сэкономлено {PREFETCH_CALLS_PER_HIT} запроса "
+                f"(prefetch hits={stats.hits}, hit_rate={stats.hit_rate:.0%}, всего сэкономлено {stats.calls_saved})"
+            )
+        else:
+            response_raw = await self._call_user_by_username_v2(username)
         user: dict[str, Any] = cast(dict[str, Any], response_raw.get("user", {}))
 
         if not user or not user.get("pk"):
@@ -307,79 +492,44 @@ class HikerInstagramScraper:
 
         user_id = str(user["pk"])
 
-        # 2+3. Медиа и хайлайты параллельно (sync → thread)
-        medias_result_raw: list[Any]
+        # 2+3. Медиа и хайлайты параллельно
+        known_ids = {p.platform_id for p in known_posts or ()}
+        raw_medias: list[dict[str, Any]]
         raw_highlights: list[dict[str, Any]]
-        medias_result_raw, raw_highlights = await asyncio.gather(
-            asyncio.to_thread(self._call_user_medias_chunk_v1, user_id),
-            asyncio.to_thread(
-                self._call_user_highlights, user_id, self.settings.highlights_to_fetch
-            ),
-        )
-        # user_medias_chunk_v1 возвращает [medias_list, next_cursor]
-        raw_medias: list[dict[str, Any]] = (
-            cast(list[dict[str, Any]], medias_result_raw[0])
-            if medias_result_raw
-            else []
+        raw_medias, raw_highlights = await asyncio.gather(
+            self._fetch_medias(user_id, known_ids, first_chunk),
+            self._call_user_highlights(user_id, self.settings.highlights_to_fetch),
         )
 
-        highlights: list[ScrapedHighlight] = []
-        for hl in raw_highlights[: self.settings.highlights_to_fetch]:
-            try:
-                hl_pk = str(hl.get("pk", ""))
-                # highlight_by_id_v2 принимает pk без prefix 'highlight:'
-                hl_pk_clean = hl_pk.replace("highlight:", "")
-                detail_raw: dict[str, Any] = await asyncio.to_thread(
-                    self._call_highlight_by_id_v2, hl_pk_clean
-                )
-                # Структура: response.reels.{highlight:pk}.items
-                response_part = cast(dict[str, Any], detail_raw.get("response", {}))
-                reels_data = cast(dict[str, Any], response_part.get("reels", {}))
-                hl_items: list[dict[str, Any]] = []
-                for reel_data_raw in reels_data.values():
-                    reel_data = cast(dict[str, Any], reel_data_raw)
-                    hl_items = cast(list[dict[str, Any]], reel_data.get("items", []))
-                    break  # берём первый (единственный) reel
-                highlights.append(_hiker_highlight_to_scraped(hl, hl_items))
-            except Exception as e:
-                logger.warning(f"[HikerAPI] Failed to fetch highlight {hl.get('pk')}: {e}")
-                highlights.append(_hiker_highlight_to_scraped(hl))
-
         # 4. Маппинг — все медиа в один список (без разделения на посты/рилсы)
         medias_mapped = [_hiker_media_to_post(m) for m in raw_medias]
-
-        # 5. Комментарии для первых N постов с включёнными комментариями
-        posts_for_comments = select_posts_for_comments(medias_mapped, self.settings.posts_with_comments)
-
-        for post in posts_for_comments:
-            try:
-                raw_comments_raw: list[Any] = await asyncio.to_thread(
-                    self._call_media_comments_chunk_v1, post.platform_id
-                )
-                # media_comments_chunk_v1 возвращает [comments_list, max_id, can_support_threading]
-                comment_items: list[Any]
-                if raw_comments_raw and isinstance(raw_comments_raw[0], list):
-                    comment_items = cast(list[Any], raw_comments_raw[0])
-                else:
-                    comment_items = list(raw_comments_raw) if raw_comments_raw else []
-                comments: list[ScrapedComment] = []
-                for c in comment_items[:self.settings.comments_to_fetch]:
-                    if not isinstance(c, dict):
-                        continue
-                    c_dict = cast(dict[str, Any], c)
-                    text: str = str(c_dict.get("text", "")).strip()
-                    comment_user_raw: Any = c_dict.get("user") or {}
-                    comment_user = cast(dict[str, Any], comment_user_raw)
-                    uname: str = str(comment_user.get("username", ""))
-                    if text and uname:
-                        comments.append(ScrapedComment(username=uname, text=text))
-                post.top_comments = comments
-            except Exception as e:
-                logger.warning(f"[HikerAPI] Failed to fetch comments for {post.platform_id}: {e}")
+        if known_posts:
+            medias_mapped = merge_known_posts(medias_mapped, known_posts, self.settings.posts_to_fetch)
+
+        # 5. Детали хайлайтов и комментарии для первых N постов — параллельно,
+        # не больше profile_subrequest_concurrency запросов одновременно.
+        # Комментарии известных постов уже в БД — не запрашиваем повторно.
+        selected = select_posts_for_comments(medias_mapped, self.settings.posts_with_comments)
+        posts_for_comments = [p for p in selected if p.platform_id not in known_ids]
+        limit = asyncio.Semaphore(self.settings.profile_subrequest_concurrency)
+        highlights, _ = await asyncio.gather(
+            asyncio.gather(*(
+                run_limited(limit, self._fetch_highlight(hl))
+                for hl in raw_highlights[: self.settings.highlights_to_fetch]
+            )),
+            asyncio.gather(*(
+                run_limited(limit, self._fetch_comments(post)) for post in posts_for_comments
+            )),
+        )
 
         # Рилсы отдельно для avg_er_reels
         reels_for_er = [p for p in medias_mapped if p.media_type == 2 and p.product_type == "clips"]
 
+        # Не сделанные запросы: комментарии известных постов + ответы pre_filter
+        saved_requests = len(selected) - len(posts_for_comments)
+        if prefetched is not None:
+            saved_requests += PREFETCH_CALLS_PER_HIT
+
         # Вычислить engagement_rate для всех медиа
         follower_count: int = int(user.get("follower_count") or 0)
 
@@ -451,6 +601,7 @@ class HikerInstagramScraper:
             er_trend=None if likes_hidden else calculate_er_trend(medias_mapped, follower_count),
             posts_per_week=calculate_posts_per_week(medias_mapped),
             likes_hidden=likes_hidden,
+            saved_requests=saved_requests,
         )
 
         logger.info(
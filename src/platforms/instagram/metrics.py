@@ -1,6 +1,7 @@
 """Расчёт метрик Instagram-профиля: ER, тренд, частота публикаций."""
 import re
 import statistics
+from collections.abc import Sequence
 from typing import Any
 
 from src.models.blog import ScrapedPost
@@ -128,6 +129,36 @@ def select_posts_for_comments(posts: list[ScrapedPost], limit: int) -> list[Scra
     ][:limit]
 
 
+def merge_known_posts(
+    fetched: list[ScrapedPost],
+    known: Sequence[ScrapedPost],
+    limit: int,
+) -> list[ScrapedPost]:
+    """Инкрементальный re-scrape: свежие медиа + сохранённые посты, которых нет в выдаче.
+
+    Известные посты из выдачи получают top_comments из БД (повторно не запрашиваются).
+    Сохранённые посты новее самого старого из выдачи, но отсутствующие в ней, считаются
+    удалёнными и не добавляются. Выдача сохраняется целиком, хвост добивается до limit.
+    """
+    known_by_id = {p.platform_id: p for p in known}
+    for post in fetched:
+        stored = known_by_id.get(post.platform_id)
+        if stored is not None and not post.top_comments:
+            post.top_comments = stored.top_comments
+
+    fetched_ids = {p.platform_id for p in fetched}
+    oldest = min((p.taken_at for p in fetched), default=None)
+    tail = sorted(
+        (
+            p for p in known
+            if p.platform_id not in fetched_ids and (oldest is None or p.taken_at < oldest)
+        ),
+        key=lambda p: p.taken_at,
+        reverse=True,
+    )
+    return [*fetched, *tail][:max(limit, len(fetched))]
+
+
 def extract_hashtags(text: str) -> list[str]:
     """Извлечь хештеги из caption. Поддерживает кириллицу."""
     return re.findall(r"#[а-яА-ЯёЁa-zA-Z0-9_]+", text)
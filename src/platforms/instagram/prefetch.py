@@ -0,0 +1,91 @@
+"""Передача ответов HikerAPI из pre_filter в последующий full_scrape."""
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+# Ответы, которые pre_filter уже получил и scrape_profile запросил бы повторно:
+# user_by_username_v2 + первый chunk user_medias_chunk_v1
+PREFETCH_CALLS_PER_HIT = 2
+DEFAULT_MAX_ENTRIES = 1000
+
+
+@dataclass
+class PrefetchStats:
+    """Счётчики использования prefetch-кэша."""
+
+    stored: int = 0
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    evicted: int = 0
+
+    @property
+    def calls_saved(self) -> int:
+        """Платных запросов HikerAPI не сделано благодаря pre_filter."""
+        return self.hits * PREFETCH_CALLS_PER_HIT
+
+    @property
+    def hit_rate(self) -> float:
+        """Доля full_scrape, получивших данные из pre_filter."""
+        total = self.hits + self.misses + self.expired
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class PrefetchedProfile:
+    """Сырые ответы pre_filter для одного username."""
+
+    user_response: dict[str, Any]
+    medias_chunk: list[Any]
+    stored_at: float
+
+
+class PrefetchCache:
+    """In-process TTL-кэш ответов pre_filter, ключ — нормализованный username.
+
+    Запись одноразовая: take() извлекает её, повторный скрап идёт в API.
+    Кэш живёт в процессе воркера — с --workers N попадание только если
+    pre_filter и full_scrape блогера обработал один и тот же процесс.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, PrefetchedProfile] = OrderedDict()
+        self.stats = PrefetchStats()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, username: str, user_response: dict[str, Any], medias_chunk: list[Any]) -> None:
+        """Сохранить ответы user_by_username_v2 и user_medias_chunk_v1 (без курсора)."""
+        if self.ttl_seconds <= 0:
+            return
+        key = username.lower()
+        self._entries.pop(key, None)
+        self._entries[key] = PrefetchedProfile(user_response, medias_chunk, self._clock())
+        self.stats.stored += 1
+        # Вытесняем самые старые записи
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evicted += 1
+
+    def take(self, username: str) -> PrefetchedProfile | None:
+        """Извлечь свежие ответы для username; None — промах или запись устарела."""
+        entry = self._entries.pop(username.lower(), None)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if self._clock() - entry.stored_at > self.ttl_seconds:
+            self.stats.expired += 1
+            return None
+        self.stats.hits += 1
+        return entry
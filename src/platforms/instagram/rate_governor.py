@@ -0,0 +1,166 @@
+"""Глобальный rate governor HikerAPI: token bucket + дневной бюджет по endpoint'ам.
+
+Все вызовы SafeHikerClient процесса проходят через один governor:
+- token bucket (rate/сек, burst) сглаживает всплески — вызов ждёт токен, а не падает;
+- HTTP 429 ставит bucket на паузу (Retry-After) для всех корутин сразу;
+- дневной бюджет (в единицах стоимости, по умолчанию 1 = один вызов) по endpoint'у
+  и суммарно ("*"); при исчерпании — HikerBudgetExhaustedError, задача
+  откладывается до сброса бюджета (полночь UTC).
+
+Настройки — на весь деплой: create_rate_governor делит rate и бюджет на
+worker_shard_count, каждый процесс --workers N получает свою долю.
+Потраченный бюджет хранится в памяти процесса и обнуляется при рестарте.
+"""
+import asyncio
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, field
+
+from loguru import logger
+
+from src.config import Settings
+from src.platforms.instagram.exceptions import HikerBudgetExhaustedError
+
+TOTAL_BUDGET_KEY = "*"
+DEFAULT_CALL_COST = 1.0
+DEFAULT_RATE_LIMIT_PAUSE = 5.0  # Пауза после 429 без Retry-After (секунды)
+_SECONDS_PER_DAY = 86400
+
+
+class TokenBucket:
+    """Async token bucket (GCRA): acquire() ждёт свободный токен, в порядке вызова.
+
+    Вместо счётчика токенов хранится абсолютное время _tat, к которому
+    bucket опустеет; слот резервируется сразу, ожидание — один sleep до него.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._clock = clock
+        self._sleep = sleep
+        self._interval = 1 / rate
+        self._tolerance = (self.burst - 1) * self._interval
+        self._tat = clock()
+        self._paused_until = 0.0
+
+    def pause(self, seconds: float) -> None:
+        """Не выдавать токены seconds секунд; после паузы — без накопленного burst."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+        self._tat = max(self._tat, self._paused_until + self._tolerance)
+
+    async def acquire(self) -> float:
+        """Взять токен, при необходимости дождавшись его; возвращает время ожидания."""
+        now = self._clock()
+        tat = max(self._tat, now, self._paused_until)
+        allowed_at = max(now, self._paused_until, tat - self._tolerance)
+        self._tat = tat + self._interval
+        delay = allowed_at - now
+        if delay > 0:
+            await self._sleep(delay)
+            return delay
+        return 0.0
+
+
+@dataclass
+class GovernorStats:
+    """Счётчики rate governor."""
+
+    calls_by_endpoint: Counter[str] = field(default_factory=Counter[str])
+    throttled: int = 0  # Вызовов, ждавших токен
+    wait_seconds: float = 0.0
+    rate_limited: int = 0  # Ответов 429 от HikerAPI
+    budget_rejected: int = 0
+
+
+class HikerRateGovernor:
+    """Rate limit и дневной бюджет вызовов HikerAPI, общий для всех корутин процесса."""
+
+    def __init__(
+        self,
+        rate_per_second: float,
+        burst: int,
+        daily_budget: Mapping[str, float] | None = None,
+        call_costs: Mapping[str, float] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        wall_clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.bucket = TokenBucket(rate_per_second, burst, clock, sleep) if rate_per_second > 0 else None
+        self.daily_budget = dict(daily_budget or {})
+        self.call_costs = dict(call_costs or {})
+        self._wall_clock = wall_clock
+        self._day = self._current_day()
+        self._spent: defaultdict[str, float] = defaultdict(float)
+        self.stats = GovernorStats()
+
+    def _current_day(self) -> int:
+        return int(self._wall_clock() // _SECONDS_PER_DAY)
+
+    def _seconds_until_reset(self) -> float:
+        return (self._day + 1) * _SECONDS_PER_DAY - self._wall_clock()
+
+    def cost_of(self, endpoint: str) -> float:
+        return self.call_costs.get(endpoint, DEFAULT_CALL_COST)
+
+    def remaining_budget(self) -> dict[str, float]:
+        """Остаток дневного бюджета по каждому ограниченному ключу."""
+        self._roll_day()
+        return {key: limit - self._spent[key] for key, limit in self.daily_budget.items()}
+
+    def _roll_day(self) -> None:
+        day = self._current_day()
+        if day != self._day:
+            self._day = day
+            self._spent.clear()
+
+    async def acquire(self, endpoint: str) -> None:
+        """Дождаться слота для вызова endpoint и списать его стоимость из бюджета."""
+        if self.bucket is not None:
+            waited = await self.bucket.acquire()
+            if waited > 0:
+                self.stats.throttled += 1
+                self.stats.wait_seconds += waited
+
+        self._roll_day()
+        cost = self.cost_of(endpoint)
+        for key in (endpoint, TOTAL_BUDGET_KEY):
+            limit = self.daily_budget.get(key)
+            if limit is not None and self._spent[key] + cost > limit:
+                self.stats.budget_rejected += 1
+                raise HikerBudgetExhaustedError(
+                    f"HikerAPI daily budget exhausted: {key} ({self._spent[key]:g}/{limit:g})",
+                    reset_in_seconds=self._seconds_until_reset(),
+                )
+        self._spent[endpoint] += cost
+        self._spent[TOTAL_BUDGET_KEY] += cost
+        self.stats.calls_by_endpoint[endpoint] += 1
+
+    def rate_limited(self, retry_after: float | None = None) -> None:
+        """HikerAPI ответил 429 — приостановить все вызовы процесса."""
+        self.stats.rate_limited += 1
+        pause = retry_after if retry_after is not None and retry_after > 0 else DEFAULT_RATE_LIMIT_PAUSE
+        if self.bucket is not None:
+            self.bucket.pause(pause)
+        logger.warning(f"[hiker_governor] HTTP 429 — пауза {pause:g}с для всех запросов")
+
+
+def create_rate_governor(settings: Settings) -> HikerRateGovernor | None:
+    """Governor процесса из настроек деплоя; None, если не заданы ни rate, ни бюджет."""
+    if settings.hikerapi_rate_per_second <= 0 and not settings.hikerapi_daily_budget:
+        return None
+    # Лимиты в настройках — на все процессы --workers N
+    shards = max(settings.worker_shard_count, 1)
+    return HikerRateGovernor(
+        rate_per_second=settings.hikerapi_rate_per_second / shards,
+        burst=max(settings.hikerapi_burst // shards, 1),
+        daily_budget={key: limit / shards for key, limit in settings.hikerapi_daily_budget.items()},
+        call_costs=settings.hikerapi_call_costs,
+    )
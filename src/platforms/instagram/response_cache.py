@@ -0,0 +1,225 @@
+"""TTL-кэш ответов Instagram API (HikerAPI и instagrapi) по endpoint и аргументам.
+
+Повторные запросы одних и тех же данных в течение минут (pre_filter → full_scrape,
+API-rescrape, retry после ошибки Storage) отдаются из кэша без платного вызова.
+
+- память: LRU с лимитом по суммарному размеру сериализованных ответов;
+- диск (опционально): write-through, pickle + zlib, переживает рестарт процесса.
+
+Кэшируются только endpoint'ы с положительным TTL; ошибки не кэшируются.
+"""
+import asyncio
+import hashlib
+import json
+import pickle
+import struct
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from loguru import logger
+
+# TTL по умолчанию (секунды). Ключ — path HikerAPI или имя функции для safe_request.
+DEFAULT_ENDPOINT_TTLS: dict[str, float] = {
+    # HikerAPI
+    "/v2/user/by/username": 900,
+    "/v1/user/medias/chunk": 900,
+    "/v1/user/clips/chunk": 900,
+    "/v2/user/highlights": 3600,
+    "/v2/highlight/by/id": 3600,
+    "/v1/media/comments/chunk": 3600,
+    # instagrapi (функции-обёртки scraper.py)
+    "_user_info_by_username": 900,
+    "_user_info": 900,
+    "_user_medias": 900,
+    "_user_medias_paginated": 900,
+    "_user_highlights": 3600,
+    "_highlight_info": 3600,
+    "_media_comments": 3600,
+}
+
+_DISK_SUFFIX = ".zz"
+_DISK_HEADER = struct.Struct("<d")  # expires_at (unix time)
+_DISK_SWEEP_EVERY = 256  # Чистка просроченных файлов раз в N записей
+
+
+@dataclass
+class ResponseCacheStats:
+    """Счётчики кэша ответов."""
+
+    hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    bytes_served: int = 0  # Объём ответов, отданных из кэша (не скачанных заново)
+    memory_bytes: int = 0  # Текущий размер памяти
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / total if total else 0.0
+
+
+class _Miss:
+    """Маркер промаха (None — допустимый закэшированный ответ)."""
+
+
+MISS = _Miss()
+
+
+def _cache_key(endpoint: str, args: Any) -> str:
+    """Стабильный ключ: endpoint + канонический JSON аргументов."""
+    encoded = json.dumps(args, sort_keys=True, default=str, ensure_ascii=False)
+    return f"{endpoint}|{encoded}"
+
+
+class ResponseCache:
+    """LRU-кэш ответов с TTL по endpoint'у и опциональным дисковым уровнем."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttls: Mapping[str, float] | None = None,
+        disk_dir: Path | str | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.ttls = {**DEFAULT_ENDPOINT_TTLS, **(ttls or {})}
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._clock = clock
+        # key → (expires_at, pickled value)
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._disk_writes = 0
+        self.stats = ResponseCacheStats()
+
+    def ttl_for(self, endpoint: str) -> float:
+        """TTL endpoint'а; 0 — не кэшируется."""
+        return self.ttls.get(endpoint, 0)
+
+    async def get(self, endpoint: str, args: Any) -> Any:
+        """Ответ из кэша или MISS."""
+        if self.ttl_for(endpoint) <= 0:
+            return MISS
+        key = _cache_key(endpoint, args)
+        now = self._clock()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, blob = entry
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                self.stats.bytes_served += len(blob)
+                return pickle.loads(blob)
+            self._drop(key)
+
+        if self.disk_dir is not None:
+            disk_entry = await asyncio.to_thread(self._read_disk, key, now)
+            if disk_entry is not None:
+                expires_at, blob = disk_entry
+                self._remember(key, expires_at, blob)
+                self.stats.disk_hits += 1
+                self.stats.bytes_served += len(blob)
+                return pickle.loads(blob)
+
+        self.stats.misses += 1
+        return MISS
+
+    async def put(self, endpoint: str, args: Any, value: Any) -> None:
+        """Сохранить ответ endpoint'а (если у него положительный TTL)."""
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"[response_cache] {endpoint}: ответ не сериализуется ({type(e).__name__})")
+            return
+        key = _cache_key(endpoint, args)
+        expires_at = self._clock() + ttl
+        self._remember(key, expires_at, blob)
+        self.stats.stores += 1
+        if self.disk_dir is not None:
+            try:
+                await asyncio.to_thread(self._write_disk, key, expires_at, blob)
+            except OSError as e:
+                logger.warning(f"[response_cache] Ошибка записи на диск: {e}")
+
+    def _remember(self, key: str, expires_at: float, blob: bytes) -> None:
+        """Положить в LRU и вытеснить старые записи сверх max_bytes."""
+        if len(blob) > self.max_bytes:
+            return
+        self._drop(key)
+        self._entries[key] = (expires_at, blob)
+        self.stats.memory_bytes += len(blob)
+        while self.stats.memory_bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.stats.memory_bytes -= len(evicted)
+            self.stats.evictions += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.stats.memory_bytes -= len(entry[1])
+
+    # --- Дисковый уровень (вызывается в треде) ---
+
+    def _disk_path(self, key: str) -> Path:
+        assert self.disk_dir is not None
+        return self.disk_dir / f"{hashlib.sha256(key.encode()).hexdigest()}{_DISK_SUFFIX}"
+
+    def _read_disk(self, key: str, now: float) -> tuple[float, bytes] | None:
+        path = self._disk_path(key)
+        try:
+            raw = path.read_bytes()
+            (expires_at,) = _DISK_HEADER.unpack_from(raw)
+            if expires_at <= now:
+                path.unlink(missing_ok=True)
+                return None
+            return expires_at, zlib.decompress(raw[_DISK_HEADER.size:])
+        except FileNotFoundError:
+            return None
+        except (OSError, struct.error, zlib.error) as e:
+            logger.debug(f"[response_cache] Битый файл кэша {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: str, expires_at: float, blob: bytes) -> None:
+        path = self._disk_path(key)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(_DISK_HEADER.pack(expires_at) + zlib.compress(blob))
+        tmp.replace(path)
+        self._disk_writes += 1
+        if self._disk_writes % _DISK_SWEEP_EVERY == 0:
+            self._sweep_disk()
+
+    def _sweep_disk(self) -> None:
+        """Удалить просроченные файлы дискового уровня."""
+        assert self.disk_dir is not None
+        now = self._clock()
+        for path in self.disk_dir.glob(f"*{_DISK_SUFFIX}"):
+            try:
+                with path.open("rb") as f:
+                    (expires_at,) = _DISK_HEADER.unpack(f.read(_DISK_HEADER.size))
+                if expires_at <= now:
+                    path.unlink(missing_ok=True)
+            except (OSError, struct.error):
+                path.unlink(missing_ok=True)
+
+
+def create_response_cache(
+    max_mb: int,
+    ttls: Mapping[str, float] | None = None,
+    disk_dir: str = "",
+) -> ResponseCache | None:
+    """Кэш из настроек; None, если выключен (max_mb <= 0)."""
+    if max_mb <= 0:
+        return None
+    return ResponseCache(max_bytes=max_mb * 1024 * 1024, ttls=ttls, disk_dir=disk_dir or None)
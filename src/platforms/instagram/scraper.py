@@ -1,4 +1,6 @@
 """Скрапинг Instagram-профилей через instagrapi."""
+import asyncio
+from collections.abc import Sequence
 from typing import Any, cast
 
 from instagrapi.exceptions import UserNotFound
@@ -22,10 +24,13 @@ from src.platforms.instagram.metrics import (
     calculate_posts_per_week,
     extract_hashtags,
     extract_mentions,
+    merge_known_posts,
     select_posts_for_comments,
 )
+from src.utils import run_limited
 
 TOP_HASHTAG_MEDIAS_AMOUNT = 9
+INCREMENTAL_MEDIAS_PAGE = 12  # Размер страницы медиа при инкрементальном re-scrape
 
 
 def media_to_scraped_post(media: Any) -> ScrapedPost:
@@ -159,6 +164,10 @@ def _user_medias(client: Any, user_id: str, amount: int) -> Any:
     return client.user_medias(user_id, amount)
 
 
+def _user_medias_paginated(client: Any, user_id: str, amount: int, end_cursor: str) -> Any:
+    return client.user_medias_paginated(user_id, amount, end_cursor=end_cursor)
+
+
 def _user_highlights(client: Any, user_id: str) -> Any:
     return client.user_highlights(user_id)
 
@@ -186,8 +195,64 @@ class InstagramScraper:
         self.pool = pool
         self.settings = settings
 
-    async def scrape_profile(self, username: str) -> ScrapedProfile:
-        """Полный скрапинг Instagram-профиля через safe_request."""
+    def _subrequest_limit(self) -> int:
+        """Параллельных под-запросов профиля: по одному на доступный аккаунт.
+
+        Аккаунт выполняет один запрос за раз, поэтому больше параллельных
+        запросов, чем доступных аккаунтов, только стоят в очереди acquire().
+        Сверху — profile_subrequest_concurrency.
+        """
+        return max(1, min(self.settings.profile_subrequest_concurrency, self.pool.eligible_count()))
+
+    async def _fetch_medias(self, user_id: str, known_ids: set[str]) -> list[Any]:
+        """Медиа пользователя: posts_to_fetch разом или (инкрементально) страницы до известного поста."""
+        if not known_ids:
+            return await self.pool.safe_request(_user_medias, user_id, self.settings.posts_to_fetch)
+
+        medias: list[Any] = []
+        end_cursor = ""
+        while len(medias) < self.settings.posts_to_fetch:
+            page, end_cursor = await self.pool.safe_request(
+                _user_medias_paginated, user_id, INCREMENTAL_MEDIAS_PAGE, end_cursor,
+            )
+            medias.extend(page)
+            if not page or not end_cursor or any(str(m.pk) in known_ids for m in page):
+                break
+        return medias
+
+    async def _fetch_highlight(self, hl: Any) -> ScrapedHighlight:
+        """Хайлайт с деталями из highlight_info; при ошибке — из краткой версии."""
+        try:
+            full_hl = await self.pool.safe_request(_highlight_info, int(hl.pk))
+            return highlight_to_scraped(full_hl)
+        except Exception as e:
+            logger.warning(f"Failed to fetch highlight {hl.pk}: {e}")
+            return highlight_to_scraped(hl)
+
+    async def _fetch_comments(self, post: ScrapedPost) -> None:
+        """Заполнить post.top_comments; ошибка не влияет на остальные посты."""
+        try:
+            raw_comments = await self.pool.safe_request(
+                _media_comments, post.platform_id, self.settings.comments_to_fetch
+            )
+            comments: list[ScrapedComment] = []
+            for c in raw_comments[:self.settings.comments_to_fetch]:
+                text = (c.text or "").strip()
+                uname = c.user.username if c.user else ""
+                if text and uname:
+                    comments.append(ScrapedComment(username=uname, text=text))
+            post.top_comments = comments
+        except Exception as e:
+            logger.warning(f"Failed to fetch comments for {post.platform_id}: {e}")
+
+    async def scrape_profile(
+        self, username: str, known_posts: Sequence[ScrapedPost] | None = None,
+    ) -> ScrapedProfile:
+        """Скрапинг Instagram-профиля через safe_request.
+
+        known_posts — сохранённые посты блога (инкрементальный re-scrape), см.
+        HikerInstagramScraper.scrape_profile.
+        """
         logger.info(f"Scraping profile @{username}")
 
         # 1. Получить информацию о пользователе
@@ -197,46 +262,33 @@ class InstagramScraper:
         if user.is_private:
             raise PrivateAccountError(f"@{username} is private")
 
-        # 2. Получить медиа
-        medias = await self.pool.safe_request(
-            _user_medias, str(user.pk), self.settings.posts_to_fetch
+        # 2+3. Медиа и хайлайты параллельно
+        known_ids = {p.platform_id for p in known_posts or ()}
+        medias, raw_highlights = await asyncio.gather(
+            self._fetch_medias(str(user.pk), known_ids),
+            self.pool.safe_request(_user_highlights, str(user.pk)),
         )
 
-        # 3. Получить хайлайты
-        raw_highlights = await self.pool.safe_request(
-            _user_highlights, str(user.pk)
-        )
-
-        # Загрузить детали первых N хайлайтов
-        highlights: list[ScrapedHighlight] = []
-        for hl in raw_highlights[: self.settings.highlights_to_fetch]:
-            try:
-                full_hl = await self.pool.safe_request(_highlight_info, int(hl.pk))
-                highlights.append(highlight_to_scraped(full_hl))
-            except Exception as e:
-                logger.warning(f"Failed to fetch highlight {hl.pk}: {e}")
-                highlights.append(highlight_to_scraped(hl))
-
         # 4. Маппинг — все медиа в один список (без разделения на посты/рилсы)
         medias_mapped = [media_to_scraped_post(m) for m in medias]
-
-        # 5. Комментарии для первых N постов с включёнными комментариями
-        posts_for_comments = select_posts_for_comments(medias_mapped, self.settings.posts_with_comments)
-
-        for post in posts_for_comments:
-            try:
-                raw_comments = await self.pool.safe_request(
-                    _media_comments, post.platform_id, self.settings.comments_to_fetch
-                )
-                comments: list[ScrapedComment] = []
-                for c in raw_comments[:self.settings.comments_to_fetch]:
-                    text = (c.text or "").strip()
-                    uname = c.user.username if c.user else ""
-                    if text and uname:
-                        comments.append(ScrapedComment(username=uname, text=text))
-                post.top_comments = comments
-            except Exception as e:
-                logger.warning(f"Failed to fetch comments for {post.platform_id}: {e}")
+        if known_posts:
+            medias_mapped = merge_known_posts(medias_mapped, known_posts, self.settings.posts_to_fetch)
+
+        # 5. Детали первых N хайлайтов и комментарии для первых N постов — параллельно,
+        # каждый под-запрос на своём аккаунте пула (см. _subrequest_limit).
+        # Комментарии известных постов уже в БД — не запрашиваем повторно.
+        selected = select_posts_for_comments(medias_mapped, self.settings.posts_with_comments)
+        posts_for_comments = [p for p in selected if p.platform_id not in known_ids]
+        limit = asyncio.Semaphore(self._subrequest_limit())
+        highlights, _ = await asyncio.gather(
+            asyncio.gather(*(
+                run_limited(limit, self._fetch_highlight(hl))
+                for hl in raw_highlights[: self.settings.highlights_to_fetch]
+            )),
+            asyncio.gather(*(
+                run_limited(limit, self._fetch_comments(post)) for post in posts_for_comments
+            )),
+        )
 
         # Рилсы отдельно для avg_er_reels
         reels_for_er = [p for p in medias_mapped if p.media_type == 2 and p.product_type == "clips"]
@@ -289,6 +341,7 @@ class InstagramScraper:
             avg_er_reels=calculate_er(reels_for_er, user.follower_count),
             er_trend=calculate_er_trend(medias_mapped, user.follower_count),
             posts_per_week=calculate_posts_per_week(medias_mapped),
+            saved_requests=len(selected) - len(posts_for_comments),
         )
 
         logger.info(
@@ -0,0 +1,344 @@
+"""In-memory реализации TaskRepository/BlogRepository — для нагрузочных тестов без Supabase.
+
+Очередь повторяет семантику claim_pending_tasks: порядок claim_rank
+(created_at + priority * шаг aging task_type), next_retry_at, атомарный захват
+(status=running, attempts+1, worker_id, lease).
+Pending задачи лежат в heap по task_type, отложенные (next_retry_at в будущем) —
+в отдельном heap по времени готовности. Устаревшие записи heap (задача уже
+захвачена или перепоставлена) отбрасываются лениво по seq.
+Все методы без await внутри — атомарны в рамках одного event loop.
+"""
+
+import heapq
+import itertools
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable, Mapping
+from datetime import UTC, datetime, timedelta
+from typing import Any, cast
+
+from src.database import get_backoff_seconds, priority_aging_seconds, sanitize_error
+from src.models.db_types import NewTaskRow, TaskRecord
+
+type _ReadyEntry = tuple[float, int, str]  # (claim_rank, seq, task_id)
+type _DelayedEntry = tuple[float, int, str]  # (ready_at, seq, task_id)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, UTC).isoformat()
+
+
+class InMemoryTaskRepository:
+    """Очередь задач в памяти процесса с семантикой scrape_tasks."""
+
+    def __init__(
+        self,
+        clock: Callable[[], float] = time.time,
+        aging_seconds: Mapping[str, float] | None = None,
+    ) -> None:
+        self._clock = clock
+        self._aging_seconds = aging_seconds
+        self.tasks: dict[str, TaskRecord] = {}
+        # claim_rank задачи в секундах epoch — ключ ready heap
+        self._rank: dict[str, float] = {}
+        self._created_ts: dict[str, float] = {}
+        self._ready: dict[str, list[_ReadyEntry]] = {}
+        self._delayed: list[_DelayedEntry] = []
+        self._seq = itertools.count()
+        # Актуальный seq записи heap для задачи — остальные записи устарели
+        self._entry_seq: dict[str, int] = {}
+        self._started_ts: dict[str, float] = {}
+        self._lease_until: dict[str, float] = {}
+        # (blog_id, task_type) → id активной (pending/running) задачи — дедупликация
+        self._active_keys: dict[tuple[str, str], str] = {}
+        self.claim_calls = 0
+        # Ожидание в очереди до первого claim по priority (как task_wait_stats)
+        self.wait_seconds: dict[int, list[float]] = {}
+
+    # --- внутренние операции очереди ---
+
+    def _enqueue(self, task_id: str, ready_at: float | None = None) -> None:
+        task = self.tasks[task_id]
+        seq = next(self._seq)
+        self._entry_seq[task_id] = seq
+        if ready_at is not None and ready_at > self._clock():
+            heapq.heappush(self._delayed, (ready_at, seq, task_id))
+            task["next_retry_at"] = _iso(ready_at)
+        else:
+            heapq.heappush(self._ready.setdefault(task["task_type"], []), (self._rank[task_id], seq, task_id))
+
+    def _aging_step(self, task_type: str) -> float:
+        if self._aging_seconds is not None and task_type in self._aging_seconds:
+            return self._aging_seconds[task_type]
+        return priority_aging_seconds(task_type)
+
+    def _is_current(self, seq: int, task_id: str) -> bool:
+        return self._entry_seq.get(task_id) == seq and self.tasks[task_id]["status"] == "pending"
+
+    def _promote_due(self, now: float) -> None:
+        """Перенести задачи с наступившим next_retry_at в ready heap."""
+        while self._delayed and self._delayed[0][0] <= now:
+            _ready_at, seq, task_id = heapq.heappop(self._delayed)
+            if self._is_current(seq, task_id):
+                self._enqueue(task_id)
+
+    def _peek(self, task_type: str) -> _ReadyEntry | None:
+        heap = self._ready.get(task_type)
+        while heap and not self._is_current(heap[0][1], heap[0][2]):
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    def _release_key(self, task: TaskRecord) -> None:
+        blog_id = task.get("blog_id")
+        if blog_id and self._active_keys.get((blog_id, task["task_type"])) == task["id"]:
+            del self._active_keys[(blog_id, task["task_type"])]
+
+    def _set_pending(self, task: TaskRecord, error: str | None, ready_at: float) -> None:
+        task["status"] = "pending"
+        task["error_message"] = error
+        task["lease_expires_at"] = None
+        self._lease_until.pop(task["id"], None)
+        self._enqueue(task["id"], ready_at)
+
+    def _set_failed(self, task: TaskRecord, error: str) -> None:
+        task["status"] = "failed"
+        task["error_message"] = error
+        task["lease_expires_at"] = None
+        self._lease_until.pop(task["id"], None)
+        self._release_key(task)
+
+    def _start(self, task: TaskRecord, now: float, worker_id: str | None, lease_seconds: int | None) -> None:
+        task["status"] = "running"
+        task["attempts"] += 1
+        task["started_at"] = _iso(now)
+        task["worker_id"] = worker_id
+        self._started_ts[task["id"]] = now
+        if task["attempts"] == 1:
+            waited = now - self._created_ts[task["id"]]
+            self.wait_seconds.setdefault(task["priority"], []).append(waited)
+        self._entry_seq.pop(task["id"], None)
+        if lease_seconds is not None:
+            self._lease_until[task["id"]] = now + lease_seconds
+            task["lease_expires_at"] = _iso(now + lease_seconds)
+        else:
+            self._lease_until.pop(task["id"], None)
+            task["lease_expires_at"] = None
+
+    # --- TaskRepository ---
+
+    async def create_if_not_exists(
+        self,
+        blog_id: str | None,
+        task_type: str,
+        priority: int,
+        payload: dict[str, Any] | None = None,
+    ) -> str | None:
+        """Создать задачу, если для (blog_id, task_type) нет pending/running."""
+        if blog_id and (blog_id, task_type) in self._active_keys:
+            return None
+        task_id = str(uuid.uuid4())
+        now = self._clock()
+        rank = now + priority * self._aging_step(task_type)
+        task = cast(TaskRecord, {
+            "id": task_id,
+            "task_type": task_type,
+            "status": "pending",
+            "blog_id": blog_id,
+            "priority": priority,
+            "attempts": 0,
+            "max_attempts": 3,
+            "error_message": None,
+            "payload": payload or {},
+            "created_at": _iso(now),
+            "started_at": None,
+            "completed_at": None,
+            "next_retry_at": None,
+            "worker_id": None,
+            "lease_expires_at": None,
+            "claim_rank": _iso(rank),
+        })
+        self.tasks[task_id] = task
+        self._rank[task_id] = rank
+        self._created_ts[task_id] = now
+        if blog_id:
+            self._active_keys[(blog_id, task_type)] = task_id
+        self._enqueue(task_id)
+        return task_id
+
+    async def create_many_if_not_exist(self, rows: list[NewTaskRow]) -> list[str | None]:
+        """Пачка create_if_not_exists (дубли внутри пачки тоже отбрасываются)."""
+        return [
+            await self.create_if_not_exists(row["blog_id"], row["task_type"], row["priority"], row.get("payload"))
+            for row in rows
+        ]
+
+    async def claim_pending(
+        self,
+        worker_id: str,
+        limit: int = 10,
+        task_types: list[str] | None = None,
+        lease_seconds: int = 60,
+    ) -> list[TaskRecord]:
+        """Захватить до limit готовых задач по claim_rank."""
+        self.claim_calls += 1
+        if limit <= 0:
+            return []
+        now = self._clock()
+        self._promote_due(now)
+        types = task_types if task_types is not None else list(self._ready)
+        claimed: list[TaskRecord] = []
+        while len(claimed) < limit:
+            best: tuple[_ReadyEntry, str] | None = None
+            for task_type in types:
+                top = self._peek(task_type)
+                if top is not None and (best is None or top < best[0]):
+                    best = (top, task_type)
+            if best is None:
+                break
+            _rank, _seq, task_id = heapq.heappop(self._ready[best[1]])
+            task = self.tasks[task_id]
+            self._start(task, now, worker_id, lease_seconds)
+            claimed.append(cast(TaskRecord, dict(task)))
+        return claimed
+
+    async def mark_running(self, task_id: str) -> bool:
+        """pending → running без lease (ручной запуск, добор в AI-батч)."""
+        task = self.tasks.get(task_id)
+        if task is None or task["status"] != "pending":
+            return False
+        self._start(task, self._clock(), None, None)
+        return True
+
+    async def mark_done(self, task_id: str) -> None:
+        task = self.tasks[task_id]
+        task["status"] = "done"
+        task["completed_at"] = _iso(self._clock())
+        task["lease_expires_at"] = None
+        self._lease_until.pop(task_id, None)
+        self._release_key(task)
+
+    async def mark_failed(
+        self,
+        task_id: str,
+        attempts: int,
+        max_attempts: int,
+        error: str,
+        retry: bool = True,
+    ) -> None:
+        task = self.tasks[task_id]
+        safe_error = sanitize_error(error)
+        if retry and attempts < max_attempts:
+            self._set_pending(task, safe_error, self._clock() + get_backoff_seconds(attempts))
+        else:
+            self._set_failed(task, safe_error)
+
+    async def requeue(self, task_id: str, attempts: int, error: str, delay_seconds: float) -> None:
+        task = self.tasks[task_id]
+        task["attempts"] = max(0, attempts)
+        self._set_pending(task, error, self._clock() + delay_seconds)
+
+    async def fetch_pending(self, limit: int = 10) -> list[TaskRecord]:
+        """Готовые pending задачи без захвата."""
+        self._promote_due(self._clock())
+        entries = [
+            entry
+            for heap in self._ready.values()
+            for entry in heap
+            if self._is_current(entry[1], entry[2])
+        ]
+        return [cast(TaskRecord, dict(self.tasks[e[2]])) for e in heapq.nsmallest(limit, entries)]
+
+    async def renew_leases(self, worker_id: str, task_ids: list[str], lease_seconds: int) -> int:
+        now = self._clock()
+        renewed = 0
+        for task_id in task_ids:
+            task = self.tasks.get(task_id)
+            if (
+                task is None
+                or task["status"] != "running"
+                or task.get("worker_id") != worker_id
+                or task_id not in self._lease_until
+            ):
+                continue
+            self._lease_until[task_id] = now + lease_seconds
+            task["lease_expires_at"] = _iso(now + lease_seconds)
+            renewed += 1
+        return renewed
+
+    def _recover(self, task_ids: list[str], error: str) -> int:
+        recovered = 0
+        now = self._clock()
+        for task_id in task_ids:
+            task = self.tasks[task_id]
+            if task["attempts"] >= task["max_attempts"]:
+                self._set_failed(task, f"{error}, max attempts exhausted")
+            else:
+                self._set_pending(task, f"Recovered: {error}", now)
+                recovered += 1
+        return recovered
+
+    async def recover_stuck(
+        self,
+        max_running_minutes: int = 30,
+        max_ai_running_minutes: int = 120,
+    ) -> int:
+        """Вернуть в pending running задачи без lease, зависшие дольше таймаута."""
+        now = self._clock()
+        stuck = [
+            task_id
+            for task_id, task in self.tasks.items()
+            if task["status"] == "running"
+            and task_id not in self._lease_until
+            and now - self._started_ts.get(task_id, now) > 60 * (
+                max_ai_running_minutes if task["task_type"] == "ai_analysis" else max_running_minutes
+            )
+        ]
+        return self._recover(stuck, "stuck in running")
+
+    async def recover_expired_leases(self) -> int:
+        """Вернуть в pending running задачи с истёкшим lease."""
+        now = self._clock()
+        expired = [
+            task_id for task_id, until in self._lease_until.items()
+            if until < now and self.tasks[task_id]["status"] == "running"
+        ]
+        return self._recover(expired, "lease expired")
+
+    def status_counts(self) -> Counter[str]:
+        """Число задач по статусам (для отчётов бенчмарка)."""
+        return Counter(task["status"] for task in self.tasks.values())
+
+
+class InMemoryBlogRepository:
+    """Блоги, посты и хайлайты в памяти процесса."""
+
+    def __init__(self) -> None:
+        self.blogs: dict[str, dict[str, Any]] = {}
+        self.posts: dict[str, dict[str, dict[str, Any]]] = {}
+        self.highlights: dict[str, dict[str, dict[str, Any]]] = {}
+        self.persons: set[str] = set()
+
+    async def is_fresh(self, blog_id: str, min_days: int) -> bool:
+        scraped_at = self.blogs.get(blog_id, {}).get("scraped_at")
+        if not isinstance(scraped_at, str):
+            return False
+        threshold = datetime.now(UTC) - timedelta(days=min_days)
+        return datetime.fromisoformat(scraped_at) > threshold
+
+    async def upsert(self, blog_id: str, data: dict[str, Any]) -> None:
+        self.blogs.setdefault(blog_id, {"id": blog_id}).update(data)
+
+    async def upsert_posts(self, blog_id: str, posts: list[dict[str, Any]]) -> None:
+        rows = self.posts.setdefault(blog_id, {})
+        for post in posts:
+            rows[str(post.get("platform_id"))] = {**post, "blog_id": blog_id}
+
+    async def upsert_highlights(self, blog_id: str, highlights: list[dict[str, Any]]) -> None:
+        rows = self.highlights.setdefault(blog_id, {})
+        for highlight in highlights:
+            rows[str(highlight.get("platform_id"))] = {**highlight, "blog_id": blog_id}
+
+    async def cleanup_orphan_person(self, person_id: str) -> None:
+        if not any(blog.get("person_id") == person_id for blog in self.blogs.values()):
+            self.persons.discard(person_id)
@@ -2,11 +2,11 @@
 
 from typing import Any, Protocol
 
-from src.models.db_types import TaskRecord
+from src.models.db_types import NewTaskRow, TaskRecord
 
 
-class TaskRepository(Protocol):
-    """Интерфейс для операций с задачами."""
+class TaskStatusRepository(Protocol):
+    """Операции с задачами, которые выполняют обработчики (статусы, follow-up задачи)."""
 
     async def mark_running(self, task_id: str) -> bool: ...
 
@@ -21,6 +21,8 @@ class TaskRepository(Protocol):
         retry: bool = True,
     ) -> None: ...
 
+    async def requeue(self, task_id: str, attempts: int, error: str, delay_seconds: float) -> None: ...
+
     async def create_if_not_exists(
         self,
         blog_id: str | None,
@@ -29,6 +31,37 @@ class TaskRepository(Protocol):
         payload: dict[str, Any] | None = None,
     ) -> str | None: ...
 
+    async def create_many_if_not_exist(self, rows: list[NewTaskRow]) -> list[str | None]: ...
+
+
+class TaskQueue(Protocol):
+    """Операции очереди задач, которые использует цикл воркера (run_worker/process_task)."""
+
+    async def claim_pending(
+        self,
+        worker_id: str,
+        limit: int = 10,
+        task_types: list[str] | None = None,
+        lease_seconds: int = 60,
+    ) -> list[TaskRecord]: ...
+
+    async def renew_leases(self, worker_id: str, task_ids: list[str], lease_seconds: int) -> int: ...
+
+    async def mark_failed(
+        self,
+        task_id: str,
+        attempts: int,
+        max_attempts: int,
+        error: str,
+        retry: bool = True,
+    ) -> None: ...
+
+    async def requeue(self, task_id: str, attempts: int, error: str, delay_seconds: float) -> None: ...
+
+
+class TaskRepository(TaskQueue, TaskStatusRepository, Protocol):
+    """Интерфейс для операций с задачами."""
+
     async def fetch_pending(self, limit: int = 10) -> list[TaskRecord]: ...
 
     async def recover_stuck(
@@ -6,8 +6,14 @@ from typing import Any, cast
 from loguru import logger
 from supabase import AsyncClient
 
-from src.database import _extract_rpc_scalar, get_backoff_seconds, sanitize_error
-from src.models.db_types import TaskRecord
+from src.database import (
+    _claim_order_key,
+    _extract_rpc_scalar,
+    create_tasks_if_not_exist,
+    get_backoff_seconds,
+    sanitize_error,
+)
+from src.models.db_types import NewTaskRow, TaskRecord
 
 
 def _as_dict_row(value: Any) -> dict[str, Any]:
@@ -66,6 +72,15 @@ class SupabaseTaskRepository:
             }).eq("id", task_id).execute()
             logger.error(f"Task {task_id} permanently failed: {safe_error}")
 
+    async def requeue(self, task_id: str, attempts: int, error: str, delay_seconds: float) -> None:
+        """Вернуть задачу в pending без сжигания попытки."""
+        await self._db.table("scrape_tasks").update({
+            "status": "pending",
+            "error_message": error,
+            "next_retry_at": (datetime.now(UTC) + timedelta(seconds=delay_seconds)).isoformat(),
+            "attempts": max(0, attempts),
+        }).eq("id", task_id).execute()
+
     async def create_if_not_exists(
         self,
         blog_id: str | None,
@@ -89,6 +104,10 @@ class SupabaseTaskRepository:
         logger.debug(f"Task {task_type} for blog {blog_id} already exists, skipping")
         return None
 
+    async def create_many_if_not_exist(self, rows: list[NewTaskRow]) -> list[str | None]:
+        """Создать пачку задач одним RPC (create_tasks_if_not_exist)."""
+        return await create_tasks_if_not_exist(self._db, rows)
+
     async def fetch_pending(self, limit: int = 10) -> list[TaskRecord]:
         """Получить pending задачи, готовые к обработке."""
         now = datetime.now(UTC).isoformat()
@@ -96,7 +115,7 @@ class SupabaseTaskRepository:
             .select("*") \
             .eq("status", "pending") \
             .or_(f"next_retry_at.is.null,next_retry_at.lte.{now}") \
-            .order("priority", desc=False) \
+            .order("claim_rank", desc=False) \
             .order("created_at", desc=False) \
             .limit(limit) \
             .execute()
@@ -114,6 +133,47 @@ class SupabaseTaskRepository:
             logger.debug(f"fetch_pending_tasks: {len(rows)} tasks ({types})")
         return rows
 
+    async def claim_pending(
+        self,
+        worker_id: str,
+        limit: int = 10,
+        task_types: list[str] | None = None,
+        lease_seconds: int = 60,
+    ) -> list[TaskRecord]:
+        """Атомарно захватить пачку pending задач (running, attempts + 1, lease)."""
+        if limit <= 0:
+            return []
+        result = await self._db.rpc("claim_pending_tasks", {
+            "p_worker_id": worker_id,
+            "p_limit": limit,
+            "p_task_types": task_types,
+            "p_lease_seconds": lease_seconds,
+        }).execute()
+        raw_data: Any = result.data or []
+        if isinstance(raw_data, dict):
+            raw_data = [raw_data]
+        rows: list[TaskRecord] = []
+        for raw in cast(list[Any], raw_data):
+            row = _as_dict_row(raw)
+            if row:
+                rows.append(cast(TaskRecord, row))
+        rows.sort(key=_claim_order_key)
+        return rows
+
+    async def renew_leases(self, worker_id: str, task_ids: list[str], lease_seconds: int) -> int:
+        """Продлить lease активных задач воркера одним UPDATE."""
+        if not task_ids:
+            return 0
+        lease_expires_at = (datetime.now(UTC) + timedelta(seconds=lease_seconds)).isoformat()
+        result = await self._db.table("scrape_tasks") \
+            .update({"lease_expires_at": lease_expires_at}) \
+            .in_("id", task_ids) \
+            .eq("status", "running") \
+            .eq("worker_id", worker_id) \
+            .not_.is_("lease_expires_at", "null") \
+            .execute()
+        return len(result.data or [])
+
     async def recover_stuck(
         self,
         max_running_minutes: int = 30,
@@ -133,6 +193,7 @@ class SupabaseTaskRepository:
             .eq("status", "running") \
             .in_("task_type", ["full_scrape", "discover", "pre_filter"]) \
             .lt("started_at", threshold) \
+            .is_("lease_expires_at", "null") \
             .execute()
 
         # ai_analysis — длинный таймаут, т.к. completion_window=24h
@@ -0,0 +1,186 @@
+"""Супервизор многопроцессного режима (`python src/main.py --workers N`).
+
+Один event loop упирается в CPU: PIL-ресайз изображений и парсинг батчей
+блокируют API, scheduler и остальные задачи. Супервизор запускает N
+процессов (spawn), у каждого свой event loop и Supabase-клиент:
+- процесс 0 — лидер: API + APScheduler + воркер;
+- процессы 1..N-1 — только воркер.
+Задачи каждый процесс захватывает сам (claim_pending_tasks, SKIP LOCKED).
+Instagram-аккаунты шардируются по процессам (WORKER_SHARD_INDEX/COUNT),
+чтобы один аккаунт не логинился из нескольких процессов.
+
+Упавший процесс перезапускается с экспоненциальной задержкой. SIGTERM/SIGINT
+рассылается всем процессам, после shutdown_grace оставшиеся убиваются.
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from multiprocessing.context import SpawnProcess
+from typing import Any
+
+from loguru import logger
+
+from src.config import Settings, load_settings
+
+# Переменные окружения, через которые процесс узнаёт свой шард
+SHARD_INDEX_ENV = "WORKER_SHARD_INDEX"
+SHARD_COUNT_ENV = "WORKER_SHARD_COUNT"
+
+# Процесс, проживший дольше, считается стабильным — backoff рестартов сбрасывается
+_STABLE_UPTIME = 60.0
+_MAX_RESTART_DELAY = 60.0
+# run_worker ждёт активные задачи 30с — даём запас на flush статусов и сессий
+DEFAULT_SHUTDOWN_GRACE = 45.0
+
+
+def run_worker_process(index: int, count: int) -> None:
+    """Точка входа дочернего процесса: свой event loop, роль по индексу шарда."""
+    os.environ[SHARD_INDEX_ENV] = str(index)
+    os.environ[SHARD_COUNT_ENV] = str(count)
+    from src.main import main
+
+    asyncio.run(main(role="leader" if index == 0 else "worker"))
+
+
+@dataclass
+class _Slot:
+    """Слот процесса: текущий процесс, число падений подряд, время рестарта."""
+
+    index: int
+    process: SpawnProcess | None = None
+    started_at: float = 0.0
+    crashes: int = 0
+    restart_at: float = 0.0
+
+
+class WorkerSupervisor:
+    """Держит N дочерних процессов живыми и координирует их остановку."""
+
+    def __init__(
+        self,
+        n_workers: int,
+        target: Callable[[int, int], None] = run_worker_process,
+        shutdown_grace: float = DEFAULT_SHUTDOWN_GRACE,
+        check_interval: float = 0.5,
+    ) -> None:
+        if n_workers < 1:
+            raise ValueError("n_workers must be >= 1")
+        self.n_workers = n_workers
+        self.target = target
+        self.shutdown_grace = shutdown_grace
+        self.check_interval = check_interval
+        self.restarts = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = [_Slot(index=i) for i in range(n_workers)]
+        self._stop = threading.Event()
+
+    def install_signal_handlers(self) -> None:
+        """SIGTERM/SIGINT → координированная остановка (только из главного потока)."""
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+
+    def _on_signal(self, signum: int, _frame: Any) -> None:
+        logger.info(f"[supervisor] Signal {signal.Signals(signum).name}, stopping workers")
+        self.request_stop()
+
+    def request_stop(self) -> None:
+        """Запросить остановку (потокобезопасно)."""
+        self._stop.set()
+
+    def _start(self, slot: _Slot) -> None:
+        process = self._ctx.Process(
+            target=self.target,
+            args=(slot.index, self.n_workers),
+            name=f"scraper-worker-{slot.index}",
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = time.monotonic()
+        role = "leader" if slot.index == 0 else "worker"
+        logger.info(f"[supervisor] Started {role} #{slot.index} (pid={process.pid})")
+
+    def _check(self, slot: _Slot) -> None:
+        """Обнаружить упавший процесс и перезапустить его после задержки."""
+        now = time.monotonic()
+        process = slot.process
+        if process is not None:
+            if process.is_alive():
+                return
+            process.join()
+            uptime = now - slot.started_at
+            slot.crashes = 1 if uptime >= _STABLE_UPTIME else slot.crashes + 1
+            delay = min(_MAX_RESTART_DELAY, 2.0 ** (slot.crashes - 1))
+            slot.restart_at = now + delay
+            slot.process = None
+            logger.error(
+                f"[supervisor] Worker #{slot.index} exited (code={process.exitcode}, "
+                f"uptime={uptime:.0f}s), restart in {delay:.0f}s"
+            )
+            return
+        if now >= slot.restart_at:
+            self.restarts += 1
+            self._start(slot)
+
+    def run(self) -> int:
+        """Запустить процессы и следить за ними до request_stop(); код выхода супервизора."""
+        logger.info(f"[supervisor] Starting {self.n_workers} worker processes")
+        for slot in self._slots:
+            self._start(slot)
+        while not self._stop.wait(self.check_interval):
+            for slot in self._slots:
+                self._check(slot)
+        self._shutdown()
+        return 0
+
+    def _shutdown(self) -> None:
+        """SIGTERM всем процессам, ожидание shutdown_grace, затем SIGKILL."""
+        alive = [s.process for s in self._slots if s.process is not None and s.process.is_alive()]
+        for process in alive:
+            process.terminate()
+        deadline = time.monotonic() + self.shutdown_grace
+        for process in alive:
+            process.join(max(0.0, deadline - time.monotonic()))
+        for process in alive:
+            if process.is_alive():
+                logger.warning(f"[supervisor] {process.name} did not stop in {self.shutdown_grace:.0f}s, killing")
+                process.kill()
+                process.join()
+        logger.info("[supervisor] All workers stopped")
+
+    @property
+    def pids(self) -> list[int | None]:
+        """PID текущих процессов по слотам (None — ждёт рестарта)."""
+        return [s.process.pid if s.process is not None else None for s in self._slots]
+
+
+def check_account_sharding(n_workers: int, settings: Settings) -> None:
+    """С бэкендом instagrapi каждому процессу нужен хотя бы один аккаунт.
+
+    Иначе шард без аккаунтов захватывает full_scrape/discover/pre_filter и
+    каждая такая задача падает с AllAccountsCooldownError, тратя попытку.
+    """
+    if settings.scraper_backend != "instagrapi":
+        return
+    accounts = len(settings.all_account_credentials)
+    if n_workers > accounts:
+        raise ValueError(
+            f"--workers {n_workers} exceeds Instagram accounts ({accounts}): "
+            f"each worker process needs at least one account"
+        )
+
+
+def run_supervisor(n_workers: int, settings: Settings | None = None) -> int:
+    """Запустить супервизор с обработкой сигналов; возвращает код выхода."""
+    try:
+        check_account_sharding(n_workers, settings or load_settings())
+    except ValueError as e:
+        logger.error(f"[supervisor] {e}")
+        return 2
+    supervisor = WorkerSupervisor(n_workers)
+    supervisor.install_signal_handlers()
+    return supervisor.run()
@@ -0,0 +1,122 @@
+"""Канал пробуждения воркера: in-process notify + Postgres LISTEN/NOTIFY.
+
+Polling-цикл воркера засыпает на worker_poll_interval между выборками задач.
+TaskWakeup позволяет прервать сон, как только появилась новая задача:
+- create_task_if_not_exists в том же процессе вызывает notify_task_created();
+- триггер на scrape_tasks делает pg_notify('scrape_tasks_new', task_type),
+  listen_for_new_tasks слушает канал через прямое соединение с Postgres.
+Polling остаётся fallback'ом — пропущенный сигнал стоит максимум один интервал.
+"""
+import asyncio
+import contextlib
+
+import asyncpg
+from loguru import logger
+
+TASK_CHANNEL = "scrape_tasks_new"
+
+# Пауза между попытками переподключения LISTEN-соединения (секунды)
+LISTEN_RECONNECT_DELAY = 5.0
+
+
+class TaskWakeup:
+    """Сигнал «появилась новая задача» для polling-цикла воркера.
+
+    Несколько notify() между ожиданиями схлопываются в одно пробуждение —
+    воркер всё равно забирает задачи пачкой.
+    """
+
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+        self.notify_count = 0
+        self.wakeup_count = 0
+
+    def notify(self, source: str = "local") -> None:
+        """Разбудить ожидающий цикл (идемпотентно)."""
+        self.notify_count += 1
+        if not self._event.is_set():
+            logger.debug(f"[wakeup] notify from {source}")
+        self._event.set()
+
+    async def wait(self, max_wait: float) -> bool:
+        """Ждать сигнал не дольше max_wait секунд. True — разбудили, False — истёк таймаут."""
+        woken = False
+        with contextlib.suppress(TimeoutError):
+            await asyncio.wait_for(self._event.wait(), timeout=max_wait)
+            woken = True
+        self._event.clear()
+        if woken:
+            self.wakeup_count += 1
+        return woken
+
+
+# Активный wakeup текущего процесса (регистрирует run_worker)
+_active_wakeup: TaskWakeup | None = None
+
+
+def set_active_wakeup(wakeup: TaskWakeup | None) -> None:
+    """Зарегистрировать wakeup работающего в процессе воркера."""
+    global _active_wakeup
+    _active_wakeup = wakeup
+
+
+def notify_task_created(task_type: str) -> None:
+    """Сообщить воркеру этого процесса о новой задаче (no-op без воркера)."""
+    if _active_wakeup is not None:
+        _active_wakeup.notify(f"local:{task_type}")
+
+
+async def listen_for_new_tasks(
+    dsn: str,
+    wakeup: TaskWakeup,
+    shutdown_event: asyncio.Event,
+    channel: str = TASK_CHANNEL,
+) -> None:
+    """LISTEN на канале новых задач; переподключается при обрыве до shutdown.
+
+    Нужен прямой Postgres DSN (session mode): transaction pooler
+    не поддерживает LISTEN.
+    """
+
+    def _on_notify(_conn: object, _pid: int, _channel: str, payload: str) -> None:
+        wakeup.notify(f"pg:{payload}")
+
+    while not shutdown_event.is_set():
+        conn: asyncpg.Connection | None = None
+        lost = asyncio.Event()
+
+        def _on_lost(_conn: object, ev: asyncio.Event = lost) -> None:
+            ev.set()
+
+        try:
+            connected: asyncpg.Connection = await asyncpg.connect(dsn)
+            conn = connected
+            connected.add_termination_listener(_on_lost)
+            await connected.add_listener(channel, _on_notify)
+            logger.info(f"[wakeup] LISTEN {channel} started")
+            # Задачи, созданные пока соединения не было, подберёт ближайший poll
+            wakeup.notify("listen-connected")
+
+            stop_waiter = asyncio.ensure_future(shutdown_event.wait())
+            lost_waiter = asyncio.ensure_future(lost.wait())
+            try:
+                await asyncio.wait({stop_waiter, lost_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                stop_waiter.cancel()
+                lost_waiter.cancel()
+            if lost.is_set() and not shutdown_event.is_set():
+                logger.warning(f"[wakeup] LISTEN {channel}: соединение потеряно, переподключение")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"[wakeup] LISTEN {channel} недоступен: {type(e).__name__}: {e}")
+        finally:
+            if conn is not None and not conn.is_closed():
+                with contextlib.suppress(Exception):
+                    await conn.close()
+
+        if not shutdown_event.is_set():
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(shutdown_event.wait(), timeout=LISTEN_RECONNECT_DELAY)
+
+    logger.debug(f"[wakeup] LISTEN {channel} stopped")
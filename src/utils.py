@@ -1,5 +1,7 @@
 """Общие утилиты для скрапера."""
+import asyncio
 import ipaddress
+from collections.abc import Awaitable
 from urllib.parse import urlparse
 
 # Коды errno для транзиентных сетевых ошибок:
@@ -37,6 +39,12 @@ def is_transient_network_error(exc: BaseException) -> bool:
     return any(marker in err_str for marker in _TRANSIENT_ERROR_MARKERS)
 
 
+async def run_limited[T](semaphore: asyncio.Semaphore, aw: Awaitable[T]) -> T:
+    """Выполнить awaitable под семафором — для gather с ограничением параллелизма."""
+    async with semaphore:
+        return await aw
+
+
 def is_safe_url(url: str) -> bool:
     """Проверить URL на безопасность (не private IP, корректная схема).
 
@@ -24,7 +24,10 @@ from src.ai.taxonomy_matching import (
     normalize_brand,
 )
 from src.config import Settings
+from src.image_storage import llm_variant_urls, parse_image_index
 from src.models.blog import BioLink, ScrapedHighlight, ScrapedPost, ScrapedProfile
+from src.repositories.protocols import TaskStatusRepository
+from src.worker.handlers import HandlerRepos
 from src.worker.scrape_handler import _parse_top_comments
 
 # Маппинг discrete confidence (1-5) → float для БД (DECIMAL(3,2))
@@ -38,18 +41,27 @@ _OPENAI_QUOTA_ERRORS = ("token_limit_exceeded", "billing_hard_limit_reached", "i
 
 
 async def _safe_fail_tasks(
-    db: AsyncClient,
+    tasks: TaskStatusRepository,
     task_infos: list[tuple[str, int, int]],
     error: str,
     *,
     retry: bool = True,
 ) -> None:
-    """Пометить список задач как failed с обработкой ошибок каждой."""
-    for task_id, attempts, max_attempts in task_infos:
-        try:
-            await _h.mark_task_failed(db, task_id, attempts, max_attempts, error, retry=retry)
-        except Exception as fail_err:
-            logger.error(f"[batch_results] Не удалось пометить задачу {task_id} как failed: {fail_err}")
+    """Пометить список задач как failed с обработкой ошибок каждой.
+
+    Вызовы идут конкурентно — при активном TaskStatusWriter весь список
+    уходит одним bulk UPDATE вместо N последовательных.
+    """
+    results = await asyncio.gather(
+        *(
+            tasks.mark_failed(task_id, attempts, max_attempts, error, retry=retry)
+            for task_id, attempts, max_attempts in task_infos
+        ),
+        return_exceptions=True,
+    )
+    for (task_id, _attempts, _max_attempts), result in zip(task_infos, results, strict=True):
+        if isinstance(result, BaseException):
+            logger.error(f"[batch_results] Не удалось пометить задачу {task_id} как failed: {result}")
 
 
 def _has_successful_ai_insights(value: Any) -> bool:
@@ -75,6 +87,7 @@ class BatchContext:
 
     db: AsyncClient
     openai_client: AsyncOpenAI
+    repos: HandlerRepos
     current_by_id: dict[str, dict[str, Any]]
     categories_cache: dict[str, str]
     tags_cache: dict[str, str]
@@ -155,11 +168,16 @@ def _extract_blog_fields(insights: AIInsights) -> dict[str, Any]:
 async def _load_profiles_for_batch(
     db: AsyncClient,
     pending_tasks: list[dict[str, Any]],
+    llm_variants: dict[str, str] | None = None,
+    tasks: TaskStatusRepository | None = None,
 ) -> tuple[list[tuple[str, ScrapedProfile]], list[str], list[str]]:
     """
     Батчевая загрузка профилей для AI-анализа.
     Возвращает (profiles, task_ids, failed_task_ids).
+    llm_variants (если передан) дополняется URL LLM-вариантов изображений
+    профилей по blogs.image_index — для submit_batch.
     """
+    tasks = tasks or HandlerRepos.for_db(db).tasks
     blog_ids = [t["blog_id"] for t in pending_tasks if t.get("blog_id")]
     if not blog_ids:
         return [], [], []
@@ -192,8 +210,7 @@ async def _load_profiles_for_batch(
         blog = blogs_by_id.get(blog_id)
 
         if not blog:
-            await _h.mark_task_failed(
-                db,
+            await tasks.mark_failed(
                 pt["id"],
                 pt.get("attempts", 0),
                 pt.get("max_attempts", 3),
@@ -298,22 +315,78 @@ async def _load_profiles_for_batch(
             highlights=highlights,
         )
 
+        if llm_variants is not None:
+            image_urls = [profile.profile_pic_url, *(post.thumbnail_url for post in medias)]
+            llm_variants.update(llm_variant_urls(
+                (url for url in image_urls if url), parse_image_index(blog.get("image_index")),
+            ))
+
         profiles.append((blog_id, profile))
         task_ids.append(pt["id"])
 
     return profiles, task_ids, failed_task_ids
 
 
+async def _release_claimed_task(db: AsyncClient, task: dict[str, Any], delay_seconds: int) -> None:
+    """Вернуть задачу, захваченную claim_pending_tasks, в pending без сжигания попытки.
+
+    next_retry_at откладывает повторный claim, чтобы воркер не крутил одну
+    и ту же задачу, пока батч не набран; в сбор батча задача попадает по-прежнему.
+    """
+    attempts = int(task.get("attempts", 0) or 0)
+    next_retry = datetime.now(UTC) + timedelta(seconds=delay_seconds)
+    await (
+        db.table("scrape_tasks")
+        .update(
+            {
+                "status": "pending",
+                "attempts": max(0, attempts - 1),  # откат инкремента claim
+                "started_at": None,
+                "next_retry_at": next_retry.isoformat(),
+            }
+        )
+        .eq("id", task["id"])
+        .eq("status", "running")
+        .execute()
+    )
+
+
 async def handle_ai_analysis(
     db: AsyncClient,
     task: dict[str, Any],
     openai_client: AsyncOpenAI,
     settings: Settings,
+    repos: HandlerRepos | None = None,
 ) -> None:
     """
     AI-анализ через Batch API.
     Собирает pending ai_analysis задачи, при достижении порога отправляет батч.
+
+    Задача, уже захваченная claim_pending_tasks (status=running), участвует
+    в батче без повторного claim; если батч не отправлен — возвращается в pending.
+    """
+    repos = repos or HandlerRepos.for_db(db)
+    pre_claimed = task.get("status") == "running"
+    settled_ids = await _submit_pending_batch(db, task, openai_client, settings, pre_claimed, repos)
+    if pre_claimed and task["id"] not in settled_ids:
+        logger.debug(f"[ai_analysis] Batch not submitted, releasing claimed task {task['id']}")
+        await _release_claimed_task(db, task, settings.worker_poll_interval)
+
+
+async def _submit_pending_batch(
+    db: AsyncClient,
+    task: dict[str, Any],
+    openai_client: AsyncOpenAI,
+    settings: Settings,
+    pre_claimed: bool,
+    repos: HandlerRepos,
+) -> set[str]:
+    """Собрать pending ai_analysis задачи и отправить батч при достижении порога.
+
+    Возвращает id задач, статус которых решён здесь (ушли в батч или failed).
     """
+    settled_ids: set[str] = set()
+
     # Считаем pending ai_analysis задачи
     logger.debug("[ai_analysis] Checking pending ai_analysis tasks...")
     pending_result = (
@@ -333,7 +406,7 @@ async def handle_ai_analysis(
 
     if not pending_tasks:
         logger.debug("[ai_analysis] No pending tasks")
-        return
+        return settled_ids
 
     # Проверяем: набрался батч или старейшая задача > 2ч?
     created_dates = [t["created_at"] for t in pending_tasks if t.get("created_at")]
@@ -352,7 +425,7 @@ async def handle_ai_analysis(
             f"[ai_analysis] {len(pending_tasks)} pending, not enough for batch "
             f"(min={settings.batch_min_size}, time_triggered={time_triggered})"
         )
-        return
+        return settled_ids
 
     logger.debug(
         f"[ai_analysis] Submitting batch: {len(pending_tasks)} tasks "
@@ -360,11 +433,15 @@ async def handle_ai_analysis(
     )
 
     # Батчевая загрузка профилей
-    profiles, task_ids, _ = await _load_profiles_for_batch(db, pending_tasks)
+    llm_variants: dict[str, str] = {}
+    profiles, task_ids, failed_task_ids = await _load_profiles_for_batch(
+        db, pending_tasks, llm_variants, repos.tasks
+    )
+    settled_ids.update(failed_task_ids)
 
     if not profiles:
         logger.debug("[ai_analysis] Нет профилей для батча после загрузки (все задачи failed или пустые)")
-        return
+        return settled_ids
 
     # Собираем text_only blog_id из payload задач (retry после refusal)
     text_only_ids: set[str] = set()
@@ -379,27 +456,34 @@ async def handle_ai_analysis(
     try:
         claimed_profiles: list[tuple[str, ScrapedProfile]] = []
         for profile_entry, tid in zip(profiles, task_ids, strict=True):
-            was_claimed = await _h.mark_task_running(db, tid)
-            if not was_claimed:
-                logger.debug(f"AI task {tid} was already claimed by another worker")
-                continue
-            claimed_profiles.append(profile_entry)
             original_task = pending_by_id.get(tid, {})
-            current_attempts = int(original_task.get("attempts", 0)) + 1
+            if pre_claimed and tid == task["id"]:
+                # Уже захвачена claim_pending_tasks, attempts инкрементирован
+                current_attempts = int(original_task.get("attempts", 0))
+            else:
+                was_claimed = await repos.tasks.mark_running(tid)
+                if not was_claimed:
+                    logger.debug(f"AI task {tid} was already claimed by another worker")
+                    continue
+                current_attempts = int(original_task.get("attempts", 0)) + 1
+            claimed_profiles.append(profile_entry)
             max_attempts = int(original_task.get("max_attempts", 3))
             claimed_tasks[tid] = (current_attempts, max_attempts)
 
         if not claimed_profiles:
-            return
+            return settled_ids
 
+        settled_ids.update(claimed_tasks)
         batch_id = await _h.submit_batch(
             openai_client,
             claimed_profiles,
             settings,
             text_only_ids=text_only_ids,
+            llm_variants=llm_variants,
         )
 
-        # Сохраняем batch_id в payload (мержим с существующим, чтобы не затереть text_only)
+        # Сохраняем batch_id в payload (мержим с существующим, чтобы не затереть text_only).
+        # Lease снимаем: дальше задача ждёт батч часами, её стережёт recover_stuck_tasks
         save_failures: list[str] = []
         for tid in claimed_tasks:
             try:
@@ -410,6 +494,7 @@ async def handle_ai_analysis(
                     .update(
                         {
                             "payload": merged_payload,
+                            "lease_expires_at": None,
                         }
                     )
                     .eq("id", tid)
@@ -464,8 +549,7 @@ async def handle_ai_analysis(
             # Обычная ошибка — считаем как attempt, ретраим стандартно
             for tid, (attempts, max_attempts) in claimed_tasks.items():
                 try:
-                    await _h.mark_task_failed(
-                        db=db,
+                    await repos.tasks.mark_failed(
                         task_id=tid,
                         attempts=attempts,
                         max_attempts=max_attempts,
@@ -476,6 +560,8 @@ async def handle_ai_analysis(
                     logger.error(f"Failed to rollback task {tid}: {rollback_err}")
             logger.error(f"Failed to submit AI batch: {e}")
 
+    return settled_ids
+
 
 def _dedup_brands(brands: list[str]) -> list[str]:
     """Нормализация и дедупликация списка брендов."""
@@ -561,6 +647,7 @@ async def _process_blog_result(
 ) -> None:
     """Обработать результат одного блога из батча. Исключения пробрасываются наверх."""
     db = ctx.db
+    repos = ctx.repos
     current_by_id = ctx.current_by_id
     categories_cache = ctx.categories_cache
     tags_cache = ctx.tags_cache
@@ -593,8 +680,7 @@ async def _process_blog_result(
 
         if not already_refused:
             try:
-                await _h.create_task_if_not_exists(
-                    db,
+                await repos.tasks.create_if_not_exists(
                     blog_id,
                     "ai_analysis",
                     priority=2,
@@ -696,6 +782,7 @@ async def handle_batch_results(
     openai_client: AsyncOpenAI,
     batch_id: str,
     task_ids_by_blog: Mapping[str, str | dict[str, Any] | list[str | dict[str, Any]]],
+    repos: HandlerRepos | None = None,
 ) -> None:
     """
     Обработать результаты завершённого батча.
@@ -704,6 +791,7 @@ async def handle_batch_results(
       - {blog_id: {"id": ..., "attempts": ..., "max_attempts": ...}}
       - {blog_id: [task_id | {"id": ..., "attempts": ..., "max_attempts": ...}, ...]}
     """
+    repos = repos or HandlerRepos.for_db(db)
     logger.debug(f"[batch_results] Polling batch {batch_id}...")
     result = await _h.poll_batch(openai_client, batch_id)
     logger.debug(f"[batch_results] Batch {batch_id} status={result['status']}")
@@ -723,7 +811,7 @@ async def handle_batch_results(
                     tid, att, ma = item, 1, 3
                 if tid:
                     all_task_infos.append((tid, att, ma))
-        await _safe_fail_tasks(db, all_task_infos, f"Batch {result['status']}")
+        await _safe_fail_tasks(repos.tasks, all_task_infos, f"Batch {result['status']}")
         return
 
     # poll_batch возвращает results для completed и expired (partial results)
@@ -763,6 +851,7 @@ async def handle_batch_results(
     ctx = BatchContext(
         db=db,
         openai_client=openai_client,
+        repos=repos,
         current_by_id=current_by_id,
         categories_cache=categories_cache,
         tags_cache=tags_cache,
@@ -806,7 +895,7 @@ async def handle_batch_results(
         if insights is None:
             logger.warning(f"[batch_results] Blog {blog_id}: no insights (API error), retry")
             await _safe_fail_tasks(
-                db,
+                repos.tasks,
                 task_infos,
                 "OpenAI API error: no insights in batch result",
             )
@@ -818,7 +907,7 @@ async def handle_batch_results(
             # Ошибка одного блога не должна убивать весь батч
             logger.error(f"[batch_results] Blog {blog_id} failed: {e}")
             await _safe_fail_tasks(
-                db,
+                repos.tasks,
                 task_infos,
                 f"Error processing batch result: {e}",
             )
@@ -826,7 +915,7 @@ async def handle_batch_results(
 
         for task_id, _, _ in task_infos:
             try:
-                await _h.mark_task_done(db, task_id)
+                await repos.tasks.mark_done(task_id)
             except Exception as done_err:
                 logger.error(f"[batch_results] Не удалось пометить задачу {task_id} как done: {done_err}")
 
@@ -839,7 +928,7 @@ async def handle_batch_results(
                     logger.warning(f"Skipping expired retry for {blog_id}: no task_id")
                     continue
                 await _safe_fail_tasks(
-                    db,
+                    repos.tasks,
                     task_infos,
                     "Batch expired without result for this task",
                 )
@@ -6,10 +6,11 @@ from supabase import AsyncClient
 
 import src.worker.handlers as _h
 from src.config import Settings
-from src.models.db_types import TaskRecord
+from src.models.db_types import NewTaskRow, TaskRecord
 from src.platforms.base import BaseScraper
-from src.platforms.instagram.exceptions import AllAccountsCooldownError
-from src.worker.scrape_handler import _normalize_username
+from src.platforms.instagram.exceptions import AllAccountsCooldownError, HikerBudgetExhaustedError
+from src.worker.handlers import HandlerRepos
+from src.worker.scrape_handler import _claim_task, _defer_until_budget_reset, _normalize_username
 
 
 def _as_row_dict(value: Any) -> dict[str, Any]:
@@ -24,39 +25,43 @@ async def handle_discover(
     task: TaskRecord,
     scraper: BaseScraper,
     settings: Settings,
+    repos: HandlerRepos | None = None,
 ) -> None:
     """
     Дискавери новых профилей по хештегу.
     1. discover() по хештегу из payload
     2. Для каждого нового профиля: insert в persons + blogs
-    3. Создать full_scrape задачу
+    3. Создать full_scrape задачи (новые и устаревшие блоги) одним bulk RPC
     """
+    repos = repos or HandlerRepos.for_db(db)
     task_id = task["id"]
     payload = task.get("payload") or {}
     hashtag = payload.get("hashtag", "")
     min_followers = payload.get("min_followers", 1000)
 
     if not hashtag:
-        await _h.mark_task_failed(db, task_id, task["attempts"], task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, task["attempts"], task["max_attempts"],
                                   "No hashtag in payload", retry=False)
         return
 
-    was_claimed = await _h.mark_task_running(db, task_id)
-    if not was_claimed:
+    claimed_attempts = await _claim_task(repos.tasks, task)
+    if claimed_attempts is None:
         _h.logger.debug(f"Task {task_id} was already claimed by another worker")
         return
-    # RPC атомарно инкрементирует attempts, используем актуальное значение
-    current_attempts = task["attempts"] + 1
+    current_attempts = claimed_attempts
 
     try:
         discovered = await scraper.discover(hashtag, min_followers)
+    except HikerBudgetExhaustedError as e:
+        await _defer_until_budget_reset(repos.tasks, task_id, current_attempts, e)
+        return
     except AllAccountsCooldownError as e:
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=True)
         return
     except Exception as e:
         _h.logger.exception(f"[discover] Ошибка discover #{hashtag}")
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=True)
         return
 
@@ -76,6 +81,8 @@ async def handle_discover(
             existing_blogs_by_username[username_raw] = row
 
     new_count = 0
+    # full_scrape задачи создаются одним bulk RPC после обхода всех профилей
+    task_rows: list[NewTaskRow] = []
     for profile in discovered:
         normalized_username = _normalize_username(profile.username)
 
@@ -88,10 +95,10 @@ async def handle_discover(
                 continue
             blog_id = blog_id_raw
             try:
-                if not await _h.is_blog_fresh(db, blog_id, settings.rescrape_days):
-                    await _h.create_task_if_not_exists(db, blog_id, "full_scrape", priority=5)
+                if not await repos.blogs.is_fresh(blog_id, settings.rescrape_days):
+                    task_rows.append({"blog_id": blog_id, "task_type": "full_scrape", "priority": 5})
             except Exception as e:
-                _h.logger.error(f"[discover] Failed to check/create rescrape for @{profile.username}: {e}")
+                _h.logger.error(f"[discover] Failed to check freshness for @{profile.username}: {e}")
             continue
 
         # Создаём person + blog (ошибка одного профиля не ломает весь discover)
@@ -128,16 +135,27 @@ async def handle_discover(
                 raise ValueError("Invalid blogs insert response: missing id")
             blog_id = blog_id_raw
 
-            await _h.create_task_if_not_exists(db, blog_id, "full_scrape", priority=5)
+            task_rows.append({"blog_id": blog_id, "task_type": "full_scrape", "priority": 5})
             # Предотвращаем дубли, если тот же username встречается несколько раз
             # в discovered-списке в рамках одного прогона.
             existing_blogs_by_username[normalized_username] = {"id": blog_id}
             new_count += 1
         except Exception as e:
             if person_id:
-                await _h.cleanup_orphan_person(db, person_id)
+                await repos.blogs.cleanup_orphan_person(person_id)
             _h.logger.error(f"[discover] Failed to create profile @{profile.username}: {e}")
             continue
 
-    await _h.mark_task_done(db, task_id)
-    _h.logger.info(f"Discover #{hashtag}: found {len(discovered)}, new {new_count}")
+    created_count = 0
+    if task_rows:
+        try:
+            created = await repos.tasks.create_many_if_not_exist(task_rows)
+            created_count = sum(1 for tid in created if tid)
+        except Exception as e:
+            # Новые блоги остаются в scrape_status=pending — их подберёт backfill_scrape
+            _h.logger.error(f"[discover] Failed to create {len(task_rows)} full_scrape tasks: {e}")
+
+    await repos.tasks.mark_done(task_id)
+    _h.logger.info(
+        f"Discover #{hashtag}: found {len(discovered)}, new {new_count}, tasks created {created_count}"
+    )
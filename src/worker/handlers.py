@@ -9,9 +9,17 @@
 
 NB: символы с ``_`` (напр. ``_dedup_brands``, ``_normalize_username``) — внутренние,
 экспортируются только для патчинга в тестах.
+
+Здесь же HandlerRepos — статусы задач и запись блогов, которые обработчики
+получают параметром ``repos``. По умолчанию (HandlerRepos.for_db) это функции
+src.database, резолвящиеся через этот модуль при каждом вызове, поэтому патчи
+вида ``src.worker.handlers.mark_task_done`` действуют и через репозиторий.
 """
+from dataclasses import dataclass
+from typing import Any, Self
 
 from loguru import logger  # noqa: F401
+from supabase import AsyncClient
 
 from src.ai.batch_api import poll_batch, submit_batch  # noqa: F401
 from src.ai.embedding import build_embedding_text, generate_embedding  # noqa: F401
@@ -26,17 +34,101 @@ from src.ai.taxonomy_matching import (  # noqa: F401
 from src.database import (  # noqa: F401
     cleanup_orphan_person,
     create_task_if_not_exists,
+    create_tasks_if_not_exist,
     is_blog_fresh,
     mark_task_done,
     mark_task_failed,
     mark_task_running,
+    requeue_task,
     sanitize_error,
     upsert_blog,
     upsert_highlights,
     upsert_posts,
 )
 from src.image_storage import persist_profile_images  # noqa: F401
-from src.worker.ai_handler import (  # noqa: F401
+from src.models.db_types import NewTaskRow
+from src.repositories.protocols import BlogRepository, TaskStatusRepository
+
+
+class _DatabaseTaskStatuses:
+    """TaskStatusRepository поверх функций src.database (через этот модуль)."""
+
+    def __init__(self, db: AsyncClient) -> None:
+        self._db = db
+
+    async def mark_running(self, task_id: str) -> bool:
+        return await mark_task_running(self._db, task_id)
+
+    async def mark_done(self, task_id: str) -> None:
+        await mark_task_done(self._db, task_id)
+
+    async def mark_failed(
+        self,
+        task_id: str,
+        attempts: int,
+        max_attempts: int,
+        error: str,
+        retry: bool = True,
+    ) -> None:
+        await mark_task_failed(self._db, task_id, attempts, max_attempts, error, retry=retry)
+
+    async def requeue(self, task_id: str, attempts: int, error: str, delay_seconds: float) -> None:
+        await requeue_task(self._db, task_id, attempts, error, delay_seconds)
+
+    async def create_if_not_exists(
+        self,
+        blog_id: str | None,
+        task_type: str,
+        priority: int,
+        payload: dict[str, Any] | None = None,
+    ) -> str | None:
+        return await create_task_if_not_exists(self._db, blog_id, task_type, priority=priority, payload=payload)
+
+    async def create_many_if_not_exist(self, rows: list[NewTaskRow]) -> list[str | None]:
+        return await create_tasks_if_not_exist(self._db, rows)
+
+
+class _DatabaseBlogs:
+    """BlogRepository поверх функций src.database (через этот модуль)."""
+
+    def __init__(self, db: AsyncClient) -> None:
+        self._db = db
+
+    async def is_fresh(self, blog_id: str, min_days: int) -> bool:
+        return await is_blog_fresh(self._db, blog_id, min_days)
+
+    async def upsert(self, blog_id: str, data: dict[str, Any]) -> None:
+        await upsert_blog(self._db, blog_id, data)
+
+    async def upsert_posts(self, blog_id: str, posts: list[dict[str, Any]]) -> None:
+        await upsert_posts(self._db, blog_id, posts)
+
+    async def upsert_highlights(self, blog_id: str, highlights: list[dict[str, Any]]) -> None:
+        await upsert_highlights(self._db, blog_id, highlights)
+
+    async def cleanup_orphan_person(self, person_id: str) -> None:
+        await cleanup_orphan_person(self._db, person_id)
+
+
+@dataclass(frozen=True)
+class HandlerRepos:
+    """Репозитории обработчика: статусы задач и запись данных блога.
+
+    Чтения (профили для батча, known posts, pre_filter_log) и служебные
+    записи обработчиков (payload задач, image_index, insights) идут в db напрямую.
+    """
+
+    tasks: TaskStatusRepository
+    blogs: BlogRepository
+
+    @classmethod
+    def for_db(cls, db: AsyncClient) -> Self:
+        """Репозитории поверх Supabase — по умолчанию для обработчиков."""
+        return cls(tasks=_DatabaseTaskStatuses(db), blogs=_DatabaseBlogs(db))
+
+
+# Подмодули импортируют HandlerRepos из этого модуля — импорт после определения
+from src.worker.ai_handler import (  # noqa: E402, F401
     _CONFIDENCE_TO_FLOAT,
     _ENRICHMENT_RETRY_ATTEMPTS,
     _ENRICHMENT_RETRY_DELAY_SECONDS,
@@ -46,12 +138,14 @@ from src.worker.ai_handler import (  # noqa: F401
     _load_profiles_for_batch,
     _process_blog_result,
     _retry_enrichment,
+    _safe_fail_tasks,
     handle_ai_analysis,
     handle_batch_results,
 )
-from src.worker.blog_data import build_blog_data_from_user  # noqa: F401
-from src.worker.discover_handler import handle_discover  # noqa: F401
-from src.worker.scrape_handler import (  # noqa: F401
+from src.worker.blog_data import build_blog_data_from_user  # noqa: E402, F401
+from src.worker.discover_handler import handle_discover  # noqa: E402, F401
+from src.worker.scrape_handler import (  # noqa: E402, F401
+    _claim_task,
     _normalize_username,
     _parse_top_comments,
     handle_full_scrape,
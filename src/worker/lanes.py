@@ -0,0 +1,187 @@
+"""Полосы (lanes) воркера — лимит параллельности и доля fetch-бюджета по task_type.
+
+Общий семафор не защищает дешёвые задачи от медленных: пачка full_scrape
+занимает все слоты, pre_filter и ai_analysis ждут. Lane ограничивает число
+одновременно захваченных задач своего типа, а вес задаёт долю окна выборки,
+чтобы один тип не забирал все 10 мест за poll.
+
+Общий лимит worker_max_concurrent действует поверх lanes. Если сумма лимитов
+lanes больше него, lanes занимают общие слоты по мере освобождения: при
+полной загрузке медленные типы могут держать все слоты, и задачи других
+типов ждут освобождения. Вес при этом делит только оставшиеся свободные
+слоты. Чтобы у каждого типа был гарантированный слот, сумма лимитов
+должна укладываться в worker_max_concurrent (так настроено по умолчанию).
+"""
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from src.config import Settings
+
+# Типы задач, для которых всегда создаётся lane
+LANE_TASK_TYPES = ("full_scrape", "ai_analysis", "discover", "pre_filter")
+
+# Сколько последних ожиданий хранить для перцентилей
+_WAIT_SAMPLES = 200
+
+
+def parse_lane_spec(spec: str) -> dict[str, tuple[int, int]]:
+    """Парсит 'task_type:max_concurrent:weight,...' → {task_type: (max_concurrent, weight)}.
+
+    Вес можно опустить ('pre_filter:2' → weight=1).
+    """
+    result: dict[str, tuple[int, int]] = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        parts = [p.strip() for p in item.split(":")]
+        if len(parts) not in (2, 3) or not parts[0]:
+            raise ValueError(f"Invalid lane spec '{item}': expected task_type:max_concurrent[:weight]")
+        task_type = parts[0]
+        if task_type not in LANE_TASK_TYPES:
+            raise ValueError(f"Invalid lane spec '{item}': unknown task_type '{task_type}'")
+        try:
+            max_concurrent = int(parts[1])
+            weight = int(parts[2]) if len(parts) == 3 else 1
+        except ValueError as e:
+            raise ValueError(f"Invalid lane spec '{item}': {e}") from e
+        if max_concurrent < 1 or weight < 1:
+            raise ValueError(f"Invalid lane spec '{item}': max_concurrent and weight must be >= 1")
+        result[task_type] = (max_concurrent, weight)
+    return result
+
+
+class Lane:
+    """Полоса одного task_type: лимит, занятость и статистика ожидания."""
+
+    def __init__(self, task_type: str, max_concurrent: int, weight: int) -> None:
+        self.task_type = task_type
+        self.max_concurrent = max_concurrent
+        self.weight = weight
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # Захвачено воркером и ещё не завершено (ждёт слот или выполняется)
+        self.in_flight = 0
+        # Выполняется handler
+        self.active = 0
+        self.started = 0
+        self.completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._waits: deque[float] = deque(maxlen=_WAIT_SAMPLES)
+
+    @property
+    def free_slots(self) -> int:
+        """Сколько задач lane может захватить прямо сейчас."""
+        return max(0, self.max_concurrent - self.in_flight)
+
+    def reserve(self) -> float:
+        """Учесть захваченную задачу; возвращает момент claim для подсчёта ожидания."""
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self) -> None:
+        """Задача завершена (успешно или нет) — освободить место в lane."""
+        self.in_flight = max(0, self.in_flight - 1)
+
+    @asynccontextmanager
+    async def slot(self, claimed_at: float | None = None) -> AsyncGenerator[None]:
+        """Занять слот lane на время выполнения handler."""
+        async with self._semaphore:
+            wait = time.monotonic() - claimed_at if claimed_at is not None else 0.0
+            self._waits.append(wait)
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self.started += 1
+            self.active += 1
+            try:
+                yield
+            finally:
+                self.active -= 1
+                self.completed += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        """Статистика lane для /api/scheduler/status."""
+        waits = sorted(self._waits)
+
+        def _pct(p: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 3)
+
+        return {
+            "task_type": self.task_type,
+            "max_concurrent": self.max_concurrent,
+            "weight": self.weight,
+            "in_flight": self.in_flight,
+            "active": self.active,
+            "started": self.started,
+            "completed": self.completed,
+            "wait_avg_seconds": round(self._total_wait / self.started, 3) if self.started else 0.0,
+            "wait_p95_seconds": _pct(0.95),
+            "wait_max_seconds": round(self._max_wait, 3),
+        }
+
+
+class WorkerLanes:
+    """Набор lanes воркера и распределение fetch-бюджета между ними."""
+
+    def __init__(self, lanes: list[Lane]) -> None:
+        self.lanes: dict[str, Lane] = {lane.task_type: lane for lane in lanes}
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "WorkerLanes":
+        """Собрать lanes из settings.worker_lanes.
+
+        Типы, не указанные в spec, получают lane с лимитом worker_max_concurrent
+        и весом 1 — поведение как до введения lanes.
+        """
+        specs = parse_lane_spec(settings.worker_lanes)
+        lanes = [
+            Lane(task_type, *specs.get(task_type, (settings.worker_max_concurrent, 1)))
+            for task_type in LANE_TASK_TYPES
+        ]
+        return cls(lanes)
+
+    def get(self, task_type: str) -> Lane | None:
+        """Lane для task_type (None — тип неизвестен)."""
+        return self.lanes.get(task_type)
+
+    @property
+    def free_slots(self) -> int:
+        """Суммарная свободная ёмкость всех lanes."""
+        return sum(lane.free_slots for lane in self.lanes.values())
+
+    def allocate(self, budget: int) -> dict[str, int]:
+        """Разделить fetch-бюджет между lanes пропорционально весам.
+
+        Доля lane ограничена её свободными слотами; остаток, который lane
+        не может принять, перераспределяется между остальными по весам.
+        """
+        free = {t: lane.free_slots for t, lane in self.lanes.items() if lane.free_slots > 0}
+        allocation = dict.fromkeys(free, 0)
+        remaining = budget
+        while remaining > 0 and free:
+            total_weight = sum(self.lanes[t].weight for t in free)
+            granted = 0
+            # Порядок по убыванию веса — при округлении вниз тяжёлые lanes получают остаток первыми
+            for task_type in sorted(free, key=lambda t: -self.lanes[t].weight):
+                share = max(1, remaining * self.lanes[task_type].weight // total_weight)
+                take = min(share, free[task_type], remaining - granted)
+                if take <= 0:
+                    continue
+                allocation[task_type] += take
+                free[task_type] -= take
+                granted += take
+            remaining -= granted
+            free = {t: n for t, n in free.items() if n > 0}
+            if granted == 0:
+                break
+        return {t: n for t, n in allocation.items() if n > 0}
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Статистика всех lanes."""
+        return [lane.snapshot() for lane in self.lanes.values()]
@@ -2,8 +2,9 @@
 import asyncio
 import contextlib
 import gc
+import os
+import socket
 from collections.abc import Callable, Coroutine
-from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from loguru import logger
@@ -11,17 +12,33 @@ from openai import AsyncOpenAI
 from supabase import AsyncClient
 
 from src.config import Settings
-from src.database import fetch_pending_tasks, mark_task_failed
+from src.database import (
+    TaskStatusWriter,
+    claim_pending_tasks,
+    mark_task_failed,
+    renew_task_leases,
+    requeue_task,
+    set_active_status_writer,
+)
 from src.models.db_types import TaskRecord
 from src.platforms.base import BaseScraper
+from src.repositories.protocols import TaskQueue
+from src.task_wakeup import TaskWakeup, set_active_wakeup
 from src.utils import is_transient_network_error
 from src.worker.handlers import (
+    HandlerRepos,
     handle_ai_analysis,
     handle_discover,
     handle_full_scrape,
 )
+from src.worker.lanes import Lane, WorkerLanes
+from src.worker.polling import PollPacer
 from src.worker.pre_filter_handler import handle_pre_filter
 
+# Максимум задач за один poll — делится между lanes по весам.
+# Если очередь глубже, насыщенный claim сразу запускает следующий poll.
+FETCH_WINDOW = 10
+
 # Тип handler-функции для type safety
 type TaskHandler = Callable[..., Coroutine[Any, Any, None]]
 
@@ -35,6 +52,44 @@ TASK_DEPS: dict[str, list[str]] = {
 }
 
 
+class DatabaseTaskQueue:
+    """TaskQueue поверх функций src.database — очередь run_worker по умолчанию.
+
+    Функции резолвятся из этого модуля при каждом вызове, поэтому
+    mock.patch("src.worker.loop.claim_pending_tasks") и т.п. продолжает работать.
+    """
+
+    def __init__(self, db: AsyncClient) -> None:
+        self._db = db
+
+    async def claim_pending(
+        self,
+        worker_id: str,
+        limit: int = 10,
+        task_types: list[str] | None = None,
+        lease_seconds: int = 60,
+    ) -> list[TaskRecord]:
+        return await claim_pending_tasks(
+            self._db, worker_id, limit=limit, task_types=task_types, lease_seconds=lease_seconds,
+        )
+
+    async def renew_leases(self, worker_id: str, task_ids: list[str], lease_seconds: int) -> int:
+        return await renew_task_leases(self._db, worker_id, task_ids, lease_seconds)
+
+    async def mark_failed(
+        self,
+        task_id: str,
+        attempts: int,
+        max_attempts: int,
+        error: str,
+        retry: bool = True,
+    ) -> None:
+        await mark_task_failed(self._db, task_id, attempts, max_attempts, error, retry=retry)
+
+    async def requeue(self, task_id: str, attempts: int, error: str, delay_seconds: float) -> None:
+        await requeue_task(self._db, task_id, attempts, error, delay_seconds)
+
+
 def _resolve_handler(task_type: str) -> TaskHandler | None:
     """Dispatch table: task_type → handler-функция.
 
@@ -57,13 +112,14 @@ async def _get_scraper(
     attempts: int,
     max_attempts: int,
     task_type: str,
+    task_repo: TaskQueue | None = None,
 ) -> BaseScraper | None:
     """Получить скрапер для instagram; при отсутствии — пометить задачу failed."""
     scraper = scrapers.get("instagram")
     if scraper is None:
         logger.error(f"No scraper for {task_type} task {task_id}")
-        await mark_task_failed(
-            db,
+        queue = task_repo if task_repo is not None else DatabaseTaskQueue(db)
+        await queue.mark_failed(
             task_id,
             attempts,
             max_attempts,
@@ -81,9 +137,21 @@ async def process_task(
     settings: Settings,
     semaphore: asyncio.Semaphore,
     upload_semaphore: asyncio.Semaphore,
+    lane: Lane | None = None,
+    claimed_at: float | None = None,
+    task_repo: TaskQueue | None = None,
+    repos: HandlerRepos | None = None,
 ) -> None:
-    """Обработать одну задачу с учётом семафора."""
-    async with semaphore:
+    """Обработать одну задачу с учётом общего семафора и слота lane.
+
+    Переходы статуса уровня цикла (неизвестный тип, нет скрапера, необработанная
+    или транзиентная ошибка) идут через task_repo (по умолчанию — Supabase),
+    статусы и данные блогов внутри обработчика — через repos.
+    """
+    queue = task_repo if task_repo is not None else DatabaseTaskQueue(db)
+    repos = repos or HandlerRepos.for_db(db)
+    lane_slot = lane.slot(claimed_at) if lane is not None else contextlib.nullcontext()
+    async with semaphore, lane_slot:
         task_type = task["task_type"]
         task_id = task["id"]
         attempts = task.get("attempts", 0)
@@ -96,8 +164,7 @@ async def process_task(
             handler = _resolve_handler(task_type)
             if handler is None:
                 logger.warning(f"Unknown task type: {task_type}")
-                await mark_task_failed(
-                    db,
+                await queue.mark_failed(
                     task_id,
                     attempts,
                     max_attempts,
@@ -113,7 +180,7 @@ async def process_task(
             for dep_key in required_deps:
                 if dep_key == "scraper":
                     scraper = await _get_scraper(
-                        scrapers, db, task_id, attempts, max_attempts, task_type,
+                        scrapers, db, task_id, attempts, max_attempts, task_type, task_repo=queue,
                     )
                     if scraper is None:
                         return
@@ -124,28 +191,28 @@ async def process_task(
             # Вызов handler с нужными аргументами
             if "scraper" in resolved:
                 if task_type == "full_scrape":
-                    await handler(db, task, resolved["scraper"], settings, upload_semaphore)
+                    await handler(db, task, resolved["scraper"], settings, upload_semaphore, repos=repos)
                 else:
-                    await handler(db, task, resolved["scraper"], settings)
+                    await handler(db, task, resolved["scraper"], settings, repos=repos)
             elif "openai" in resolved:
-                await handler(db, task, resolved["openai"], settings)
+                await handler(db, task, resolved["openai"], settings, repos=repos)
             else:
-                await handler(db, task, settings)
+                await handler(db, task, settings, repos=repos)
 
         except Exception as e:
             if is_transient_network_error(e):
                 # Транзиентная ошибка (Errno 11, broken pipe) — не сжигаем попытку.
-                # mark_task_running уже инкрементировал attempts, откатываем назад.
+                # claim_pending_tasks уже инкрементировал attempts (в task —
+                # актуальное значение), mark_task_running — после чтения task.
                 logger.warning(f"Transient error in task {task_id}: {e}")
+                rollback_attempts = attempts - 1 if task.get("status") == "running" else attempts
                 try:
-                    await db.table("scrape_tasks").update({
-                        "status": "pending",
-                        "error_message": f"Transient error (retry shortly): {e}",
-                        "next_retry_at": (
-                            datetime.now(UTC) + timedelta(seconds=30)
-                        ).isoformat(),
-                        "attempts": attempts,  # откат инкремента
-                    }).eq("id", task_id).execute()
+                    await queue.requeue(
+                        task_id,
+                        rollback_attempts,  # откат инкремента
+                        f"Transient error (retry shortly): {e}",
+                        delay_seconds=30,
+                    )
                 except Exception as fail_err:
                     logger.error(
                         f"Failed to reset transient task {task_id}: {fail_err}"
@@ -153,8 +220,8 @@ async def process_task(
             else:
                 logger.exception(f"Unhandled error in task {task_id}")
                 try:
-                    await mark_task_failed(
-                        db, task_id, attempts, max_attempts,
+                    await queue.mark_failed(
+                        task_id, attempts, max_attempts,
                         f"Unhandled error: {e}", retry=True,
                     )
                 except Exception as fail_err:
@@ -169,21 +236,56 @@ async def process_task(
                 gc.collect()
 
 
+def default_worker_id() -> str:
+    """Идентификатор реплики по умолчанию: hostname:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
 async def run_worker(
     db: AsyncClient,
     scrapers: dict[str, BaseScraper],
     settings: Settings,
     shutdown_event: asyncio.Event,
     openai_client: AsyncOpenAI | None = None,
+    wakeup: TaskWakeup | None = None,
+    lanes: WorkerLanes | None = None,
+    task_repo: TaskQueue | None = None,
+    repos: HandlerRepos | None = None,
 ) -> None:
     """
     Основной polling-цикл воркера.
-    Берёт pending задачи, запускает обработку через asyncio.create_task.
+    Атомарно захватывает pending задачи (claim_pending_tasks) отдельно для
+    каждой lane — размер выборки равен свободной ёмкости (не больше FETCH_WINDOW),
+    доли lanes — по весам — и запускает обработку через asyncio.create_task.
+    Паузу между выборками выбирает PollPacer: насыщенный claim — сразу снова,
+    пустая очередь — экспоненциальный backoff до worker_poll_interval.
+    Ожидание прерывает wakeup (новая задача, NOTIFY из Postgres, завершение задачи).
+    Захваченные задачи получают lease; фоновый heartbeat продлевает его.
+    Переходы статусов копит TaskStatusWriter и сбрасывает bulk UPDATE'ами.
     Останавливается по shutdown_event, дожидаясь завершения активных задач.
+    task_repo — очередь задач (по умолчанию Supabase; InMemoryTaskRepository — для нагрузочных тестов).
+    repos — репозитории обработчиков (HandlerRepos.for_db(db) по умолчанию).
     """
+    if wakeup is None:
+        wakeup = TaskWakeup()
+    set_active_wakeup(wakeup)
+
     if openai_client is None:
         openai_client = AsyncOpenAI(api_key=settings.openai_api_key.get_secret_value())
 
+    if lanes is None:
+        lanes = WorkerLanes.from_settings(settings)
+
+    # done/failed от handlers и scheduler job'ов этого процесса пишутся bulk UPDATE'ами
+    status_writer = TaskStatusWriter(
+        db,
+        flush_interval=settings.status_flush_interval_ms / 1000,
+        max_batch=settings.status_flush_max_items,
+    )
+    set_active_status_writer(status_writer)
+
+    queue = task_repo if task_repo is not None else DatabaseTaskQueue(db)
+    worker_id = settings.worker_id or default_worker_id()
     semaphore = asyncio.Semaphore(settings.worker_max_concurrent)
     upload_semaphore = asyncio.Semaphore(settings.upload_max_concurrent)
     active_tasks: set[asyncio.Task[None]] = set()
@@ -191,40 +293,106 @@ async def run_worker(
     processing_ids: set[str] = set()
 
     logger.info(
-        f"Worker started (poll={settings.worker_poll_interval}s, "
+        f"Worker {worker_id} started (poll={settings.worker_poll_interval}s, "
         f"concurrent={settings.worker_max_concurrent})"
     )
 
-    def _on_task_done(task_id: str, t: asyncio.Task[None]) -> None:
+    def _on_task_done(task_id: str, lane: Lane, t: asyncio.Task[None]) -> None:
         active_tasks.discard(t)
         processing_ids.discard(task_id)
+        lane.release()
+        # Освободился слот — можно брать следующую задачу, не дожидаясь poll_interval
+        wakeup.notify("task-done")
+
+    def _free_capacity() -> int:
+        """Свободная ёмкость: минимум из слотов lanes и общего лимита воркера."""
+        global_free = settings.worker_max_concurrent - len(active_tasks)
+        return max(0, min(lanes.free_slots, global_free))
+
+    async def _claim_lane(task_type: str, limit: int) -> list[TaskRecord]:
+        return await queue.claim_pending(
+            worker_id, limit=limit, task_types=[task_type],
+            lease_seconds=settings.task_lease_seconds,
+        )
+
+    async def _heartbeat() -> None:
+        """Продлевать lease всех задач воркера одним UPDATE каждые task_lease_renew_seconds.
+
+        Работает и во время graceful shutdown — пока активные задачи доделываются,
+        их lease не должен истечь.
+        """
+        while True:
+            await asyncio.sleep(settings.task_lease_renew_seconds)
+            if not processing_ids:
+                continue
+            try:
+                renewed = await queue.renew_leases(
+                    worker_id, list(processing_ids), settings.task_lease_seconds,
+                )
+                logger.debug(f"[lease] renewed {renewed}/{len(processing_ids)} leases")
+            except Exception as e:
+                logger.warning(f"[lease] Failed to renew leases: {e}")
 
     consecutive_errors = 0
+    pacer = PollPacer(settings.worker_poll_interval)
+
+    async def _wake_on_shutdown() -> None:
+        await shutdown_event.wait()
+        wakeup.notify("shutdown")
+
+    shutdown_watcher = asyncio.create_task(_wake_on_shutdown())
+    heartbeat = asyncio.create_task(_heartbeat())
 
     while not shutdown_event.is_set():
         try:
-            tasks = await fetch_pending_tasks(db, limit=10)
-            consecutive_errors = 0  # сброс при успешном fetch
-
-            if tasks:
-                logger.info(f"Fetched {len(tasks)} pending tasks")
+            requested_budget = min(_free_capacity(), FETCH_WINDOW)
+            allocation = lanes.allocate(requested_budget)
+            requested = sum(allocation.values())
+            lane_types = list(allocation)
+            results = await asyncio.gather(
+                *(_claim_lane(task_type, allocation[task_type]) for task_type in lane_types),
+                return_exceptions=True,
+            )
 
-            for task in tasks:
-                task_id = task["id"]
-                if task_id in processing_ids:
+            # Задачи успешно захваченных lanes запускаем даже при ошибке соседней lane,
+            # иначе они зависнут в running до recover
+            claim_errors: list[BaseException] = []
+            claimed = 0
+            for task_type, result in zip(lane_types, results, strict=True):
+                if isinstance(result, BaseException):
+                    claim_errors.append(result)
                     continue
-                processing_ids.add(task_id)
+                lane = lanes.lanes[task_type]
+                for task in result:
+                    task_id = task["id"]
+                    if task_id in processing_ids:
+                        continue
+                    processing_ids.add(task_id)
+                    claimed_at = lane.reserve()
 
-                try:
-                    t = asyncio.create_task(
-                        process_task(db, task, scrapers, openai_client, settings, semaphore, upload_semaphore)
+                    try:
+                        t = asyncio.create_task(
+                            process_task(
+                                db, task, scrapers, openai_client, settings, semaphore, upload_semaphore,
+                                lane=lane, claimed_at=claimed_at, task_repo=task_repo, repos=repos,
+                            )
+                        )
+                    except Exception:
+                        processing_ids.discard(task_id)
+                        lane.release()
+                        raise
+
+                    claimed += 1
+                    active_tasks.add(t)
+                    t.add_done_callback(
+                        lambda done_t, tid=task_id, ln=lane: _on_task_done(tid, ln, done_t)
                     )
-                except Exception:
-                    processing_ids.discard(task_id)
-                    raise
 
-                active_tasks.add(t)
-                t.add_done_callback(lambda done_t, tid=task_id: _on_task_done(tid, done_t))
+            if claimed:
+                logger.info(f"Claimed {claimed} pending tasks (allocation={allocation})")
+            if claim_errors:
+                raise claim_errors[0]
+            consecutive_errors = 0  # сброс при успешном claim
 
         except asyncio.CancelledError:
             raise
@@ -237,12 +405,17 @@ async def run_worker(
                 await asyncio.wait_for(shutdown_event.wait(), timeout=backoff)
             continue
 
-        # Ждём poll_interval или shutdown
-        with contextlib.suppress(TimeoutError):
-            await asyncio.wait_for(
-                shutdown_event.wait(),
-                timeout=settings.worker_poll_interval,
-            )
+        decision = pacer.next_delay(requested, claimed, _free_capacity())
+        logger.debug(f"[poll] next in {decision.delay:.1f}s: {decision.reason}")
+        if decision.delay > 0:
+            # Ждём паузу, новую задачу / освободившийся слот (wakeup) или shutdown
+            await wakeup.wait(decision.delay)
+        else:
+            # Дать запущенным задачам стартовать перед следующим claim
+            await asyncio.sleep(0)
+
+    shutdown_watcher.cancel()
+    set_active_wakeup(None)
 
     # Graceful shutdown: дождаться завершения активных задач
     if active_tasks:
@@ -254,4 +427,9 @@ async def run_worker(
                 t.cancel()
             await asyncio.gather(*pending, return_exceptions=True)
 
+    heartbeat.cancel()
+    await asyncio.gather(heartbeat, return_exceptions=True)
+    # Гарантированный flush статусов, накопленных к моменту остановки
+    set_active_status_writer(None)
+    await status_writer.close()
     logger.info("Worker shutting down")
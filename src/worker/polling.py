@@ -0,0 +1,50 @@
+"""Адаптивный темп polling-цикла воркера.
+
+Вместо фиксированного сна worker_poll_interval после каждого claim:
+- claim забрал всё, что просили (очередь не исчерпана) — следующий poll сразу;
+- свободных слотов нет — ждём завершения задачи (wakeup) или poll_interval;
+- очередь пуста — экспоненциальный backoff от MIN_POLL_DELAY до poll_interval;
+- очередь частично выбрана — короткая пауза MIN_POLL_DELAY.
+Любой notify (новая задача, завершение задачи) прерывает ожидание.
+"""
+from dataclasses import dataclass
+
+# Минимальная пауза между poll'ами при пустой/частично выбранной очереди (секунды)
+MIN_POLL_DELAY = 1.0
+
+
+@dataclass(frozen=True)
+class PollDecision:
+    """Решение о следующем poll: сколько ждать и почему."""
+
+    delay: float
+    reason: str
+
+
+class PollPacer:
+    """Выбирает паузу до следующего poll по результату claim и свободной ёмкости."""
+
+    def __init__(self, max_interval: float, min_interval: float = MIN_POLL_DELAY) -> None:
+        self.max_interval = max_interval
+        self.min_interval = min(min_interval, max_interval)
+        self._empty_streak = 0
+
+    def next_delay(self, requested: int, claimed: int, free_slots: int) -> PollDecision:
+        """Пауза после poll: requested — запрошено у БД, claimed — получено, free_slots — ёмкость после claim."""
+        if requested > 0 and claimed >= requested:
+            self._empty_streak = 0
+            if free_slots > 0:
+                return PollDecision(0.0, f"saturated ({claimed}/{requested}), free={free_slots}")
+            return PollDecision(self.max_interval, f"saturated ({claimed}/{requested}), no free slots")
+
+        if requested == 0:
+            # Все lanes заняты — проснёмся по завершению задачи
+            return PollDecision(self.max_interval, "no free slots")
+
+        if claimed > 0:
+            self._empty_streak = 0
+            return PollDecision(self.min_interval, f"partial ({claimed}/{requested})")
+
+        delay = min(self.max_interval, self.min_interval * (2 ** self._empty_streak))
+        self._empty_streak += 1
+        return PollDecision(delay, f"empty (streak={self._empty_streak})")
@@ -15,10 +15,12 @@ from src.models.db_types import TaskRecord
 from src.platforms.instagram.exceptions import (
     AllAccountsCooldownError,
     HikerAPIError,
+    HikerBudgetExhaustedError,
     InsufficientBalanceError,
     PrivateAccountError,
 )
-from src.worker.scrape_handler import _normalize_username
+from src.worker.handlers import HandlerRepos
+from src.worker.scrape_handler import _claim_task, _defer_until_budget_reset, _normalize_username
 
 
 def _extract_inserted_id(data: Any) -> str | None:
@@ -106,6 +108,7 @@ async def handle_pre_filter(
     task: TaskRecord,
     scraper: Any,
     settings: Settings,
+    repos: HandlerRepos | None = None,
 ) -> None:
     """
     Быстрая проверка профиля по 3 критериям:
@@ -115,13 +118,14 @@ async def handle_pre_filter(
 
     Прошёл фильтр → создать person + blog, scrape_status="pending".
     """
+    repos = repos or HandlerRepos.for_db(db)
     task_id = task["id"]
     payload = task.get("payload") or {}
     username = payload.get("username", "")
 
     if not username:
-        await _h.mark_task_failed(
-            db, task_id, task["attempts"], task["max_attempts"], "No username in payload", retry=False
+        await repos.tasks.mark_failed(
+            task_id, task["attempts"], task["max_attempts"], "No username in payload", retry=False
         )
         return
 
@@ -133,19 +137,18 @@ async def handle_pre_filter(
     ).eq("username", username).execute()
     if existing_blog.data:
         logger.info(f"[pre_filter] @{username}: блог уже существует, пропускаем")
-        await _h.mark_task_done(db, task_id)
+        await repos.tasks.mark_done(task_id)
         return
 
-    was_claimed = await _h.mark_task_running(db, task_id)
-    if not was_claimed:
+    claimed_attempts = await _claim_task(repos.tasks, task)
+    if claimed_attempts is None:
         logger.debug(f"Task {task_id} was already claimed by another worker")
         return
-    # RPC атомарно инкрементирует attempts, используем актуальное значение
-    current_attempts = task["attempts"] + 1
+    current_attempts = claimed_attempts
 
     # 1. Получить информацию о пользователе
     try:
-        user_info = await asyncio.to_thread(scraper.cl.user_by_username_v2, username)
+        user_info = await scraper.cl.user_by_username_v2(username)
     except UserNotFound:
         logger.info(f"[pre_filter] @{username}: пользователь не найден")
         await _mark_filtered_out(db, task_id, "not_found", username=username)
@@ -156,8 +159,8 @@ async def handle_pre_filter(
         return
     except InsufficientBalanceError as e:
         logger.error(f"[pre_filter] HikerAPI баланс исчерпан: {e}")
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], "HikerAPI: insufficient balance", retry=False
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], "HikerAPI: insufficient balance", retry=False
         )
         return
     except HikerAPIError as e:
@@ -167,25 +170,28 @@ async def handle_pre_filter(
             await _mark_filtered_out(db, task_id, "not_found", username=username)
             return
         retry = e.status_code in (429, 500, 502, 503, 504)
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=retry
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=retry
         )
         return
+    except HikerBudgetExhaustedError as e:
+        await _defer_until_budget_reset(repos.tasks, task_id, current_attempts, e)
+        return
     except AllAccountsCooldownError as e:
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
     except httpx.TimeoutException as e:
         logger.warning(f"[pre_filter] @{username}: таймаут при получении user_info ({type(e).__name__})")
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
     except Exception as e:
         logger.exception(f"[pre_filter] @{username}: неожиданная ошибка при получении user_info")
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
 
@@ -209,13 +215,13 @@ async def handle_pre_filter(
     # 2. Получить последние посты и рилсы параллельно
     try:
         posts_result, clips_result = await asyncio.gather(
-            asyncio.to_thread(scraper.cl.user_medias_chunk_v1, user_id),
-            asyncio.to_thread(scraper.cl.user_clips_chunk_v1, user_id),
+            scraper.cl.user_medias_chunk_v1(user_id),
+            scraper.cl.user_clips_chunk_v1(user_id),
         )
     except InsufficientBalanceError as e:
         logger.error(f"[pre_filter] HikerAPI баланс исчерпан: {e}")
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], "HikerAPI: insufficient balance", retry=False
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], "HikerAPI: insufficient balance", retry=False
         )
         return
     except HikerAPIError as e:
@@ -232,25 +238,28 @@ async def handle_pre_filter(
             )
             return
         retry = e.status_code in (429, 500, 502, 503, 504)
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=retry
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=retry
         )
         return
+    except HikerBudgetExhaustedError as e:
+        await _defer_until_budget_reset(repos.tasks, task_id, current_attempts, e)
+        return
     except AllAccountsCooldownError as e:
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
     except httpx.TimeoutException as e:
         logger.warning(f"[pre_filter] @{username}: таймаут при загрузке постов/рилсов ({type(e).__name__})")
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
     except Exception as e:
         logger.exception(f"[pre_filter] @{username}: неожиданная ошибка при загрузке постов/рилсов")
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
 
@@ -369,11 +378,14 @@ async def handle_pre_filter(
             raise ValueError("Invalid blogs insert response: missing id")
     except Exception as e:
         if person_id:
-            await _h.cleanup_orphan_person(db, person_id)
-        await _h.mark_task_failed(
-            db, task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
+            await repos.blogs.cleanup_orphan_person(person_id)
+        await repos.tasks.mark_failed(
+            task_id, current_attempts, task["max_attempts"], _h.sanitize_error(str(e)), retry=True
         )
         return
 
-    await _h.mark_task_done(db, task_id)
+    # Ответы уже оплачены — full_scrape этого блога возьмёт их из prefetch-кэша скрапера
+    scraper.prefetch.put(username, user_info, posts_result)
+
+    await repos.tasks.mark_done(task_id)
     logger.info(f"[pre_filter] @{username}: прошёл фильтр, создан blog={blog_id}")
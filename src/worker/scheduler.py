@@ -23,11 +23,13 @@ from src.ai.taxonomy_matching import (
 from src.config import Settings
 from src.database import (
     count_running_ai_tasks,
-    create_task_if_not_exists,
+    create_tasks_if_not_exist,
     mark_task_failed,
+    recover_expired_leases,
     recover_stuck_tasks,
 )
 from src.image_storage import delete_blog_images
+from src.models.db_types import NewTaskRow, TaskType
 from src.worker.handlers import handle_batch_results
 
 # Время последнего запуска каждой cron/interval-задачи (UTC ISO)
@@ -78,6 +80,27 @@ async def has_recent_balance_errors(
     return bool(result.count and result.count > 0)
 
 
+async def _create_blog_tasks(
+    db: AsyncClient,
+    blog_ids: list[str],
+    task_type: TaskType,
+    priority: int,
+    payload: dict[str, Any] | None = None,
+) -> int:
+    """Создать задачи task_type для блогов одним bulk RPC; возвращает число созданных."""
+    if not blog_ids:
+        return 0
+    rows: list[NewTaskRow] = [
+        {"blog_id": blog_id, "task_type": task_type, "priority": priority}
+        for blog_id in blog_ids
+    ]
+    if payload:
+        for row in rows:
+            row["payload"] = payload
+    created = await create_tasks_if_not_exist(db, rows)
+    return sum(1 for task_id in created if task_id)
+
+
 async def backfill_scrape(db: AsyncClient, settings: Settings) -> None:
     """Создать full_scrape задачи для pending блогов без скрапинга."""
     record_job_run("backfill_scrape")
@@ -94,6 +117,10 @@ async def backfill_scrape(db: AsyncClient, settings: Settings) -> None:
     if await has_recent_balance_errors(db, "insufficient balance"):
         logger.warning("[backfill_scrape] Пропуск: недавние ошибки баланса HikerAPI")
         return
+    # Дневной бюджет governor'а исчерпан — новые задачи только копили бы retry
+    if await has_recent_balance_errors(db, "daily budget exhausted"):
+        logger.warning("[backfill_scrape] Пропуск: дневной бюджет HikerAPI исчерпан")
+        return
 
     result = await db.rpc(
         "backfill_pending_blogs",
@@ -105,14 +132,11 @@ async def backfill_scrape(db: AsyncClient, settings: Settings) -> None:
         logger.debug("[backfill_scrape] Нет pending блогов для backfill")
         return
 
-    created = 0
-    for blog_id in blog_ids:
-        try:
-            task_id = await create_task_if_not_exists(db, blog_id, "full_scrape", priority=6)
-            if task_id:
-                created += 1
-        except Exception as e:
-            logger.error(f"[backfill_scrape] Ошибка создания задачи для blog {blog_id}: {e}")
+    try:
+        created = await _create_blog_tasks(db, blog_ids, "full_scrape", priority=6)
+    except Exception as e:
+        logger.error(f"[backfill_scrape] Ошибка bulk-создания задач для {len(blog_ids)} блогов: {e}")
+        return
 
     logger.info(f"[backfill_scrape] Создано {created} задач из {len(blog_ids)} pending блогов")
 
@@ -148,14 +172,11 @@ async def backfill_ai_analysis(db: AsyncClient, settings: Settings) -> None:
         logger.debug("[backfill_ai] Нет блогов без AI insights для backfill")
         return
 
-    created = 0
-    for blog_id in blog_ids:
-        try:
-            task_id = await create_task_if_not_exists(db, blog_id, "ai_analysis", priority=2)
-            if task_id:
-                created += 1
-        except Exception as e:
-            logger.error(f"[backfill_ai] Ошибка создания задачи для blog {blog_id}: {e}")
+    try:
+        created = await _create_blog_tasks(db, blog_ids, "ai_analysis", priority=2)
+    except Exception as e:
+        logger.error(f"[backfill_ai] Ошибка bulk-создания задач для {len(blog_ids)} блогов: {e}")
+        return
 
     logger.info(f"[backfill_ai] Создано {created} задач из {len(blog_ids)} блогов без insights")
 
@@ -171,19 +192,14 @@ async def schedule_updates(db: AsyncClient, settings: Settings) -> None:
         "followers_count", desc=True
     ).limit(100).execute()
 
-    created = 0
-    for blog in _as_rows(result.data):
-        blog_id = blog.get("id")
-        if not isinstance(blog_id, str):
-            continue
-        try:
-            task_id = await create_task_if_not_exists(
-                db, blog_id, "full_scrape", priority=8
-            )
-            if task_id:
-                created += 1
-        except Exception as e:
-            logger.error(f"[schedule_updates] Ошибка создания re-scrape для blog {blog_id}: {e}")
+    blog_ids = [blog_id for blog in _as_rows(result.data) if isinstance(blog_id := blog.get("id"), str)]
+    # Инкрементально: скрапер догружает только посты новее сохранённых
+    payload = {"incremental": True} if settings.incremental_rescrape else None
+    try:
+        created = await _create_blog_tasks(db, blog_ids, "full_scrape", priority=8, payload=payload)
+    except Exception as e:
+        logger.error(f"[schedule_updates] Ошибка bulk-создания re-scrape для {len(blog_ids)} блогов: {e}")
+        return
 
     logger.info(f"Scheduled {created} blog re-scrape tasks")
 
@@ -465,6 +481,15 @@ async def recover_tasks(db: AsyncClient) -> None:
         logger.exception(f"[recover_tasks] Ошибка восстановления зависших задач: {e}")
 
 
+async def recover_leases(db: AsyncClient) -> None:
+    """Вернуть в pending running задачи с истёкшим lease (воркер перестал продлевать)."""
+    record_job_run("recover_leases")
+    try:
+        await recover_expired_leases(db)
+    except Exception as e:
+        logger.exception(f"[recover_leases] Ошибка восстановления задач с истёкшим lease: {e}")
+
+
 def create_scheduler(
     db: AsyncClient,
     settings: Settings,
@@ -547,6 +572,15 @@ def create_scheduler(
         id="recover_tasks",
     )
 
+    # Каждую минуту — задачи упавших воркеров (lease не продлевается)
+    sched.add_job(
+        recover_leases,
+        "interval",
+        minutes=1,
+        kwargs={"db": db},
+        id="recover_leases",
+    )
+
     # Еженедельно в воскресенье 4:00 — очистка старых изображений
     sched.add_job(
         cleanup_old_images,
@@ -7,19 +7,29 @@ from typing import Any, cast
 import httpx
 from instagrapi.exceptions import UserNotFound
 from loguru import logger
+from pydantic import ValidationError
 from supabase import AsyncClient
 
 import src.worker.handlers as _h
 from src.config import Settings
-from src.models.blog import ScrapedComment, ScrapedProfile
+from src.image_storage import UploadStats, parse_image_index
+from src.models.blog import ScrapedComment, ScrapedPost, ScrapedProfile
 from src.models.db_types import TaskRecord
 from src.platforms.base import BaseScraper
 from src.platforms.instagram.exceptions import (
     AllAccountsCooldownError,
     HikerAPIError,
+    HikerBudgetExhaustedError,
     InsufficientBalanceError,
     PrivateAccountError,
 )
+from src.repositories.protocols import TaskStatusRepository
+from src.worker.handlers import HandlerRepos
+
+# Колонки blog_posts, совпадающие с полями ScrapedPost (posts_data — их model_dump)
+_KNOWN_POST_COLUMNS = ", ".join(ScrapedPost.model_fields)
+# Поля известного поста, при изменении которых он upsert'ится повторно
+_REFRESH_FIELDS = ("like_count", "comment_count", "play_count", "view_count", "thumbnail_url")
 
 
 def _as_row_dict(value: Any) -> dict[str, Any]:
@@ -34,6 +44,28 @@ def _normalize_username(username: str) -> str:
     return username.strip().lstrip("@").lower()
 
 
+async def _claim_task(tasks: TaskStatusRepository, task: TaskRecord) -> int | None:
+    """Захватить задачу; вернуть актуальный attempts или None, если её взял другой воркер.
+
+    Задачи из claim_pending_tasks приходят уже в статусе running
+    с инкрементированным attempts — повторный mark_task_running не нужен.
+    """
+    if task.get("status") == "running":
+        return task["attempts"]
+    if not await tasks.mark_running(task["id"]):
+        return None
+    # RPC атомарно инкрементирует attempts
+    return task["attempts"] + 1
+
+
+async def _defer_until_budget_reset(
+    tasks: TaskStatusRepository, task_id: str, attempts: int, error: HikerBudgetExhaustedError,
+) -> None:
+    """Отложить задачу до сброса дневного бюджета HikerAPI, не сжигая попытку."""
+    logger.warning(f"Task {task_id}: {error}, повтор через {error.reset_in_seconds:.0f}с")
+    await tasks.requeue(task_id, attempts - 1, str(error), error.reset_in_seconds)
+
+
 def _build_blog_data(
     profile: ScrapedProfile,
     avg_reels_views: int | None,
@@ -99,50 +131,110 @@ def _parse_top_comments(raw_value: Any) -> list[ScrapedComment]:
     return comments
 
 
+def _post_from_row(row: dict[str, Any]) -> ScrapedPost | None:
+    """Строка blog_posts → ScrapedPost; None, если строка неполная."""
+    fields = {k: v for k in ScrapedPost.model_fields if (v := row.get(k)) is not None}
+    fields["top_comments"] = _parse_top_comments(row.get("top_comments"))
+    try:
+        return ScrapedPost.model_validate(fields)
+    except ValidationError:
+        return None
+
+
+async def _load_known_posts(db: AsyncClient, blog_id: str, limit: int) -> dict[str, dict[str, Any]]:
+    """Сохранённые посты блога (новые первыми): platform_id → строка blog_posts."""
+    result = await db.table("blog_posts").select(_KNOWN_POST_COLUMNS).eq(
+        "blog_id", blog_id
+    ).order("taken_at", desc=True).limit(limit).execute()
+    rows: dict[str, dict[str, Any]] = {}
+    for raw in result.data or []:
+        row = _as_row_dict(raw)
+        platform_id = row.get("platform_id")
+        if isinstance(platform_id, str) and platform_id:
+            rows[platform_id] = row
+    return rows
+
+
+def _post_changed(post: dict[str, Any], stored: dict[str, Any] | None) -> bool:
+    """Новый пост или у известного изменились счётчики/изображение."""
+    if stored is None:
+        return True
+    return any(post.get(field) != stored.get(field) for field in _REFRESH_FIELDS)
+
+
+def _log_incremental_savings(
+    username: str,
+    profile: ScrapedProfile,
+    stored_rows: dict[str, dict[str, Any]],
+    reused_images: int,
+    upload_stats: UploadStats,
+    upserted: int,
+) -> None:
+    """Отчёт инкрементального re-scrape: что не пришлось запрашивать и загружать."""
+    new_posts = sum(1 for p in profile.medias if p.platform_id not in stored_rows)
+    # Объём переиспользованных изображений оцениваем по среднему размеру загруженных
+    saved_bytes = (
+        reused_images * upload_stats.bytes // upload_stats.files if upload_stats.files else 0
+    )
+    logger.info(
+        f"[full_scrape] @{username}: incremental — новых постов {new_posts}/{len(profile.medias)}, "
+        f"API-запросов сэкономлено {profile.saved_requests}, "
+        f"изображений переиспользовано {reused_images} (~{saved_bytes} байт), "
+        f"загружено {upload_stats.files} ({upload_stats.bytes} байт), "
+        f"без изменений по индексу {upload_stats.skipped}, "
+        f"upsert {upserted}/{len(profile.medias)} постов"
+    )
+
+
 async def handle_full_scrape(
     db: AsyncClient,
     task: TaskRecord,
     scraper: BaseScraper,
     settings: Settings,
     upload_semaphore: asyncio.Semaphore | None = None,
+    repos: HandlerRepos | None = None,
 ) -> None:
     """
     Полный скрапинг профиля.
-    1. mark_task_running
+    1. claim задачи (если не захвачена claim_pending_tasks)
     2. scrape_status = 'scraping'
     3. scrape_profile(username)
     4. upsert_blog, upsert_posts, upsert_highlights
     5. Создать задачу ai_analysis
     6. mark_task_done
+
+    payload {"incremental": true} (re-scrape из schedule_updates): скрапер получает
+    сохранённые посты и догружает только новые медиа; в Storage уходят изображения
+    только новых постов, upsert — только новых и изменившихся.
     """
+    repos = repos or HandlerRepos.for_db(db)
     task_id = task["id"]
     blog_id = task["blog_id"]
     if not blog_id:
-        await _h.mark_task_failed(db, task_id, task["attempts"], task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, task["attempts"], task["max_attempts"],
                                   "No blog_id in full_scrape task", retry=False)
         return
     logger.debug(f"[full_scrape] Starting task={task_id}, blog={blog_id}")
 
-    was_claimed = await _h.mark_task_running(db, task_id)
-    if not was_claimed:
+    claimed_attempts = await _claim_task(repos.tasks, task)
+    if claimed_attempts is None:
         logger.debug(f"Task {task_id} was already claimed by another worker")
         return
-    # RPC атомарно инкрементирует attempts, используем актуальное значение
-    current_attempts = task["attempts"] + 1
+    current_attempts = claimed_attempts
 
     # Получаем username из blogs
     blog_result = await db.table("blogs").select(
-        "username, person_id, scrape_status"
+        "username, person_id, scrape_status, image_index"
     ).eq("id", blog_id).execute()
     if not blog_result.data:
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   "Blog not found", retry=False)
         return
 
     blog_row = _as_row_dict(blog_result.data[0])
     username_value = blog_row.get("username")
     if not isinstance(username_value, str) or not username_value:
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   "Blog username is missing", retry=False)
         return
     username = username_value
@@ -150,26 +242,40 @@ async def handle_full_scrape(
     person_id = person_id_raw if isinstance(person_id_raw, str) else None
     scrape_status_raw = blog_row.get("scrape_status")
     scrape_status = scrape_status_raw if isinstance(scrape_status_raw, str) else None
+    image_index = parse_image_index(blog_row.get("image_index"))
 
     # Блог деактивирован/удалён — не скрапить
     if scrape_status in ("deleted", "deactivated"):
         logger.info(f"[full_scrape] Пропуск @{username}: статус {scrape_status}")
-        await _h.mark_task_done(db, task_id)
+        await repos.tasks.mark_done(task_id)
         return
 
     logger.debug(f"[full_scrape] Scraping @{username} (blog={blog_id})")
 
+    # Инкрементальный режим: сохранённые посты → скрапер не перезапрашивает известное
+    stored_rows: dict[str, dict[str, Any]] = {}
+    known_posts: list[ScrapedPost] = []
+    if (task.get("payload") or {}).get("incremental"):
+        try:
+            stored_rows = await _load_known_posts(db, blog_id, settings.posts_to_fetch)
+        except Exception as e:
+            logger.warning(f"[full_scrape] @{username}: не удалось загрузить посты, полный скрап: {e}")
+        known_posts = [post for row in stored_rows.values() if (post := _post_from_row(row))]
+
     # Обновить scrape_status
     await db.table("blogs").update({"scrape_status": "scraping"}).eq("id", blog_id).execute()
 
     try:
-        profile = await scraper.scrape_profile(username)
+        if known_posts:
+            profile = await scraper.scrape_profile(username, known_posts)
+        else:
+            profile = await scraper.scrape_profile(username)
     except PrivateAccountError:
         await db.table("blogs").update(
             {"scrape_status": "private", "needs_review": True,
              "review_reason": "Приватный аккаунт"}
         ).eq("id", blog_id).execute()
-        await _h.mark_task_done(db, task_id)
+        await repos.tasks.mark_done(task_id)
         return
     except UserNotFound:
         # Пользователь удалён / не найден — без retry, нужна ручная проверка
@@ -177,12 +283,12 @@ async def handle_full_scrape(
             {"scrape_status": "deleted", "needs_review": True,
              "review_reason": "Аккаунт не найден (удалён или переименован)"}
         ).eq("id", blog_id).execute()
-        await _h.mark_task_done(db, task_id)
+        await repos.tasks.mark_done(task_id)
         return
     except InsufficientBalanceError as e:
         # Нет денег на HikerAPI — ретрай бесполезен, не трогаем scrape_status блога
         logger.error(f"[full_scrape] HikerAPI баланс исчерпан: {e}")
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   "HikerAPI: insufficient balance", retry=False)
         return
     except HikerAPIError as e:
@@ -196,19 +302,23 @@ async def handle_full_scrape(
             update_data["review_reason"] = f"HikerAPI ошибка HTTP {e.status_code}"
             update_data["scrape_error"] = str(e)[:1000]
         await db.table("blogs").update(update_data).eq("id", blog_id).execute()
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=retry)
         return
+    except HikerBudgetExhaustedError as e:
+        await db.table("blogs").update({"scrape_status": "pending"}).eq("id", blog_id).execute()
+        await _defer_until_budget_reset(repos.tasks, task_id, current_attempts, e)
+        return
     except AllAccountsCooldownError as e:
         await db.table("blogs").update({"scrape_status": "pending"}).eq("id", blog_id).execute()
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=True)
         return
     except httpx.TimeoutException as e:
         # Транзиентный таймаут — ретрай без needs_review
         logger.warning(f"[full_scrape] @{username}: таймаут ({type(e).__name__})")
         await db.table("blogs").update({"scrape_status": "pending"}).eq("id", blog_id).execute()
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=True)
         return
     except Exception as e:
@@ -220,7 +330,7 @@ async def handle_full_scrape(
             "review_reason": f"Неожиданная ошибка: {type(e).__name__}",
             "scrape_error": _h.sanitize_error(str(e))[:1000],
         }).eq("id", blog_id).execute()
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=True)
         return
 
@@ -248,30 +358,40 @@ async def handle_full_scrape(
         h.model_dump(mode="json") for h in profile.highlights
     ]
 
+    # Известные посты с изображением в Storage — переиспользуем, не скачиваем заново
+    stored_thumbnails: dict[str, str] = {
+        pid: url for pid, row in stored_rows.items()
+        if isinstance(url := row.get("thumbnail_url"), str) and url
+    }
+    posts_to_upload = [p for p in posts_data if p.get("platform_id") not in stored_thumbnails]
+    upload_stats = UploadStats()
+
     # Скачать CDN-изображения → загрузить в Supabase Storage → подставить постоянные URL
     try:
         avatar_storage_url, post_urls = await _h.persist_profile_images(
             db, settings.supabase_url, blog_id,
-            profile.profile_pic_url, posts_data,
+            profile.profile_pic_url, posts_to_upload,
             upload_semaphore=upload_semaphore,
+            stats=upload_stats,
+            image_index=image_index,
         )
         if avatar_storage_url:
             blog_data["avatar_url"] = avatar_storage_url
-        for post in posts_data:
-            pid = post.get("platform_id", "")
-            if pid in post_urls:
-                post["thumbnail_url"] = post_urls[pid]
-            else:
-                # Не удалось загрузить в Storage — не сохраняем протухающий CDN URL
-                post["thumbnail_url"] = None
+        blog_data["image_index"] = image_index
     except Exception as e:
         logger.warning(f"[full_scrape] @{username}: ошибка загрузки изображений в Storage: {e}")
-        for post in posts_data:
-            post["thumbnail_url"] = None
+        post_urls = {}
+    for post in posts_data:
+        pid = post.get("platform_id", "")
+        # Не удалось загрузить в Storage — не сохраняем протухающий CDN URL
+        post["thumbnail_url"] = post_urls.get(pid) or stored_thumbnails.get(pid)
+
+    # Инкрементально: неизменившиеся известные посты не перезаписываем
+    posts_to_upsert = [p for p in posts_data if _post_changed(p, stored_rows.get(p.get("platform_id", "")))]
 
     try:
         logger.debug(f"[full_scrape] @{username}: upserting blog data...")
-        await _h.upsert_blog(db, blog_id, blog_data)
+        await repos.blogs.upsert(blog_id, blog_data)
 
         # Обновить full_name в persons
         if person_id and profile.full_name:
@@ -279,10 +399,10 @@ async def handle_full_scrape(
                 {"full_name": profile.full_name}
             ).eq("id", person_id).execute()
 
-        await _h.upsert_posts(db, blog_id, posts_data)
-        logger.debug(f"[full_scrape] @{username}: upserted {len(posts_data)} posts/reels")
+        await repos.blogs.upsert_posts(blog_id, posts_to_upsert)
+        logger.debug(f"[full_scrape] @{username}: upserted {len(posts_to_upsert)} posts/reels")
 
-        await _h.upsert_highlights(db, blog_id, highlights_data)
+        await repos.blogs.upsert_highlights(blog_id, highlights_data)
         logger.debug(f"[full_scrape] @{username}: upserted {len(highlights_data)} highlights")
     except Exception as e:
         logger.exception(f"[full_scrape] @{username}: ошибка upsert данных")
@@ -290,17 +410,21 @@ async def handle_full_scrape(
             "scrape_status": "failed",
             "scrape_error": _h.sanitize_error(str(e))[:1000],
         }).eq("id", blog_id).execute()
-        await _h.mark_task_failed(db, task_id, current_attempts, task["max_attempts"],
+        await repos.tasks.mark_failed(task_id, current_attempts, task["max_attempts"],
                                   _h.sanitize_error(str(e)), retry=True)
         return
 
     # Создать задачу AI-анализа
     logger.debug(f"[full_scrape] @{username}: creating ai_analysis task...")
     try:
-        await _h.create_task_if_not_exists(db, blog_id, "ai_analysis", priority=2)
+        await repos.tasks.create_if_not_exists(blog_id, "ai_analysis", priority=2)
     except Exception as e:
         logger.error(f"[full_scrape] @{username}: не удалось создать ai_analysis задачу: {e}")
         # Не фейлим full_scrape — данные уже сохранены, ai_analysis можно создать вручную
 
-    await _h.mark_task_done(db, task_id)
+    await repos.tasks.mark_done(task_id)
     logger.info(f"Full scrape done for @{username} (blog={blog_id})")
+    if stored_rows:
+        _log_incremental_savings(username, profile, stored_rows, len(posts_data) - len(posts_to_upload),
+                                 upload_stats, len(posts_to_upsert))
+
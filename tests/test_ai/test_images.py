@@ -1,8 +1,10 @@
 """Тесты скачивания изображений и конвертации в base64."""
 import base64
 import io
+import os
+from concurrent.futures.process import BrokenProcessPool
 from datetime import UTC, datetime
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
@@ -10,8 +12,13 @@ from PIL import Image
 
 from src.ai.images import (
     MAX_IMAGES,
+    create_image_pool,
     download_image_as_base64,
+    llm_variant_path,
+    optimize_image_async,
+    optimize_image_for_llm,
     resolve_profile_images,
+    set_image_pool,
 )
 from src.models.blog import ScrapedPost, ScrapedProfile
 
@@ -136,6 +143,174 @@ class TestDownloadImageAsBase64:
         assert max(processed.size) <= 512
 
 
+def _noise_image(size: tuple[int, int], mode: str = "RGB") -> Image.Image:
+    channels = len(mode)
+    return Image.frombytes(mode, size, os.urandom(size[0] * size[1] * channels))
+
+
+def _encode(image: Image.Image, fmt: str, **params: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+class TestOptimizeImageForLlm:
+    """Тесты optimize_image_for_llm."""
+
+    def test_small_jpeg_passed_through(self) -> None:
+        """Небольшой JPEG в пределах 512px отдаётся без перекодирования."""
+        raw = _encode(Image.new("RGB", (320, 320), color="green"), "JPEG")
+
+        with patch("src.ai.images._encode_jpeg") as mock_encode:
+            assert optimize_image_for_llm(raw, "u") == (raw, "image/jpeg")
+        mock_encode.assert_not_called()
+
+    def test_large_jpeg_single_encode(self) -> None:
+        """Обычная миниатюра 1080px — одно кодирование, результат в пределах 512px."""
+        from src.ai.images import _encode_jpeg
+
+        raw = _encode(Image.new("RGB", (1080, 1350), color="red"), "JPEG", quality=95)
+
+        with patch("src.ai.images._encode_jpeg", side_effect=_encode_jpeg) as mock_encode:
+            result = optimize_image_for_llm(raw, "u")
+
+        assert result is not None
+        assert mock_encode.call_count == 1
+        assert max(Image.open(io.BytesIO(result[0])).size) == 512
+
+    def test_quality_search_fits_limit(self) -> None:
+        """JPEG больше лимита — не больше двух перекодирований, результат в лимите."""
+        from src.ai.images import _encode_jpeg
+
+        image = _noise_image((512, 512))
+        raw = _encode(image, "PNG")
+        limit = len(_encode_jpeg(image, 82)) * 2 // 3
+
+        with (
+            patch("src.ai.images.MAX_OPTIMIZED_IMAGE_SIZE", limit),
+            patch("src.ai.images._encode_jpeg", side_effect=_encode_jpeg) as mock_encode,
+        ):
+            result = optimize_image_for_llm(raw, "u")
+
+        assert result is not None
+        assert len(result[0]) <= limit
+        assert mock_encode.call_count <= 3
+
+    def test_prediction_depends_on_pixel_count(self) -> None:
+        """Одинаковый размер прохода: плотный (мало пикселей) JPEG сжимается слабее — качество ниже."""
+        from src.ai.images import _jpeg_size_exponent, _predict_jpeg_quality
+
+        size = 200 * 1024
+        with patch("src.ai.images.MAX_OPTIMIZED_IMAGE_SIZE", 100 * 1024):
+            dense = _predict_jpeg_quality(82, size, 320 * 320)
+            sparse = _predict_jpeg_quality(82, size, 2048 * 2048)
+
+        assert dense < sparse
+        assert _jpeg_size_exponent(0.03) > _jpeg_size_exponent(0.3) > _jpeg_size_exponent(3.0)
+
+    def test_transparent_png_kept(self) -> None:
+        """Реальная прозрачность сохраняется в PNG."""
+        image = Image.new("RGBA", (64, 64), color=(255, 0, 0, 128))
+
+        result = optimize_image_for_llm(_encode(image, "PNG"), "u")
+
+        assert result is not None
+        assert result[1] == "image/png"
+
+    def test_opaque_alpha_goes_to_jpeg(self) -> None:
+        """Полностью непрозрачный alpha-канал отбрасывается — сразу JPEG, без PNG-прохода."""
+        image = Image.new("RGBA", (64, 64), color=(255, 0, 0, 255))
+
+        result = optimize_image_for_llm(_encode(image, "PNG"), "u")
+
+        assert result is not None
+        assert result[1] == "image/jpeg"
+
+    def test_corrupted_image_returns_none(self) -> None:
+        raw = _encode(Image.new("RGB", (320, 320), color="green"), "JPEG")
+
+        assert optimize_image_for_llm(raw[: len(raw) // 2], "u") is None
+
+
+class TestOptimizeImageAsync:
+    """optimize_image_async: пул процессов, без него — поток."""
+
+    @pytest.mark.asyncio
+    async def test_process_pool_matches_inline(self) -> None:
+        raw = _encode(Image.new("RGB", (1080, 1080), color="red"), "JPEG")
+        pool = create_image_pool(1)
+        set_image_pool(pool)
+        try:
+            assert await optimize_image_async(raw, "u") == optimize_image_for_llm(raw, "u")
+        finally:
+            set_image_pool(None)
+            pool.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_falls_back_to_thread(self) -> None:
+        """Сломанный пул снимается с регистрации: следующий вызов его не трогает."""
+        raw = _encode(Image.new("RGB", (1080, 1080), color="red"), "JPEG")
+        pool = MagicMock()
+        pool.submit.side_effect = BrokenProcessPool("worker died")
+        set_image_pool(pool)
+        try:
+            assert await optimize_image_async(raw, "u") == optimize_image_for_llm(raw, "u")
+            assert await optimize_image_async(raw, "u") is not None
+            assert pool.submit.call_count == 1
+        finally:
+            set_image_pool(None)
+
+
+STORAGE_POST = "https://sb.co/storage/v1/object/public/blog-images/blog-1/post_p1.jpg"
+
+
+class TestLlmVariant:
+    """LLM-вариант из Storage (сохраняется при full_scrape) идёт в батч ссылкой."""
+
+    def test_llm_variant_path(self) -> None:
+        assert llm_variant_path("blog-1/post_p1.jpg") == "blog-1/post_p1_llm.jpg"
+        assert llm_variant_path("avatar.jpg") == "avatar_llm.jpg"
+
+    @pytest.mark.asyncio
+    async def test_variant_referenced_without_download(self) -> None:
+        variant_url = llm_variant_path(STORAGE_POST)
+        profile = ScrapedProfile(
+            platform_id="12345",
+            username="test",
+            medias=[
+                ScrapedPost(
+                    platform_id="p1",
+                    media_type=1,
+                    thumbnail_url=STORAGE_POST,
+                    taken_at=datetime(2026, 1, 15, tzinfo=UTC),
+                ),
+            ],
+        )
+
+        with patch("src.ai.images.download_image_as_base64") as mock_dl:
+            client = AsyncMock(spec=httpx.AsyncClient)
+            result = await resolve_profile_images(
+                profile, client=client, llm_variants={STORAGE_POST: variant_url},
+            )
+
+        assert result == {STORAGE_POST: variant_url}
+        mock_dl.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_storage_url_without_variant_not_probed(self) -> None:
+        """Изображение без варианта скачивается сразу, без запроса к _llm."""
+        requested: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=_make_valid_image_bytes("JPEG"))
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            assert await download_image_as_base64(STORAGE_POST, client) is not None
+
+        assert requested == ["/storage/v1/object/public/blog-images/blog-1/post_p1.jpg"]
+
+
 class TestResolveProfileImages:
     """Тесты resolve_profile_images."""
 
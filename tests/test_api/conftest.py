@@ -53,8 +53,7 @@ def make_pool(total: int = 2, available: int = 1):
     now = time.time()
     for i, acc in enumerate(pool.accounts):
         acc.cooldown_until = 0 if i < available else now + 9999
-        acc.requests_this_hour = 0
-        acc.hour_started_at = now
+        acc.tokens = 30
     pool.requests_per_hour = 30
     return pool
 
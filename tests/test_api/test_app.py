@@ -1,5 +1,5 @@
 """Тесты FastAPI-приложения: auth, health."""
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 from fastapi.testclient import TestClient
 
@@ -89,3 +89,53 @@ class TestAuth:
         client = TestClient(app)
         resp = client.get("/api/tasks", headers=AUTH_HEADERS)
         assert resp.status_code != 401
+
+
+class TestSchedulerStatus:
+    """GET /api/scheduler/status — jobs и lanes воркера."""
+
+    def test_includes_worker_lanes(self) -> None:
+        from src.worker.lanes import Lane, WorkerLanes
+
+        app = make_app()
+        lanes = WorkerLanes([Lane("full_scrape", 3, 2)])
+        lanes.lanes["full_scrape"].reserve()
+        app.state.worker_lanes = lanes
+        client = TestClient(app)
+        resp = client.get("/api/scheduler/status", headers=AUTH_HEADERS)
+
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["jobs"] == []
+        assert data["lanes"][0]["task_type"] == "full_scrape"
+        assert data["lanes"][0]["in_flight"] == 1
+        assert data["lanes"][0]["max_concurrent"] == 3
+
+    def test_no_lanes_when_worker_not_attached(self) -> None:
+        client = TestClient(make_app())
+        resp = client.get("/api/scheduler/status", headers=AUTH_HEADERS)
+        assert resp.json() == {"jobs": [], "lanes": []}
+
+
+class TestQueueWaitStats:
+    """GET /api/queue/wait-stats — перцентили ожидания по priority."""
+
+    def test_returns_rpc_rows(self) -> None:
+        db = make_db_mock()
+        row = {
+            "priority": 8, "started": 40, "wait_p50_seconds": 12.0, "wait_p95_seconds": 300.0,
+            "wait_p99_seconds": 900.0, "wait_max_seconds": 1200.0,
+            "pending": 3, "oldest_pending_seconds": 60.0,
+        }
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[row]))
+        client = TestClient(make_app(db=db))
+
+        resp = client.get("/api/queue/wait-stats?window_minutes=30", headers=AUTH_HEADERS)
+
+        assert resp.status_code == 200
+        assert resp.json() == {"window_minutes": 30, "priorities": [row]}
+        db.rpc.assert_called_once_with("task_wait_stats", {"p_window_minutes": 30})
+
+    def test_requires_auth(self) -> None:
+        client = TestClient(make_app())
+        assert client.get("/api/queue/wait-stats").status_code == 401
@@ -49,9 +49,9 @@ class TestGetHealthStatus:
         now = time.time()
         pool.accounts = [MagicMock(), MagicMock()]
         pool.accounts[0].cooldown_until = 0
-        pool.accounts[0].requests_this_hour = 0
+        pool.accounts[0].tokens = 30
         pool.accounts[1].cooldown_until = now + 9999
-        pool.accounts[1].requests_this_hour = 0
+        pool.accounts[1].tokens = 30
         pool.requests_per_hour = 30
         response = MagicMock()
 
@@ -6,7 +6,7 @@ from unittest.mock import patch
 import pytest
 from pydantic import SecretStr
 
-from src.config import Settings, _parse_account_credentials, _split_comma
+from src.config import AccountCredentials, Settings, _parse_account_credentials, _split_comma
 
 
 def make_settings(**overrides: str) -> Settings:
@@ -108,6 +108,8 @@ class TestSettings:
         assert s.batch_model == "gpt-5-mini"
         assert s.worker_poll_interval == 30
         assert s.worker_max_concurrent == 5
+        assert s.task_lease_seconds == 60
+        assert s.task_lease_renew_seconds == 15
         assert s.log_level == "INFO"
         assert s.instagram_accounts == ""
 
@@ -344,3 +346,44 @@ class TestBackfillSettings:
         assert settings.backfill_ai_enabled is False
         assert settings.backfill_ai_batch_size == 100
         assert settings.backfill_ai_interval_minutes == 120
+
+
+class TestWorkerLanesSettings:
+    """Тесты настройки WORKER_LANES."""
+
+    def test_default_lanes_valid(self) -> None:
+        from src.worker.lanes import parse_lane_spec
+
+        settings = make_settings()
+        assert set(parse_lane_spec(settings.worker_lanes)) == {"full_scrape", "pre_filter", "ai_analysis", "discover"}
+
+    def test_invalid_lanes_rejected(self) -> None:
+        from pydantic import ValidationError
+
+        with pytest.raises(ValidationError, match="Invalid lane spec"):
+            make_settings(WORKER_LANES="full_scrape:zero")
+
+
+class TestWorkerShardSettings:
+    """Тесты шардирования Instagram-аккаунтов между процессами."""
+
+    @staticmethod
+    def _creds(n: int) -> list[AccountCredentials]:
+        return [
+            AccountCredentials(name=f"acc{i}", username=f"user{i}", password=SecretStr("p"), proxy="")
+            for i in range(n)
+        ]
+
+    def test_single_process_gets_all_accounts(self) -> None:
+        settings = make_settings()
+        with patch("src.config._parse_account_credentials", return_value=self._creds(3)):
+            assert [c.name for c in settings.account_credentials] == ["acc0", "acc1", "acc2"]
+
+    def test_accounts_split_by_shard(self) -> None:
+        names: list[list[str]] = []
+        for index in range(2):
+            settings = make_settings(WORKER_SHARD_INDEX=str(index), WORKER_SHARD_COUNT="2")
+            with patch("src.config._parse_account_credentials", return_value=self._creds(5)):
+                names.append([c.name for c in settings.account_credentials])
+
+        assert names == [["acc0", "acc2", "acc4"], ["acc1", "acc3"]]
@@ -1,4 +1,5 @@
 """Тесты CRUD-операций с Supabase (AsyncClient)."""
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 
@@ -19,6 +20,7 @@ def _mock_supabase():
     table_mock.eq.return_value = table_mock
     table_mock.in_.return_value = table_mock
     table_mock.is_.return_value = table_mock
+    table_mock.not_ = table_mock
     table_mock.lte.return_value = table_mock
     table_mock.lt.return_value = table_mock
     table_mock.gt.return_value = table_mock
@@ -493,6 +495,163 @@ class TestCreateTaskIfNotExistsEdge:
         assert result is None
 
 
+class TestTaskStatusWriter:
+    """Тесты write-behind записи статусов."""
+
+    async def test_groups_transitions_by_target_state(self) -> None:
+        from src.database import TaskStatusWriter
+
+        db = _mock_supabase()
+        table = db.table.return_value
+        writer = TaskStatusWriter(db, flush_interval=0.01)
+
+        await asyncio.gather(
+            writer.mark_done("t1"),
+            writer.mark_done("t2"),
+            writer.mark_failed("t3", 1, 3, "boom"),
+            writer.mark_failed("t4", 1, 3, "boom"),
+            writer.mark_failed("t5", 3, 3, "boom"),
+        )
+        await writer.close()
+
+        # Три группы: done, pending (retry), failed — три UPDATE вместо пяти
+        assert table.update.call_count == 3
+        statuses = sorted(c[0][0]["status"] for c in table.update.call_args_list)
+        assert statuses == ["done", "failed", "pending"]
+        table.in_.assert_any_call("id", ["t1", "t2"])
+        table.in_.assert_any_call("id", ["t3", "t4"])
+        table.in_.assert_any_call("id", ["t5"])
+        assert writer.flushes == 1
+
+    async def test_close_flushes_pending_transitions(self) -> None:
+        from src.database import TaskStatusWriter
+
+        db = _mock_supabase()
+        writer = TaskStatusWriter(db, flush_interval=60)
+
+        pending = asyncio.create_task(writer.mark_done("t1"))
+        await asyncio.sleep(0)
+        db.table.return_value.update.assert_not_called()
+
+        await writer.close()
+        await asyncio.wait_for(pending, timeout=1)
+        db.table.return_value.update.assert_called_once()
+
+    async def test_max_batch_triggers_flush(self) -> None:
+        from src.database import TaskStatusWriter
+
+        db = _mock_supabase()
+        writer = TaskStatusWriter(db, flush_interval=60, max_batch=2)
+
+        await asyncio.wait_for(
+            asyncio.gather(writer.mark_done("t1"), writer.mark_done("t2")),
+            timeout=1,
+        )
+        db.table.return_value.update.assert_called_once()
+        await writer.close()
+
+    async def test_bulk_failure_reports_per_task(self) -> None:
+        """Bulk UPDATE упал — повтор построчно, ошибка только у сбойной задачи."""
+        from src.database import TaskStatusWriter
+
+        db = _mock_supabase()
+        table = db.table.return_value
+        table.execute = AsyncMock(side_effect=[
+            RuntimeError("bulk failed"),
+            MagicMock(data=[]),
+            RuntimeError("row t2 failed"),
+        ])
+        writer = TaskStatusWriter(db, flush_interval=0.01)
+
+        results = await asyncio.gather(
+            writer.mark_done("t1"), writer.mark_done("t2"), return_exceptions=True,
+        )
+        await writer.close()
+
+        assert results[0] is None
+        assert isinstance(results[1], RuntimeError)
+        table.eq.assert_any_call("id", "t1")
+        table.eq.assert_any_call("id", "t2")
+
+    async def test_mark_task_done_uses_active_writer(self) -> None:
+        from src.database import TaskStatusWriter, mark_task_done, set_active_status_writer
+
+        db = _mock_supabase()
+        writer = TaskStatusWriter(db, flush_interval=0.01)
+        set_active_status_writer(writer)
+        try:
+            await mark_task_done(db, "t1")
+            # Другой клиент пишет напрямую
+            other_db = _mock_supabase()
+            await mark_task_done(other_db, "t2")
+        finally:
+            set_active_status_writer(None)
+            await writer.close()
+
+        db.table.return_value.in_.assert_called_once_with("id", ["t1"])
+        other_db.table.return_value.eq.assert_called_once_with("id", "t2")
+
+
+class TestCreateTasksIfNotExist:
+    """Тесты bulk-создания задач одним RPC."""
+
+    async def test_empty_rows_skips_rpc(self) -> None:
+        from src.database import create_tasks_if_not_exist
+
+        db = _mock_supabase()
+        assert await create_tasks_if_not_exist(db, []) == []
+        db.rpc.assert_not_called()
+
+    async def test_single_rpc_with_all_rows(self) -> None:
+        from src.database import create_tasks_if_not_exist
+
+        db = _mock_supabase()
+        await create_tasks_if_not_exist(db, [
+            {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 6},
+            {"blog_id": None, "task_type": "pre_filter", "priority": 8, "payload": {"username": "u"}},
+        ])
+
+        db.rpc.assert_called_once_with("create_tasks_if_not_exist", {
+            "p_tasks": [
+                {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 6, "payload": {}},
+                {"blog_id": None, "task_type": "pre_filter", "priority": 8, "payload": {"username": "u"}},
+            ],
+        })
+
+    async def test_result_aligned_with_rows(self) -> None:
+        """Дубликаты → None на своей позиции, созданные → id."""
+        from src.database import create_tasks_if_not_exist
+
+        db = _mock_supabase()
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[
+            {"idx": 2, "task_id": "task-c"},
+            {"idx": 0, "task_id": "task-a"},
+        ]))
+        rows = [
+            {"blog_id": f"blog-{i}", "task_type": "full_scrape", "priority": 6}
+            for i in range(3)
+        ]
+
+        with patch("src.database.notify_task_created") as mock_notify:
+            result = await create_tasks_if_not_exist(db, rows)  # type: ignore[arg-type]
+
+        assert result == ["task-a", None, "task-c"]
+        # Один wakeup на тип задачи, а не на каждую строку
+        mock_notify.assert_called_once_with("full_scrape")
+
+    async def test_nothing_created_no_notify(self) -> None:
+        from src.database import create_tasks_if_not_exist
+
+        db = _mock_supabase()
+        with patch("src.database.notify_task_created") as mock_notify:
+            result = await create_tasks_if_not_exist(
+                db, [{"blog_id": "blog-1", "task_type": "ai_analysis", "priority": 2}],
+            )
+
+        assert result == [None]
+        mock_notify.assert_not_called()
+
+
 class TestRecoverStuckTasks:
     """Тесты recovery зависших running задач."""
 
@@ -529,6 +688,14 @@ class TestRecoverStuckTasks:
         assert update_args["status"] == "pending"
         assert "Recovered" in update_args["error_message"]
 
+    async def test_short_timeout_skips_leased_tasks(self) -> None:
+        """Задачи с lease восстанавливает recover_expired_leases, а не 30-минутный таймаут."""
+        from src.database import recover_stuck_tasks
+
+        db = _mock_supabase()
+        await recover_stuck_tasks(db)
+        db.table.return_value.is_.assert_any_call("lease_expires_at", "null")
+
     async def test_exhausted_attempts_sets_failed(self) -> None:
         """Задача с исчерпанными попытками помечается как failed."""
         from src.database import recover_stuck_tasks
@@ -656,6 +823,136 @@ class TestFetchPendingTasks:
         db.table.assert_called_with("scrape_tasks")
 
 
+class TestClaimPendingTasks:
+    """Тесты атомарного claim пачки задач."""
+
+    async def test_calls_rpc_with_params(self) -> None:
+        from src.database import claim_pending_tasks
+
+        db = _mock_supabase()
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[]))
+
+        await claim_pending_tasks(db, "host:1", limit=7, task_types=["full_scrape"])
+
+        db.rpc.assert_called_once_with("claim_pending_tasks", {
+            "p_worker_id": "host:1",
+            "p_limit": 7,
+            "p_task_types": ["full_scrape"],
+            "p_lease_seconds": 60,
+        })
+
+    async def test_returns_rows_sorted_by_priority(self) -> None:
+        from src.database import claim_pending_tasks
+
+        db = _mock_supabase()
+        rows = [
+            {"id": "t2", "status": "running", "priority": 8, "created_at": "2026-01-01T00:00:00+00:00"},
+            {"id": "t1", "status": "running", "priority": 3, "created_at": "2026-01-02T00:00:00+00:00"},
+            {"id": "t3", "status": "running", "priority": 8, "created_at": "2026-01-03T00:00:00+00:00"},
+        ]
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=rows))
+
+        result = await claim_pending_tasks(db, "w")
+        assert [t["id"] for t in result] == ["t1", "t2", "t3"]
+
+    async def test_sorts_by_claim_rank_when_present(self) -> None:
+        from src.database import claim_pending_tasks
+
+        db = _mock_supabase()
+        rows = [
+            {"id": "new-high", "priority": 3, "created_at": "2026-01-01T01:00:00+00:00",
+             "claim_rank": "2026-01-01T01:30:00+00:00"},
+            {"id": "old-low", "priority": 8, "created_at": "2026-01-01T00:00:00+00:00",
+             "claim_rank": "2026-01-01T01:20:00+00:00"},
+        ]
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=rows))
+
+        result = await claim_pending_tasks(db, "w")
+        assert [t["id"] for t in result] == ["old-low", "new-high"]
+
+    async def test_zero_limit_skips_rpc(self) -> None:
+        from src.database import claim_pending_tasks
+
+        db = _mock_supabase()
+        assert await claim_pending_tasks(db, "w", limit=0) == []
+        db.rpc.assert_not_called()
+
+    async def test_single_row_dict_response(self) -> None:
+        from src.database import claim_pending_tasks
+
+        db = _mock_supabase()
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data={"id": "t1", "priority": 5}))
+        result = await claim_pending_tasks(db, "w")
+        assert [t["id"] for t in result] == ["t1"]
+
+
+class TestRenewTaskLeases:
+    """Тесты bulk-продления lease."""
+
+    async def test_empty_ids_skips_query(self) -> None:
+        from src.database import renew_task_leases
+
+        db = _mock_supabase()
+        assert await renew_task_leases(db, "w", [], 60) == 0
+        db.table.assert_not_called()
+
+    async def test_single_update_for_all_tasks(self) -> None:
+        from src.database import renew_task_leases
+
+        db = _mock_supabase()
+        table = db.table.return_value
+        table.execute = AsyncMock(return_value=MagicMock(data=[{"id": "t1"}, {"id": "t2"}]))
+
+        renewed = await renew_task_leases(db, "host:1", ["t1", "t2", "t3"], 60)
+
+        assert renewed == 2
+        table.update.assert_called_once()
+        assert "lease_expires_at" in table.update.call_args[0][0]
+        table.in_.assert_called_once_with("id", ["t1", "t2", "t3"])
+        table.eq.assert_any_call("status", "running")
+        table.eq.assert_any_call("worker_id", "host:1")
+        # Снятый lease не восстанавливается
+        table.is_.assert_called_once_with("lease_expires_at", "null")
+        table.execute.assert_awaited_once()
+
+
+class TestRecoverExpiredLeases:
+    """Тесты recovery задач с истёкшим lease."""
+
+    async def test_no_expired(self) -> None:
+        from src.database import recover_expired_leases
+
+        db = _mock_supabase()
+        assert await recover_expired_leases(db) == 0
+        db.table.return_value.update.assert_not_called()
+
+    async def test_expired_tasks_returned_to_pending_or_failed(self) -> None:
+        from src.database import recover_expired_leases
+
+        db = _mock_supabase()
+        table = db.table.return_value
+        table.execute = AsyncMock(side_effect=[
+            MagicMock(data=[
+                {"id": "t1", "task_type": "full_scrape", "attempts": 1, "max_attempts": 3, "worker_id": "a:1"},
+                {"id": "t2", "task_type": "discover", "attempts": 1, "max_attempts": 3, "worker_id": "a:1"},
+                {"id": "t3", "task_type": "pre_filter", "attempts": 3, "max_attempts": 3, "worker_id": "b:2"},
+            ]),
+            MagicMock(data=[]),
+            MagicMock(data=[]),
+        ])
+
+        recovered = await recover_expired_leases(db)
+
+        assert recovered == 2
+        updates = [c[0][0] for c in table.update.call_args_list]
+        assert [u["status"] for u in updates] == ["failed", "pending"]
+        assert all(u["lease_expires_at"] is None for u in updates)
+        table.in_.assert_any_call("id", ["t3"])
+        table.in_.assert_any_call("id", ["t1", "t2"])
+        # Bulk: один select + по одному update на статус
+        assert table.execute.await_count == 3
+
+
 class TestUpsertBlog:
     """Тесты обновления данных блога."""
 
@@ -0,0 +1,106 @@
+"""Тесты общих HTTP-клиентов процесса (src/http_clients.py)."""
+import asyncio
+from collections.abc import AsyncGenerator
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.http_clients import (
+    HttpPoolStats,
+    SharedHttpClients,
+    cdn_client,
+    set_shared_http_clients,
+    storage_api,
+)
+
+
+def _settings() -> MagicMock:
+    settings = MagicMock()
+    settings.http_max_connections = 10
+    settings.http_max_keepalive_connections = 5
+    settings.http_keepalive_expiry = 30.0
+    settings.http2_enabled = False
+    return settings
+
+
+def _db() -> MagicMock:
+    db = MagicMock()
+    db.storage_url = "https://proj.supabase.co/storage/v1/"
+    db.options.headers = {"apiKey": "key", "Authorization": "Bearer key"}
+    return db
+
+
+@pytest.fixture
+async def shared() -> AsyncGenerator[SharedHttpClients]:
+    clients = SharedHttpClients(_settings(), _db())
+    set_shared_http_clients(clients)
+    yield clients
+    set_shared_http_clients(None)
+    await clients.aclose()
+
+
+async def _keepalive_server() -> tuple[asyncio.Server, int]:
+    """Минимальный HTTP/1.1 сервер с keep-alive: на каждый запрос — 200 "ok"."""
+
+    async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        while await reader.readuntil(b"\r\n\r\n"):
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+
+    async def _safe_handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await _handle(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(_safe_handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class TestHttpPoolStats:
+    def test_reuse_ratio(self) -> None:
+        assert HttpPoolStats().reuse_ratio == 0.0
+        assert HttpPoolStats(requests=4, connections=1).reuse_ratio == 0.75
+
+
+class TestSharedHttpClients:
+    """Тесты SharedHttpClients."""
+
+    async def test_counts_connection_reuse(self, shared: SharedHttpClients) -> None:
+        """Последовательные запросы идут по одному keep-alive соединению."""
+        server, port = await _keepalive_server()
+        try:
+            for _ in range(3):
+                response = await shared.cdn.get(f"http://127.0.0.1:{port}/img.jpg")
+                assert response.text == "ok"
+        finally:
+            server.close()
+
+        assert shared.cdn_stats.requests == 3
+        assert shared.cdn_stats.connections == 1
+        assert shared.cdn_stats.reuse_ratio == pytest.approx(2 / 3)
+
+    async def test_storage_api_uses_shared_pool(self, shared: SharedHttpClients) -> None:
+        """Storage API берёт URL и заголовки db, но ходит через общий клиент."""
+        api = storage_api(_db())
+
+        assert api is shared.storage
+        assert api.session is shared.storage_http
+
+    async def test_cdn_client_is_shared(self, shared: SharedHttpClients) -> None:
+        async with cdn_client() as client:
+            assert client is shared.cdn
+        assert not shared.cdn.is_closed
+
+
+class TestWithoutSharedClients:
+    """Без регистрации (скрипты, тесты) — временный клиент и db.storage."""
+
+    async def test_cdn_client_temporary(self) -> None:
+        async with cdn_client() as client:
+            pass
+        assert client.is_closed
+
+    def test_storage_api_falls_back_to_db(self) -> None:
+        db = _db()
+        assert storage_api(db) is db.storage
@@ -1,4 +1,7 @@
 """Тесты модуля image_storage — загрузка изображений в Supabase Storage."""
+import contextlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
@@ -27,264 +30,453 @@ class TestBuildPublicUrl:
             build_public_url("https://example.supabase.co", "../avatar.jpg")
 
 
-class TestDownloadImage:
-    """Тесты download_image."""
+class TestEagainDetection:
+    """Тесты распознавания EAGAIN-ошибок."""
+
+    def test_linux_errno_11_is_recognized(self) -> None:
+        from src.utils import is_transient_network_error
+
+        assert is_transient_network_error(OSError(11, "Resource temporarily unavailable"))
+
+
+CDN_URL = "https://cdn.instagram.com/photo.jpg"
+STORAGE_URL = "https://sb.co/storage/v1/"
+
+
+def _cdn_client(handler: Callable[[httpx.Request], Awaitable[httpx.Response]]) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _jpeg_response(body: bytes = b"\xff\xd8\xff" * 100, **headers: str) -> httpx.Response:
+    return httpx.Response(200, headers={"content-type": "image/jpeg", **headers}, content=body)
+
+
+def _storage_db() -> MagicMock:
+    db = MagicMock()
+    db.storage_url = STORAGE_URL
+    db.options.headers = {"apiKey": "key", "Authorization": "Bearer key"}
+    return db
+
+
+class _FakeStorage:
+    """Storage API на MockTransport: запоминает загруженные объекты."""
+
+    def __init__(self, *failures: BaseException | int, reject_suffix: str | None = None) -> None:
+        self.uploads: dict[str, tuple[bytes, httpx.Headers]] = {}
+        self._failures = list(failures)
+        self._reject_suffix = reject_suffix  # Пути с таким окончанием → HTTP 500
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        if self._reject_suffix and str(request.url).endswith(self._reject_suffix):
+            return httpx.Response(500)
+        if self._failures:
+            failure = self._failures.pop(0)
+            if isinstance(failure, BaseException):
+                raise failure
+            return httpx.Response(failure)
+        self.uploads[str(request.url).removeprefix(f"{STORAGE_URL}object/")] = (body, request.headers)
+        return httpx.Response(200, json={"Key": "ok"})
+
+    def client(self) -> contextlib.AbstractAsyncContextManager[httpx.AsyncClient]:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+
+
+async def _transfer(
+    cdn: Callable[[httpx.Request], Awaitable[httpx.Response]],
+    storage: _FakeStorage,
+    stats: Any = None,
+    url: str = CDN_URL,
+    **kwargs: Any,
+) -> str | None:
+    from src.image_storage import download_and_upload_image
+
+    with (
+        patch("src.image_storage.storage_http_client", storage.client),
+        patch("src.image_storage.asyncio.sleep", new_callable=AsyncMock),
+    ):
+        async with _cdn_client(cdn) as client:
+            return await download_and_upload_image(
+                _storage_db(), client, url, "blog-1/avatar.jpg", "https://example.supabase.co", stats,
+                **kwargs,
+            )
+
+
+class TestDownloadAndUploadImage:
+    """Тесты download_and_upload_image — потоковая передача CDN → Storage."""
 
     @pytest.mark.asyncio
-    async def test_success(self) -> None:
-        from src.image_storage import download_image
+    async def test_success_streams_body(self) -> None:
+        """Тело CDN уходит в Storage как есть, с upsert и MIME источника."""
+        from src.image_storage import UploadStats
+
+        body = b"\xff\xd8\xff" * 100
+        storage = _FakeStorage()
+        stats = UploadStats()
 
-        mock_response = MagicMock()
-        mock_response.content = b"\xff\xd8\xff" * 100
-        mock_response.headers = {"content-type": "image/jpeg"}
-        mock_response.raise_for_status = MagicMock()
-        mock_response.url = "https://cdn.instagram.com/photo.jpg"
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body)
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        result = await _transfer(cdn, storage, stats)
 
-        result = await download_image("https://cdn.instagram.com/photo.jpg", mock_client)
-        assert result is not None
-        data, content_type = result
-        assert data == mock_response.content
-        assert content_type == "image/jpeg"
+        assert result == "https://example.supabase.co/storage/v1/object/public/blog-images/blog-1/avatar.jpg"
+        uploaded, headers = storage.uploads["blog-images/blog-1/avatar.jpg"]
+        assert uploaded == body
+        assert headers["content-type"] == "image/jpeg"
+        assert headers["x-upsert"] == "true"
+        assert headers["authorization"] == "Bearer key"
+        assert stats == UploadStats(files=1, bytes=len(body))
+        assert stats.transfers[0].bytes == len(body)
+        assert stats.transfers[0].seconds >= 0
 
     @pytest.mark.asyncio
-    async def test_timeout(self) -> None:
-        from src.image_storage import download_image
+    async def test_size_limit_enforced_mid_stream(self) -> None:
+        """Без Content-Length лимит проверяется по ходу потока — upload прерывается."""
+        storage = _FakeStorage()
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.side_effect = httpx.TimeoutException("timeout")
+        async def _chunks() -> AsyncIterator[bytes]:
+            for _ in range(5):
+                yield b"x" * 64
+
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, headers={"content-type": "image/jpeg"}, content=_chunks())
+
+        with patch("src.image_storage.MAX_DOWNLOAD_SIZE", 100):
+            result = await _transfer(cdn, storage)
 
-        result = await download_image("https://cdn.instagram.com/photo.jpg", mock_client)
         assert result is None
+        assert storage.uploads == {}
 
     @pytest.mark.asyncio
-    async def test_http_error(self) -> None:
-        from src.image_storage import download_image
+    async def test_content_length_too_large(self) -> None:
+        from src.image_storage import MAX_DOWNLOAD_SIZE
 
-        mock_response = MagicMock()
-        mock_response.status_code = 404
-        mock_response.raise_for_status.side_effect = httpx.HTTPStatusError(
-            "Not Found", request=MagicMock(), response=mock_response
-        )
+        storage = _FakeStorage()
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(b"x", **{"content-length": str(MAX_DOWNLOAD_SIZE + 1)})
 
-        result = await download_image("https://cdn.instagram.com/photo.jpg", mock_client)
-        assert result is None
+        assert await _transfer(cdn, storage) is None
+        assert storage.uploads == {}
 
     @pytest.mark.asyncio
-    async def test_too_large(self) -> None:
-        from src.image_storage import MAX_DOWNLOAD_SIZE, download_image
+    async def test_unsupported_mime(self) -> None:
+        storage = _FakeStorage()
 
-        mock_response = MagicMock()
-        mock_response.content = b"\x00" * (MAX_DOWNLOAD_SIZE + 1)
-        mock_response.headers = {"content-type": "image/jpeg"}
-        mock_response.raise_for_status = MagicMock()
-        mock_response.url = "https://cdn.instagram.com/photo.jpg"
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, headers={"content-type": "image/svg+xml"}, content=b"<svg/>")
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        assert await _transfer(cdn, storage) is None
+        assert storage.uploads == {}
 
-        result = await download_image("https://cdn.instagram.com/photo.jpg", mock_client)
-        assert result is None
+    @pytest.mark.asyncio
+    async def test_unsafe_url_not_requested(self) -> None:
+        storage = _FakeStorage()
+        cdn = AsyncMock()
+
+        assert await _transfer(cdn, storage, url="http://127.0.0.1/photo.jpg") is None
+        cdn.assert_not_called()
 
     @pytest.mark.asyncio
-    async def test_non_image_content_type(self) -> None:
-        from src.image_storage import download_image
+    async def test_cdn_http_error(self) -> None:
+        storage = _FakeStorage()
 
-        mock_response = MagicMock()
-        mock_response.content = b"<html>Not an image</html>"
-        mock_response.headers = {"content-type": "text/html"}
-        mock_response.raise_for_status = MagicMock()
-        mock_response.url = "https://cdn.instagram.com/photo.jpg"
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return httpx.Response(404)
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        assert await _transfer(cdn, storage) is None
+        assert storage.uploads == {}
 
-        result = await download_image("https://cdn.instagram.com/photo.jpg", mock_client)
-        assert result is None
+    @pytest.mark.asyncio
+    async def test_storage_error(self) -> None:
+        """Ошибка Storage → None, stats не учитывает файл."""
+        from src.image_storage import UploadStats
+
+        storage = _FakeStorage(500)
+        stats = UploadStats()
+
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response()
 
+        assert await _transfer(cdn, storage, stats) is None
+        assert stats == UploadStats()
 
     @pytest.mark.asyncio
-    async def test_rejects_svg_mime_type(self) -> None:
-        """SVG не должен проходить проверку MIME."""
-        from src.image_storage import download_image
+    async def test_transient_error_retries_whole_transfer(self) -> None:
+        """Транзиентная ошибка Storage — передача повторяется с повторным запросом к CDN."""
+        storage = _FakeStorage(OSError(11, "Resource temporarily unavailable"))
+        cdn_calls = 0
 
-        mock_response = MagicMock()
-        mock_response.content = b"<svg></svg>"
-        mock_response.headers = {"content-type": "image/svg+xml"}
-        mock_response.raise_for_status = MagicMock()
-        mock_response.url = "https://cdn.instagram.com/photo.svg"
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            nonlocal cdn_calls
+            cdn_calls += 1
+            return _jpeg_response()
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        assert await _transfer(cdn, storage) is not None
+        assert cdn_calls == 2
+        assert "blog-images/blog-1/avatar.jpg" in storage.uploads
 
-        result = await download_image("https://cdn.instagram.com/photo.svg", mock_client)
-        assert result is None
+
+class TestImageIndex:
+    """Индекс sha256/ETag: запись при загрузке и условное обновление аватара."""
 
     @pytest.mark.asyncio
-    async def test_accepts_webp_mime_type(self) -> None:
-        """WebP должен проходить проверку MIME."""
-        from src.image_storage import download_image
+    async def test_upload_records_hash_and_validators(self) -> None:
+        import hashlib
 
-        mock_response = MagicMock()
-        mock_response.content = b"\x00webp" * 10
-        mock_response.headers = {"content-type": "image/webp"}
-        mock_response.raise_for_status = MagicMock()
-        mock_response.url = "https://cdn.instagram.com/photo.webp"
+        body = b"\xff\xd8\xff" * 100
+        storage = _FakeStorage()
+        index: dict[str, dict[str, str]] = {}
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body, etag='"abc"', **{"last-modified": "Mon, 01 Jun 2026 00:00:00 GMT"})
 
-        result = await download_image("https://cdn.instagram.com/photo.webp", mock_client)
-        assert result is not None
-        data, content_type = result
-        assert data == mock_response.content
-        assert content_type == "image/webp"
+        assert await _transfer(cdn, storage, index=index) is not None
+        assert index == {"blog-1/avatar.jpg": {
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "etag": '"abc"',
+            "last_modified": "Mon, 01 Jun 2026 00:00:00 GMT",
+        }}
 
     @pytest.mark.asyncio
-    async def test_rejects_unsafe_redirect_url(self) -> None:
-        from src.image_storage import download_image
+    async def test_not_modified_skips_upload(self) -> None:
+        """304 на условный запрос — Storage не трогаем, URL прежний."""
+        from src.image_storage import UploadStats
 
-        mock_response = MagicMock()
-        mock_response.content = b"\xff\xd8\xff" * 10
-        mock_response.headers = {"content-type": "image/jpeg"}
-        mock_response.raise_for_status = MagicMock()
-        mock_response.url = "http://127.0.0.1/internal.jpg"
+        storage = _FakeStorage()
+        stats = UploadStats()
+        entry = {"sha256": "old", "etag": '"abc"', "last_modified": "Mon, 01 Jun 2026 00:00:00 GMT"}
+        index = {"blog-1/avatar.jpg": dict(entry)}
+        seen: list[httpx.Headers] = []
 
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-        mock_client.get.return_value = mock_response
+        async def cdn(request: httpx.Request) -> httpx.Response:
+            seen.append(request.headers)
+            return httpx.Response(304)
 
-        result = await download_image("https://cdn.instagram.com/photo.jpg", mock_client)
-        assert result is None
+        result = await _transfer(cdn, storage, stats=stats, index=index, only_if_changed=True)
 
+        assert result == "https://example.supabase.co/storage/v1/object/public/blog-images/blog-1/avatar.jpg"
+        assert seen[0]["if-none-match"] == '"abc"'
+        assert seen[0]["if-modified-since"] == entry["last_modified"]
+        assert storage.uploads == {}
+        assert stats == UploadStats(skipped=1)
+        assert index["blog-1/avatar.jpg"] == entry
 
-class TestUploadImage:
-    """Тесты upload_image."""
+    @pytest.mark.asyncio
+    async def test_same_hash_skips_upload(self) -> None:
+        """CDN отдал 200 (новый ETag), но содержимое то же — загрузки нет, индекс обновлён."""
+        import hashlib
+
+        from src.image_storage import UploadStats
+
+        body = b"\xff\xd8\xff" * 100
+        storage = _FakeStorage()
+        stats = UploadStats()
+        index = {"blog-1/avatar.jpg": {"sha256": hashlib.sha256(body).hexdigest(), "etag": '"old"'}}
+
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body, etag='"new"')
+
+        assert await _transfer(cdn, storage, stats=stats, index=index, only_if_changed=True)
+        assert storage.uploads == {}
+        assert stats == UploadStats(skipped=1)
+        assert index["blog-1/avatar.jpg"]["etag"] == '"new"'
 
     @pytest.mark.asyncio
-    async def test_success(self) -> None:
-        from src.image_storage import upload_image
+    async def test_changed_hash_uploads(self) -> None:
+        from src.image_storage import UploadStats
 
-        mock_db = MagicMock()
-        mock_storage_bucket = MagicMock()
-        mock_db.storage.from_.return_value = mock_storage_bucket
-        mock_storage_bucket.upload = AsyncMock()
+        body = b"\xff\xd8\xff" * 50
+        storage = _FakeStorage()
+        stats = UploadStats()
+        index = {"blog-1/avatar.jpg": {"sha256": "old"}}
+
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body)
+
+        assert await _transfer(cdn, storage, stats=stats, index=index, only_if_changed=True)
+        assert storage.uploads["blog-images/blog-1/avatar.jpg"][0] == body
+        assert stats == UploadStats(files=1, bytes=len(body))
+        assert index["blog-1/avatar.jpg"]["sha256"] != "old"
+
+    def test_parse_image_index(self) -> None:
+        from src.image_storage import parse_image_index
+
+        raw = {
+            "blog-1/avatar.jpg": {"sha256": "a", "etag": '"e"'},
+            "blog-1/post_p1.jpg": {"etag": '"no-hash"'},
+            "blog-1/post_p2.jpg": "garbage",
+        }
+        assert parse_image_index(raw) == {"blog-1/avatar.jpg": {"sha256": "a", "etag": '"e"'}}
+        assert parse_image_index(None) == {}
+
+    def test_llm_variant_urls(self) -> None:
+        from src.image_storage import llm_variant_urls
 
-        result = await upload_image(mock_db, "blog-1/avatar.jpg", b"image-data", "image/jpeg")
-        assert result is True
-        mock_storage_bucket.upload.assert_called_once()
+        base = "https://sb.co/storage/v1/object/public/blog-images"
+        index = {
+            "blog-1/post_p1.jpg": {"sha256": "a", "llm": "image/jpeg"},
+            "blog-1/post_p2.jpg": {"sha256": "b"},
+        }
+        urls = [f"{base}/blog-1/post_p1.jpg", f"{base}/blog-1/post_p2.jpg", "https://cdn/p3.jpg"]
+        assert llm_variant_urls(urls, index) == {urls[0]: f"{base}/blog-1/post_p1_llm.jpg"}
+
+
+def _red_jpeg() -> bytes:
+    import io
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (1080, 1080), color="red").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class TestLlmVariant:
+    """LLM-вариант строится при передаче из CDN и лежит рядом с оригиналом."""
 
     @pytest.mark.asyncio
-    async def test_failure(self) -> None:
-        from src.image_storage import upload_image
+    async def test_variant_uploaded_next_to_original(self) -> None:
+        import io
 
-        mock_db = MagicMock()
-        mock_storage_bucket = MagicMock()
-        mock_db.storage.from_.return_value = mock_storage_bucket
-        mock_storage_bucket.upload = AsyncMock(side_effect=Exception("Storage error"))
+        from PIL import Image
+
+        from src.image_storage import UploadStats
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1080, 1080), color="red").save(buffer, format="JPEG")
+        body = buffer.getvalue()
+        storage = _FakeStorage()
+        stats = UploadStats()
 
-        result = await upload_image(mock_db, "blog-1/avatar.jpg", b"image-data", "image/jpeg")
-        assert result is False
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body)
+
+        assert await _transfer(cdn, storage, stats, llm_variant=True) is not None
+
+        assert storage.uploads["blog-images/blog-1/avatar.jpg"][0] == body
+        variant, headers = storage.uploads["blog-images/blog-1/avatar_llm.jpg"]
+        assert headers["content-type"] == "image/jpeg"
+        assert max(Image.open(io.BytesIO(variant)).size) == 512
+        assert stats.files == 1
+        assert stats.llm_variants == 1
 
     @pytest.mark.asyncio
-    async def test_correct_bucket_and_path(self) -> None:
-        from src.image_storage import upload_image
+    async def test_variant_from_spilled_spool(self) -> None:
+        """Тело больше SPOOL_MAX_MEMORY уходит во временный файл — вариант строится из него."""
+        import io
 
-        mock_db = MagicMock()
-        mock_storage_bucket = MagicMock()
-        mock_db.storage.from_.return_value = mock_storage_bucket
-        mock_storage_bucket.upload = AsyncMock()
+        from PIL import Image
 
-        await upload_image(mock_db, "blog-1/post_p1.jpg", b"data", "image/jpeg")
+        from src.image_storage import UploadStats
 
-        mock_db.storage.from_.assert_called_with("blog-images")
-        mock_storage_bucket.upload.assert_called_once_with(
-            "blog-1/post_p1.jpg",
-            b"data",
-            {"content-type": "image/jpeg", "upsert": "true"},
-        )
+        buffer = io.BytesIO()
+        Image.effect_noise((800, 800), 64).convert("RGB").save(buffer, format="JPEG")
+        body = buffer.getvalue()
+        storage = _FakeStorage()
+        stats = UploadStats()
 
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body)
 
-class TestEagainDetection:
-    """Тесты распознавания EAGAIN-ошибок."""
+        with patch("src.image_storage.SPOOL_MAX_MEMORY", 1024):
+            assert await _transfer(cdn, storage, stats, llm_variant=True) is not None
 
-    def test_linux_errno_11_is_recognized(self) -> None:
-        from src.utils import is_transient_network_error
+        assert storage.uploads["blog-images/blog-1/avatar.jpg"][0] == body
+        variant, _headers = storage.uploads["blog-images/blog-1/avatar_llm.jpg"]
+        assert max(Image.open(io.BytesIO(variant)).size) == 512
+        assert stats.llm_variants == 1
 
-        assert is_transient_network_error(OSError(11, "Resource temporarily unavailable"))
+    @pytest.mark.asyncio
+    async def test_variant_recorded_in_index(self) -> None:
+        from src.image_storage import UploadStats
 
+        storage = _FakeStorage()
+        index: dict[str, dict[str, str]] = {}
 
-class TestDownloadAndUploadImage:
-    """Тесты download_and_upload_image."""
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(_red_jpeg())
+
+        assert await _transfer(cdn, storage, UploadStats(), index=index, llm_variant=True)
+        assert index["blog-1/avatar.jpg"]["llm"] == "image/jpeg"
 
     @pytest.mark.asyncio
-    async def test_success(self) -> None:
-        from src.image_storage import download_and_upload_image
+    async def test_missing_variant_retried_without_reupload(self) -> None:
+        """В индексе нет "llm": тело запрашивается без валидаторов, оригинал не перезагружается."""
+        import hashlib
 
-        mock_db = MagicMock()
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-
-        with (
-            patch("src.image_storage.download_image", new_callable=AsyncMock) as mock_download,
-            patch("src.image_storage.upload_image", new_callable=AsyncMock) as mock_upload,
-        ):
-            mock_download.return_value = (b"image-data", "image/jpeg")
-            mock_upload.return_value = True
-
-            result = await download_and_upload_image(
-                mock_db, mock_client, "https://cdn.instagram.com/photo.jpg",
-                "blog-1/avatar.jpg", "https://example.supabase.co",
-            )
+        from src.image_storage import UploadStats
 
-            assert result == "https://example.supabase.co/storage/v1/object/public/blog-images/blog-1/avatar.jpg"
-            mock_download.assert_called_once_with("https://cdn.instagram.com/photo.jpg", mock_client)
-            mock_upload.assert_called_once_with(mock_db, "blog-1/avatar.jpg", b"image-data", "image/jpeg")
+        body = _red_jpeg()
+        storage = _FakeStorage()
+        stats = UploadStats()
+        index = {"blog-1/avatar.jpg": {"sha256": hashlib.sha256(body).hexdigest(), "etag": '"abc"'}}
+        seen: list[httpx.Headers] = []
+
+        async def cdn(request: httpx.Request) -> httpx.Response:
+            seen.append(request.headers)
+            return _jpeg_response(body, etag='"abc"')
+
+        assert await _transfer(
+            cdn, storage, stats, index=index, only_if_changed=True, llm_variant=True,
+        )
+        assert "if-none-match" not in seen[0]
+        assert list(storage.uploads) == ["blog-images/blog-1/avatar_llm.jpg"]
+        assert stats.skipped == 1
+        assert stats.llm_variants == 1
+        assert index["blog-1/avatar.jpg"]["llm"] == "image/jpeg"
 
     @pytest.mark.asyncio
-    async def test_download_fails(self) -> None:
-        from src.image_storage import download_and_upload_image
+    async def test_unchanged_image_keeps_variant(self) -> None:
+        """Тот же sha256 и "llm" в индексе — вариант не перестраивается."""
+        import hashlib
 
-        mock_db = MagicMock()
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
+        from src.image_storage import UploadStats
 
-        with (
-            patch("src.image_storage.download_image", new_callable=AsyncMock) as mock_download,
-            patch("src.image_storage.upload_image", new_callable=AsyncMock) as mock_upload,
-        ):
-            mock_download.return_value = None
+        body = _red_jpeg()
+        storage = _FakeStorage()
+        stats = UploadStats()
+        index = {"blog-1/avatar.jpg": {"sha256": hashlib.sha256(body).hexdigest(), "llm": "image/jpeg"}}
 
-            result = await download_and_upload_image(
-                mock_db, mock_client, "https://cdn.instagram.com/photo.jpg",
-                "blog-1/avatar.jpg", "https://example.supabase.co",
-            )
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(body, etag='"new"')
 
-            assert result is None
-            mock_upload.assert_not_called()
+        assert await _transfer(
+            cdn, storage, stats, index=index, only_if_changed=True, llm_variant=True,
+        )
+        assert storage.uploads == {}
+        assert stats == UploadStats(skipped=1)
+        assert index["blog-1/avatar.jpg"]["llm"] == "image/jpeg"
 
     @pytest.mark.asyncio
-    async def test_upload_fails(self) -> None:
-        from src.image_storage import download_and_upload_image
+    async def test_failed_variant_not_recorded(self) -> None:
+        """Вариант не загрузился — в индексе нет "llm", следующий скрап повторит."""
+        from src.image_storage import UploadStats
 
-        mock_db = MagicMock()
-        mock_client = AsyncMock(spec=httpx.AsyncClient)
-
-        with (
-            patch("src.image_storage.download_image", new_callable=AsyncMock) as mock_download,
-            patch("src.image_storage.upload_image", new_callable=AsyncMock) as mock_upload,
-        ):
-            mock_download.return_value = (b"image-data", "image/jpeg")
-            mock_upload.return_value = False
-
-            result = await download_and_upload_image(
-                mock_db, mock_client, "https://cdn.instagram.com/photo.jpg",
-                "blog-1/avatar.jpg", "https://example.supabase.co",
-            )
+        storage = _FakeStorage(reject_suffix="_llm.jpg")
+        index: dict[str, dict[str, str]] = {}
+
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response(_red_jpeg())
+
+        assert await _transfer(cdn, storage, UploadStats(), index=index, llm_variant=True)
+        assert list(storage.uploads) == ["blog-images/blog-1/avatar.jpg"]
+        assert "llm" not in index["blog-1/avatar.jpg"]
+
+    @pytest.mark.asyncio
+    async def test_undecodable_image_keeps_original(self) -> None:
+        """Битое изображение: оригинал загружен, варианта нет."""
+        from src.image_storage import UploadStats
+
+        storage = _FakeStorage()
+        stats = UploadStats()
+
+        async def cdn(_request: httpx.Request) -> httpx.Response:
+            return _jpeg_response()
 
-            assert result is None
+        assert await _transfer(cdn, storage, stats, llm_variant=True) is not None
+        assert list(storage.uploads) == ["blog-images/blog-1/avatar.jpg"]
+        assert stats.llm_variants == 0
 
 
 class TestPersistProfileImages:
@@ -357,6 +549,44 @@ class TestPersistProfileImages:
         assert avatar_url is None
         assert post_urls == {}
 
+    @pytest.mark.asyncio
+    async def test_index_skips_known_posts(self) -> None:
+        """Пост из индекса с вариантом не скачивается; без варианта и аватар — условно."""
+        from src.image_storage import UploadStats, persist_profile_images
+
+        posts = [
+            {"platform_id": "p1", "thumbnail_url": "https://cdn/p1.jpg"},
+            {"platform_id": "p2", "thumbnail_url": "https://cdn/p2.jpg"},
+            {"platform_id": "p3", "thumbnail_url": "https://cdn/p3.jpg"},
+        ]
+        index = {
+            "blog-1/post_p1.jpg": {"sha256": "h1", "llm": "image/jpeg"},
+            "blog-1/post_p3.jpg": {"sha256": "h3"},  # LLM-вариант не сохранился
+        }
+        stats = UploadStats()
+
+        with patch("src.image_storage.download_and_upload_image", new_callable=AsyncMock) as mock_fn:
+            mock_fn.side_effect = ["avatar-url", "p2-url", "p3-url"]
+
+            avatar_url, post_urls = await persist_profile_images(
+                MagicMock(), "https://sb.co", "blog-1", "https://cdn/avatar.jpg", posts,
+                stats=stats, image_index=index,
+            )
+
+        assert avatar_url == "avatar-url"
+        assert post_urls == {
+            "p1": "https://sb.co/storage/v1/object/public/blog-images/blog-1/post_p1.jpg",
+            "p2": "p2-url",
+            "p3": "p3-url",
+        }
+        assert stats.skipped == 1
+        assert [c.args[3] for c in mock_fn.call_args_list] == [
+            "blog-1/avatar.jpg", "blog-1/post_p2.jpg", "blog-1/post_p3.jpg",
+        ]
+        assert [c.kwargs["only_if_changed"] for c in mock_fn.call_args_list] == [True, False, True]
+        assert all(c.kwargs["llm_variant"] for c in mock_fn.call_args_list)
+        assert all(c.kwargs["index"] is index for c in mock_fn.call_args_list)
+
     @pytest.mark.asyncio
     async def test_skips_posts_without_thumbnail(self) -> None:
         from src.image_storage import persist_profile_images
@@ -386,8 +616,8 @@ class TestDeleteBlogImages:
         mock_db = MagicMock()
         mock_storage_bucket = MagicMock()
         mock_db.storage.from_.return_value = mock_storage_bucket
-        # avatar.jpg пропускается — удаляется только post_p1.jpg
-        files = [{"name": "avatar.jpg"}, {"name": "post_p1.jpg"}]
+        # avatar.jpg и его LLM-вариант пропускаются — удаляется только post_p1.jpg
+        files = [{"name": "avatar.jpg"}, {"name": "avatar_llm.jpg"}, {"name": "post_p1.jpg"}]
         mock_storage_bucket.list = AsyncMock(return_value=files)
         mock_storage_bucket.remove = AsyncMock()
 
@@ -401,7 +631,10 @@ class TestDeleteBlogImages:
         result = await delete_blog_images(mock_db, "blog-1")
         assert result == 1  # только post, без avatar
         mock_storage_bucket.remove.assert_called_once()
-        table_mock.execute.assert_called_once()
+        # Индекс изображений сбрасывается вместе с thumbnail_url
+        assert [c.args[0] for c in mock_db.table.call_args_list] == ["blogs", "blog_posts"]
+        assert table_mock.update.call_args_list[0].args[0] == {"image_index": None}
+        assert table_mock.execute.call_count == 2
 
     @pytest.mark.asyncio
     async def test_empty_folder(self) -> None:
@@ -18,20 +18,17 @@ from instagrapi.exceptions import (
 
 from src.platforms.instagram.client import AccountPool, AccountState
 from src.platforms.instagram.exceptions import AllAccountsCooldownError, ScraperError
+from src.platforms.instagram.response_cache import ResponseCache
 
 
-def _make_pool(num_accounts: int = 3) -> AccountPool:
+def _make_pool(
+    num_accounts: int = 3,
+    max_wait_seconds: float = 120,
+    pacing_delay_range: tuple[float, float] = (0, 0),
+) -> AccountPool:
     """Создать пул с заданным числом аккаунтов."""
-    pool = AccountPool.__new__(AccountPool)
-    pool.accounts = []
-    pool.current_index = 0
-    pool.requests_per_hour = 30
-    pool.cooldown_minutes = 45
-    pool._db = None
-    pool._lock = asyncio.Lock()
-
-    for i in range(num_accounts):
-        state = AccountState(
+    accounts = [
+        AccountState(
             name=f"acc{i}",
             client=MagicMock(),
             proxy=f"http://proxy:{7000+i}",
@@ -39,11 +36,16 @@ def _make_pool(num_accounts: int = 3) -> AccountPool:
             password=f"pass{i}",
             is_available=True,
             cooldown_until=0,
-            requests_this_hour=0,
-            hour_started_at=time.time(),
         )
-        pool.accounts.append(state)
-    return pool
+        for i in range(num_accounts)
+    ]
+    return AccountPool(
+        accounts,
+        requests_per_hour=30,
+        cooldown_minutes=45,
+        max_wait_seconds=max_wait_seconds,
+        pacing_delay_range=pacing_delay_range,
+    )
 
 
 class TestAccountPool:
@@ -89,23 +91,44 @@ class TestAccountPool:
         assert pool.get_available_account() is None
 
     def test_skip_hourly_limit(self) -> None:
-        """Аккаунт достиг лимита запросов/час — пропускается."""
+        """Аккаунт без токенов (исчерпал requests_per_hour) — пропускается."""
         pool = self._make_pool(2)
-        pool.accounts[0].requests_this_hour = 30  # лимит
+        pool.accounts[0].tokens = 0
 
         acc = pool.get_available_account()
         assert acc is not None
         assert acc.name == "acc1"
 
-    def test_hourly_counter_resets(self) -> None:
-        """Счётчик сбрасывается через час."""
+    def test_tokens_refill_over_time(self) -> None:
+        """Token bucket пополняется со скоростью requests_per_hour в час."""
         pool = self._make_pool(1)
-        pool.accounts[0].requests_this_hour = 30
-        pool.accounts[0].hour_started_at = time.time() - 3601  # больше часа назад
+        acc = pool.accounts[0]
+        acc.tokens = 0
+        acc.tokens_updated_at = time.time() - 120  # 2 минуты при 30/час → 1 токен
 
-        acc = pool.get_available_account()
-        assert acc is not None
-        assert acc.requests_this_hour == 0
+        assert pool.get_available_account() is acc
+        assert acc.tokens == pytest.approx(1, abs=0.01)
+
+    def test_tokens_capped_by_requests_per_hour(self) -> None:
+        """Простой не копит больше requests_per_hour токенов."""
+        pool = self._make_pool(1)
+        acc = pool.accounts[0]
+        acc.tokens_updated_at = time.time() - 86400
+
+        pool.get_available_account()
+        assert acc.tokens == pytest.approx(30)
+
+    def test_next_available_at(self) -> None:
+        """Ближайшее освобождение — минимум по cooldown и пополнению токенов."""
+        pool = self._make_pool(2)
+        now = time.time()
+        pool.accounts[0].cooldown_until = now + 600
+        pool.accounts[1].tokens = 0.5  # половина токена → 60с при 30/час
+        pool.accounts[1].tokens_updated_at = now
+
+        ready_at = pool.next_available_at()
+        assert ready_at is not None
+        assert ready_at - now == pytest.approx(60, abs=1)
 
     def test_mark_rate_limited(self) -> None:
         """mark_rate_limited устанавливает cooldown."""
@@ -124,14 +147,107 @@ class TestAccountPool:
         assert acc.cooldown_until > expected_min
 
     def test_increment_requests(self) -> None:
-        """increment_requests увеличивает счётчик."""
+        """increment_requests списывает токен и считает запросы."""
         pool = self._make_pool(1)
         acc = pool.accounts[0]
-        assert acc.requests_this_hour == 0
+        assert acc.requests_total == 0
         pool.increment_requests(acc)
-        assert acc.requests_this_hour == 1
+        assert acc.requests_total == 1
         pool.increment_requests(acc)
-        assert acc.requests_this_hour == 2
+        assert acc.requests_total == 2
+        assert acc.tokens == pytest.approx(28, abs=0.01)
+
+
+class TestAcquire:
+    """Тесты ожидания аккаунта в acquire()."""
+
+    @pytest.mark.asyncio
+    async def test_waits_for_token_instead_of_failing(self) -> None:
+        """Аккаунт без токена освободится через ~0.1с — acquire ждёт, а не падает."""
+        pool = _make_pool(1)
+        acc = pool.accounts[0]
+        acc.tokens = 1 - 0.1 * 30 / 3600  # до целого токена — 0.1с
+        acc.tokens_updated_at = time.time()
+
+        started = time.monotonic()
+        assert await pool.acquire() is acc
+        assert 0.05 <= time.monotonic() - started < 1
+        assert acc.requests_total == 1
+
+    @pytest.mark.asyncio
+    async def test_raises_when_wait_exceeds_limit(self) -> None:
+        """Освобождение позже max_wait → AllAccountsCooldownError без ожидания."""
+        pool = _make_pool(1, max_wait_seconds=5)
+        pool.accounts[0].cooldown_until = time.time() + 600
+
+        started = time.monotonic()
+        with pytest.raises(AllAccountsCooldownError):
+            await pool.acquire()
+        assert time.monotonic() - started < 0.5
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self) -> None:
+        """Ждущие получают аккаунт по priority, а не по порядку прихода."""
+        pool = _make_pool(1, max_wait_seconds=30)
+        acc = pool.accounts[0]
+        acc.tokens = 1 - 0.1 * 30 / 3600
+        acc.tokens_updated_at = time.time()
+        order: list[str] = []
+
+        async def _take(name: str, priority: int) -> None:
+            await pool.acquire(priority=priority)
+            order.append(name)
+
+        low = asyncio.create_task(_take("low", 5))
+        await asyncio.sleep(0)
+        high = asyncio.create_task(_take("high", 1))
+        # Второй токен появится только через 2 минуты — low не дождётся
+        with pytest.raises(AllAccountsCooldownError):
+            await asyncio.gather(high, low)
+        await asyncio.gather(high, low, return_exceptions=True)
+
+        assert order == ["high"]
+
+
+class TestInFlight:
+    """Один запрос на аккаунт за раз."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_acquires_get_different_accounts(self) -> None:
+        """Занятый аккаунт не выдаётся, следующий ждёт release()."""
+        pool = _make_pool(2)
+        first = await pool.acquire()
+        second = await pool.acquire()
+        assert first is not second
+
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        await pool.release(second)
+
+        assert await asyncio.wait_for(waiter, 1) is second
+
+    @pytest.mark.asyncio
+    async def test_safe_request_releases_on_error(self) -> None:
+        """Аккаунт освобождается и после ошибки запроса."""
+        pool = _make_pool(1)
+
+        def _fail(client):
+            raise UserNotFound("gone")
+
+        with pytest.raises(UserNotFound):
+            await pool.safe_request(_fail)
+
+        assert pool.accounts[0].in_flight is False
+
+    def test_eligible_count(self) -> None:
+        """В cooldown и без токенов — не в счёт, занятые запросом — в счёт."""
+        pool = _make_pool(4)
+        pool.accounts[0].cooldown_until = time.time() + 600
+        pool.accounts[1].tokens = 0
+        pool.accounts[2].in_flight = True
+
+        assert pool.eligible_count() == 2
 
 
 class TestSafeRequest:
@@ -148,7 +264,7 @@ class TestSafeRequest:
 
         result = await pool.safe_request(func, "test")
         assert result == "result-test"
-        assert pool.accounts[0].requests_this_hour == 1
+        assert pool.accounts[0].requests_total == 1
 
     @pytest.mark.asyncio
     @patch("src.platforms.instagram.client.asyncio.sleep", return_value=None)
@@ -219,7 +335,7 @@ class TestSafeRequest:
             await pool.safe_request(func, "test")
 
         # Счётчик увеличен (запрос был сделан)
-        assert pool.accounts[0].requests_this_hour == 1
+        assert pool.accounts[0].requests_total == 1
 
     @pytest.mark.asyncio
     @patch("src.platforms.instagram.client.asyncio.sleep", return_value=None)
@@ -267,6 +383,109 @@ class TestSafeRequest:
         pool.accounts[0].client.login.assert_called_once_with("user0", "pass0")
 
 
+class TestSafeRequestCache:
+    """Тесты кэша ответов в safe_request."""
+
+    @pytest.mark.asyncio
+    @patch("src.platforms.instagram.client.asyncio.sleep", return_value=None)
+    async def test_cached_response_skips_account(self, _sleep) -> None:
+        """Повторный вызов с теми же аргументами не расходует запрос аккаунта."""
+        pool = _make_pool(1)
+        pool.cache = ResponseCache(max_bytes=1024 * 1024)
+
+        def _user_info(client, user_id):
+            return {"pk": user_id}
+
+        assert await pool.safe_request(_user_info, "1") == {"pk": "1"}
+        assert await pool.safe_request(_user_info, "1") == {"pk": "1"}
+        assert await pool.safe_request(_user_info, "2") == {"pk": "2"}
+
+        assert pool.accounts[0].requests_total == 2
+        assert pool.cache.stats.hits == 1
+
+    @pytest.mark.asyncio
+    @patch("src.platforms.instagram.client.asyncio.sleep", return_value=None)
+    async def test_uncached_function_always_requested(self, _sleep) -> None:
+        """Функция без TTL в кэше вызывается каждый раз."""
+        pool = _make_pool(1)
+        pool.cache = ResponseCache(max_bytes=1024 * 1024)
+
+        def _hashtag_medias(client, tag):
+            return [tag]
+
+        await pool.safe_request(_hashtag_medias, "food")
+        await pool.safe_request(_hashtag_medias, "food")
+
+        assert pool.accounts[0].requests_total == 2
+
+
+class TestPacing:
+    """Тесты паузы между запросами аккаунта без sleep в safe_request."""
+
+    @pytest.mark.asyncio
+    async def test_result_returned_without_sleep(self) -> None:
+        """Результат отдаётся сразу, пауза — в next_request_at аккаунта."""
+        pool = _make_pool(2, pacing_delay_range=(2, 5))
+
+        def func(client, arg):
+            return arg
+
+        with patch("src.platforms.instagram.client.asyncio.sleep") as mock_sleep:
+            assert await pool.safe_request(func, "a") == "a"
+            mock_sleep.assert_not_called()
+
+        acc = pool.accounts[0]
+        assert acc.next_request_at - time.time() >= 1.9
+        assert acc.requests_total == 1
+
+    @pytest.mark.asyncio
+    async def test_paced_account_skipped(self) -> None:
+        """Пока у аккаунта пауза, следующий запрос идёт через другой."""
+        pool = _make_pool(2, pacing_delay_range=(2, 5))
+
+        def func(client, arg):
+            return client
+
+        first = await pool.safe_request(func, "a")
+        second = await pool.safe_request(func, "b")
+
+        assert first is pool.accounts[0].client
+        assert second is pool.accounts[1].client
+
+    @pytest.mark.asyncio
+    async def test_waits_for_pacing_when_single_account(self) -> None:
+        """Единственный аккаунт — второй запрос ждёт окончания паузы в acquire."""
+        pool = _make_pool(1, pacing_delay_range=(0.1, 0.1))
+
+        def func(client, arg):
+            return arg
+
+        await pool.safe_request(func, "a")
+        started = time.monotonic()
+        await pool.safe_request(func, "b")
+
+        assert time.monotonic() - started >= 0.05
+        assert pool.acquire_wait_seconds >= 0.05
+
+    @pytest.mark.asyncio
+    async def test_utilisation(self) -> None:
+        """utilisation() показывает запросы и занятое время каждого аккаунта."""
+        pool = _make_pool(2)
+
+        def func(client, arg):
+            time.sleep(0.02)
+            return arg
+
+        await pool.safe_request(func, "a")
+
+        stats = {u.name: u for u in pool.utilisation()}
+        assert stats["acc0"].requests == 1
+        assert stats["acc0"].busy_seconds >= 0.02
+        assert 0 < stats["acc0"].utilisation <= 1
+        assert stats["acc1"].requests == 0
+        assert stats["acc1"].utilisation == 0
+
+
 class TestTryRelogin:
     """Тесты _try_relogin."""
 
@@ -293,6 +512,93 @@ class TestTryRelogin:
         assert acc.cooldown_until > time.time()
 
 
+def _init_settings(names: list[str], concurrency: int = 4) -> MagicMock:
+    settings = MagicMock()
+    settings.account_credentials = [MagicMock(name=name) for name in names]
+    for cred, name in zip(settings.account_credentials, names, strict=True):
+        cred.name = name
+    settings.requests_per_hour = 30
+    settings.cooldown_minutes = 45
+    settings.account_wait_max_seconds = 120
+    settings.account_init_concurrency = concurrency
+    return settings
+
+
+class TestCreate:
+    """Тесты параллельной инициализации пула в create()."""
+
+    @pytest.mark.asyncio
+    async def test_returns_after_first_account(self) -> None:
+        """create() не ждёт медленные аккаунты — они добавляются в фоне."""
+        slow_done = asyncio.Event()
+
+        async def _init(db, settings, cred) -> AccountState:
+            if cred.name == "slow":
+                await slow_done.wait()
+            return AccountState(name=cred.name, client=MagicMock(), proxy="")
+
+        with patch.object(AccountPool, "_init_account", side_effect=_init):
+            pool = await AccountPool.create(MagicMock(), _init_settings(["slow", "fast"]))
+            assert [acc.name for acc in pool.accounts] == ["fast"]
+            assert pool.accounts[0].tokens == 30
+
+            slow_done.set()
+            assert pool._init_task is not None
+            await pool._init_task
+
+        assert [acc.name for acc in pool.accounts] == ["fast", "slow"]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_bounded(self) -> None:
+        """Одновременно логинится не больше account_init_concurrency аккаунтов."""
+        active = 0
+        peak = 0
+
+        async def _init(db, settings, cred) -> AccountState:
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            return AccountState(name=cred.name, client=MagicMock(), proxy="")
+
+        names = [f"acc{i}" for i in range(6)]
+        with patch.object(AccountPool, "_init_account", side_effect=_init):
+            pool = await AccountPool.create(MagicMock(), _init_settings(names, concurrency=2))
+            assert pool._init_task is not None
+            await pool._init_task
+
+        assert peak == 2
+        assert len(pool.accounts) == 6
+
+    @pytest.mark.asyncio
+    async def test_failed_accounts_skipped(self) -> None:
+        """Упавший логин пропускается; если упали все — пул пустой, без зависания."""
+        async def _init(db, settings, cred) -> AccountState:
+            raise RuntimeError("bad password")
+
+        with patch.object(AccountPool, "_init_account", side_effect=_init):
+            pool = await AccountPool.create(MagicMock(), _init_settings(["a", "b"]))
+
+        assert pool.accounts == []
+        with pytest.raises(AllAccountsCooldownError):
+            await pool.acquire()
+
+    @pytest.mark.asyncio
+    async def test_acquire_waits_for_pending_login(self) -> None:
+        """Пока аккаунты логинятся, acquire() ждёт add_account(), а не падает."""
+        pool = _make_pool(0)
+        pool._initializing = True
+
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        acc = AccountState(name="late", client=MagicMock(), proxy="")
+        await pool.add_account(acc)
+
+        assert await asyncio.wait_for(waiter, 1) is acc
+
+
 class TestSaveAllSessions:
     """Тесты save_all_sessions."""
 
@@ -382,7 +688,7 @@ class TestAccountPoolEdgeCases:
     def test_single_account_at_hourly_limit_returns_none(self) -> None:
         """Единственный аккаунт достиг лимита → None."""
         pool = _make_pool(1)
-        pool.accounts[0].requests_this_hour = pool.requests_per_hour
+        pool.accounts[0].tokens = 0
 
         assert pool.get_available_account() is None
 
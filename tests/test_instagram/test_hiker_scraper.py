@@ -1,9 +1,11 @@
 """Тесты HikerAPI скрапера."""
+from datetime import UTC, datetime
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from src.models.blog import ScrapedComment, ScrapedPost
 from src.platforms.instagram.hiker_scraper import (
     HikerInstagramScraper,
     _hiker_highlight_to_scraped,
@@ -318,11 +320,12 @@ class TestHikerInstagramScraper:
         s = MagicMock()
         s.posts_to_fetch = 20
         s.highlights_to_fetch = 2
+        s.profile_subrequest_concurrency = 6
         return s
 
     @pytest.fixture
-    def mock_client(self) -> MagicMock:
-        return MagicMock()
+    def mock_client(self) -> AsyncMock:
+        return AsyncMock()
 
     @pytest.fixture
     def scraper(self, settings: MagicMock, mock_client: MagicMock) -> HikerInstagramScraper:
@@ -473,13 +476,14 @@ class TestHikerCommentsFetching:
         s = MagicMock()
         s.posts_to_fetch = 20
         s.highlights_to_fetch = 2
+        s.profile_subrequest_concurrency = 6
         s.comments_to_fetch = 10
         s.posts_with_comments = 3
         return s
 
     @pytest.fixture
-    def mock_client(self) -> MagicMock:
-        return MagicMock()
+    def mock_client(self) -> AsyncMock:
+        return AsyncMock()
 
     @pytest.fixture
     def scraper(self, settings: MagicMock, mock_client: MagicMock) -> HikerInstagramScraper:
@@ -593,6 +597,44 @@ class TestHikerCommentsFetching:
 
         assert mock_client.media_comments_chunk_v1.call_count == 2
 
+    async def test_subrequests_run_concurrently_under_cap(
+        self, scraper: HikerInstagramScraper, mock_client: MagicMock, settings: MagicMock
+    ) -> None:
+        """Детали хайлайтов и комментарии идут параллельно, не больше profile_subrequest_concurrency."""
+        import asyncio
+
+        settings.profile_subrequest_concurrency = 3
+        medias = [
+            _mock_hiker_media(str(i), comments=10, taken_at=1706400000 + i * 86400)
+            for i in range(3)
+        ]
+        self._setup_basic_profile(mock_client, medias)
+        mock_client.user_highlights.return_value = [
+            {"pk": f"h{i}", "title": "HL", "media_count": 1, "cover_media": {}} for i in range(2)
+        ]
+
+        in_flight = 0
+        peak = 0
+
+        def _slow(result: Any) -> Any:
+            async def _call(*args: Any, **kwargs: Any) -> Any:
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                await asyncio.sleep(0.01)
+                in_flight -= 1
+                return result
+            return _call
+
+        mock_client.highlight_by_id_v2.side_effect = _slow({"response": {"reels": {}}})
+        mock_client.media_comments_chunk_v1.side_effect = _slow([[], None, None])
+
+        profile = await scraper.scrape_profile("testuser")
+
+        assert len(profile.highlights) == 2
+        assert mock_client.media_comments_chunk_v1.call_count == 3
+        assert peak == 3
+
     async def test_empty_comments_skipped(
         self, scraper: HikerInstagramScraper, mock_client: MagicMock
     ) -> None:
@@ -677,10 +719,144 @@ class TestHikerCommentsFetching:
         assert profile.medias[0].top_comments == []
 
 
+class TestHikerPrefetch:
+    """Тесты scrape_profile с ответами pre_filter из prefetch-кэша."""
+
+    @pytest.fixture
+    def settings(self) -> MagicMock:
+        s = MagicMock()
+        s.posts_to_fetch = 25
+        s.highlights_to_fetch = 2
+        s.profile_subrequest_concurrency = 6
+        s.posts_with_comments = 0
+        s.hikerapi_prefetch_ttl_seconds = 7200
+        return s
+
+    @pytest.fixture
+    def mock_client(self) -> AsyncMock:
+        client = AsyncMock()
+        client.user_highlights.return_value = []
+        return client
+
+    @pytest.fixture
+    def scraper(self, settings: MagicMock, mock_client: MagicMock) -> HikerInstagramScraper:
+        with patch("src.platforms.instagram.hiker_scraper.SafeHikerClient", return_value=mock_client):
+            return HikerInstagramScraper(token="test-token", settings=settings)
+
+    async def test_prefetched_responses_skip_api_calls(
+        self, scraper: HikerInstagramScraper, mock_client: MagicMock
+    ) -> None:
+        """Ответы pre_filter используются вместо user_by_username_v2 и первого chunk'а медиа."""
+        scraper.prefetch.put(
+            "TestUser", {"user": _mock_hiker_user()}, [[_mock_hiker_media("1")], "cursor"],
+        )
+
+        profile = await scraper.scrape_profile("testuser")
+
+        mock_client.user_by_username_v2.assert_not_called()
+        mock_client.user_medias_chunk_v1.assert_not_called()
+        assert [p.platform_id for p in profile.medias] == ["1"]
+        assert profile.saved_requests == 2
+        assert scraper.prefetch.stats.hits == 1
+
+    async def test_prefetch_entry_used_once(
+        self, scraper: HikerInstagramScraper, mock_client: MagicMock
+    ) -> None:
+        """Повторный скрап (retry) идёт в API."""
+        scraper.prefetch.put("testuser", {"user": _mock_hiker_user()}, [[], None])
+        mock_client.user_by_username_v2.return_value = {"user": _mock_hiker_user()}
+        mock_client.user_medias_chunk_v1.return_value = [[], None]
+
+        await scraper.scrape_profile("testuser")
+        await scraper.scrape_profile("testuser")
+
+        mock_client.user_by_username_v2.assert_called_once_with("testuser")
+        assert scraper.prefetch.stats.misses == 1
+
+
+class TestHikerIncrementalScrape:
+    """Тесты scrape_profile с known_posts (инкрементальный re-scrape)."""
+
+    @pytest.fixture
+    def settings(self) -> MagicMock:
+        s = MagicMock()
+        s.posts_to_fetch = 25
+        s.highlights_to_fetch = 2
+        s.profile_subrequest_concurrency = 6
+        s.comments_to_fetch = 10
+        s.posts_with_comments = 3
+        return s
+
+    @pytest.fixture
+    def mock_client(self) -> AsyncMock:
+        client = AsyncMock()
+        client.user_by_username_v2.return_value = {"user": _mock_hiker_user()}
+        client.user_highlights.return_value = []
+        client.media_comments_chunk_v1.return_value = [
+            [{"text": "Новый коммент", "user": {"username": "fan"}}], None, None,
+        ]
+        return client
+
+    @pytest.fixture
+    def scraper(self, settings: MagicMock, mock_client: MagicMock) -> HikerInstagramScraper:
+        with patch("src.platforms.instagram.hiker_scraper.SafeHikerClient", return_value=mock_client):
+            return HikerInstagramScraper(token="test-token", settings=settings)
+
+    @staticmethod
+    def _known(pk: str, taken_at: int) -> ScrapedPost:
+        return ScrapedPost(
+            platform_id=pk,
+            media_type=1,
+            like_count=10,
+            comment_count=5,
+            taken_at=datetime.fromtimestamp(taken_at, tz=UTC),
+            top_comments=[ScrapedComment(username="old", text="Сохранённый")],
+        )
+
+    async def test_pages_until_known_post(
+        self, scraper: HikerInstagramScraper, mock_client: MagicMock
+    ) -> None:
+        """Chunk'и догружаются до первого известного поста, хвост окна — из БД."""
+        base = 1706400000
+        mock_client.user_medias_chunk_v1.side_effect = [
+            [[_mock_hiker_media("n1", taken_at=base + 500), _mock_hiker_media("n2", taken_at=base + 400)], "c1"],
+            [[_mock_hiker_media("n3", taken_at=base + 300), _mock_hiker_media("k1", taken_at=base + 200)], "c2"],
+        ]
+        known = [self._known("k1", base + 200), self._known("k2", base + 100)]
+
+        profile = await scraper.scrape_profile("testuser", known)
+
+        assert mock_client.user_medias_chunk_v1.call_count == 2
+        assert mock_client.user_medias_chunk_v1.call_args.kwargs["end_cursor"] == "c1"
+        assert [p.platform_id for p in profile.medias] == ["n1", "n2", "n3", "k1", "k2"]
+        # Счётчики известного поста обновлены из выдачи
+        assert profile.medias[3].like_count == 100
+
+    async def test_comments_only_for_new_posts(
+        self, scraper: HikerInstagramScraper, mock_client: MagicMock
+    ) -> None:
+        """Комментарии известных постов берутся из БД, запрос — только для новых."""
+        base = 1706400000
+        mock_client.user_medias_chunk_v1.return_value = [[
+            _mock_hiker_media("n1", taken_at=base + 300),
+            _mock_hiker_media("k1", taken_at=base + 200),
+            _mock_hiker_media("k2", taken_at=base + 100),
+        ], "c1"]
+        known = [self._known("k1", base + 200), self._known("k2", base + 100)]
+
+        profile = await scraper.scrape_profile("testuser", known)
+
+        assert mock_client.user_medias_chunk_v1.call_count == 1
+        mock_client.media_comments_chunk_v1.assert_called_once_with("n1")
+        assert profile.saved_requests == 2
+        assert profile.medias[0].top_comments[0].username == "fan"
+        assert profile.medias[1].top_comments[0].username == "old"
+
+
 class TestSafeHikerClient:
     """Тесты SafeHikerClient — проверка HTTP-статусов."""
 
-    def test_raises_insufficient_balance_on_402(self) -> None:
+    async def test_raises_insufficient_balance_on_402(self) -> None:
         """HTTP 402 → InsufficientBalanceError."""
         from src.platforms.instagram.exceptions import InsufficientBalanceError
         from src.platforms.instagram.hiker_scraper import SafeHikerClient
@@ -688,6 +864,8 @@ class TestSafeHikerClient:
         client = MagicMock(spec=SafeHikerClient)
         client._headers = {"x-access-key": "test"}
         client._timeout = 10
+        client.cache = None
+        client.governor = None
 
         mock_resp = MagicMock()
         mock_resp.status_code = 402
@@ -696,13 +874,13 @@ class TestSafeHikerClient:
         mock_resp.headers = {"content-type": "application/json"}
 
         mock_http = MagicMock()
-        mock_http.request.return_value = mock_resp
+        mock_http.request = AsyncMock(return_value=mock_resp)
         client._client = mock_http
 
         with pytest.raises(InsufficientBalanceError, match="402"):
-            SafeHikerClient._request(client, "GET", "/v2/user/by/username")
+            await SafeHikerClient._request(client, "GET", "/v2/user/by/username")
 
-    def test_raises_hiker_api_error_on_429(self) -> None:
+    async def test_raises_hiker_api_error_on_429(self) -> None:
         """HTTP 429 → HikerAPIError."""
         from src.platforms.instagram.exceptions import HikerAPIError
         from src.platforms.instagram.hiker_scraper import SafeHikerClient
@@ -710,6 +888,8 @@ class TestSafeHikerClient:
         client = MagicMock(spec=SafeHikerClient)
         client._headers = {"x-access-key": "test"}
         client._timeout = 10
+        client.cache = None
+        client.governor = None
 
         mock_resp = MagicMock()
         mock_resp.status_code = 429
@@ -717,13 +897,13 @@ class TestSafeHikerClient:
         mock_resp.headers = {"content-type": "application/json"}
 
         mock_http = MagicMock()
-        mock_http.request.return_value = mock_resp
+        mock_http.request = AsyncMock(return_value=mock_resp)
         client._client = mock_http
 
         with pytest.raises(HikerAPIError, match="429"):
-            SafeHikerClient._request(client, "GET", "/v2/user/by/username")
+            await SafeHikerClient._request(client, "GET", "/v2/user/by/username")
 
-    def test_raises_hiker_api_error_on_500(self) -> None:
+    async def test_raises_hiker_api_error_on_500(self) -> None:
         """HTTP 500 → HikerAPIError."""
         from src.platforms.instagram.exceptions import HikerAPIError
         from src.platforms.instagram.hiker_scraper import SafeHikerClient
@@ -731,6 +911,8 @@ class TestSafeHikerClient:
         client = MagicMock(spec=SafeHikerClient)
         client._headers = {"x-access-key": "test"}
         client._timeout = 10
+        client.cache = None
+        client.governor = None
 
         mock_resp = MagicMock()
         mock_resp.status_code = 500
@@ -739,19 +921,21 @@ class TestSafeHikerClient:
         mock_resp.headers = {"content-type": "application/json"}
 
         mock_http = MagicMock()
-        mock_http.request.return_value = mock_resp
+        mock_http.request = AsyncMock(return_value=mock_resp)
         client._client = mock_http
 
         with pytest.raises(HikerAPIError, match="500"):
-            SafeHikerClient._request(client, "GET", "/v2/user/by/username")
+            await SafeHikerClient._request(client, "GET", "/v2/user/by/username")
 
-    def test_returns_json_on_200(self) -> None:
+    async def test_returns_json_on_200(self) -> None:
         """HTTP 200 → возвращает JSON."""
         from src.platforms.instagram.hiker_scraper import SafeHikerClient
 
         client = MagicMock(spec=SafeHikerClient)
         client._headers = {"x-access-key": "test"}
         client._timeout = 10
+        client.cache = None
+        client.governor = None
 
         mock_resp = MagicMock()
         mock_resp.status_code = 200
@@ -759,8 +943,148 @@ class TestSafeHikerClient:
         mock_resp.headers = {"content-type": "application/json"}
 
         mock_http = MagicMock()
-        mock_http.request.return_value = mock_resp
+        mock_http.request = AsyncMock(return_value=mock_resp)
         client._client = mock_http
 
-        result = SafeHikerClient._request(client, "GET", "/v2/user/by/username")
+        result = await SafeHikerClient._request(client, "GET", "/v2/user/by/username")
         assert result == {"user": {"pk": "123"}}
+
+    async def test_concurrent_requests_share_pool(self) -> None:
+        """Запросы через MockTransport идут параллельно, а не по 4 треда."""
+        import asyncio
+
+        import httpx
+
+        from src.platforms.instagram.hiker_scraper import SafeHikerClient
+
+        in_flight = 0
+        peak = 0
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            assert request.headers["x-access-key"] == "test"
+            return httpx.Response(200, json={"user": {"pk": request.url.params["username"]}})
+
+        client = SafeHikerClient(token="test", transport=httpx.MockTransport(handler))
+        try:
+            results = await asyncio.gather(*(client.user_by_username_v2(f"u{i}") for i in range(16)))
+        finally:
+            await client.aclose()
+
+        assert [r["user"]["pk"] for r in results] == [f"u{i}" for i in range(16)]
+        assert peak == 16
+
+    async def test_builds_single_http_client(self) -> None:
+        """Пул соединений SDK не создаётся — иначе он бы не закрывался (утечка на скрапер)."""
+        import httpx
+
+        from src.platforms.instagram.hiker_scraper import SafeHikerClient
+
+        real_client = httpx.AsyncClient
+        created: list[httpx.AsyncClient] = []
+
+        def _tracking(*args: Any, **kwargs: Any) -> httpx.AsyncClient:
+            created.append(real_client(*args, **kwargs))
+            return created[-1]
+
+        with patch("httpx.AsyncClient", side_effect=_tracking):
+            client = SafeHikerClient(token="test")
+        await client.aclose()
+
+        assert created == [client._client]
+        assert client._client.is_closed
+
+    async def test_cached_get_not_sent_twice(self) -> None:
+        """Повторный GET с теми же параметрами отдаётся из cache без HTTP-запроса."""
+        import httpx
+
+        from src.platforms.instagram.hiker_scraper import SafeHikerClient
+        from src.platforms.instagram.response_cache import ResponseCache
+
+        sent: list[str] = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            sent.append(request.url.params["username"])
+            return httpx.Response(200, json={"user": {"pk": request.url.params["username"]}})
+
+        cache = ResponseCache(max_bytes=1024 * 1024)
+        client = SafeHikerClient(token="test", transport=httpx.MockTransport(handler), cache=cache)
+        try:
+            first = await client.user_by_username_v2("u1")
+            second = await client.user_by_username_v2("u1")
+            await client.user_by_username_v2("u2")
+        finally:
+            await client.aclose()
+
+        assert first == second == {"user": {"pk": "u1"}}
+        assert sent == ["u1", "u2"]
+        assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+    async def test_error_response_not_cached(self) -> None:
+        """Ответ с ошибкой не кэшируется — следующий вызов идёт в API."""
+        import httpx
+
+        from src.platforms.instagram.exceptions import HikerAPIError
+        from src.platforms.instagram.hiker_scraper import SafeHikerClient
+        from src.platforms.instagram.response_cache import ResponseCache
+
+        statuses = [500, 200]
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(statuses.pop(0), json={"user": {"pk": "1"}})
+
+        client = SafeHikerClient(
+            token="test", transport=httpx.MockTransport(handler), cache=ResponseCache(max_bytes=1024),
+        )
+        try:
+            with pytest.raises(HikerAPIError):
+                await client.user_by_username_v2("u1")
+            assert await client.user_by_username_v2("u1") == {"user": {"pk": "1"}}
+        finally:
+            await client.aclose()
+
+    async def test_429_pauses_governor_and_retries(self) -> None:
+        """429 через governor — пауза для всех и повтор запроса вместо ошибки."""
+        import httpx
+
+        from src.platforms.instagram.hiker_scraper import SafeHikerClient
+        from src.platforms.instagram.rate_governor import HikerRateGovernor
+        from tests.test_instagram.test_rate_governor import _Clock
+
+        statuses = [429, 200]
+        clock = _Clock()
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(statuses.pop(0), headers={"retry-after": "3"}, json={"user": {"pk": "1"}})
+
+        governor = HikerRateGovernor(rate_per_second=100, burst=5, clock=clock, sleep=clock.sleep)
+        client = SafeHikerClient(token="test", transport=httpx.MockTransport(handler), governor=governor)
+        try:
+            assert await client.user_by_username_v2("u1") == {"user": {"pk": "1"}}
+        finally:
+            await client.aclose()
+
+        assert governor.stats.rate_limited == 1
+        assert governor.stats.calls_by_endpoint["/v2/user/by/username"] == 2
+        assert clock.sleeps == [pytest.approx(3)]
+
+    async def test_429_without_governor_raises(self) -> None:
+        """Без governor 429 сразу превращается в HikerAPIError (retry задачей)."""
+        import httpx
+
+        from src.platforms.instagram.exceptions import HikerAPIError
+        from src.platforms.instagram.hiker_scraper import SafeHikerClient
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(429, json={})
+
+        client = SafeHikerClient(token="test", transport=httpx.MockTransport(handler))
+        try:
+            with pytest.raises(HikerAPIError, match="429"):
+                await client.user_by_username_v2("u1")
+        finally:
+            await client.aclose()
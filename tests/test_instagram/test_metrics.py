@@ -450,3 +450,43 @@ class TestCalculatePostsPerWeekEdge:
         assert result is not None
         # ~7 / (6/7) ≈ 8.17 (7 постов за 6-дневный период)
         assert result > 7
+
+
+class TestMergeKnownPosts:
+    """Тесты merge_known_posts (инкрементальный re-scrape)."""
+
+    def test_fills_window_with_older_known_posts(self) -> None:
+        """Свежая выдача + сохранённые посты старше неё, не больше limit."""
+        from src.platforms.instagram.metrics import merge_known_posts
+
+        fetched = [_make_post(100, 10, 0), _make_post(200, 20, 1)]
+        known = [_make_post(5, 1, 1), _make_post(50, 5, 3), _make_post(60, 6, 2), _make_post(70, 7, 4)]
+
+        merged = merge_known_posts(fetched, known, limit=4)
+
+        assert [p.platform_id for p in merged] == ["post_0", "post_1", "post_2", "post_3"]
+        # Известный пост из выдачи — со свежими счётчиками
+        assert merged[1].like_count == 200
+
+    def test_known_post_keeps_stored_comments(self) -> None:
+        """top_comments известного поста переносятся из БД."""
+        from src.models.blog import ScrapedComment
+        from src.platforms.instagram.metrics import merge_known_posts
+
+        stored = _make_post(100, 10, 1)
+        stored.top_comments = [ScrapedComment(username="fan", text="Круто")]
+
+        merged = merge_known_posts([_make_post(150, 12, 1)], [stored], limit=25)
+
+        assert merged[0].top_comments == stored.top_comments
+
+    def test_deleted_posts_not_restored(self) -> None:
+        """Сохранённый пост новее самого старого из выдачи, но без неё — удалён."""
+        from src.platforms.instagram.metrics import merge_known_posts
+
+        fetched = [_make_post(100, 10, 0), _make_post(100, 10, 2)]
+        known = [_make_post(100, 10, 1), _make_post(100, 10, 3)]
+
+        merged = merge_known_posts(fetched, known, limit=25)
+
+        assert [p.platform_id for p in merged] == ["post_0", "post_2", "post_3"]
@@ -0,0 +1,56 @@
+"""Тесты PrefetchCache — передачи ответов pre_filter в full_scrape."""
+from src.platforms.instagram.prefetch import PrefetchCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestPrefetchCache:
+    """Тесты PrefetchCache."""
+
+    def test_take_returns_entry_once(self) -> None:
+        """Запись извлекается один раз, ключ не зависит от регистра."""
+        cache = PrefetchCache(ttl_seconds=60)
+        cache.put("User", {"user": {"pk": "1"}}, [[], None])
+
+        entry = cache.take("user")
+
+        assert entry is not None
+        assert entry.user_response == {"user": {"pk": "1"}}
+        assert cache.take("user") is None
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+        assert cache.stats.calls_saved == 2
+        assert cache.stats.hit_rate == 0.5
+
+    def test_expired_entry_not_used(self) -> None:
+        """Запись старше TTL не используется."""
+        clock = _Clock()
+        cache = PrefetchCache(ttl_seconds=60, clock=clock)
+        cache.put("user", {}, [])
+        clock.now = 61
+
+        assert cache.take("user") is None
+        assert cache.stats.expired == 1
+        assert len(cache) == 0
+
+    def test_evicts_oldest_over_capacity(self) -> None:
+        """При переполнении вытесняются самые старые записи."""
+        cache = PrefetchCache(ttl_seconds=60, max_entries=2)
+        for name in ("a", "b", "c"):
+            cache.put(name, {}, [])
+
+        assert cache.take("a") is None
+        assert cache.take("c") is not None
+        assert cache.stats.evicted == 1
+
+    def test_zero_ttl_disables_cache(self) -> None:
+        """TTL 0 — ничего не сохраняется."""
+        cache = PrefetchCache(ttl_seconds=0)
+        cache.put("user", {}, [])
+
+        assert len(cache) == 0
@@ -0,0 +1,192 @@
+"""Тесты HikerRateGovernor — token bucket и дневного бюджета HikerAPI."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.platforms.instagram.exceptions import HikerBudgetExhaustedError
+from src.platforms.instagram.rate_governor import (
+    HikerRateGovernor,
+    TokenBucket,
+    create_rate_governor,
+)
+
+ENDPOINT = "/v2/user/by/username"
+
+
+class _Clock:
+    """Фейковое время: sleep продвигает часы вместо ожидания."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Тесты TokenBucket."""
+
+    async def test_burst_then_rate(self) -> None:
+        """Первые burst вызовов без ожидания, дальше — по 1/rate секунд."""
+        clock = _Clock()
+        bucket = TokenBucket(rate=2, burst=3, clock=clock, sleep=clock.sleep)
+
+        waits = [await bucket.acquire() for _ in range(5)]
+
+        assert waits[:3] == [0, 0, 0]
+        assert waits[3:] == [pytest.approx(0.5), pytest.approx(0.5)]
+        assert clock.now == pytest.approx(1.0)
+
+    async def test_refill_capped_by_burst(self) -> None:
+        """Простой не копит токенов больше burst."""
+        clock = _Clock()
+        bucket = TokenBucket(rate=10, burst=2, clock=clock, sleep=clock.sleep)
+        clock.now = 100
+
+        waits = [await bucket.acquire() for _ in range(3)]
+
+        assert waits == [0, 0, pytest.approx(0.1)]
+
+    async def test_pause_blocks_and_drops_burst(self) -> None:
+        """pause() задерживает вызовы и сбрасывает накопленный burst."""
+        clock = _Clock()
+        bucket = TokenBucket(rate=1, burst=5, clock=clock, sleep=clock.sleep)
+        bucket.pause(10)
+
+        assert await bucket.acquire() == pytest.approx(10)
+        assert await bucket.acquire() == pytest.approx(1)
+        assert clock.now == pytest.approx(11)
+
+    async def test_float_rounding_does_not_spin(self) -> None:
+        """Нецелые rate/время не приводят к циклу микроскопических sleep."""
+        clock = _Clock()
+        clock.now = 4.0
+        bucket = TokenBucket(rate=10, burst=1, clock=clock, sleep=clock.sleep)
+        await bucket.acquire()
+        clock.now = 4.1
+
+        await bucket.acquire()
+        await bucket.acquire()
+
+        assert len(clock.sleeps) <= 2
+
+
+class TestHikerRateGovernor:
+    """Тесты HikerRateGovernor."""
+
+    async def test_counts_calls_by_endpoint(self) -> None:
+        clock = _Clock()
+        governor = HikerRateGovernor(rate_per_second=1, burst=1, clock=clock, sleep=clock.sleep)
+
+        await governor.acquire(ENDPOINT)
+        await governor.acquire(ENDPOINT)
+        await governor.acquire("/v1/user/medias/chunk")
+
+        assert governor.stats.calls_by_endpoint == {ENDPOINT: 2, "/v1/user/medias/chunk": 1}
+        assert governor.stats.throttled == 2
+        assert governor.stats.wait_seconds == pytest.approx(2)
+
+    async def test_endpoint_budget_exhausted(self) -> None:
+        """Бюджет endpoint'а исчерпан — ошибка, другие endpoint'ы работают."""
+        governor = HikerRateGovernor(
+            rate_per_second=0, burst=1, daily_budget={ENDPOINT: 2},
+        )
+        await governor.acquire(ENDPOINT)
+        await governor.acquire(ENDPOINT)
+
+        with pytest.raises(HikerBudgetExhaustedError, match="daily budget exhausted"):
+            await governor.acquire(ENDPOINT)
+        await governor.acquire("/v1/user/medias/chunk")
+
+        assert governor.stats.budget_rejected == 1
+        assert governor.remaining_budget() == {ENDPOINT: 0}
+
+    async def test_total_budget_with_costs(self) -> None:
+        """Суммарный бюджет "*" считается в единицах стоимости."""
+        governor = HikerRateGovernor(
+            rate_per_second=0,
+            burst=1,
+            daily_budget={"*": 5},
+            call_costs={"/v1/media/comments/chunk": 3},
+        )
+        await governor.acquire("/v1/media/comments/chunk")
+        await governor.acquire(ENDPOINT)
+
+        with pytest.raises(HikerBudgetExhaustedError):
+            await governor.acquire("/v1/media/comments/chunk")
+        assert governor.remaining_budget() == {"*": 1}
+
+    async def test_budget_resets_next_day(self) -> None:
+        wall = _Clock()
+        wall.now = 86400 - 600
+        governor = HikerRateGovernor(
+            rate_per_second=0, burst=1, daily_budget={"*": 1}, wall_clock=wall,
+        )
+        await governor.acquire(ENDPOINT)
+        with pytest.raises(HikerBudgetExhaustedError) as exc_info:
+            await governor.acquire(ENDPOINT)
+        assert exc_info.value.reset_in_seconds == pytest.approx(600)
+        wall.now = 86400
+
+        await governor.acquire(ENDPOINT)
+
+        assert governor.stats.calls_by_endpoint[ENDPOINT] == 2
+
+    async def test_rate_limited_pauses_bucket(self) -> None:
+        """429 ставит паузу на Retry-After для следующих вызовов."""
+        clock = _Clock()
+        governor = HikerRateGovernor(rate_per_second=10, burst=10, clock=clock, sleep=clock.sleep)
+
+        governor.rate_limited(retry_after=4)
+        await governor.acquire(ENDPOINT)
+
+        assert governor.stats.rate_limited == 1
+        assert clock.now >= 4
+
+
+class TestCreateRateGovernor:
+    """Тесты create_rate_governor."""
+
+    def test_disabled(self) -> None:
+        settings = MagicMock()
+        settings.hikerapi_rate_per_second = 0
+        settings.hikerapi_daily_budget = {}
+
+        assert create_rate_governor(settings) is None
+
+    def test_from_settings(self) -> None:
+        settings = MagicMock()
+        settings.hikerapi_rate_per_second = 5.0
+        settings.hikerapi_burst = 10
+        settings.hikerapi_daily_budget = {"*": 1000}
+        settings.hikerapi_call_costs = {}
+        settings.worker_shard_count = 1
+
+        governor = create_rate_governor(settings)
+
+        assert governor is not None
+        assert governor.bucket is not None
+        assert governor.bucket.burst == 10
+        assert governor.remaining_budget() == {"*": 1000}
+
+    def test_limits_split_between_worker_shards(self) -> None:
+        """С --workers N каждый процесс получает 1/N rate, burst и бюджета."""
+        settings = MagicMock()
+        settings.hikerapi_rate_per_second = 12.0
+        settings.hikerapi_burst = 20
+        settings.hikerapi_daily_budget = {"*": 900}
+        settings.hikerapi_call_costs = {}
+        settings.worker_shard_count = 3
+
+        governor = create_rate_governor(settings)
+
+        assert governor is not None
+        assert governor.bucket is not None
+        assert governor.bucket.rate == 4
+        assert governor.bucket.burst == 6
+        assert governor.remaining_budget() == {"*": 300}
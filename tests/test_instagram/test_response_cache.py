@@ -0,0 +1,135 @@
+"""Тесты ResponseCache — TTL-кэша ответов Instagram API."""
+from pathlib import Path
+
+from src.platforms.instagram.response_cache import MISS, ResponseCache, create_response_cache
+
+ENDPOINT = "/v2/user/by/username"
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache_files(disk_dir: Path) -> list[Path]:
+    return list(disk_dir.glob("*.zz"))
+
+
+class TestResponseCache:
+    """Тесты ResponseCache."""
+
+    async def test_hit_after_put(self) -> None:
+        """Ответ отдаётся по тем же endpoint и аргументам, другие аргументы — промах."""
+        cache = ResponseCache(max_bytes=1024 * 1024)
+        await cache.put(ENDPOINT, {"username": "a"}, {"user": {"pk": "1"}})
+
+        assert await cache.get(ENDPOINT, {"username": "a"}) == {"user": {"pk": "1"}}
+        assert await cache.get(ENDPOINT, {"username": "b"}) is MISS
+        assert (cache.stats.hits, cache.stats.misses) == (1, 1)
+        assert cache.stats.bytes_served > 0
+        assert cache.stats.hit_rate == 0.5
+
+    async def test_returns_copy(self) -> None:
+        """Изменение полученного ответа не портит закэшированный."""
+        cache = ResponseCache(max_bytes=1024 * 1024)
+        await cache.put(ENDPOINT, {"username": "a"}, {"user": {"pk": "1"}})
+
+        first = await cache.get(ENDPOINT, {"username": "a"})
+        first["user"]["pk"] = "changed"
+
+        assert await cache.get(ENDPOINT, {"username": "a"}) == {"user": {"pk": "1"}}
+
+    async def test_none_is_cached(self) -> None:
+        """None — валидный ответ, отличимый от промаха."""
+        cache = ResponseCache(max_bytes=1024)
+        await cache.put(ENDPOINT, {"username": "a"}, None)
+
+        assert await cache.get(ENDPOINT, {"username": "a"}) is None
+
+    async def test_expired_entry_is_miss(self) -> None:
+        """Запись старше TTL endpoint'а не отдаётся."""
+        clock = _Clock()
+        cache = ResponseCache(max_bytes=1024, ttls={ENDPOINT: 60}, clock=clock)
+        await cache.put(ENDPOINT, {"username": "a"}, {"ok": 1})
+        clock.now += 61
+
+        assert await cache.get(ENDPOINT, {"username": "a"}) is MISS
+        assert cache.stats.memory_bytes == 0
+
+    async def test_endpoint_without_ttl_not_cached(self) -> None:
+        """Endpoint без TTL (или с TTL 0) не кэшируется."""
+        cache = ResponseCache(max_bytes=1024, ttls={ENDPOINT: 0})
+        await cache.put(ENDPOINT, {"username": "a"}, {"ok": 1})
+        await cache.put("/v2/hashtag/medias/top", {"name": "x"}, [1])
+
+        assert await cache.get(ENDPOINT, {"username": "a"}) is MISS
+        assert await cache.get("/v2/hashtag/medias/top", {"name": "x"}) is MISS
+        assert cache.stats.stores == 0
+
+    async def test_lru_eviction_by_bytes(self) -> None:
+        """Сверх max_bytes вытесняется давно не использованная запись."""
+        cache = ResponseCache(max_bytes=300)
+        payload = "x" * 100
+        await cache.put(ENDPOINT, {"username": "a"}, payload)
+        await cache.put(ENDPOINT, {"username": "b"}, payload)
+        await cache.get(ENDPOINT, {"username": "a"})  # a — свежее b
+        await cache.put(ENDPOINT, {"username": "c"}, payload)
+
+        assert await cache.get(ENDPOINT, {"username": "b"}) is MISS
+        assert await cache.get(ENDPOINT, {"username": "a"}) == payload
+        assert await cache.get(ENDPOINT, {"username": "c"}) == payload
+        assert cache.stats.evictions == 1
+        assert cache.stats.memory_bytes <= 300
+
+    async def test_disk_tier_shared_between_instances(self, tmp_path: Path) -> None:
+        """Ответ с диска доступен другому экземпляру (другому процессу)."""
+        writer = ResponseCache(max_bytes=1024 * 1024, disk_dir=tmp_path)
+        await writer.put(ENDPOINT, {"username": "a"}, {"user": {"pk": "1"}})
+        assert len(_cache_files(tmp_path)) == 1
+
+        reader = ResponseCache(max_bytes=1024 * 1024, disk_dir=tmp_path)
+        assert await reader.get(ENDPOINT, {"username": "a"}) == {"user": {"pk": "1"}}
+        assert reader.stats.disk_hits == 1
+        # Второй раз — из памяти
+        assert await reader.get(ENDPOINT, {"username": "a"}) == {"user": {"pk": "1"}}
+        assert reader.stats.hits == 1
+
+    async def test_disk_tier_expired_file_removed(self, tmp_path: Path) -> None:
+        """Просроченный файл на диске — промах, файл удаляется."""
+        clock = _Clock()
+        await ResponseCache(max_bytes=1024, ttls={ENDPOINT: 60}, disk_dir=tmp_path, clock=clock).put(
+            ENDPOINT, {"username": "a"}, {"ok": 1},
+        )
+        clock.now += 61
+        reader = ResponseCache(max_bytes=1024, ttls={ENDPOINT: 60}, disk_dir=tmp_path, clock=clock)
+
+        assert await reader.get(ENDPOINT, {"username": "a"}) is MISS
+        assert _cache_files(tmp_path) == []
+
+    async def test_corrupted_disk_file_is_miss(self, tmp_path: Path) -> None:
+        """Битый файл на диске не роняет запрос."""
+        cache = ResponseCache(max_bytes=1024, disk_dir=tmp_path)
+        await cache.put(ENDPOINT, {"username": "a"}, {"ok": 1})
+        for path in _cache_files(tmp_path):
+            path.write_bytes(b"garbage")
+
+        reader = ResponseCache(max_bytes=1024, disk_dir=tmp_path)
+        assert await reader.get(ENDPOINT, {"username": "a"}) is MISS
+
+
+class TestCreateResponseCache:
+    """Тесты create_response_cache."""
+
+    def test_disabled_when_zero(self) -> None:
+        assert create_response_cache(0) is None
+
+    def test_ttl_overrides(self) -> None:
+        cache = create_response_cache(8, ttls={ENDPOINT: 30})
+
+        assert cache is not None
+        assert cache.max_bytes == 8 * 1024 * 1024
+        assert cache.ttl_for(ENDPOINT) == 30
+        assert cache.ttl_for("/v1/media/comments/chunk") == 3600
@@ -238,6 +238,13 @@ class TestHighlightToScraped:
         assert len(result.story_mentions) == 1
 
 
+def _mock_pool(eligible: int = 3) -> MagicMock:
+    """Мок AccountPool с eligible доступными аккаунтами."""
+    pool = MagicMock()
+    pool.eligible_count.return_value = eligible
+    return pool
+
+
 def _mock_ig_user(
     pk: str = "12345",
     username: str = "testuser",
@@ -281,10 +288,11 @@ class TestInstagramScraperScrapeProfile:
         from src.platforms.instagram.exceptions import PrivateAccountError
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         private_user = _mock_ig_user(is_private=True)
         pool.safe_request = MagicMock(return_value=private_user)
@@ -303,10 +311,11 @@ class TestInstagramScraperScrapeProfile:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user()
         medias = [_mock_ig_media(str(i), days_ago=i) for i in range(1, 5)]
@@ -330,10 +339,11 @@ class TestInstagramScraperScrapeProfile:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user(follower_count=0)
         medias = [_mock_ig_media("1")]
@@ -357,7 +367,7 @@ class TestInstagramScraperDiscover:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         # Одна медиа от приватного пользователя
@@ -379,7 +389,7 @@ class TestInstagramScraperDiscover:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         media1 = MagicMock()
@@ -400,7 +410,7 @@ class TestInstagramScraperDiscover:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         # Два медиа от одного пользователя
@@ -425,7 +435,7 @@ class TestInstagramScraperDiscover:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         # 30 медиа от 30 разных пользователей
@@ -455,7 +465,7 @@ class TestInstagramScraperDiscover:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         pool.safe_request = AsyncMock(return_value=[])
 
@@ -624,10 +634,11 @@ class TestScrapeProfileBioLinksEdge:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user()
         # bio_links с объектом без .url
@@ -658,7 +669,7 @@ class TestDiscoverEdgeCases:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         # Первая медиа без user, вторая с нормальным user
@@ -685,7 +696,7 @@ class TestDiscoverEdgeCases:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         media1 = MagicMock()
@@ -709,7 +720,7 @@ class TestDiscoverEdgeCases:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         media1 = MagicMock()
@@ -738,7 +749,7 @@ class TestDiscoverEdgeCases:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         media1 = MagicMock()
@@ -766,7 +777,7 @@ class TestDiscoverEdgeCases:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         pool.safe_request = AsyncMock(return_value=[])
@@ -786,10 +797,11 @@ class TestScrapeProfileHighlightFailure:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user()
 
@@ -824,10 +836,11 @@ class TestScrapeProfileHighlightFailure:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user()
         medias = [_mock_ig_media("1", days_ago=1)]
@@ -872,6 +885,71 @@ class TestScrapeProfileHighlightFailure:
         assert profile.highlights[1].platform_id == "h2"
 
 
+class TestScrapeProfileFanOut:
+    """Под-запросы одного профиля расходятся по разным аккаунтам пула."""
+
+    async def test_highlights_fetched_on_different_accounts(self) -> None:
+        """Детали хайлайтов идут параллельно, каждый — через свой аккаунт."""
+        import time
+
+        from src.platforms.instagram.client import AccountPool, AccountState
+        from src.platforms.instagram.scraper import InstagramScraper
+
+        user = _mock_ig_user()
+        highlights = []
+        for i in range(3):
+            hl = MagicMock()
+            hl.pk = str(i + 1)
+            hl.title = f"hl{i}"
+            hl.items = []
+            hl.cover_media = {}
+            highlights.append(hl)
+        served_by: list[str] = []
+
+        def _make_client(name: str) -> MagicMock:
+            def _highlight_info(pk: int) -> MagicMock:
+                time.sleep(0.1)
+                served_by.append(name)
+                return highlights[pk - 1]
+
+            client = MagicMock()
+            client.user_info_by_username.return_value = user
+            client.user_medias.return_value = [_mock_ig_media("1")]
+            client.user_highlights.return_value = highlights
+            client.highlight_info.side_effect = _highlight_info
+            return client
+
+        accounts = [
+            AccountState(name=f"acc{i}", client=_make_client(f"acc{i}"), proxy="")
+            for i in range(3)
+        ]
+        pool = AccountPool(accounts, pacing_delay_range=(0, 0))
+        settings = MagicMock()
+        settings.posts_to_fetch = 20
+        settings.highlights_to_fetch = 3
+        settings.posts_with_comments = 0
+        settings.profile_subrequest_concurrency = 6
+
+        started = time.monotonic()
+        profile = await InstagramScraper(pool, settings).scrape_profile("testuser")
+        elapsed = time.monotonic() - started
+
+        assert len(profile.highlights) == 3
+        assert sorted(served_by) == ["acc0", "acc1", "acc2"]
+        assert elapsed < 0.25  # последовательно было бы >= 0.3с
+
+    def test_subrequest_limit_follows_pool(self) -> None:
+        """Лимит параллельности — число доступных аккаунтов, но не выше настройки."""
+        from src.platforms.instagram.scraper import InstagramScraper
+
+        settings = MagicMock()
+        settings.profile_subrequest_concurrency = 6
+
+        assert InstagramScraper(_mock_pool(eligible=2), settings)._subrequest_limit() == 2
+        assert InstagramScraper(_mock_pool(eligible=10), settings)._subrequest_limit() == 6
+        assert InstagramScraper(_mock_pool(eligible=0), settings)._subrequest_limit() == 1
+
+
 class TestScrapeProfileEmptyMedias:
     """Тесты: scrape_profile с пустым списком медиа."""
 
@@ -881,10 +959,11 @@ class TestScrapeProfileEmptyMedias:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user(follower_count=50000)
 
@@ -1126,10 +1205,11 @@ class TestScrapeProfileNewFields:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user()
         user.account_type = 2
@@ -1157,10 +1237,11 @@ class TestScrapeProfileNewFields:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
 
         user = _mock_ig_user()
         link1 = MagicMock()
@@ -1194,7 +1275,7 @@ class TestDiscoverNewFields:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
 
         media1 = MagicMock()
@@ -1227,10 +1308,11 @@ class TestInstagrapiCommentsFetching:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
         settings.comments_to_fetch = 10
         settings.posts_with_comments = 3
 
@@ -1270,10 +1352,11 @@ class TestInstagrapiCommentsFetching:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
         settings.comments_to_fetch = 10
         settings.posts_with_comments = 3
 
@@ -1296,10 +1379,11 @@ class TestInstagrapiCommentsFetching:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
         settings.comments_to_fetch = 10
         settings.posts_with_comments = 3
 
@@ -1320,10 +1404,11 @@ class TestInstagrapiCommentsFetching:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
         settings.comments_to_fetch = 10
         settings.posts_with_comments = 3
 
@@ -1355,10 +1440,11 @@ class TestInstagrapiCommentsFetching:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
         settings.comments_to_fetch = 10
         settings.posts_with_comments = 2
 
@@ -1387,10 +1473,11 @@ class TestInstagrapiCommentsFetching:
 
         from src.platforms.instagram.scraper import InstagramScraper
 
-        pool = MagicMock()
+        pool = _mock_pool()
         settings = MagicMock()
         settings.posts_to_fetch = 20
         settings.highlights_to_fetch = 3
+        settings.profile_subrequest_concurrency = 6
         settings.comments_to_fetch = 10
         settings.posts_with_comments = 3
 
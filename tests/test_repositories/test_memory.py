@@ -0,0 +1,250 @@
+"""Тесты in-memory репозиториев."""
+
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.repositories.memory import InMemoryBlogRepository, InMemoryTaskRepository
+from src.repositories.protocols import BlogRepository, TaskRepository
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> _Clock:
+    return _Clock()
+
+
+@pytest.fixture
+def repo(clock: _Clock) -> InMemoryTaskRepository:
+    return InMemoryTaskRepository(clock=clock)
+
+
+class TestProtocols:
+    def test_task_repository_protocol(self, repo: InMemoryTaskRepository):
+        task_repo: TaskRepository = repo
+        assert task_repo is repo
+
+    def test_blog_repository_protocol(self):
+        blog_repo: BlogRepository = InMemoryBlogRepository()
+        assert isinstance(blog_repo, InMemoryBlogRepository)
+
+
+class TestCreate:
+    async def test_dedup_active_task(self, repo: InMemoryTaskRepository):
+        first = await repo.create_if_not_exists("blog-1", "full_scrape", 3)
+        second = await repo.create_if_not_exists("blog-1", "full_scrape", 3)
+        assert first is not None
+        assert second is None
+
+    async def test_other_type_not_deduped(self, repo: InMemoryTaskRepository):
+        assert await repo.create_if_not_exists("blog-1", "full_scrape", 3)
+        assert await repo.create_if_not_exists("blog-1", "ai_analysis", 3)
+
+    async def test_without_blog_not_deduped(self, repo: InMemoryTaskRepository):
+        assert await repo.create_if_not_exists(None, "discover", 5)
+        assert await repo.create_if_not_exists(None, "discover", 5)
+
+    async def test_new_task_allowed_after_done(self, repo: InMemoryTaskRepository):
+        task_id = await repo.create_if_not_exists("blog-1", "full_scrape", 3)
+        assert task_id is not None
+        await repo.mark_done(task_id)
+        assert await repo.create_if_not_exists("blog-1", "full_scrape", 3)
+
+    async def test_create_many_dedups_within_batch(self, repo: InMemoryTaskRepository):
+        created = await repo.create_many_if_not_exist([
+            {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 5},
+            {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 5},
+            {"blog_id": "blog-2", "task_type": "full_scrape", "priority": 5, "payload": {"x": 1}},
+        ])
+        assert created[0] is not None
+        assert created[1] is None
+        assert created[2] is not None
+        assert repo.tasks[created[2]]["payload"] == {"x": 1}
+
+
+class TestClaim:
+    async def test_priority_then_fifo(self, repo: InMemoryTaskRepository):
+        low = await repo.create_if_not_exists("b1", "full_scrape", 5)
+        high_first = await repo.create_if_not_exists("b2", "full_scrape", 1)
+        high_second = await repo.create_if_not_exists("b3", "full_scrape", 1)
+
+        claimed = await repo.claim_pending("w1", limit=3)
+
+        assert [t["id"] for t in claimed] == [high_first, high_second, low]
+
+    async def test_claim_sets_running_fields(self, repo: InMemoryTaskRepository, clock: _Clock):
+        task_id = await repo.create_if_not_exists("b1", "full_scrape", 3)
+
+        [task] = await repo.claim_pending("w1", limit=1, lease_seconds=60)
+
+        stored = repo.tasks[task_id]
+        assert task["status"] == "running"
+        assert stored["attempts"] == 1
+        assert stored["worker_id"] == "w1"
+        assert stored["lease_expires_at"] == datetime.fromtimestamp(clock.now + 60, UTC).isoformat()
+
+    async def test_claimed_task_not_claimed_again(self, repo: InMemoryTaskRepository):
+        await repo.create_if_not_exists("b1", "full_scrape", 3)
+        assert len(await repo.claim_pending("w1", limit=5)) == 1
+        assert await repo.claim_pending("w2", limit=5) == []
+
+    async def test_filters_task_types(self, repo: InMemoryTaskRepository):
+        await repo.create_if_not_exists("b1", "full_scrape", 1)
+        ai_id = await repo.create_if_not_exists("b1", "ai_analysis", 5)
+
+        claimed = await repo.claim_pending("w1", limit=5, task_types=["ai_analysis"])
+
+        assert [t["id"] for t in claimed] == [ai_id]
+
+    async def test_merges_types_by_priority(self, repo: InMemoryTaskRepository):
+        ai_id = await repo.create_if_not_exists("b1", "ai_analysis", 2)
+        scrape_id = await repo.create_if_not_exists("b2", "full_scrape", 1)
+
+        claimed = await repo.claim_pending("w1", limit=2)
+
+        assert [t["id"] for t in claimed] == [scrape_id, ai_id]
+
+    async def test_zero_limit(self, repo: InMemoryTaskRepository):
+        await repo.create_if_not_exists("b1", "full_scrape", 1)
+        assert await repo.claim_pending("w1", limit=0) == []
+
+
+class TestRetry:
+    async def test_mark_failed_respects_next_retry_at(self, repo: InMemoryTaskRepository, clock: _Clock):
+        task_id = await repo.create_if_not_exists("b1", "full_scrape", 3)
+        assert task_id is not None
+        [task] = await repo.claim_pending("w1", limit=1)
+
+        await repo.mark_failed(task_id, task["attempts"], 3, "boom")
+
+        assert repo.tasks[task_id]["status"] == "pending"
+        assert await repo.claim_pending("w1", limit=1) == []
+        clock.now += 5 * 60 + 1  # backoff после 1-й попытки — 5 минут
+        assert [t["id"] for t in await repo.claim_pending("w1", limit=1)] == [task_id]
+
+    async def test_mark_failed_final(self, repo: InMemoryTaskRepository):
+        task_id = await repo.create_if_not_exists("b1", "full_scrape", 3)
+        assert task_id is not None
+
+        await repo.mark_failed(task_id, 3, 3, "boom")
+
+        assert repo.tasks[task_id]["status"] == "failed"
+        assert await repo.create_if_not_exists("b1", "full_scrape", 3)
+
+    async def test_requeue_rolls_back_attempts(self, repo: InMemoryTaskRepository, clock: _Clock):
+        task_id = await repo.create_if_not_exists("b1", "full_scrape", 3)
+        assert task_id is not None
+        await repo.claim_pending("w1", limit=1)
+
+        await repo.requeue(task_id, 0, "transient", delay_seconds=30)
+
+        assert repo.tasks[task_id]["attempts"] == 0
+        assert await repo.claim_pending("w1", limit=1) == []
+        clock.now += 31
+        assert len(await repo.claim_pending("w1", limit=1)) == 1
+
+    async def test_mark_running_only_pending(self, repo: InMemoryTaskRepository):
+        task_id = await repo.create_if_not_exists("b1", "ai_analysis", 3)
+        assert task_id is not None
+        assert await repo.mark_running(task_id) is True
+        assert await repo.mark_running(task_id) is False
+        assert repo.tasks[task_id]["lease_expires_at"] is None
+
+
+class TestLeases:
+    async def test_renew_only_own_running(self, repo: InMemoryTaskRepository, clock: _Clock):
+        mine = await repo.create_if_not_exists("b1", "full_scrape", 3)
+        other = await repo.create_if_not_exists("b2", "full_scrape", 3)
+        assert mine is not None and other is not None
+        await repo.claim_pending("w1", limit=1)
+        await repo.claim_pending("w2", limit=1)
+
+        clock.now += 30
+        assert await repo.renew_leases("w1", [mine, other], 60) == 1
+
+    async def test_recover_expired_leases(self, repo: InMemoryTaskRepository, clock: _Clock):
+        task_id = await repo.create_if_not_exists("b1", "full_scrape", 3)
+        assert task_id is not None
+        await repo.claim_pending("w1", limit=1, lease_seconds=60)
+
+        clock.now += 61
+        assert await repo.recover_expired_leases() == 1
+        assert repo.tasks[task_id]["status"] == "pending"
+        assert len(await repo.claim_pending("w2", limit=1)) == 1
+
+    async def test_recover_stuck_skips_leased(self, repo: InMemoryTaskRepository, clock: _Clock):
+        leased = await repo.create_if_not_exists("b1", "full_scrape", 3)
+        manual = await repo.create_if_not_exists("b2", "full_scrape", 3)
+        assert leased is not None and manual is not None
+        await repo.claim_pending("w1", limit=1)
+        await repo.mark_running(manual)
+
+        clock.now += 31 * 60
+        assert await repo.recover_stuck(max_running_minutes=30) == 1
+        assert repo.tasks[manual]["status"] == "pending"
+        assert repo.tasks[leased]["status"] == "running"
+
+
+class TestFetchPending:
+    async def test_does_not_claim(self, repo: InMemoryTaskRepository):
+        task_id = await repo.create_if_not_exists("b1", "full_scrape", 3)
+
+        pending = await repo.fetch_pending(limit=5)
+
+        assert [t["id"] for t in pending] == [task_id]
+        assert repo.status_counts()["pending"] == 1
+
+
+class TestBlogRepository:
+    async def test_is_fresh(self):
+        blogs = InMemoryBlogRepository()
+        await blogs.upsert("b1", {"scraped_at": datetime.now(UTC).isoformat()})
+        await blogs.upsert("b2", {"scraped_at": (datetime.now(UTC) - timedelta(days=90)).isoformat()})
+
+        assert await blogs.is_fresh("b1", 60) is True
+        assert await blogs.is_fresh("b2", 60) is False
+        assert await blogs.is_fresh("missing", 60) is False
+
+    async def test_upsert_posts_by_platform_id(self):
+        blogs = InMemoryBlogRepository()
+        await blogs.upsert_posts("b1", [{"platform_id": "p1", "like_count": 1}])
+        await blogs.upsert_posts("b1", [{"platform_id": "p1", "like_count": 5}])
+
+        assert blogs.posts["b1"]["p1"]["like_count"] == 5
+
+
+class TestPriorityAging:
+    async def test_old_low_priority_overtakes_new_high_priority(
+        self, repo: InMemoryTaskRepository, clock: _Clock,
+    ):
+        old_low = await repo.create_if_not_exists("b1", "full_scrape", 8)
+        clock.now += 8 * 600
+        new_high = await repo.create_if_not_exists("b2", "full_scrape", 3)
+
+        claimed = await repo.claim_pending("w1", limit=2)
+
+        assert [t["id"] for t in claimed] == [old_low, new_high]
+
+    async def test_aging_step_per_task_type(self, clock: _Clock):
+        repo = InMemoryTaskRepository(clock=clock, aging_seconds={"discover": 60})
+        discover = await repo.create_if_not_exists(None, "discover", 10)
+        clock.now += 10 * 60
+        scrape = await repo.create_if_not_exists("b1", "full_scrape", 3)
+
+        claimed = await repo.claim_pending("w1", limit=2)
+
+        assert [t["id"] for t in claimed] == [discover, scrape]
+
+    async def test_records_wait_by_priority(self, repo: InMemoryTaskRepository, clock: _Clock):
+        await repo.create_if_not_exists("b1", "full_scrape", 8)
+        clock.now += 30
+        await repo.claim_pending("w1", limit=1)
+
+        assert repo.wait_seconds == {8: [30.0]}
@@ -16,6 +16,8 @@ def _mock_supabase():
     table_mock.select.return_value = table_mock
     table_mock.eq.return_value = table_mock
     table_mock.in_.return_value = table_mock
+    table_mock.is_.return_value = table_mock
+    table_mock.not_ = table_mock
     table_mock.lt.return_value = table_mock
     table_mock.gt.return_value = table_mock
     table_mock.or_.return_value = table_mock
@@ -193,6 +195,19 @@ class TestCreateIfNotExists:
             },
         )
 
+    @pytest.mark.asyncio
+    async def test_create_many_single_rpc(self):
+        db, _, rpc_mock = _mock_supabase()
+        repo = SupabaseTaskRepository(db)
+        rpc_mock.execute = AsyncMock(return_value=MagicMock(data=[{"idx": 1, "task_id": "t2"}]))
+        result = await repo.create_many_if_not_exist([
+            {"blog_id": "b1", "task_type": "full_scrape", "priority": 5},
+            {"blog_id": "b2", "task_type": "full_scrape", "priority": 5},
+        ])
+        assert result == [None, "t2"]
+        assert db.rpc.call_count == 1
+        assert db.rpc.call_args.args[0] == "create_tasks_if_not_exist"
+
 
 class TestFetchPending:
     @pytest.mark.asyncio
@@ -277,3 +292,36 @@ class TestRecoverStuck:
         result = await repo.recover_stuck()
         # Задача с исчерпанными попытками помечается failed, не recovered
         assert result == 0
+
+
+class TestClaimPending:
+    @pytest.mark.asyncio
+    async def test_claim_pending_calls_rpc(self):
+        db, _, rpc_mock = _mock_supabase()
+        repo = SupabaseTaskRepository(db)
+        rpc_mock.execute = AsyncMock(return_value=MagicMock(data=[{"id": "t1", "status": "running"}]))
+        result = await repo.claim_pending("w1", limit=3, task_types=["pre_filter"])
+        assert result == [{"id": "t1", "status": "running"}]
+        db.rpc.assert_called_once_with("claim_pending_tasks", {
+            "p_worker_id": "w1",
+            "p_limit": 3,
+            "p_task_types": ["pre_filter"],
+            "p_lease_seconds": 60,
+        })
+
+    @pytest.mark.asyncio
+    async def test_renew_leases_bulk_update(self):
+        db, table_mock, _ = _mock_supabase()
+        table_mock.execute = AsyncMock(return_value=MagicMock(data=[{"id": "t1"}]))
+        repo = SupabaseTaskRepository(db)
+        assert await repo.renew_leases("w1", ["t1", "t2"], 60) == 1
+        table_mock.in_.assert_called_once_with("id", ["t1", "t2"])
+        table_mock.eq.assert_any_call("worker_id", "w1")
+        assert await repo.renew_leases("w1", [], 60) == 0
+
+    @pytest.mark.asyncio
+    async def test_claim_pending_zero_limit(self):
+        db, _, _ = _mock_supabase()
+        repo = SupabaseTaskRepository(db)
+        assert await repo.claim_pending("w1", limit=0) == []
+        db.rpc.assert_not_called()
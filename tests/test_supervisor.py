@@ -0,0 +1,88 @@
+"""Тесты супервизора многопроцессного режима."""
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.supervisor import WorkerSupervisor, check_account_sharding, run_supervisor
+
+
+def _sleep_forever(_index: int, _count: int) -> None:
+    time.sleep(60)
+
+
+def _crash(_index: int, _count: int) -> None:
+    sys.exit(3)
+
+
+def _run_in_thread(supervisor: WorkerSupervisor) -> threading.Thread:
+    thread = threading.Thread(target=supervisor.run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _wait_for(predicate, timeout: float = 10.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestWorkerSupervisor:
+    """Запуск, рестарт и координированная остановка процессов."""
+
+    def test_rejects_zero_workers(self) -> None:
+        with pytest.raises(ValueError, match="n_workers"):
+            WorkerSupervisor(0)
+
+    def test_starts_workers_and_stops_them(self) -> None:
+        supervisor = WorkerSupervisor(2, target=_sleep_forever, shutdown_grace=5, check_interval=0.05)
+        thread = _run_in_thread(supervisor)
+
+        assert _wait_for(lambda: all(pid is not None for pid in supervisor.pids))
+        pids = supervisor.pids
+        assert len(set(pids)) == 2
+
+        supervisor.request_stop()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+        assert supervisor.restarts == 0
+
+    def test_restarts_crashed_worker(self) -> None:
+        supervisor = WorkerSupervisor(1, target=_crash, shutdown_grace=5, check_interval=0.05)
+        thread = _run_in_thread(supervisor)
+
+        # Первый рестарт — через 1с после падения
+        assert _wait_for(lambda: supervisor.restarts >= 1)
+
+        supervisor.request_stop()
+        thread.join(timeout=10)
+        assert not thread.is_alive()
+
+
+def _settings(backend: str, accounts: int) -> MagicMock:
+    settings = MagicMock()
+    settings.scraper_backend = backend
+    settings.all_account_credentials = [MagicMock() for _ in range(accounts)]
+    return settings
+
+
+class TestAccountSharding:
+    """--workers N не больше числа Instagram-аккаунтов (бэкенд instagrapi)."""
+
+    def test_more_workers_than_accounts_rejected(self) -> None:
+        with pytest.raises(ValueError, match="exceeds Instagram accounts"):
+            check_account_sharding(3, _settings("instagrapi", 2))
+
+    def test_run_supervisor_exits_without_spawning(self) -> None:
+        assert run_supervisor(3, _settings("instagrapi", 2)) == 2
+
+    def test_enough_accounts(self) -> None:
+        check_account_sharding(2, _settings("instagrapi", 2))
+
+    def test_hikerapi_ignores_accounts(self) -> None:
+        check_account_sharding(4, _settings("hikerapi", 0))
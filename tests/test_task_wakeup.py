@@ -0,0 +1,172 @@
+"""Тесты канала пробуждения воркера (TaskWakeup, LISTEN/NOTIFY)."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import src.task_wakeup as tw
+from src.task_wakeup import (
+    TASK_CHANNEL,
+    TaskWakeup,
+    listen_for_new_tasks,
+    notify_task_created,
+    set_active_wakeup,
+)
+from tests.conftest import make_db_mock
+
+
+class TestTaskWakeup:
+    """TaskWakeup: notify/wait."""
+
+    async def test_wait_times_out_without_notify(self) -> None:
+        wakeup = TaskWakeup()
+        assert await wakeup.wait(0.01) is False
+        assert wakeup.wakeup_count == 0
+
+    async def test_notify_before_wait_returns_immediately(self) -> None:
+        wakeup = TaskWakeup()
+        wakeup.notify("test")
+        assert await wakeup.wait(5) is True
+        assert wakeup.wakeup_count == 1
+
+    async def test_multiple_notifies_coalesce(self) -> None:
+        wakeup = TaskWakeup()
+        wakeup.notify()
+        wakeup.notify()
+        wakeup.notify()
+        assert await wakeup.wait(5) is True
+        # Сигнал сброшен после пробуждения
+        assert await wakeup.wait(0.01) is False
+        assert wakeup.notify_count == 3
+
+    async def test_notify_during_wait(self) -> None:
+        wakeup = TaskWakeup()
+
+        async def notify_soon() -> None:
+            await asyncio.sleep(0.01)
+            wakeup.notify()
+
+        notifier = asyncio.create_task(notify_soon())
+        assert await wakeup.wait(5) is True
+        await notifier
+
+
+class TestNotifyTaskCreated:
+    """In-process notify через активный wakeup."""
+
+    async def test_noop_without_active_wakeup(self) -> None:
+        set_active_wakeup(None)
+        notify_task_created("full_scrape")  # не падает
+
+    async def test_notifies_active_wakeup(self) -> None:
+        wakeup = TaskWakeup()
+        set_active_wakeup(wakeup)
+        try:
+            notify_task_created("full_scrape")
+            assert await wakeup.wait(0.01) is True
+        finally:
+            set_active_wakeup(None)
+
+    async def test_create_task_if_not_exists_notifies(self) -> None:
+        from src.database import create_task_if_not_exists
+
+        db = make_db_mock()
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data="task-1"))
+        wakeup = TaskWakeup()
+        set_active_wakeup(wakeup)
+        try:
+            assert await create_task_if_not_exists(db, "blog-1", "full_scrape", 3) == "task-1"
+            assert wakeup.notify_count == 1
+        finally:
+            set_active_wakeup(None)
+
+    async def test_existing_task_does_not_notify(self) -> None:
+        from src.database import create_task_if_not_exists
+
+        db = make_db_mock()
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=None))
+        wakeup = TaskWakeup()
+        set_active_wakeup(wakeup)
+        try:
+            assert await create_task_if_not_exists(db, "blog-1", "full_scrape", 3) is None
+            assert wakeup.notify_count == 0
+        finally:
+            set_active_wakeup(None)
+
+
+class TestListenForNewTasks:
+    """LISTEN-цикл поверх asyncpg (соединение замокано)."""
+
+    @staticmethod
+    def _make_conn() -> MagicMock:
+        conn = MagicMock()
+        conn.add_listener = AsyncMock()
+        conn.close = AsyncMock()
+        conn.is_closed.return_value = False
+        return conn
+
+    async def test_notify_payload_wakes_worker(self) -> None:
+        conn = self._make_conn()
+        wakeup = TaskWakeup()
+        shutdown = asyncio.Event()
+
+        with patch("src.task_wakeup.asyncpg.connect", new=AsyncMock(return_value=conn)):
+            listener = asyncio.create_task(listen_for_new_tasks("postgresql://x", wakeup, shutdown))
+            await asyncio.sleep(0.01)
+            channel, callback = conn.add_listener.call_args.args
+            assert channel == TASK_CHANNEL
+            # Сигнал о подключении уже выставлен — сбрасываем
+            await wakeup.wait(0.01)
+
+            callback(conn, 1, TASK_CHANNEL, "full_scrape")
+            assert await wakeup.wait(0.5) is True
+
+            shutdown.set()
+            await asyncio.wait_for(listener, timeout=1)
+
+        conn.close.assert_awaited_once()
+
+    async def test_reconnects_after_connect_error(self) -> None:
+        conn = self._make_conn()
+        wakeup = TaskWakeup()
+        shutdown = asyncio.Event()
+        connect = AsyncMock(side_effect=[OSError("connection refused"), conn])
+
+        with (
+            patch("src.task_wakeup.asyncpg.connect", new=connect),
+            patch.object(tw, "LISTEN_RECONNECT_DELAY", 0.01),
+        ):
+            listener = asyncio.create_task(listen_for_new_tasks("postgresql://x", wakeup, shutdown))
+            assert await wakeup.wait(1) is True  # listen-connected после reconnect
+            shutdown.set()
+            await asyncio.wait_for(listener, timeout=1)
+
+        assert connect.await_count == 2
+
+    async def test_reconnects_after_connection_lost(self) -> None:
+        first, second = self._make_conn(), self._make_conn()
+        wakeup = TaskWakeup()
+        shutdown = asyncio.Event()
+        connect = AsyncMock(side_effect=[first, second])
+
+        with (
+            patch("src.task_wakeup.asyncpg.connect", new=connect),
+            patch.object(tw, "LISTEN_RECONNECT_DELAY", 0.01),
+        ):
+            listener = asyncio.create_task(listen_for_new_tasks("postgresql://x", wakeup, shutdown))
+            await asyncio.sleep(0.01)
+            on_lost = first.add_termination_listener.call_args.args[0]
+            first.is_closed.return_value = True
+            on_lost(first)
+            await asyncio.sleep(0.05)
+            shutdown.set()
+            await asyncio.wait_for(listener, timeout=1)
+
+        assert connect.await_count == 2
+        second.close.assert_awaited_once()
+
+    async def test_exits_immediately_when_shutdown_set(self) -> None:
+        shutdown = asyncio.Event()
+        shutdown.set()
+        connect = AsyncMock()
+        with patch("src.task_wakeup.asyncpg.connect", new=connect):
+            await listen_for_new_tasks("postgresql://x", TaskWakeup(), shutdown)
+        connect.assert_not_awaited()
@@ -10,6 +10,7 @@ from src.models.blog import BioLink, ScrapedPost
 from src.platforms.base import DiscoveredProfile
 from src.platforms.instagram.exceptions import (
     AllAccountsCooldownError,
+    HikerBudgetExhaustedError,
     PrivateAccountError,
 )
 from tests.conftest import make_db_mock, make_scraped_profile, make_settings, make_task
@@ -112,6 +113,37 @@ class TestHandleFullScrape:
         ]
         assert "pending" in statuses
 
+    @pytest.mark.asyncio
+    async def test_budget_exhausted_requeues_without_attempt(self) -> None:
+        """Исчерпан бюджет HikerAPI → requeue до сброса бюджета, попытка не сжигается."""
+        from src.worker.handlers import handle_full_scrape
+
+        task = _make_task("full_scrape", attempts=1)
+        mock_db = make_db_mock()
+        blog_select_mock = MagicMock()
+        blog_select_mock.data = [{"username": "testblogger"}]
+        table_mock = MagicMock()
+        table_mock.select.return_value.eq.return_value.execute = AsyncMock(return_value=blog_select_mock)
+        table_mock.update.return_value.eq.return_value.execute = AsyncMock(return_value=MagicMock())
+        mock_db.table.return_value = table_mock
+
+        mock_scraper = AsyncMock()
+        mock_scraper.scrape_profile.side_effect = HikerBudgetExhaustedError(
+            "HikerAPI daily budget exhausted: *", reset_in_seconds=3600,
+        )
+
+        with (
+            patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
+            patch("src.worker.handlers.requeue_task", new_callable=AsyncMock) as mock_requeue,
+            patch("src.worker.handlers.mark_task_failed", new_callable=AsyncMock) as mock_failed,
+        ):
+            await handle_full_scrape(mock_db, task, mock_scraper, _make_settings())
+
+        mock_failed.assert_not_called()
+        mock_requeue.assert_awaited_once_with(
+            mock_db, "task-1", 1, "HikerAPI daily budget exhausted: *", 3600,
+        )
+
     @pytest.mark.asyncio
     async def test_user_not_found_sets_deleted_and_needs_review(self) -> None:
         from instagrapi.exceptions import UserNotFound
@@ -330,6 +362,29 @@ class TestHandleFullScrape:
             # Скрапинг не должен запускаться
             mock_scraper.scrape_profile.assert_not_called()
 
+    @pytest.mark.asyncio
+    @patch("src.worker.handlers.persist_profile_images", new_callable=AsyncMock, return_value=(None, {}))
+    async def test_pre_claimed_task_skips_mark_running(self, _mock_persist: AsyncMock) -> None:
+        """Задача из claim_pending_tasks (running) не claim'ится повторно, attempts не инкрементируется."""
+        from src.worker.handlers import handle_full_scrape
+
+        task = _make_task("full_scrape", status="running", attempts=2)
+        mock_db = make_db_mock()
+        mock_db.table.return_value.execute = AsyncMock(return_value=MagicMock(data=[{"username": "testblogger"}]))
+        mock_scraper = AsyncMock()
+        mock_scraper.scrape_profile.side_effect = RuntimeError("boom")
+
+        with (
+            patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock) as mock_claim,
+            patch("src.worker.handlers.mark_task_failed", new_callable=AsyncMock) as mock_failed,
+        ):
+            await handle_full_scrape(mock_db, task, mock_scraper, _make_settings())
+
+        mock_claim.assert_not_called()
+        mock_scraper.scrape_profile.assert_called_once_with("testblogger")
+        # attempts из claim — уже актуальные
+        assert mock_failed.call_args.args[2] == 2
+
     @pytest.mark.asyncio
     async def test_storage_urls_replace_cdn(self) -> None:
         """persist_profile_images подставляет Storage URL вместо CDN URL."""
@@ -381,6 +436,100 @@ class TestHandleFullScrape:
                     assert data["avatar_url"] == storage_avatar
 
 
+    @pytest.mark.asyncio
+    async def test_incremental_reuses_known_posts(self) -> None:
+        """payload incremental: известные посты передаются скраперу, в Storage — только новые."""
+        from src.worker.handlers import handle_full_scrape
+
+        task = _make_task("full_scrape", payload={"incremental": True})
+        storage = "https://sb.co/storage/v1/object/public/blog-images/blog-1"
+
+        def _chain(data: list[dict[str, object]]) -> MagicMock:
+            table = MagicMock()
+            for method in ("select", "eq", "order", "limit", "update"):
+                getattr(table, method).return_value = table
+            table.execute = AsyncMock(return_value=MagicMock(data=data))
+            return table
+
+        def _stored(pid: str, likes: int, day: int) -> dict[str, object]:
+            return {
+                "platform_id": pid, "media_type": 1, "like_count": likes, "comment_count": 5,
+                "play_count": None, "view_count": None, "thumbnail_url": f"{storage}/post_{pid}.jpg",
+                "taken_at": f"2026-01-{day:02d}T00:00:00+00:00",
+                "top_comments": [{"username": "fan", "text": "Класс"}],
+            }
+
+        blogs_table = _chain([{"username": "testblogger"}])
+        posts_table = _chain([_stored("k1", 10, 10), _stored("k2", 20, 5)])
+        mock_db = make_db_mock()
+        mock_db.table.side_effect = lambda name: posts_table if name == "blog_posts" else blogs_table
+
+        def _post(pid: str, likes: int, day: int) -> ScrapedPost:
+            return ScrapedPost(
+                platform_id=pid, media_type=1, like_count=likes, comment_count=5,
+                thumbnail_url=f"https://cdn.instagram.com/{pid}.jpg",
+                taken_at=datetime(2026, 1, day, tzinfo=UTC),
+            )
+
+        profile = _make_scraped_profile(medias=[_post("n1", 7, 20), _post("k1", 15, 10), _post("k2", 20, 5)])
+        mock_scraper = AsyncMock()
+        mock_scraper.scrape_profile.return_value = profile
+
+        with (
+            patch("src.worker.handlers.persist_profile_images", new_callable=AsyncMock,
+                  return_value=(None, {"n1": f"{storage}/post_n1.jpg"})) as mock_persist,
+            patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock),
+            patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock) as mock_upsert_posts,
+            patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
+        ):
+            await handle_full_scrape(mock_db, task, mock_scraper, _make_settings(posts_to_fetch=25))
+
+        known = mock_scraper.scrape_profile.call_args.args[1]
+        assert [p.platform_id for p in known] == ["k1", "k2"]
+        assert known[0].top_comments[0].username == "fan"
+        # В Storage — только новый пост
+        assert [p["platform_id"] for p in mock_persist.call_args.args[4]] == ["n1"]
+        # upsert — новый пост и известный с изменившимися лайками; k2 не изменился
+        upserted = mock_upsert_posts.call_args.args[2]
+        assert [p["platform_id"] for p in upserted] == ["n1", "k1"]
+        assert upserted[1]["thumbnail_url"] == f"{storage}/post_k1.jpg"
+        mock_done.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_image_index_round_trip(self) -> None:
+        """blogs.image_index передаётся в persist_profile_images и сохраняется с данными блога."""
+        from src.worker.handlers import handle_full_scrape
+
+        index = {"blog-1/post_p1.jpg": {"sha256": "h1"}}
+        mock_db = make_db_mock()
+        mock_db.table.return_value.execute = AsyncMock(
+            return_value=MagicMock(data=[{"username": "testblogger", "image_index": index}]),
+        )
+        mock_scraper = AsyncMock()
+        mock_scraper.scrape_profile.return_value = _make_scraped_profile()
+
+        async def _persist(*_args: object, image_index: dict[str, dict[str, str]], **_kwargs: object) -> object:
+            image_index["blog-1/avatar.jpg"] = {"sha256": "a1"}
+            return None, {}
+
+        with (
+            patch("src.worker.handlers.persist_profile_images", side_effect=_persist),
+            patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
+            patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
+            patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
+        ):
+            await handle_full_scrape(mock_db, _make_task("full_scrape"), mock_scraper, _make_settings())
+
+        assert mock_upsert.call_args.args[2]["image_index"] == {
+            "blog-1/post_p1.jpg": {"sha256": "h1"},
+            "blog-1/avatar.jpg": {"sha256": "a1"},
+        }
+
+
 class TestProcessTask:
     """Тесты process_task."""
 
@@ -457,7 +606,7 @@ class TestHandleDiscover:
 
         settings = MagicMock()
 
-        with patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock):
+        with patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock):
             await handle_discover(mock_db, task, mock_scraper, settings)
 
         mock_scraper.discover.assert_called_once_with("beauty", 1000)
@@ -501,12 +650,14 @@ class TestHandleDiscover:
         settings = MagicMock()
         settings.rescrape_days = 60
 
-        with patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock) as mock_create:
+        with patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create:
             await handle_discover(mock_db, task, mock_scraper, settings)
 
         # insert(person) + insert(blog) только один раз для unique username.
         assert table_mock.insert.return_value.execute.call_count == 2
-        mock_create.assert_called_once_with(mock_db, "blog-1", "full_scrape", priority=5)
+        mock_create.assert_called_once_with(
+            mock_db, [{"blog_id": "blog-1", "task_type": "full_scrape", "priority": 5}],
+        )
 
     @pytest.mark.asyncio
     async def test_no_hashtag_in_payload(self) -> None:
@@ -608,11 +759,13 @@ class TestHandleDiscover:
 
         with (
             patch("src.worker.handlers.is_blog_fresh", new_callable=AsyncMock, return_value=False) as mock_fresh,
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await handle_discover(mock_db, task, mock_scraper, settings)
             mock_fresh.assert_called_once_with(mock_db, "existing-blog", 60)
-            mock_create.assert_called_once_with(mock_db, "existing-blog", "full_scrape", priority=5)
+            mock_create.assert_called_once_with(
+                mock_db, [{"blog_id": "existing-blog", "task_type": "full_scrape", "priority": 5}],
+            )
 
         # insert не должен вызываться — профиль уже есть
         table_mock.insert.assert_not_called()
@@ -713,6 +866,34 @@ class TestHandleDiscover:
 _mock_db_for_batch = make_db_mock
 
 
+class TestClaimTask:
+    """Тесты _claim_task — общий claim для handlers."""
+
+    @pytest.mark.asyncio
+    async def test_pending_task_claimed_via_rpc(self) -> None:
+        from src.worker.handlers import HandlerRepos, _claim_task
+
+        with patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True) as mock_claim:
+            assert await _claim_task(HandlerRepos.for_db(MagicMock()).tasks, _make_task(attempts=1)) == 2
+        mock_claim.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_lost_race_returns_none(self) -> None:
+        from src.worker.handlers import HandlerRepos, _claim_task
+
+        with patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=False):
+            assert await _claim_task(HandlerRepos.for_db(MagicMock()).tasks, _make_task()) is None
+
+    @pytest.mark.asyncio
+    async def test_running_task_returns_attempts_as_is(self) -> None:
+        from src.worker.handlers import HandlerRepos, _claim_task
+
+        with patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock) as mock_claim:
+            tasks = HandlerRepos.for_db(MagicMock()).tasks
+            assert await _claim_task(tasks, _make_task(status="running", attempts=3)) == 3
+        mock_claim.assert_not_called()
+
+
 class TestHandleBatchResults:
     """Тесты handle_batch_results."""
 
@@ -1225,6 +1406,59 @@ class TestHandleAiAnalysis:
         mock_failed.assert_called_once()
         assert mock_failed.call_args.kwargs["retry"] is True
 
+    @pytest.mark.asyncio
+    async def test_pre_claimed_task_released_when_batch_not_ready(self) -> None:
+        """Захваченная claim_pending_tasks задача возвращается в pending, если батч не набран."""
+        from src.worker.handlers import handle_ai_analysis
+
+        db = make_db_mock()
+        task = _make_task("ai_analysis", status="running", attempts=2,
+                          created_at=datetime.now(UTC).isoformat())
+        settings = MagicMock()
+        settings.batch_min_size = 10
+        settings.worker_poll_interval = 30
+
+        await handle_ai_analysis(db, task, MagicMock(), settings)
+
+        update_args = db.table.return_value.update.call_args[0][0]
+        assert update_args["status"] == "pending"
+        assert update_args["attempts"] == 1
+        assert update_args["next_retry_at"] is not None
+        db.table.return_value.eq.assert_any_call("status", "running")
+
+    @pytest.mark.asyncio
+    async def test_pre_claimed_task_joins_batch_without_reclaim(self) -> None:
+        """Захваченная задача уходит в батч без mark_task_running; остальные claim'ятся."""
+        from src.worker.handlers import handle_ai_analysis
+
+        db = make_db_mock()
+        now_iso = datetime.now(UTC).isoformat()
+        task = _make_task("ai_analysis", task_id="t0", blog_id="b0", status="running", created_at=now_iso)
+        settings = MagicMock()
+        settings.batch_min_size = 2
+        pending_data = MagicMock(data=[{"id": "t1", "blog_id": "b1", "created_at": now_iso, "attempts": 0}])
+        blog_data = MagicMock(data=[
+            {"id": bid, "username": f"blog{bid}", "platform_id": bid, "bio": "Bio",
+             "followers_count": 1000, "following_count": 100, "media_count": 50}
+            for bid in ("b1", "b0")
+        ])
+        empty_data = MagicMock(data=[])
+
+        with (
+            patch("src.worker.handlers.submit_batch", new_callable=AsyncMock, return_value="batch-1") as mock_submit,
+            patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True) as mock_claim,
+        ):
+            db.table.return_value.execute = AsyncMock(
+                side_effect=[pending_data, blog_data, empty_data, empty_data, MagicMock(), MagicMock()],
+            )
+            await handle_ai_analysis(db, task, MagicMock(), settings)
+
+        mock_claim.assert_awaited_once_with(db, "t1")
+        assert len(mock_submit.call_args.args[1]) == 2
+        # Нет отката в pending — только сохранение batch_id
+        for update_call in db.table.return_value.update.call_args_list:
+            assert update_call.args[0].get("status") != "pending"
+
     @pytest.mark.asyncio
     async def test_skips_posts_with_null_taken_at(self) -> None:
         """Пост с taken_at=None не крашит весь батч — пропускается."""
@@ -1620,7 +1854,7 @@ class TestHandleDiscoverEdge:
         with (
             patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             person_ok = MagicMock(data=[{"id": "person-2"}])
             blog_ok = MagicMock(data=[{"id": "blog-2"}])
@@ -1635,8 +1869,10 @@ class TestHandleDiscoverEdge:
 
             # Задача помечена done, несмотря на ошибку первого профиля
             mock_done.assert_called_once()
-            # gooduser создан (full_scrape задача создана)
-            mock_create.assert_called_once()
+            # gooduser создан (full_scrape задача создана одним bulk-вызовом)
+            mock_create.assert_called_once_with(
+                db, [{"blog_id": "blog-2", "task_type": "full_scrape", "priority": 5}],
+            )
 
     async def test_blog_insert_failure_cleans_orphan_person(self) -> None:
         """Если blog insert упал после person insert, orphan person очищается."""
@@ -1688,7 +1924,7 @@ class TestHandleDiscoverEdge:
         with (
             patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
             patch("src.worker.handlers.is_blog_fresh", new_callable=AsyncMock, return_value=True),
         ):
             # Оба профиля уже в базе (batch query возвращает оба)
@@ -1718,7 +1954,7 @@ class TestHandleDiscoverEdge:
         with (
             patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
             patch("src.worker.handlers.is_blog_fresh", new_callable=AsyncMock, return_value=False),
         ):
             # Блог уже в базе (batch query с username)
@@ -1729,7 +1965,45 @@ class TestHandleDiscoverEdge:
             await handle_discover(db, task, scraper, settings)
 
             mock_done.assert_called_once()
-            mock_create.assert_called_once_with(db, "existing-blog", "full_scrape", priority=5)
+            mock_create.assert_called_once_with(
+                db, [{"blog_id": "existing-blog", "task_type": "full_scrape", "priority": 5}],
+            )
+
+    async def test_discover_uses_handler_repos(self) -> None:
+        """Статусы и follow-up задачи идут через переданные repos, не через src.database."""
+        from src.repositories.memory import InMemoryBlogRepository, InMemoryTaskRepository
+        from src.worker.handlers import HandlerRepos, handle_discover
+
+        db = make_db_mock()
+        scraper = MagicMock()
+        scraper.discover = AsyncMock(return_value=[
+            DiscoveredProfile(username="stale_user", full_name="Stale", platform_id="1", follower_count=5000),
+        ])
+        tasks = InMemoryTaskRepository()
+        task_id = await tasks.create_if_not_exists(None, "discover", 10, payload={"hashtag": "beauty"})
+        assert task_id is not None
+
+        with (
+            patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock) as mock_running,
+            patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
+        ):
+            db.table.return_value.execute = AsyncMock(return_value=MagicMock(data=[
+                {"id": "existing-blog", "username": "stale_user", "scraped_at": None},
+            ]))
+
+            await handle_discover(
+                db, dict(tasks.tasks[task_id]), scraper, MagicMock(),
+                repos=HandlerRepos(tasks=tasks, blogs=InMemoryBlogRepository()),
+            )
+
+        mock_running.assert_not_called()
+        mock_done.assert_not_called()
+        mock_create.assert_not_called()
+        assert tasks.tasks[task_id]["status"] == "done"
+        assert [(t["blog_id"], t["task_type"]) for t in tasks.tasks.values() if t["status"] == "pending"] == [
+            ("existing-blog", "full_scrape"),
+        ]
 
     async def test_discover_existing_fresh_blog_skips_task(self) -> None:
         """Существующий свежий блог → задача full_scrape не создаётся."""
@@ -1747,7 +2021,7 @@ class TestHandleDiscoverEdge:
         with (
             patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
             patch("src.worker.handlers.is_blog_fresh", new_callable=AsyncMock, return_value=True),
         ):
             db.table.return_value.execute = AsyncMock(return_value=MagicMock(data=[
@@ -1759,6 +2033,36 @@ class TestHandleDiscoverEdge:
             mock_done.assert_called_once()
             mock_create.assert_not_called()
 
+    async def test_discover_bulk_task_error_still_marks_done(self) -> None:
+        """Ошибка bulk-создания задач не роняет discover — блоги подберёт backfill."""
+        from src.worker.handlers import handle_discover
+
+        db = make_db_mock()
+        settings = MagicMock()
+        scraper = MagicMock()
+        scraper.discover = AsyncMock(return_value=[
+            DiscoveredProfile(username="stale_user", full_name="Stale", platform_id="1", follower_count=5000),
+        ])
+
+        task = _make_task("discover", payload={"hashtag": "beauty", "min_followers": 1000})
+
+        with (
+            patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
+            patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
+            patch(
+                "src.worker.handlers.create_tasks_if_not_exist",
+                new_callable=AsyncMock, side_effect=RuntimeError("rpc down"),
+            ),
+            patch("src.worker.handlers.is_blog_fresh", new_callable=AsyncMock, return_value=False),
+        ):
+            db.table.return_value.execute = AsyncMock(return_value=MagicMock(data=[
+                {"id": "existing-blog", "username": "stale_user", "scraped_at": None},
+            ]))
+
+            await handle_discover(db, task, scraper, settings)
+
+            mock_done.assert_called_once_with(db, "task-1")
+
     async def test_discover_normalizes_username_for_select_and_insert(self) -> None:
         """Discover normalizes username before dedup check and insert."""
         from src.worker.handlers import handle_discover
@@ -1796,7 +2100,7 @@ class TestHandleDiscoverEdge:
         with (
             patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
         ):
             await handle_discover(db, task, scraper, settings)
 
@@ -1859,7 +2163,7 @@ class TestHandleFullScrapeEdge:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock) as mock_done,
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -1905,7 +2209,7 @@ class TestHandleFullScrapeNewFields:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -1944,7 +2248,7 @@ class TestHandleFullScrapeNewFields:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -1978,7 +2282,7 @@ class TestHandleFullScrapeNewFields:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -2008,7 +2312,7 @@ class TestHandleFullScrapeNewFields:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -2083,7 +2387,7 @@ class TestHandleFullScrapeNewFields:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -2125,7 +2429,7 @@ class TestHandleFullScrapeNewFields:
             patch("src.worker.handlers.upsert_blog", new_callable=AsyncMock) as mock_upsert,
             patch("src.worker.handlers.upsert_posts", new_callable=AsyncMock),
             patch("src.worker.handlers.upsert_highlights", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
         ):
             db.table.return_value.execute = AsyncMock(side_effect=[
@@ -2242,6 +2546,37 @@ class TestLoadProfilesBioLinksCompat:
         assert len(profile.medias[0].top_comments) == 2
         assert profile.medias[0].top_comments[0].username == "user_1"
 
+    async def test_llm_variants_from_image_index(self) -> None:
+        """Изображения с "llm" в image_index получают URL LLM-варианта для submit_batch."""
+        from src.worker.handlers import _load_profiles_for_batch
+
+        storage = "https://sb.co/storage/v1/object/public/blog-images/b1"
+        db = make_db_mock()
+        pending_tasks = [{"id": "t1", "blog_id": "b1", "attempts": 0, "max_attempts": 3}]
+
+        blogs_result = MagicMock(data=[{
+            "id": "b1", "username": "test", "platform_id": "123",
+            "avatar_url": f"{storage}/avatar.jpg",
+            "image_index": {
+                "b1/avatar.jpg": {"sha256": "a", "llm": "image/jpeg"},
+                "b1/post_p2.jpg": {"sha256": "b"},  # варианта нет
+            },
+        }])
+        posts_result = MagicMock(data=[
+            {
+                "blog_id": "b1", "platform_id": pid, "media_type": 1,
+                "taken_at": "2026-01-01T12:00:00+00:00", "thumbnail_url": f"{storage}/post_{pid}.jpg",
+            }
+            for pid in ("p1", "p2")
+        ])
+        empty_data = MagicMock(data=[])
+
+        db.table.return_value.execute = AsyncMock(side_effect=[blogs_result, posts_result, empty_data])
+        llm_variants: dict[str, str] = {}
+        await _load_profiles_for_batch(db, pending_tasks, llm_variants)
+
+        assert llm_variants == {f"{storage}/avatar.jpg": f"{storage}/avatar_llm.jpg"}
+
 
 class TestHandleDiscoverNewFields:
     """Тесты новых полей в handle_discover."""
@@ -2288,7 +2623,7 @@ class TestHandleDiscoverNewFields:
         with (
             patch("src.worker.handlers.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch("src.worker.handlers.mark_task_done", new_callable=AsyncMock),
-            patch("src.worker.handlers.create_task_if_not_exists", new_callable=AsyncMock),
+            patch("src.worker.handlers.create_tasks_if_not_exist", new_callable=AsyncMock),
         ):
             await handle_discover(db, task, scraper, settings)
 
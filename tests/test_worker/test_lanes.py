@@ -0,0 +1,106 @@
+"""Тесты lanes воркера: парсинг spec, распределение бюджета, статистика."""
+import asyncio
+
+import pytest
+
+from src.worker.lanes import LANE_TASK_TYPES, Lane, WorkerLanes, parse_lane_spec
+from tests.conftest import make_settings
+
+
+class TestParseLaneSpec:
+    def test_full_spec(self) -> None:
+        assert parse_lane_spec("full_scrape:3:2, pre_filter:2:1") == {
+            "full_scrape": (3, 2),
+            "pre_filter": (2, 1),
+        }
+
+    def test_weight_defaults_to_one(self) -> None:
+        assert parse_lane_spec("discover:2") == {"discover": (2, 1)}
+
+    def test_empty(self) -> None:
+        assert parse_lane_spec("") == {}
+
+    @pytest.mark.parametrize("spec", ["full_scrape", "unknown:1:1", "full_scrape:x:1", "full_scrape:0:1", "a:1:1:1"])
+    def test_invalid(self, spec: str) -> None:
+        with pytest.raises(ValueError, match="Invalid lane spec"):
+            parse_lane_spec(spec)
+
+
+class TestWorkerLanes:
+    def test_from_settings_fills_missing_types(self) -> None:
+        lanes = WorkerLanes.from_settings(make_settings(worker_lanes="full_scrape:3:2", worker_max_concurrent=5))
+        assert lanes.lanes["full_scrape"].max_concurrent == 3
+        assert lanes.lanes["full_scrape"].weight == 2
+        assert lanes.lanes["pre_filter"].max_concurrent == 5
+        assert lanes.lanes["pre_filter"].weight == 1
+
+    def test_default_lanes_fit_global_limit(self) -> None:
+        """Лимиты lanes по умолчанию укладываются в worker_max_concurrent — у каждого типа свой слот."""
+        from src.config import Settings
+
+        defaults = Settings.model_fields
+        spec = parse_lane_spec(defaults["worker_lanes"].default)
+        assert set(spec) == set(LANE_TASK_TYPES)
+        assert sum(limit for limit, _weight in spec.values()) <= defaults["worker_max_concurrent"].default
+
+    def test_allocate_by_weight(self) -> None:
+        lanes = WorkerLanes([Lane("full_scrape", 10, 3), Lane("pre_filter", 10, 1)])
+        assert lanes.allocate(8) == {"full_scrape": 6, "pre_filter": 2}
+
+    def test_allocate_caps_at_free_slots_and_redistributes(self) -> None:
+        lanes = WorkerLanes([Lane("full_scrape", 2, 5), Lane("pre_filter", 10, 1), Lane("discover", 10, 1)])
+        allocation = lanes.allocate(10)
+        assert allocation["full_scrape"] == 2
+        assert sum(allocation.values()) == 10
+
+    def test_allocate_skips_full_lanes(self) -> None:
+        full = Lane("full_scrape", 1, 5)
+        full.reserve()
+        lanes = WorkerLanes([full, Lane("pre_filter", 3, 1)])
+        assert lanes.allocate(10) == {"pre_filter": 3}
+
+    def test_allocate_nothing_free(self) -> None:
+        lane = Lane("full_scrape", 1, 1)
+        lane.reserve()
+        assert WorkerLanes([lane]).allocate(10) == {}
+
+    def test_small_budget_not_lost_to_rounding(self) -> None:
+        lanes = WorkerLanes([Lane(t, 5, 1) for t in ("full_scrape", "pre_filter", "discover", "ai_analysis")])
+        assert sum(lanes.allocate(3).values()) == 3
+
+
+class TestLane:
+    async def test_slot_tracks_occupancy_and_wait(self) -> None:
+        lane = Lane("pre_filter", 1, 1)
+        claimed_at = lane.reserve()
+        assert lane.free_slots == 0
+
+        async with lane.slot(claimed_at):
+            assert lane.active == 1
+        lane.release()
+
+        snap = lane.snapshot()
+        assert snap["active"] == 0
+        assert snap["in_flight"] == 0
+        assert snap["started"] == 1
+        assert snap["completed"] == 1
+        assert snap["wait_max_seconds"] >= 0
+
+    async def test_slot_enforces_cap(self) -> None:
+        lane = Lane("full_scrape", 1, 1)
+        entered = asyncio.Event()
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with lane.slot():
+                entered.set()
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await entered.wait()
+        second = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        assert lane.active == 1
+        release.set()
+        await asyncio.gather(holder, second)
+        assert lane.completed == 2
@@ -1,6 +1,6 @@
 """Тесты polling-цикла воркера."""
 import asyncio
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import ANY, AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -81,6 +81,7 @@ class TestProcessTask:
 
     @pytest.mark.asyncio
     async def test_dispatches_full_scrape(self) -> None:
+        from src.worker.handlers import HandlerRepos
         from src.worker.loop import process_task
 
         task = {
@@ -97,16 +98,18 @@ class TestProcessTask:
         settings = MagicMock()
         semaphore = asyncio.Semaphore(2)
         upload_semaphore = asyncio.Semaphore(5)
+        repos = HandlerRepos.for_db(mock_db)
 
         with patch("src.worker.loop.handle_full_scrape", new_callable=AsyncMock) as mock_handler:
             await process_task(
                 mock_db, task, {"instagram": mock_scraper},
-                mock_openai, settings, semaphore, upload_semaphore,
+                mock_openai, settings, semaphore, upload_semaphore, repos=repos,
             )
-            mock_handler.assert_called_once_with(mock_db, task, mock_scraper, settings, upload_semaphore)
+            mock_handler.assert_called_once_with(mock_db, task, mock_scraper, settings, upload_semaphore, repos=repos)
 
     @pytest.mark.asyncio
     async def test_dispatches_ai_analysis(self) -> None:
+        from src.worker.handlers import HandlerRepos
         from src.worker.loop import process_task
 
         task = {
@@ -122,15 +125,17 @@ class TestProcessTask:
         settings = MagicMock()
         semaphore = asyncio.Semaphore(2)
         upload_semaphore = asyncio.Semaphore(5)
+        repos = HandlerRepos.for_db(mock_db)
 
         with patch("src.worker.loop.handle_ai_analysis", new_callable=AsyncMock) as mock_handler:
             await process_task(
-                mock_db, task, {}, mock_openai, settings, semaphore, upload_semaphore,
+                mock_db, task, {}, mock_openai, settings, semaphore, upload_semaphore, repos=repos,
             )
-            mock_handler.assert_called_once_with(mock_db, task, mock_openai, settings)
+            mock_handler.assert_called_once_with(mock_db, task, mock_openai, settings, repos=repos)
 
     @pytest.mark.asyncio
     async def test_dispatches_discover(self) -> None:
+        from src.worker.handlers import HandlerRepos
         from src.worker.loop import process_task
 
         task = {
@@ -147,13 +152,14 @@ class TestProcessTask:
         settings = MagicMock()
         semaphore = asyncio.Semaphore(2)
         upload_semaphore = asyncio.Semaphore(5)
+        repos = HandlerRepos.for_db(mock_db)
 
         with patch("src.worker.loop.handle_discover", new_callable=AsyncMock) as mock_handler:
             await process_task(
                 mock_db, task, {"instagram": mock_scraper},
-                mock_openai, settings, semaphore, upload_semaphore,
+                mock_openai, settings, semaphore, upload_semaphore, repos=repos,
             )
-            mock_handler.assert_called_once_with(mock_db, task, mock_scraper, settings)
+            mock_handler.assert_called_once_with(mock_db, task, mock_scraper, settings, repos=repos)
 
     @pytest.mark.asyncio
     async def test_handles_unknown_task_type(self) -> None:
@@ -291,12 +297,16 @@ class TestRunWorker:
         settings.worker_poll_interval = 1
         settings.worker_max_concurrent = 2
         settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
         settings.openai_api_key = "test"
 
         shutdown_event = asyncio.Event()
         mock_openai = MagicMock()
 
-        with patch("src.worker.loop.fetch_pending_tasks", new_callable=AsyncMock) as mock_fetch:
+        with patch("src.worker.loop.claim_pending_tasks", new_callable=AsyncMock) as mock_fetch:
             mock_fetch.return_value = []
 
             # Запускаем воркер и сразу ставим shutdown
@@ -320,6 +330,10 @@ class TestRunWorker:
         settings.worker_poll_interval = 0.1
         settings.worker_max_concurrent = 2
         settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
         settings.openai_api_key = "test"
 
         shutdown_event = asyncio.Event()
@@ -333,7 +347,7 @@ class TestRunWorker:
                 shutdown_event.set()
             return []
 
-        with patch("src.worker.loop.fetch_pending_tasks", side_effect=counted_fetch):
+        with patch("src.worker.loop.claim_pending_tasks", side_effect=counted_fetch):
             await run_worker(mock_db, {}, settings, shutdown_event, mock_openai)
 
         assert fetch_count >= 2
@@ -348,6 +362,10 @@ class TestRunWorker:
         settings.worker_poll_interval = 0.1
         settings.worker_max_concurrent = 2
         settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
         settings.openai_api_key = "test"
 
         shutdown_event = asyncio.Event()
@@ -368,7 +386,7 @@ class TestRunWorker:
             return tasks_returned[min(idx, len(tasks_returned) - 1)]
 
         with (
-            patch("src.worker.loop.fetch_pending_tasks", side_effect=mock_fetch),
+            patch("src.worker.loop.claim_pending_tasks", side_effect=mock_fetch),
             patch("src.worker.loop.process_task", new_callable=AsyncMock),
         ):
             # process_task замокан — не будет реального выполнения
@@ -389,6 +407,10 @@ class TestRunWorker:
         settings.worker_poll_interval = 0.1
         settings.worker_max_concurrent = 2
         settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
         settings.openai_api_key = "test"
 
         shutdown_event = asyncio.Event()
@@ -403,7 +425,7 @@ class TestRunWorker:
             shutdown_event.set()
             return []
 
-        with patch("src.worker.loop.fetch_pending_tasks", side_effect=failing_fetch):
+        with patch("src.worker.loop.claim_pending_tasks", side_effect=failing_fetch):
             await run_worker(mock_db, {}, settings, shutdown_event, mock_openai)
 
         # Воркер пережил ошибку и продолжил работу
@@ -419,6 +441,10 @@ class TestRunWorker:
         settings.worker_poll_interval = 0.1
         settings.worker_max_concurrent = 5
         settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
         settings.openai_api_key = "test"
 
         shutdown_event = asyncio.Event()
@@ -442,7 +468,7 @@ class TestRunWorker:
             return []
 
         with (
-            patch("src.worker.loop.fetch_pending_tasks", side_effect=mock_fetch),
+            patch("src.worker.loop.claim_pending_tasks", side_effect=mock_fetch),
             patch("src.worker.loop.handle_full_scrape", side_effect=slow_handler),
         ):
             await run_worker(
@@ -463,6 +489,10 @@ class TestRunWorker:
         settings.worker_poll_interval = 0.1
         settings.worker_max_concurrent = 5
         settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
         settings.openai_api_key = "test"
 
         shutdown_event = asyncio.Event()
@@ -481,6 +511,9 @@ class TestRunWorker:
 
         async def mock_fetch(*args, **kwargs):
             nonlocal call_idx
+            # Claim идёт отдельно по каждой lane — считаем poll'ы по lane full_scrape
+            if kwargs.get("task_types") != ["full_scrape"]:
+                return []
             call_idx += 1
             if call_idx == 1:
                 return [{"id": "t1", "task_type": "full_scrape", "blog_id": "b1"}]
@@ -493,7 +526,7 @@ class TestRunWorker:
             return set(), set(tasks)
 
         with (
-            patch("src.worker.loop.fetch_pending_tasks", side_effect=mock_fetch),
+            patch("src.worker.loop.claim_pending_tasks", side_effect=mock_fetch),
             patch("src.worker.loop.handle_full_scrape", side_effect=stuck_handler),
             patch("src.worker.loop.asyncio.wait", side_effect=fast_wait),
         ):
@@ -504,3 +537,406 @@ class TestRunWorker:
 
         # Задача должна быть отменена
         assert was_cancelled is True
+
+
+class TestRunWorkerWakeup:
+    """Пробуждение run_worker по новым задачам до истечения poll_interval."""
+
+    @pytest.mark.asyncio
+    async def test_notify_wakes_worker_before_poll_interval(self) -> None:
+        from src.task_wakeup import TaskWakeup, notify_task_created
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 30
+        settings.worker_max_concurrent = 2
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+
+        shutdown_event = asyncio.Event()
+        fetch_count = 0
+
+        async def counted_fetch(*args, **kwargs):
+            nonlocal fetch_count
+            if kwargs.get("task_types") != ["full_scrape"]:
+                return []
+            fetch_count += 1
+            if fetch_count >= 2:
+                shutdown_event.set()
+            return []
+
+        async def create_soon():
+            await asyncio.sleep(0.05)
+            notify_task_created("full_scrape")
+
+        with patch("src.worker.loop.claim_pending_tasks", side_effect=counted_fetch):
+            creator = asyncio.create_task(create_soon())
+            await asyncio.wait_for(
+                run_worker(MagicMock(), {}, settings, shutdown_event, MagicMock(), wakeup=TaskWakeup()),
+                timeout=2,
+            )
+            await creator
+
+        # Второй poll произошёл по notify, а не через 30с
+        assert fetch_count == 2
+
+    @pytest.mark.asyncio
+    async def test_shutdown_interrupts_wait(self) -> None:
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 30
+        settings.worker_max_concurrent = 2
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+
+        shutdown_event = asyncio.Event()
+
+        async def stop_soon():
+            await asyncio.sleep(0.05)
+            shutdown_event.set()
+
+        with patch("src.worker.loop.claim_pending_tasks", new_callable=AsyncMock, return_value=[]):
+            stopper = asyncio.create_task(stop_soon())
+            await asyncio.wait_for(
+                run_worker(MagicMock(), {}, settings, shutdown_event, MagicMock()),
+                timeout=2,
+            )
+            await stopper
+
+    @pytest.mark.asyncio
+    async def test_unregisters_wakeup_on_exit(self) -> None:
+        import src.task_wakeup as tw
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 0.1
+        settings.worker_max_concurrent = 2
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+
+        shutdown_event = asyncio.Event()
+        shutdown_event.set()
+
+        with patch("src.worker.loop.claim_pending_tasks", new_callable=AsyncMock, return_value=[]):
+            await run_worker(MagicMock(), {}, settings, shutdown_event, MagicMock())
+
+        assert tw._active_wakeup is None
+
+
+class TestClaimedTaskRollback:
+    """Откат attempts при транзиентной ошибке учитывает claim."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(("status", "expected_attempts"), [("running", 1), ("pending", 2)])
+    async def test_transient_error_rollback(self, status: str, expected_attempts: int) -> None:
+        from src.worker.loop import process_task
+
+        mock_db = MagicMock()
+        table = mock_db.table.return_value
+        table.update.return_value.eq.return_value.execute = AsyncMock()
+        task = {"id": "t1", "task_type": "discover", "status": status, "attempts": 2, "max_attempts": 3}
+
+        with patch(
+            "src.worker.loop.handle_discover",
+            new_callable=AsyncMock,
+            side_effect=OSError(11, "Resource temporarily unavailable"),
+        ):
+            await process_task(
+                mock_db, task, {"instagram": MagicMock()}, MagicMock(), MagicMock(),
+                asyncio.Semaphore(1), asyncio.Semaphore(1),
+            )
+
+        update_args = table.update.call_args[0][0]
+        assert update_args["status"] == "pending"
+        assert update_args["attempts"] == expected_attempts
+
+    @pytest.mark.asyncio
+    async def test_run_worker_claims_with_worker_id(self) -> None:
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 0.1
+        settings.worker_max_concurrent = 2
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+        settings.worker_id = "replica-a"
+
+        shutdown_event = asyncio.Event()
+
+        async def claim_once(*args, **kwargs):
+            shutdown_event.set()
+            return []
+
+        with patch("src.worker.loop.claim_pending_tasks", side_effect=claim_once) as mock_claim:
+            await run_worker(MagicMock(), {}, settings, shutdown_event, MagicMock())
+
+        assert mock_claim.call_args.args[1] == "replica-a"
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_renews_leases_of_active_tasks(self) -> None:
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 0.05
+        settings.worker_max_concurrent = 8
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 0.02
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+        settings.worker_id = "replica-a"
+        settings.worker_lanes = ""
+
+        shutdown_event = asyncio.Event()
+        claimed = False
+        release = asyncio.Event()
+
+        async def claim_one(*args, **kwargs):
+            nonlocal claimed
+            if claimed or kwargs.get("task_types") != ["discover"]:
+                return []
+            claimed = True
+            assert kwargs["lease_seconds"] == 60
+            return [{"id": "t1", "task_type": "discover", "attempts": 1, "max_attempts": 3}]
+
+        async def slow_handler(*args, **kwargs):
+            await release.wait()
+
+        renew = AsyncMock(return_value=1)
+
+        async def stop_after_renew():
+            while renew.await_count < 2:  # noqa: ASYNC110
+                await asyncio.sleep(0.01)
+            release.set()
+            shutdown_event.set()
+
+        with (
+            patch("src.worker.loop.claim_pending_tasks", side_effect=claim_one),
+            patch("src.worker.loop.handle_discover", side_effect=slow_handler),
+            patch("src.worker.loop.renew_task_leases", renew),
+        ):
+            stopper = asyncio.create_task(stop_after_renew())
+            await asyncio.wait_for(
+                run_worker(MagicMock(), {"instagram": MagicMock()}, settings, shutdown_event, MagicMock()),
+                timeout=5,
+            )
+            await stopper
+
+        renew.assert_awaited_with(ANY, "replica-a", ["t1"], 60)
+
+
+class TestRunWorkerLanes:
+    """Claim по lanes: доля окна выборки и лимит свободных слотов."""
+
+    @staticmethod
+    def _settings() -> MagicMock:
+        settings = MagicMock()
+        settings.worker_poll_interval = 0.05
+        settings.worker_max_concurrent = 10
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+        settings.worker_id = "w"
+        return settings
+
+    @pytest.mark.asyncio
+    async def test_claims_per_lane_with_allocation(self) -> None:
+        from src.worker.lanes import Lane, WorkerLanes
+        from src.worker.loop import run_worker
+
+        lanes = WorkerLanes([Lane("full_scrape", 2, 3), Lane("pre_filter", 5, 1)])
+        shutdown_event = asyncio.Event()
+        calls: list[tuple[list[str], int]] = []
+
+        async def mock_claim(*args, **kwargs):
+            calls.append((kwargs["task_types"], kwargs["limit"]))
+            shutdown_event.set()
+            return []
+
+        with patch("src.worker.loop.claim_pending_tasks", side_effect=mock_claim):
+            await run_worker(MagicMock(), {}, self._settings(), shutdown_event, MagicMock(), lanes=lanes)
+
+        # full_scrape ограничена 2 слотами, остаток окна уходит pre_filter (до её лимита 5)
+        assert sorted(calls) == [(["full_scrape"], 2), (["pre_filter"], 5)]
+
+    @pytest.mark.asyncio
+    async def test_busy_lane_not_claimed_and_released_after_done(self) -> None:
+        from src.worker.lanes import Lane, WorkerLanes
+        from src.worker.loop import run_worker
+
+        lanes = WorkerLanes([Lane("full_scrape", 1, 1), Lane("pre_filter", 1, 1)])
+        shutdown_event = asyncio.Event()
+        release = asyncio.Event()
+        polls: list[list[str]] = []
+
+        async def slow_handler(*args, **kwargs):
+            await release.wait()
+
+        async def mock_claim(*args, **kwargs):
+            task_types = kwargs["task_types"]
+            polls.append(task_types)
+            if task_types == ["full_scrape"] and polls.count(["full_scrape"]) == 1:
+                return [{"id": "t1", "task_type": "full_scrape", "blog_id": "b1", "status": "running"}]
+            if polls.count(["pre_filter"]) >= 3:
+                shutdown_event.set()
+                release.set()
+            return []
+
+        with (
+            patch("src.worker.loop.claim_pending_tasks", side_effect=mock_claim),
+            patch("src.worker.loop.handle_full_scrape", side_effect=slow_handler),
+        ):
+            await run_worker(
+                MagicMock(), {"instagram": MagicMock()}, self._settings(), shutdown_event, MagicMock(), lanes=lanes,
+            )
+
+        # Пока full_scrape занята, её lane не claim'ится
+        assert polls.count(["full_scrape"]) == 1
+        assert lanes.lanes["full_scrape"].in_flight == 0
+        assert lanes.lanes["full_scrape"].completed == 1
+
+    @pytest.mark.asyncio
+    async def test_claim_error_in_one_lane_still_starts_other(self) -> None:
+        from src.worker.lanes import Lane, WorkerLanes
+        from src.worker.loop import run_worker
+
+        lanes = WorkerLanes([Lane("full_scrape", 1, 1), Lane("discover", 1, 1)])
+        shutdown_event = asyncio.Event()
+        handled = asyncio.Event()
+
+        async def handler(*args, **kwargs):
+            handled.set()
+
+        async def mock_claim(*args, **kwargs):
+            shutdown_event.set()
+            if kwargs["task_types"] == ["discover"]:
+                raise RuntimeError("db down")
+            return [{"id": "t1", "task_type": "full_scrape", "blog_id": "b1", "status": "running"}]
+
+        with (
+            patch("src.worker.loop.claim_pending_tasks", side_effect=mock_claim),
+            patch("src.worker.loop.handle_full_scrape", side_effect=handler),
+        ):
+            await run_worker(
+                MagicMock(), {"instagram": MagicMock()}, self._settings(), shutdown_event, MagicMock(), lanes=lanes,
+            )
+
+        assert handled.is_set()
+
+
+class TestRunWorkerAdaptivePolling:
+    """Размер выборки по свободной ёмкости и немедленный повтор при насыщении."""
+
+    @pytest.mark.asyncio
+    async def test_drains_backlog_without_waiting_poll_interval(self) -> None:
+        from src.worker.lanes import Lane, WorkerLanes
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 30
+        settings.worker_max_concurrent = 4
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+        settings.worker_id = "w"
+
+        backlog = [
+            {"id": f"t{i}", "task_type": "discover", "status": "running", "attempts": 1, "max_attempts": 3}
+            for i in range(25)
+        ]
+        limits: list[int] = []
+        shutdown_event = asyncio.Event()
+        handled = 0
+
+        async def mock_claim(*args, **kwargs):
+            limit = kwargs["limit"]
+            limits.append(limit)
+            batch = backlog[:limit]
+            del backlog[:limit]
+            return batch
+
+        async def handler(*args, **kwargs):
+            nonlocal handled
+            handled += 1
+            if handled == 25:
+                shutdown_event.set()
+
+        with (
+            patch("src.worker.loop.claim_pending_tasks", side_effect=mock_claim),
+            patch("src.worker.loop.handle_discover", side_effect=handler),
+        ):
+            await asyncio.wait_for(
+                run_worker(
+                    MagicMock(), {"instagram": MagicMock()}, settings, shutdown_event, MagicMock(),
+                    lanes=WorkerLanes([Lane("discover", 4, 1)]),
+                ),
+                timeout=5,
+            )
+
+        assert handled == 25
+        # Выборка не больше свободной ёмкости
+        assert max(limits) == 4
+
+
+class TestRunWorkerInMemoryQueue:
+    """run_worker поверх InMemoryTaskRepository — без Supabase."""
+
+    @pytest.mark.asyncio
+    async def test_processes_all_tasks_in_priority_order(self) -> None:
+        from src.repositories.memory import InMemoryBlogRepository, InMemoryTaskRepository
+        from src.worker.handlers import HandlerRepos
+        from src.worker.lanes import Lane, WorkerLanes
+        from src.worker.loop import run_worker
+
+        settings = MagicMock()
+        settings.worker_poll_interval = 30
+        settings.worker_max_concurrent = 1
+        settings.upload_max_concurrent = 5
+        settings.task_lease_seconds = 60
+        settings.task_lease_renew_seconds = 15
+        settings.status_flush_interval_ms = 50
+        settings.status_flush_max_items = 100
+        settings.worker_id = "w"
+
+        repo = InMemoryTaskRepository()
+        for i, priority in enumerate([5, 1, 3]):
+            await repo.create_if_not_exists(f"blog-{i}", "discover", priority)
+
+        shutdown_event = asyncio.Event()
+        seen: list[int] = []
+
+        async def handler(_db, task, *args, repos):
+            seen.append(task["priority"])
+            await repos.tasks.mark_done(task["id"])
+            if len(seen) == 3:
+                shutdown_event.set()
+
+        with patch("src.worker.loop.handle_discover", side_effect=handler):
+            await asyncio.wait_for(
+                run_worker(
+                    MagicMock(), {"instagram": MagicMock()}, settings, shutdown_event, MagicMock(),
+                    lanes=WorkerLanes([Lane("discover", 1, 1)]), task_repo=repo,
+                    repos=HandlerRepos(tasks=repo, blogs=InMemoryBlogRepository()),
+                ),
+                timeout=5,
+            )
+
+        assert seen == [1, 3, 5]
+        assert repo.status_counts() == {"done": 3}
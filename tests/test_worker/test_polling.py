@@ -0,0 +1,34 @@
+"""Тесты адаптивного темпа polling (PollPacer)."""
+from src.worker.polling import PollPacer
+
+
+class TestPollPacer:
+    def test_saturated_with_free_slots_polls_immediately(self) -> None:
+        decision = PollPacer(30).next_delay(requested=5, claimed=5, free_slots=3)
+        assert decision.delay == 0
+        assert "saturated" in decision.reason
+
+    def test_saturated_without_free_slots_waits_for_wakeup(self) -> None:
+        decision = PollPacer(30).next_delay(requested=5, claimed=5, free_slots=0)
+        assert decision.delay == 30
+
+    def test_no_capacity_waits_full_interval(self) -> None:
+        decision = PollPacer(30).next_delay(requested=0, claimed=0, free_slots=0)
+        assert decision.delay == 30
+        assert decision.reason == "no free slots"
+
+    def test_empty_queue_backs_off_exponentially(self) -> None:
+        pacer = PollPacer(10, min_interval=1)
+        delays = [pacer.next_delay(requested=5, claimed=0, free_slots=5).delay for _ in range(6)]
+        assert delays == [1, 2, 4, 8, 10, 10]
+
+    def test_claim_resets_backoff(self) -> None:
+        pacer = PollPacer(10, min_interval=1)
+        pacer.next_delay(requested=5, claimed=0, free_slots=5)
+        pacer.next_delay(requested=5, claimed=0, free_slots=5)
+        assert pacer.next_delay(requested=5, claimed=2, free_slots=3).delay == 1
+        assert pacer.next_delay(requested=5, claimed=0, free_slots=5).delay == 1
+
+    def test_min_interval_capped_by_max(self) -> None:
+        pacer = PollPacer(0.1)
+        assert pacer.next_delay(requested=5, claimed=0, free_slots=5).delay == 0.1
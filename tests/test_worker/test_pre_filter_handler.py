@@ -9,6 +9,7 @@ from instagrapi.exceptions import UserNotFound
 from src.platforms.instagram.exceptions import (
     AllAccountsCooldownError,
     HikerAPIError,
+    HikerBudgetExhaustedError,
     InsufficientBalanceError,
     PrivateAccountError,
 )
@@ -75,6 +76,7 @@ def _make_scraper(
 ) -> MagicMock:
     """Фабрика scraper-мока — маршрутизирует по return_value/side_effect метода."""
     scraper = MagicMock()
+    scraper.cl = AsyncMock()
     if isinstance(user_info, BaseException):
         scraper.cl.user_by_username_v2.side_effect = user_info
     else:
@@ -97,11 +99,6 @@ def _make_scraper(
     return scraper
 
 
-async def _mock_to_thread(func, *args, **kwargs):
-    """Mock asyncio.to_thread — делегирует вызов в настроенный scraper mock."""
-    return func(*args, **kwargs)
-
-
 def _no_blog_result() -> MagicMock:
     """Результат проверки блога — блог не найден."""
     result = MagicMock()
@@ -145,7 +142,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(_make_user_info(is_private=True))
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -175,7 +171,6 @@ class TestHandlePreFilter:
         )
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -199,7 +194,6 @@ class TestHandlePreFilter:
         )
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -220,7 +214,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(_make_user_info(), posts=posts, clips=_empty_medias())
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -252,7 +245,6 @@ class TestHandlePreFilter:
         db = _setup_db_execute(_no_blog_result(), person_result, blog_result)
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.mark_task_done", new_callable=AsyncMock) as mock_done,
         ):
@@ -270,7 +262,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(_make_user_info(), posts=_empty_medias(), clips=_empty_medias())
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -312,7 +303,6 @@ class TestHandlePreFilter:
         db = _setup_db_execute(_no_blog_result(), person_result, blog_result)
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.mark_task_done", new_callable=AsyncMock) as mock_done,
         ):
@@ -340,6 +330,12 @@ class TestHandlePreFilter:
                 {"url": "https://link.com", "title": "My site", "link_type": "external"}
             ]
             mock_done.assert_called_once_with(db, task["id"])
+            # Ответы HikerAPI переданы в prefetch-кэш для full_scrape
+            scraper.prefetch.put.assert_called_once_with(
+                "good_user",
+                scraper.cl.user_by_username_v2.return_value,
+                scraper.cl.user_medias_chunk_v1.return_value,
+            )
 
     @pytest.mark.asyncio
     async def test_user_not_found_filtered_out(self) -> None:
@@ -351,7 +347,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(UserNotFound())
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -371,7 +366,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(InsufficientBalanceError("No balance"))
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.mark_task_failed", new_callable=AsyncMock) as mock_failed,
         ):
@@ -392,7 +386,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(HikerAPIError(404, "Target user not found"))
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -422,7 +415,6 @@ class TestHandlePreFilter:
         )
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -457,7 +449,6 @@ class TestHandlePreFilter:
         db = _setup_db_execute(_no_blog_result(), person_result, blog_result)
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.mark_task_done", new_callable=AsyncMock) as mock_done,
         ):
@@ -480,7 +471,6 @@ class TestHandlePreFilter:
         )
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -510,7 +500,6 @@ class TestHandlePreFilter:
         db = _setup_db_execute(_no_blog_result(), person_result, blog_result)
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.mark_task_done", new_callable=AsyncMock) as mock_done,
         ):
@@ -533,7 +522,6 @@ class TestHandlePreFilter:
         )
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -569,7 +557,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(PrivateAccountError("This account is private"))
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
@@ -592,7 +579,6 @@ class TestHandlePreFilter:
         scraper = _make_scraper(AllAccountsCooldownError("All accounts on cooldown"))
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.mark_task_failed", new_callable=AsyncMock) as mock_failed,
         ):
@@ -601,6 +587,25 @@ class TestHandlePreFilter:
             mock_failed.assert_called_once()
             assert mock_failed.call_args[1]["retry"] is True
 
+    @pytest.mark.asyncio
+    async def test_budget_exhausted_requeues_until_reset(self) -> None:
+        """HikerBudgetExhaustedError → requeue_task до сброса бюджета без траты попытки."""
+        from src.worker.pre_filter_handler import handle_pre_filter
+
+        task = make_task("pre_filter", blog_id=None, payload={"username": "budget_user"}, attempts=0)
+        db = _setup_db_execute(_no_blog_result())
+        scraper = _make_scraper(HikerBudgetExhaustedError("budget", reset_in_seconds=120))
+
+        with (
+            patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
+            patch(f"{_MOD}._h.mark_task_failed", new_callable=AsyncMock) as mock_failed,
+            patch(f"{_MOD}._h.requeue_task", new_callable=AsyncMock) as mock_requeue,
+        ):
+            await handle_pre_filter(db, task, scraper, _pf_settings())
+
+            mock_failed.assert_not_called()
+            mock_requeue.assert_awaited_once_with(db, task["id"], 0, "budget", 120)
+
     @pytest.mark.asyncio
     async def test_blog_creation_error_cleans_up_person(self) -> None:
         """Ошибка при создании blog → cleanup_orphan_person + mark_task_failed."""
@@ -623,7 +628,6 @@ class TestHandlePreFilter:
         )
 
         with (
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread),
             patch(f"{_MOD}._h.mark_task_running", new_callable=AsyncMock, return_value=True),
             patch(f"{_MOD}._h.cleanup_orphan_person", new_callable=AsyncMock) as mock_cleanup,
             patch(f"{_MOD}._h.mark_task_failed", new_callable=AsyncMock) as mock_failed,
@@ -649,11 +653,10 @@ class TestHandlePreFilter:
 
         with (
             patch(f"{_MOD}._h.mark_task_done", new_callable=AsyncMock) as mock_done,
-            patch(f"{_MOD}.asyncio.to_thread", side_effect=_mock_to_thread) as mock_api,
         ):
             await handle_pre_filter(db, task, scraper, _pf_settings())
 
             # Задача завершена без ошибок
             mock_done.assert_called_once_with(db, task["id"])
             # HikerAPI вызовы НЕ делались
-            mock_api.assert_not_called()
+            scraper.cl.user_by_username_v2.assert_not_called()
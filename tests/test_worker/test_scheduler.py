@@ -23,24 +23,51 @@ class TestScheduleUpdates:
 
         settings = MagicMock()
         settings.rescrape_days = 60
+        settings.incremental_rescrape = True
 
         # Вернуть 2 устаревших блога
         result_mock = MagicMock()
         result_mock.data = [{"id": "blog-1"}, {"id": "blog-2"}]
         db = _make_async_db(result_mock)
 
-        # Мок create_task_if_not_exists
+        # Один bulk RPC на все блоги
         with patch(
-            "src.worker.scheduler.create_task_if_not_exists",
+            "src.worker.scheduler.create_tasks_if_not_exist",
             new_callable=AsyncMock,
-            return_value="task-id",
+            return_value=["task-1", "task-2"],
         ) as mock_create:
             await schedule_updates(db, settings)
 
-            assert mock_create.call_count == 2
-            # Проверяем priority=8 для re-scrape
-            mock_create.assert_any_call(db, "blog-1", "full_scrape", priority=8)
-            mock_create.assert_any_call(db, "blog-2", "full_scrape", priority=8)
+            # Проверяем priority=8 и инкрементальный режим для re-scrape
+            mock_create.assert_called_once_with(db, [
+                {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 8,
+                 "payload": {"incremental": True}},
+                {"blog_id": "blog-2", "task_type": "full_scrape", "priority": 8,
+                 "payload": {"incremental": True}},
+            ])
+
+    @pytest.mark.asyncio
+    async def test_incremental_disabled_creates_plain_tasks(self) -> None:
+        from src.worker.scheduler import schedule_updates
+
+        settings = MagicMock()
+        settings.rescrape_days = 60
+        settings.incremental_rescrape = False
+
+        result_mock = MagicMock()
+        result_mock.data = [{"id": "blog-1"}]
+        db = _make_async_db(result_mock)
+
+        with patch(
+            "src.worker.scheduler.create_tasks_if_not_exist",
+            new_callable=AsyncMock,
+            return_value=["task-1"],
+        ) as mock_create:
+            await schedule_updates(db, settings)
+
+            mock_create.assert_called_once_with(db, [
+                {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 8},
+            ])
 
     @pytest.mark.asyncio
     async def test_no_stale_blogs(self) -> None:
@@ -54,7 +81,7 @@ class TestScheduleUpdates:
         db = _make_async_db(result_mock)
 
         with patch(
-            "src.worker.scheduler.create_task_if_not_exists",
+            "src.worker.scheduler.create_tasks_if_not_exist",
             new_callable=AsyncMock,
         ) as mock_create:
             await schedule_updates(db, settings)
@@ -78,7 +105,7 @@ class TestScheduleUpdatesRescrape:
         db = _make_async_db(result_mock)
 
         with patch(
-            "src.worker.scheduler.create_task_if_not_exists",
+            "src.worker.scheduler.create_tasks_if_not_exist",
             new_callable=AsyncMock,
         ):
             await schedule_updates(db, settings)
@@ -100,7 +127,7 @@ class TestScheduleUpdatesRescrape:
         db = _make_async_db(result_mock)
 
         with patch(
-            "src.worker.scheduler.create_task_if_not_exists",
+            "src.worker.scheduler.create_tasks_if_not_exist",
             new_callable=AsyncMock,
         ):
             await schedule_updates(db, settings)
@@ -115,7 +142,7 @@ class TestScheduleUpdatesEdge:
 
     @pytest.mark.asyncio
     async def test_duplicate_tasks_not_counted(self) -> None:
-        """create_task_if_not_exists возвращает None для дубликатов — счётчик не растёт."""
+        """create_tasks_if_not_exist возвращает None для дубликатов — счётчик не растёт."""
         from src.worker.scheduler import schedule_updates
 
         settings = MagicMock()
@@ -125,14 +152,18 @@ class TestScheduleUpdatesEdge:
         result_mock.data = [{"id": "blog-1"}, {"id": "blog-2"}]
         db = _make_async_db(result_mock)
 
-        with patch(
-            "src.worker.scheduler.create_task_if_not_exists",
-            new_callable=AsyncMock,
-            # Первый — новая задача, второй — уже существует
-            side_effect=["task-new", None],
-        ) as mock_create:
+        with (
+            patch(
+                "src.worker.scheduler.create_tasks_if_not_exist",
+                new_callable=AsyncMock,
+                # Первый — новая задача, второй — уже существует
+                return_value=["task-new", None],
+            ) as mock_create,
+            patch("src.worker.scheduler.logger") as mock_logger,
+        ):
             await schedule_updates(db, settings)
-            assert mock_create.call_count == 2
+            mock_create.assert_called_once()
+            mock_logger.info.assert_called_once_with("Scheduled 1 blog re-scrape tasks")
 
     @pytest.mark.asyncio
     async def test_includes_null_scraped_at_in_filter(self) -> None:
@@ -147,7 +178,7 @@ class TestScheduleUpdatesEdge:
         db = _make_async_db(result_mock)
 
         with patch(
-            "src.worker.scheduler.create_task_if_not_exists",
+            "src.worker.scheduler.create_tasks_if_not_exist",
             new_callable=AsyncMock,
         ):
             await schedule_updates(db, settings)
@@ -290,6 +321,20 @@ class TestCreateScheduler:
         job_ids = [job.id for job in scheduler.get_jobs()]
         assert "recover_tasks" in job_ids
 
+    def test_recover_leases_job_every_minute(self) -> None:
+        from src.worker.scheduler import create_scheduler
+
+        settings = MagicMock()
+        settings.discovery_hashtags_list = []
+        settings.backfill_scrape_interval_minutes = 30
+        settings.backfill_ai_interval_minutes = 60
+
+        scheduler = create_scheduler(MagicMock(), settings)
+
+        job = scheduler.get_job("recover_leases")
+        assert job is not None
+        assert job.trigger.interval.total_seconds() == 60
+
 
 class TestPollBatches:
     """Тесты poll_batches."""
@@ -463,6 +508,32 @@ class TestRecoverTasks:
             mock_recover.assert_called_once_with(mock_db, max_running_minutes=30)
 
 
+class TestRecoverLeases:
+    """Тесты recover_leases."""
+
+    @pytest.mark.asyncio
+    async def test_calls_recover_expired_leases(self) -> None:
+        from src.worker.scheduler import recover_leases
+
+        mock_db = MagicMock()
+
+        with patch("src.worker.scheduler.recover_expired_leases", new_callable=AsyncMock) as mock_recover:
+            mock_recover.return_value = 2
+            await recover_leases(mock_db)
+            mock_recover.assert_called_once_with(mock_db)
+
+    @pytest.mark.asyncio
+    async def test_error_does_not_crash(self) -> None:
+        from src.worker.scheduler import recover_leases
+
+        with patch(
+            "src.worker.scheduler.recover_expired_leases",
+            new_callable=AsyncMock,
+            side_effect=RuntimeError("db down"),
+        ):
+            await recover_leases(MagicMock())
+
+
 class TestCleanupOldImages:
     """Тесты cleanup_old_images."""
 
@@ -692,16 +763,39 @@ class TestBackfillScrape:
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=100),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock, return_value=False),
             patch(
-                "src.worker.scheduler.create_task_if_not_exists",
-                new_callable=AsyncMock, return_value="task-id",
+                "src.worker.scheduler.create_tasks_if_not_exist",
+                new_callable=AsyncMock, return_value=["task-id"] * 3,
             ) as mock_create,
         ):
             await backfill_scrape(db=db, settings=settings)
 
-            assert mock_create.call_count == 3
-            mock_create.assert_any_call(db, "blog-1", "full_scrape", priority=6)
-            mock_create.assert_any_call(db, "blog-2", "full_scrape", priority=6)
-            mock_create.assert_any_call(db, "blog-3", "full_scrape", priority=6)
+            mock_create.assert_called_once_with(db, [
+                {"blog_id": "blog-1", "task_type": "full_scrape", "priority": 6},
+                {"blog_id": "blog-2", "task_type": "full_scrape", "priority": 6},
+                {"blog_id": "blog-3", "task_type": "full_scrape", "priority": 6},
+            ])
+
+    @pytest.mark.asyncio
+    async def test_bulk_create_error_does_not_crash(self) -> None:
+        from src.worker.scheduler import backfill_scrape
+
+        settings = MagicMock()
+        settings.backfill_scrape_batch_size = 80
+        settings.ai_queue_pause_threshold = 500
+
+        db = make_db_mock()
+        db.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=[{"id": "blog-1"}]))
+
+        with (
+            patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=0),
+            patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock, return_value=False),
+            patch(
+                "src.worker.scheduler.create_tasks_if_not_exist",
+                new_callable=AsyncMock, side_effect=RuntimeError("rpc down"),
+            ) as mock_create,
+        ):
+            await backfill_scrape(db=db, settings=settings)
+            mock_create.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_empty_rpc_result(self) -> None:
@@ -721,7 +815,7 @@ class TestBackfillScrape:
         with (
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=0),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock, return_value=False),
-            patch("src.worker.scheduler.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await backfill_scrape(db=db, settings=settings)
             mock_create.assert_not_called()
@@ -739,7 +833,29 @@ class TestBackfillScrape:
         with (
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=0),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock, return_value=True),
-            patch("src.worker.scheduler.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
+        ):
+            await backfill_scrape(db=db, settings=settings)
+            mock_create.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_skips_on_hiker_budget_exhausted(self) -> None:
+        """Пропуск backfill_scrape, если governor недавно исчерпал дневной бюджет HikerAPI."""
+        from src.worker.scheduler import backfill_scrape
+
+        settings = MagicMock()
+        settings.backfill_scrape_batch_size = 80
+        settings.ai_queue_pause_threshold = 500
+
+        db = make_db_mock()
+
+        async def _errors(_db: object, pattern: str) -> bool:
+            return pattern == "daily budget exhausted"
+
+        with (
+            patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=0),
+            patch("src.worker.scheduler.has_recent_balance_errors", side_effect=_errors),
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await backfill_scrape(db=db, settings=settings)
             mock_create.assert_not_called()
@@ -758,7 +874,7 @@ class TestBackfillScrape:
         with (
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=600),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock) as mock_balance,
-            patch("src.worker.scheduler.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await backfill_scrape(db=db, settings=settings)
             mock_create.assert_not_called()
@@ -788,15 +904,16 @@ class TestBackfillAiAnalysis:
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=100),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock, return_value=False),
             patch(
-                "src.worker.scheduler.create_task_if_not_exists",
-                new_callable=AsyncMock, return_value="task-id",
+                "src.worker.scheduler.create_tasks_if_not_exist",
+                new_callable=AsyncMock, return_value=["task-id"] * 3,
             ) as mock_create,
         ):
             await backfill_ai_analysis(db=db, settings=settings)
 
-            assert mock_create.call_count == 2
-            mock_create.assert_any_call(db, "blog-1", "ai_analysis", priority=2)
-            mock_create.assert_any_call(db, "blog-2", "ai_analysis", priority=2)
+            mock_create.assert_called_once_with(db, [
+                {"blog_id": "blog-1", "task_type": "ai_analysis", "priority": 2},
+                {"blog_id": "blog-2", "task_type": "ai_analysis", "priority": 2},
+            ])
 
     @pytest.mark.asyncio
     async def test_empty_rpc_result(self) -> None:
@@ -816,7 +933,7 @@ class TestBackfillAiAnalysis:
         with (
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=0),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock, return_value=False),
-            patch("src.worker.scheduler.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await backfill_ai_analysis(db=db, settings=settings)
             mock_create.assert_not_called()
@@ -838,7 +955,7 @@ class TestBackfillAiAnalysis:
                 new_callable=AsyncMock,
                 return_value=True,
             ),
-            patch("src.worker.scheduler.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await backfill_ai_analysis(db=db, settings=settings)
             mock_create.assert_not_called()
@@ -863,7 +980,7 @@ class TestBackfillAiAnalysis:
                 side_effect=[False, True],
             ),
             patch(
-                "src.worker.scheduler.create_task_if_not_exists",
+                "src.worker.scheduler.create_tasks_if_not_exist",
                 new_callable=AsyncMock,
             ) as mock_create,
         ):
@@ -884,7 +1001,7 @@ class TestBackfillAiAnalysis:
         with (
             patch("src.worker.scheduler.count_running_ai_tasks", new_callable=AsyncMock, return_value=500),
             patch("src.worker.scheduler.has_recent_balance_errors", new_callable=AsyncMock) as mock_balance,
-            patch("src.worker.scheduler.create_task_if_not_exists", new_callable=AsyncMock) as mock_create,
+            patch("src.worker.scheduler.create_tasks_if_not_exist", new_callable=AsyncMock) as mock_create,
         ):
             await backfill_ai_analysis(db=db, settings=settings)
             mock_create.assert_not_called()